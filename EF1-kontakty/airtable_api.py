@@ -0,0 +1,243 @@
+#!/usr/bin/env python3
+"""
+Společná konfigurace a HTTP vrstva Airtable API pro všechny skripty.
+
+Adresu API jde přepsat proměnnou prostředí AIRTABLE_API_BASE – např. na
+lokální náhradu Airtable (fake_airtable.py) pro offline testy propustnosti:
+
+  python3 fake_airtable.py --port 8787 &
+  AIRTABLE_API_BASE=http://127.0.0.1:8787/v0 python3 propoj_kontakty_klienti.py
+
+Všechna volání jdou přes request_with_backoff(), které opakuje 429/5xx
+a měří počty, latence, opakování a bajty (http_metrics.py – souhrn se
+zapíše do metrics/ při ukončení skriptu). Souběžnost a tempo řídí
+rate_control.py: strop 5 req/s, limit souběžnosti podle 429 a Retry-After.
+
+Token se čte jednou za proces (AIRTABLE_TOKEN, jinak ~/.cursor/mcp.json) –
+při řetězení příkazů přes kontakty.py ho sdílí všechny kroky.
+
+Snapshot tabulek (pipeline.py): s AIRTABLE_SNAPSHOT_DIR (+ AIRTABLE_SNAPSHOT_TABLES)
+se GET výpisy uvedených tabulek obslouží z <dir>/<Tabulka>.json místo z API
+a zápisy skriptu se do načtené kopie propíšou – paralelní kroky tak sdílí jedno
+stažení tabulek.
+
+Schéma base (názvy a id tabulek a polí) drží airtable_schema.py v cache s TTL;
+zápisy na metadata API ho tady zneplatní.
+
+Dávkové zápisy (PATCH/POST po 10 záznamech) jdou přes write_records(): dávky
+se zařadí do perzistentní fronty (job_queue.py) a zapíše je pool pracovníků –
+přerušený běh po restartu pokračuje, už zapsané dávky se neposílají znovu.
+Dokončené volání své dávky z fronty zapomene – stejný zápis poslaný znovu
+(např. vrácení a opětovné použití změn) se tedy opravdu zapíše.
+
+Ve skriptech:
+  from airtable_api import API_BASE, API_META_BASE, get_token, request_with_backoff
+  url = f"{API_BASE}/{BASE_ID}/{quote('Kontakty', safe='')}"
+  data = request_with_backoff("GET", url, headers=hdrs, params={"pageSize": 100})
+  write_records("PATCH", BASE_ID, "Kontakty", updates, queue="osloveni")
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+import uuid
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import quote, unquote
+
+from http_metrics import METRICS, endpoint_label, record_retry, request
+from rate_control import THROTTLE_STATUSES, bounds_for, retry_after
+
+DEFAULT_API_BASE = "https://api.airtable.com/v0"
+
+API_BASE = (os.getenv("AIRTABLE_API_BASE", "").strip() or DEFAULT_API_BASE).rstrip("/")
+API_META_BASE = f"{API_BASE}/meta/bases"
+
+MCP_CONFIG = Path.home() / ".cursor" / "mcp.json"
+
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+MAX_ATTEMPTS = 7
+
+BATCH_SIZE = 10
+WRITE_QUEUE = "airtable_writes"
+
+SNAPSHOT_DIR = os.getenv("AIRTABLE_SNAPSHOT_DIR", "").strip()
+SNAPSHOT_TABLES = {t.strip() for t in os.getenv("AIRTABLE_SNAPSHOT_TABLES", "").split(",") if t.strip()}
+# parametry výpisu, které snapshot umí obsloužit (filterByFormula, sort… jdou dál na API)
+SNAPSHOT_PARAMS = {"pageSize", "offset", "fields[]", "fields"}
+
+
+class AirtableError(RuntimeError):
+    """Chybová odpověď Airtable, kterou nemá smysl opakovat (4xx mimo 429)."""
+
+    def __init__(self, status: int, text: str):
+        super().__init__(f"Airtable API error {status}: {text[:500]}")
+        self.status = status
+
+
+@lru_cache(maxsize=None)
+def get_token() -> str:
+    """Airtable token: AIRTABLE_TOKEN, jinak MCP konfigurace Cursoru."""
+    token = os.getenv("AIRTABLE_TOKEN", "").strip()
+    if token:
+        return token
+    with open(MCP_CONFIG, "r") as f:
+        return json.load(f)["mcpServers"]["airtable"]["env"]["AIRTABLE_API_KEY"]
+
+
+class TableSnapshot:
+    """Záznamy jedné tabulky v paměti (formát Airtable list: {"records": [...]}), udržované při zápisech."""
+
+    def __init__(self, records: list):
+        self.records: Dict[str, dict] = {r["id"]: r for r in records}
+        self.lock = threading.Lock()
+
+    def page(self, params: dict) -> dict:
+        size = min(100, int(params.get("pageSize") or 100))
+        start = int(params.get("offset") or 0)
+        only = params.get("fields[]") or params.get("fields")
+        if isinstance(only, str):
+            only = [only]
+        with self.lock:
+            window = list(self.records.values())[start:start + size]
+            total = len(self.records)
+        if only:
+            window = [{**r, "fields": {k: v for k, v in r.get("fields", {}).items() if k in only}} for r in window]
+        data = {"records": window}
+        if start + size < total:
+            data["offset"] = str(start + size)
+        return data
+
+    def apply(self, method: str, data: dict) -> None:
+        with self.lock:
+            if method == "DELETE":
+                for r in data.get("records", [data]):
+                    if r.get("deleted"):
+                        self.records.pop(r.get("id"), None)
+                return
+            for r in data.get("records", [data] if "id" in data else []):
+                if "id" in r:
+                    self.records[r["id"]] = r
+
+
+_snapshots: Dict[str, Optional[TableSnapshot]] = {}
+_snapshots_lock = threading.Lock()
+
+
+def _snapshot_for(url: str) -> Tuple[Optional[TableSnapshot], str]:
+    """(snapshot tabulky, id záznamu) pro URL datového API, pokud je tabulka ve snapshotu."""
+    if not SNAPSHOT_DIR or not url.startswith(API_BASE + "/"):
+        return None, ""
+    rest = url[len(API_BASE) + 1:].split("?")[0].split("/")
+    if len(rest) < 2 or rest[0] == "meta":
+        return None, ""
+    table, rec_id = unquote(rest[1]), (rest[2] if len(rest) > 2 else "")
+    if SNAPSHOT_TABLES and table not in SNAPSHOT_TABLES:
+        return None, ""
+    with _snapshots_lock:
+        if table not in _snapshots:
+            path = Path(SNAPSHOT_DIR) / f"{table}.json"
+            snap = None
+            if path.exists():
+                with open(path, "r", encoding="utf-8") as f:
+                    snap = TableSnapshot(json.load(f).get("records", []))
+            _snapshots[table] = snap
+        return _snapshots[table], rec_id
+
+
+def request_with_backoff(method: str, url: str, *, headers: dict, json: Optional[dict] = None,
+                         params: Optional[dict] = None, timeout: float = 60) -> dict:
+    """
+    Jeden požadavek na Airtable s opakováním při 429/5xx; vrací JSON odpovědi.
+    Po 429/503 se čeká na Retry-After (pauzu drží limiter poskytovatele pro všechna
+    vlákna), ostatní 5xx mají exponenciální backoff.
+    """
+    endpoint = endpoint_label(url)
+    snap, rec_id = _snapshot_for(url)
+    if snap is not None and method == "GET" and set(params or {}) <= SNAPSHOT_PARAMS:
+        start = time.perf_counter()
+        data = snap.records.get(rec_id) if rec_id else snap.page(params or {})
+        if data is not None:
+            METRICS.observe("snapshot", method, endpoint, 200, time.perf_counter() - start)
+            return data
+    delay = 1.0
+    for attempt in range(1, MAX_ATTEMPTS + 1):
+        resp = request("airtable", method, url, endpoint=endpoint, headers=headers, json=json,
+                       params=params, timeout=timeout)
+        if resp.status_code in RETRY_STATUSES:
+            if attempt < MAX_ATTEMPTS:
+                if resp.status_code in THROTTLE_STATUSES:
+                    # rate limit – další pokus počká ve frontě limiteru na konec pauzy
+                    wait = retry_after(resp.headers.get("Retry-After"), bounds_for("airtable").pause)
+                else:
+                    wait = delay
+                    time.sleep(delay)
+                    delay = min(delay * 2, 20)
+                record_retry("airtable", method, endpoint, wait)
+            continue
+        if not resp.ok:
+            raise AirtableError(resp.status_code, resp.text)
+        data = resp.json()
+        if snap is not None and method != "GET":
+            snap.apply(method, data)
+        if method != "GET" and url.startswith(API_META_BASE + "/"):
+            # změna schématu (pole, tabulky) – cache metadat už neplatí
+            from airtable_schema import invalidate
+
+            invalidate(url[len(API_META_BASE) + 1:].split("/")[0])
+        return data
+    raise RuntimeError(f"Airtable API still failing after retries: {method} {url}")
+
+
+def write_batch_job(payload: dict) -> List[str]:
+    """Handler fronty: jeden dávkový zápis (≤ 10 záznamů); vrací id zapsaných záznamů."""
+    from job_queue import PermanentError
+
+    url = f"{API_BASE}/{payload['base']}/{quote(payload['table'], safe='')}"
+    body = {"records": payload["records"]}
+    if payload.get("typecast"):
+        body["typecast"] = True
+    hdrs = {"Authorization": f"Bearer {get_token()}", "Content-Type": "application/json"}
+    try:
+        data = request_with_backoff(payload["method"], url, headers=hdrs, json=body)
+    except AirtableError as e:
+        raise PermanentError(str(e)) from e
+    return [r["id"] for r in data.get("records", [])]
+
+
+def write_records(method: str, base_id: str, table: str, records: List[dict], *, typecast: bool = True,
+                  queue: str = WRITE_QUEUE, workers: Optional[int] = None, resume: bool = True) -> List[str]:
+    """
+    Zapíše záznamy (PATCH/POST/PUT) po dávkách přes frontu job_queue; vrací id
+    zapsaných záznamů v pořadí dávek. Dávka má klíč podle obsahu: po přerušeném
+    volání opakovaný běh už zapsané dávky nepošle podruhé. Po úspěšném dokončení
+    se dávky z fronty zapomenou, takže další stejné volání zapisuje znovu.
+    resume=False dávky přerušeného běhu nepřeskakuje (skript, který cíl před
+    zápisem maže). Když některá dávka definitivně selže, vyhodí RuntimeError –
+    ostatní dávky zůstanou zapsané a v frontě (job_queue.py status).
+    """
+    from job_queue import open_queue
+
+    run = "" if resume else f"{uuid.uuid4().hex}:"
+    items = []
+    for i in range(0, len(records), BATCH_SIZE):
+        batch = records[i:i + BATCH_SIZE]
+        payload = {"method": method, "base": base_id, "table": table, "records": batch, "typecast": typecast}
+        digest = hashlib.sha1(json.dumps(payload, sort_keys=True, ensure_ascii=False).encode("utf-8")).hexdigest()
+        items.append((f"airtable:{run}{digest}", payload))
+    if not items:
+        return []
+
+    q = open_queue()
+    q.enqueue_many(queue, "airtable", "airtable_api:write_batch_job", items)
+    q.run_workers(queue, {"airtable": workers} if workers else None, progress=len(items) > 20)
+    done = q.results(key for key, _ in items)
+    failed = len(items) - len(done)
+    if failed:
+        raise RuntimeError(f"{failed} z {len(items)} dávek zápisu do {table} selhalo"
+                           f" – python3 job_queue.py status {queue} / retry-dead {queue}")
+    q.forget(done)
+    return [rec_id for key, _ in items for rec_id in (done[key] or [])]
@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+"""
+Cache schématu Airtable base (metadata API) – názvy ↔ id tabulek a polí bez opakovaných dotazů.
+
+Schéma (GET /meta/bases/{base}/tables) se načte jednou za proces a uloží do
+.schema_cache/<base>.json; další běhy ho berou odtud, dokud je mladší než TTL
+(výchozí 24 h, KONTAKTY_SCHEMA_TTL v sekundách). Kontroly polí před zápisem
+(airtable_upsert, konvertuj_reakce_select) tak při opakovaném běhu nestojí
+žádný požadavek.
+
+Pole přidané v Airtable UI cache nevidí až do vypršení TTL – kontroly proto
+berou schéma přes schema_for(): když v něm chybí očekávaná tabulka nebo pole,
+stáhne se jednou znovu (v rámci procesu nejvýš jednou na base).
+
+Každé volání, které schéma mění (POST/PATCH/DELETE na meta API – nové pole,
+přejmenování, smazání), jde přes airtable_api.request_with_backoff a cache
+dané base zneplatní; další dotaz schéma stáhne znovu.
+
+Ve skriptech:
+  from airtable_schema import schema
+  s = schema(BASE_ID)
+  s.table_name("tblOOAzDQbnOg1KRd")           # → "Deals"
+  s.field_id("Deals", "Reakce/výsledek")      # → "fld…"
+  s.field_names("Kontakty")                   # → {"E-mail", "Jméno", …}
+  schema_for(BASE_ID, "Kontakty", {"E-mail"}).field_names("Kontakty")   # při chybějícím poli čerstvé
+
+Použití:
+  python3 airtable_schema.py                       # tabulky base (z cache)
+  python3 airtable_schema.py Deals                 # pole tabulky (typ, id)
+  python3 airtable_schema.py --refresh
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Set
+
+BASE_DIR = Path(__file__).parent
+CACHE_DIR = Path(os.getenv("KONTAKTY_SCHEMA_DIR") or BASE_DIR / ".schema_cache")
+SCHEMA_TTL = float(os.getenv("KONTAKTY_SCHEMA_TTL") or 24 * 3600)
+
+BASE_ID = "appEXpqOEIElHzScl"
+
+
+class BaseSchema:
+    """Schéma jedné base: tabulky a pole s mapami název ↔ id."""
+
+    def __init__(self, base_id: str, tables: List[dict], fetched: float):
+        self.base_id = base_id
+        self.tables = tables
+        self.fetched = fetched
+        self._tables: Dict[str, dict] = {}
+        self._fields: Dict[str, Dict[str, dict]] = {}
+        for t in tables:
+            self._tables[t["id"]] = self._tables[t["name"]] = t
+            by_key: Dict[str, dict] = {}
+            for f in t.get("fields", []) or []:
+                by_key[f["id"]] = by_key[f["name"]] = f
+            self._fields[t["id"]] = by_key
+
+    def table(self, table: str) -> Optional[dict]:
+        """Tabulka podle názvu nebo tbl… id."""
+        return self._tables.get((table or "").strip())
+
+    def table_name(self, table: str) -> str:
+        t = self.table(table)
+        return t["name"] if t else table
+
+    def table_id(self, table: str) -> Optional[str]:
+        t = self.table(table)
+        return t["id"] if t else None
+
+    def field(self, table: str, field: str) -> Optional[dict]:
+        """Pole tabulky podle názvu nebo fld… id (dict z metadata API: id, name, type, options)."""
+        t = self.table(table)
+        return self._fields[t["id"]].get(field) if t else None
+
+    def field_id(self, table: str, field: str) -> Optional[str]:
+        f = self.field(table, field)
+        return f["id"] if f else None
+
+    def field_name(self, table: str, field: str) -> Optional[str]:
+        f = self.field(table, field)
+        return f["name"] if f else None
+
+    def field_names(self, table: str) -> Set[str]:
+        t = self.table(table)
+        return {f["name"] for f in t.get("fields", []) or [] if f.get("name")} if t else set()
+
+
+_cache: Dict[str, BaseSchema] = {}
+_lock = threading.Lock()
+_fetched_here: Set[str] = set()     # base stažené tímto procesem – chybějící pole v nich opravdu není
+
+
+def _cache_path(base_id: str) -> Path:
+    return CACHE_DIR / f"{base_id}.json"
+
+
+def _fetch(base_id: str) -> BaseSchema:
+    from airtable_api import API_META_BASE, get_token, request_with_backoff
+
+    hdrs = {"Authorization": f"Bearer {get_token()}", "Content-Type": "application/json"}
+    data = request_with_backoff("GET", f"{API_META_BASE}/{base_id}/tables", headers=hdrs)
+    s = BaseSchema(base_id, data.get("tables", []) or [], time.time())
+    _fetched_here.add(base_id)
+    CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    target = _cache_path(base_id)
+    tmp = target.with_name(target.name + ".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump({"base": base_id, "fetched": s.fetched, "tables": s.tables}, f, ensure_ascii=False)
+    os.replace(tmp, target)
+    return s
+
+
+def _load(base_id: str, max_age: float) -> Optional[BaseSchema]:
+    path = _cache_path(base_id)
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if time.time() - data.get("fetched", 0) > max_age:
+        return None
+    return BaseSchema(base_id, data.get("tables", []), data["fetched"])
+
+
+def schema(base_id: str = BASE_ID, *, max_age: float = SCHEMA_TTL, refresh: bool = False) -> BaseSchema:
+    """Schéma base: z paměti, z .schema_cache/ (mladší než max_age), jinak z metadata API."""
+    with _lock:
+        s = None if refresh else _cache.get(base_id)
+        if s is None or time.time() - s.fetched > max_age:
+            s = (None if refresh else _load(base_id, max_age)) or _fetch(base_id)
+            _cache[base_id] = s
+        return s
+
+
+def schema_for(base_id: str, table: str, fields: Iterable[str] = (), *, refresh: bool = False) -> BaseSchema:
+    """
+    Schéma, ve kterém je tabulka `table` i všechna `fields`. Když v cachovaném
+    schématu chybí, stáhne se jednou znovu; co chybí i v čerstvém, opravdu neexistuje.
+    """
+    s = schema(base_id, refresh=refresh)
+    if base_id in _fetched_here:
+        return s
+    if s.table(table) is None or not set(fields) <= s.field_names(table):
+        s = schema(base_id, refresh=True)
+    return s
+
+
+def invalidate(base_id: str) -> None:
+    """Zahodí schéma base z paměti i z disku (po změně polí/tabulek)."""
+    with _lock:
+        _cache.pop(base_id, None)
+        try:
+            _cache_path(base_id).unlink()
+        except FileNotFoundError:
+            pass
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Schéma Airtable base (cache metadata API)")
+    ap.add_argument("table", nargs="?", help="Vypsat pole tabulky (název nebo tbl… id)")
+    ap.add_argument("--base", default=os.getenv("AIRTABLE_BASE_ID") or BASE_ID)
+    ap.add_argument("--refresh", action="store_true", help="Stáhnout schéma znovu")
+    args = ap.parse_args()
+
+    s = schema(args.base, refresh=args.refresh)
+    age = time.time() - s.fetched
+    print(f"🗂️  {args.base}: {len(s.tables)} tabulek (schéma staré {age / 60:.0f} min, TTL {SCHEMA_TTL / 3600:g} h)")
+    if not args.table:
+        for t in s.tables:
+            print(f"   {t['id']}  {t['name']:<28} {len(t.get('fields', []) or []):>3} polí")
+        return
+    t = s.table(args.table)
+    if t is None:
+        raise SystemExit(f"❌ Tabulka {args.table} v base {args.base} není.")
+    print(f"\n📋 {t['name']} ({t['id']})")
+    for f in t.get("fields", []) or []:
+        print(f"   {f['id']}  {f['name']:<32} {f.get('type', '')}")
+
+
+if __name__ == "__main__":
+    main()
@@ -15,11 +15,16 @@ Volby:
   --limit 100                   (zpracovat jen prvních N řádků)
   --dry-run                     (nic nezapisovat, jen spočítat změny)
   --overwrite-empty             (posílat i prázdné hodnoty = může mazat data v Airtable)
+  --no-suppression              (nepřepisovat Stav podle suppression indexu bounced emailů)
+  --resume                      (dokončit přerušený běh podle žurnálu .journal/airtable_upsert.jsonl)
+  --refresh-schema              (schéma tabulky stáhnout znovu; jinak z cache, při chybějícím poli se stáhne samo)
 
 Poznámky:
 - Airtable limit: max 10 záznamů na request.
 - Skript NEPOSÍLÁ prázdné hodnoty (aby omylem nemařil existující data), pokud nedáš --overwrite-empty.
 - Předpokládá, že v Airtable existují pole se stejnými názvy jako CSV hlavičky.
+- Zápisy jdou přes žurnál (mutation_journal.py): po pádu se nespustí znovu od nuly,
+  `--resume` dopošle jen nezapsané dávky; nové záznamy se při tom upsertují podle emailu.
 """
 
 from __future__ import annotations
@@ -27,27 +32,25 @@ from __future__ import annotations
 import argparse
 import csv
 import os
-import time
 from pathlib import Path
-from typing import Dict, List, Optional, Set, Tuple
+from typing import Dict, Iterable, List, Optional, Set, Tuple
 
-import requests
 from urllib.parse import quote
 
+from suppression import load_suppression
+from airtable_api import API_BASE, request_with_backoff
+from airtable_schema import schema_for
+from mutation_journal import MutationJournal
 
-API_BASE = "https://api.airtable.com/v0"
-API_META_BASE = "https://api.airtable.com/v0/meta/bases"
-BATCH_SIZE = 10
+
+STAV_FIELD = "Stav"
+STAV_SUPPRESSED = "Neaktivní"
 
 
 def norm_email(s: str) -> str:
     return (s or "").strip().lower()
 
 
-def chunked(items: List[dict], size: int) -> List[List[dict]]:
-    return [items[i : i + size] for i in range(0, len(items), size)]
-
-
 def airtable_headers(token: str) -> Dict[str, str]:
     return {
         "Authorization": f"Bearer {token}",
@@ -55,52 +58,28 @@ def airtable_headers(token: str) -> Dict[str, str]:
     }
 
 
-def request_with_backoff(method: str, url: str, *, headers: dict, json: Optional[dict] = None, params: Optional[dict] = None) -> dict:
-    delay = 1.0
-    for attempt in range(1, 8):
-        resp = requests.request(method, url, headers=headers, json=json, params=params, timeout=60)
-        if resp.status_code in (429, 500, 502, 503, 504):
-            # rate limit / transient
-            time.sleep(delay)
-            delay = min(delay * 2, 20)
-            continue
-        if not resp.ok:
-            raise RuntimeError(f"Airtable API error {resp.status_code}: {resp.text[:500]}")
-        return resp.json()
-    raise RuntimeError(f"Airtable API still failing after retries: {method} {url}")
-
-
-def resolve_table_name(token: str, base_id: str, table: str) -> str:
+def resolve_table_name(token: str, base_id: str, table: str, refresh: bool = False) -> str:
     """
     Airtable data API typicky používá table NAME v URL. U některých setupů tableId `tbl...` nefunguje.
     Pokud uživatel zadá `tbl...`, zkusíme ho přeložit na název tabulky přes metadata API.
-    Vyžaduje scope `schema.bases:read` a access na danou base.
+    Vyžaduje scope `schema.bases:read` a access na danou base. Schéma jde přes cache
+    (airtable_schema.py), opakovaný běh nestojí žádný požadavek.
     """
     table = (table or "").strip()
     if not table:
         return table
     if not table.startswith("tbl"):
         return table
-
-    url = f"{API_META_BASE}/{base_id}/tables"
-    headers = airtable_headers(token)
-    data = request_with_backoff("GET", url, headers=headers)
-    for t in data.get("tables", []) or []:
-        if t.get("id") == table:
-            return t.get("name") or table
-    return table
+    return schema_for(base_id, table, refresh=refresh).table_name(table)
 
 
-def get_table_field_names(token: str, base_id: str, table_name: str) -> Set[str]:
-    """Vrátí množinu názvů polí v tabulce (metadata API)."""
-    url = f"{API_META_BASE}/{base_id}/tables"
-    headers = airtable_headers(token)
-    data = request_with_backoff("GET", url, headers=headers)
-    for t in data.get("tables", []) or []:
-        if (t.get("name") or "") == table_name:
-            fields = t.get("fields", []) or []
-            return {str(f.get("name") or "") for f in fields if (f.get("name") or "")}
-    return set()
+def get_table_field_names(token: str, base_id: str, table_name: str, expected: Iterable[str] = (),
+                          refresh: bool = False) -> Set[str]:
+    """
+    Vrátí množinu názvů polí v tabulce (metadata API přes cache schématu). Když v cache
+    chybí tabulka nebo některé z `expected` (pole přidané v UI), schéma se stáhne znovu.
+    """
+    return schema_for(base_id, table_name, expected, refresh=refresh).field_names(table_name)
 
 
 def clean_field_name(name: str) -> str:
@@ -196,6 +175,14 @@ def build_airtable_fields(row: dict, *, overwrite_empty: bool, allowed_fields: O
     return fields
 
 
+def journal_hint(journal: MutationJournal) -> str:
+    """Po odmítnutém zápisu: část dávek už prošla → žurnál zůstal a nový běh ho musí zahodit."""
+    if not journal.steps:
+        return ""
+    return ("Část záznamů už je zapsaná a žurnál běhu zůstal otevřený – před novým během ho zahoď:\n"
+            f"  python3 mutation_journal.py discard {journal.name}\n")
+
+
 def main() -> None:
     ap = argparse.ArgumentParser()
     ap.add_argument("--csv", dest="csv_path", default=str(Path(__file__).parent / "kontakty_unified.csv"))
@@ -204,6 +191,9 @@ def main() -> None:
     ap.add_argument("--dry-run", action="store_true")
     ap.add_argument("--overwrite-empty", action="store_true")
     ap.add_argument("--skip-unknown-fields", action="store_true", help="Ignorovat CSV sloupce, které v Airtable tabulce neexistují")
+    ap.add_argument("--no-suppression", action="store_true", help="Nenastavovat Stav=Neaktivní podle suppression indexu")
+    ap.add_argument("--resume", action="store_true", help="Dokončit přerušený běh podle žurnálu")
+    ap.add_argument("--refresh-schema", action="store_true", help="Stáhnout schéma Airtable znovu (ne z cache)")
     args = ap.parse_args()
 
     token = os.getenv("AIRTABLE_TOKEN", "").strip()
@@ -224,9 +214,12 @@ def main() -> None:
     if not csv_path.exists():
         raise SystemExit(f"CSV nenalezeno: {csv_path}")
 
+    # nedokončený předchozí běh se hlásí hned, ne až po načtení celé tabulky
+    journal = None if args.dry_run else MutationJournal("airtable_upsert", resume=args.resume)
+
     # Normalize table identifier (allow tbl... by resolving to table name if possible)
     try:
-        resolved_table = resolve_table_name(token, base_id, table)
+        resolved_table = resolve_table_name(token, base_id, table, refresh=args.refresh_schema)
     except RuntimeError as e:
         raise SystemExit(
             "Nepodařilo se načíst metadata tabulek pro převod `tbl...` → název.\n"
@@ -237,10 +230,25 @@ def main() -> None:
         print(f"ℹ️  AIRTABLE_TABLE je ID ({table}), používám název tabulky: {resolved_table}")
     table = resolved_table
 
-    # Preflight: zjistit pole v Airtable tabulce (kvůli chybě UNKNOWN_FIELD_NAME)
+    # Load CSV
+    with open(csv_path, "r", encoding="utf-8") as f:
+        reader = csv.DictReader(f)
+        rows = list(reader)
+
+    if args.limit and args.limit > 0:
+        rows = rows[: args.limit]
+
+    # Preflight: zjistit pole v Airtable tabulce (kvůli chybě UNKNOWN_FIELD_NAME).
+    # Pole, která skript zapíše, musí být ve schématu – chybí-li v cache, stáhne se znovu.
+    email_field_mapped = map_field_name(clean_field_name(args.email_field))
+    expected = {email_field_mapped}
+    if args.skip_unknown_fields:
+        expected |= {map_field_name(k) for k in (reader.fieldnames or []) if k and clean_field_name(k)}
+        if not args.no_suppression:
+            expected.add(STAV_FIELD)
     allowed_fields: Optional[Set[str]] = None
     try:
-        allowed_fields = get_table_field_names(token, base_id, table)
+        allowed_fields = get_table_field_names(token, base_id, table, expected, refresh=args.refresh_schema)
     except RuntimeError as e:
         # bez schema scope to nemusí jít; pokračujeme bez filtrace
         allowed_fields = None
@@ -249,7 +257,6 @@ def main() -> None:
 
     if allowed_fields:
         # Ověřit, že email field existuje v Airtable (mapovaný název)
-        email_field_mapped = map_field_name(clean_field_name(args.email_field))
         if email_field_mapped not in allowed_fields:
             raise SystemExit(
                 f"V Airtable tabulce neexistuje pole '{email_field_mapped}'.\n"
@@ -258,13 +265,10 @@ def main() -> None:
                 "- nebo nejdřív importuj `kontakty_unified.csv` přes Airtable UI, aby se pole vytvořila automaticky.\n"
             )
 
-    # Load CSV
-    with open(csv_path, "r", encoding="utf-8") as f:
-        reader = csv.DictReader(f)
-        rows = list(reader)
-
-    if args.limit and args.limit > 0:
-        rows = rows[: args.limit]
+    # Bounced emaily (suppression.py) – Stav se opraví i bez nového merge
+    suppressed = None if args.no_suppression else load_suppression()
+    if suppressed is not None:
+        print(f"🚫 Suppression index: {len(suppressed)} bounced emailů")
 
     # Index existing Airtable by email (použij mapovaný název pole)
     airtable_email_field = map_field_name(clean_field_name(args.email_field))
@@ -285,6 +289,7 @@ def main() -> None:
     to_create: List[dict] = []
     to_update: List[dict] = []
     skipped_no_email = 0
+    suppressed_fixed = 0
 
     for row in rows:
         email = norm_email(row.get(args.email_field, "") or "")
@@ -302,6 +307,11 @@ def main() -> None:
         airtable_email_field = map_field_name(clean_field_name(args.email_field))
         if airtable_email_field not in fields and email:
             fields[airtable_email_field] = email
+        stav_unknown = args.skip_unknown_fields and allowed_fields and STAV_FIELD not in allowed_fields
+        if suppressed is not None and not stav_unknown and email in suppressed:
+            if fields.get(STAV_FIELD) != STAV_SUPPRESSED:
+                suppressed_fixed += 1
+            fields[STAV_FIELD] = STAV_SUPPRESSED
 
         rec_id = existing.get(email)
         if rec_id:
@@ -312,20 +322,19 @@ def main() -> None:
     print(f"📄 CSV řádků ke zpracování: {len(rows)} (bez emailu přeskočeno: {skipped_no_email})")
     print(f"➕ Create: {len(to_create)}")
     print(f"♻️ Update: {len(to_update)}")
+    if suppressed_fixed:
+        print(f"🚫 Stav → {STAV_SUPPRESSED} (bounced): {suppressed_fixed}")
 
     if args.dry_run:
         print("🧪 Dry-run: nic nezapisuji.")
         return
 
-    url = f"{API_BASE}/{base_id}/{quote(table, safe='')}"
-    headers = airtable_headers(token)
-
-    # Create
-    if to_create:
-        print("⬆️  Vytvářím nové záznamy…")
-        for batch in chunked(to_create, BATCH_SIZE):
+    with journal:
+        # Create (nové záznamy se při --resume upsertují podle emailu – rozpracovaná dávka se nezdvojí)
+        if to_create:
+            print("⬆️  Vytvářím nové záznamy…")
             try:
-                request_with_backoff("POST", url, headers=headers, json={"records": batch, "typecast": True})
+                journal.write("create", "POST", base_id, table, to_create, merge_on=[airtable_email_field])
             except RuntimeError as e:
                 msg = str(e)
                 if "UNKNOWN_FIELD_NAME" in msg:
@@ -333,27 +342,26 @@ def main() -> None:
                         "Airtable odmítl zápis kvůli neznámému názvu pole.\n"
                         "Nejrychlejší fix: v Airtable nejdřív importuj `kontakty_unified.csv` (vytvoří sloupce),\n"
                         "nebo spusť skript se `--skip-unknown-fields`.\n"
+                        f"{journal_hint(journal)}"
                         f"\nDetaily: {e}"
                     )
                 raise
-            time.sleep(0.2)
 
-    # Update
-    if to_update:
-        print("⬆️  Aktualizuji existující záznamy…")
-        for batch in chunked(to_update, BATCH_SIZE):
+        # Update
+        if to_update:
+            print("⬆️  Aktualizuji existující záznamy…")
             try:
-                request_with_backoff("PATCH", url, headers=headers, json={"records": batch, "typecast": True})
+                journal.write("update", "PATCH", base_id, table, to_update)
             except RuntimeError as e:
                 msg = str(e)
                 if "UNKNOWN_FIELD_NAME" in msg:
                     raise SystemExit(
                         "Airtable odmítl update kvůli neznámému názvu pole.\n"
                         "Zkontroluj názvy sloupců v Airtable vs CSV (nejrychlejší je nejdřív CSV import v UI).\n"
+                        f"{journal_hint(journal)}"
                         f"\nDetaily: {e}"
                     )
                 raise
-            time.sleep(0.2)
 
     print("✅ Hotovo.")
 
@@ -1,47 +1,22 @@
 #!/usr/bin/env python3
 """
 Aktualizuje názvy dealů s datem/rokem/obdobím.
+
+Změny se počítají nad snapshotem tabulek a ukládají jako plán (change_sets.py).
+
+Použití:
+  python3 aktualizuj_nazvy_s_datem.py          # plán z čerstvých dat + zápis
+  python3 aktualizuj_nazvy_s_datem.py --plan   # jen plán
+  python3 aktualizuj_nazvy_s_datem.py --apply  # zapíše poslední plán
 """
 
-import json
-import time
 import re
-from pathlib import Path
 from typing import Dict, List
-from urllib.parse import quote
 
-import requests
+from change_sets import ChangeSet, run_script
+from link_graph import LinkGraph, graph_from
 
-API_BASE = "https://api.airtable.com/v0"
 BASE_ID = "appEXpqOEIElHzScl"
-BATCH_SIZE = 10
-
-
-def get_token() -> str:
-    with open(Path.home() / ".cursor" / "mcp.json") as f:
-        return json.load(f)["mcpServers"]["airtable"]["env"]["AIRTABLE_API_KEY"]
-
-
-def headers(token: str) -> Dict[str, str]:
-    return {"Authorization": f"Bearer {token}", "Content-Type": "application/json"}
-
-
-def request_with_backoff(method: str, url: str, *, hdrs: dict, json_data=None, params=None) -> dict:
-    delay = 1.0
-    for attempt in range(1, 8):
-        resp = requests.request(method, url, headers=hdrs, json=json_data, params=params, timeout=60)
-        if resp.status_code in (429, 500, 502, 503, 504):
-            time.sleep(delay)
-            delay = min(delay * 2, 20)
-            continue
-        if not resp.ok:
-            raise RuntimeError(f"Airtable API error {resp.status_code}: {resp.text[:500]}")
-        return resp.json()
-    raise RuntimeError("Airtable API still failing after retries")
-
-
-def chunked(items: List, size: int) -> List[List]:
-    return [items[i:i + size] for i in range(0, len(items), size)]
 
 
 def extract_date_info(text: str) -> str:
@@ -130,98 +105,36 @@ def create_deal_name(firma: str, co_poptavali: str, poznamka: str) -> str:
     return " | ".join(parts)
 
 
-def main():
-    token = get_token()
-    hdrs = headers(token)
-    
-    # 1. Načti Klienty pro mapování
-    print("🔎 Načítám Klienty...")
-    klienti_url = f"{API_BASE}/{BASE_ID}/{quote('Klienti', safe='')}"
-    
-    klienti_map = {}
-    offset = None
+def firma_dealu(graph: LinkGraph, deal_id: str) -> str:
+    """Firma z prvního linkovaného Klienta."""
+    return graph.first_with(deal_id, "Klienti", "Firma")
+
+
+def plan(tables: Dict[str, List[dict]], changes: ChangeSet) -> None:
+    graph = graph_from(tables, BASE_ID)
+    print(f"   {sum(1 for rec in tables['Klienti'] if rec.get('fields', {}).get('Firma'))} klientů s firmou")
     
-    while True:
-        params = {"pageSize": 100}
-        if offset:
-            params["offset"] = offset
-        data = request_with_backoff("GET", klienti_url, hdrs=hdrs, params=params)
+    named = 0
+    for rec in tables["Deals"]:
+        fields = rec.get("fields", {})
         
-        for rec in data.get("records", []):
-            firma = rec.get("fields", {}).get("Firma", "")
-            if firma:
-                klienti_map[rec["id"]] = firma
+        # Získej firmu z linkovaných Klientů
+        firma = firma_dealu(graph, rec["id"])
+        co_poptavali = fields.get("Co poptávali", "")
+        poznamka = fields.get("Poznámka / Detaily", "")
         
-        offset = data.get("offset")
-        if not offset:
-            break
-    
-    print(f"   Načteno {len(klienti_map)} klientů")
-    
-    # 2. Načti Deals
-    print("\n🔎 Načítám Deals...")
-    deals_url = f"{API_BASE}/{BASE_ID}/{quote('Deals', safe='')}"
-    
-    records_to_update = []
-    offset = None
-    
-    while True:
-        params = {"pageSize": 100}
-        if offset:
-            params["offset"] = offset
-        data = request_with_backoff("GET", deals_url, hdrs=hdrs, params=params)
-        
-        for rec in data.get("records", []):
-            fields = rec.get("fields", {})
-            
-            # Získej firmu z linkovaných Klientů
-            klienti_ids = fields.get("Klienti", [])
-            firma = ""
-            for kid in klienti_ids:
-                if kid in klienti_map:
-                    firma = klienti_map[kid]
-                    break
-            
-            co_poptavali = fields.get("Co poptávali", "")
-            poznamka = fields.get("Poznámka / Detaily", "")
-            
-            deal_name = create_deal_name(firma, co_poptavali, poznamka)
-            
-            if deal_name:
-                records_to_update.append({
-                    "id": rec["id"],
-                    "fields": {
-                        "Název dealu": deal_name
-                    },
-                    "_preview": deal_name
-                })
+        deal_name = create_deal_name(firma, co_poptavali, poznamka)
         
-        offset = data.get("offset")
-        if not offset:
-            break
-    
-    print(f"   Nalezeno {len(records_to_update)} deals")
+        if deal_name:
+            named += 1
+            changes.update(rec, {"Název dealu": deal_name})
     
-    # Ukázka
-    print("\n📋 Ukázka názvů s datem:")
-    for rec in records_to_update[:25]:
-        print(f"   {rec['_preview']}")
-    
-    # Odstraň pomocná pole
-    for rec in records_to_update:
-        del rec["_preview"]
-    
-    # 3. Aktualizuj
-    print(f"\n⬆️ Aktualizuji...")
-    
-    updated = 0
-    for batch in chunked(records_to_update, BATCH_SIZE):
-        request_with_backoff("PATCH", deals_url, hdrs=hdrs, 
-                            json_data={"records": batch, "typecast": True})
-        updated += len(batch)
-        time.sleep(0.2)
-    
-    print(f"\n✅ Aktualizováno {updated} dealů s datem/obdobím!")
+    print(f"   Název s datem/obdobím pro {named} deals ({named - len(changes)} už aktuálních)")
+
+
+def main():
+    run_script("aktualizuj_nazvy_s_datem", "Deals", ["Klienti", "Deals"], plan, base_id=BASE_ID,
+               description="Názvy dealů s datem/rokem/obdobím")
 
 
 if __name__ == "__main__":
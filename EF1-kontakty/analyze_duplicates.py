@@ -7,33 +7,15 @@ Analyzuje kontakty v Airtable a hledá:
 """
 
 import json
-import re
 from collections import defaultdict
+from pathlib import Path
+
+import phones
 
 # Načtení dat z exportovaných souborů
 contacts_file = "/Users/helenamich/.cursor/projects/Users-helenamich-Desktop-KONTAKTY-EF1-i-t-n/agent-tools/bd08aa75-5714-40a6-bc6f-0d5936e73b1e.txt"
 clients_file = "/Users/helenamich/.cursor/projects/Users-helenamich-Desktop-KONTAKTY-EF1-i-t-n/agent-tools/31d26fba-d6ab-4bd6-a41e-8f97935ee6c5.txt"
 
-def normalize_phone(phone):
-    """Normalizuje telefonní číslo pro porovnání"""
-    if not phone or phone in ['#ERROR!', 'x', '']:
-        return None
-    # Odstraní vše kromě číslic
-    digits = re.sub(r'\D', '', str(phone))
-    # Odstraní předvolby
-    if digits.startswith('00420'):
-        digits = digits[5:]
-    elif digits.startswith('420'):
-        digits = digits[3:]
-    elif digits.startswith('00421'):
-        digits = digits[5:]
-    elif digits.startswith('421'):
-        digits = digits[3:]
-    # Pokud je příliš krátké, ignoruj
-    if len(digits) < 9:
-        return None
-    return digits
-
 def get_email_domain(email):
     """Extrahuje doménu z e-mailu"""
     if not email or '@' not in email:
@@ -59,26 +41,29 @@ print("="*80)
 print("1. DUPLICITNÍ TELEFONY (kontakty ke sloučení)")
 print("="*80)
 
-phone_groups = defaultdict(list)
-for contact in contacts:
+# Perzistentní index telefon → kontakt (phones.py) – přestaví se jen při změně exportu
+phone_index = phones.load_phone_index(Path(contacts_file))
+contacts_by_id = {c['id']: c for c in contacts}
+
+def contact_summary(contact):
     fields = contact.get('fields', {})
-    phone = fields.get('Telefon')
-    norm_phone = normalize_phone(phone)
-    if norm_phone:
-        phone_groups[norm_phone].append({
-            'id': contact['id'],
-            'jmeno': fields.get('Jméno', ''),
-            'prijmeni': fields.get('Příjmení', ''),
-            'email': fields.get('E-mail', ''),
-            'telefon': phone,
-            'firma': fields.get('Společnost / Firma', ''),
-            'pozice': fields.get('Pracovní pozice', ''),
-            'programy': fields.get('Programy', []),
-            'klienti': fields.get('Klienti', [])
-        })
+    return {
+        'id': contact['id'],
+        'jmeno': fields.get('Jméno', ''),
+        'prijmeni': fields.get('Příjmení', ''),
+        'email': fields.get('E-mail', ''),
+        'telefon': fields.get('Telefon'),
+        'firma': fields.get('Společnost / Firma', ''),
+        'pozice': fields.get('Pracovní pozice', ''),
+        'programy': fields.get('Programy', []),
+        'klienti': fields.get('Klienti', [])
+    }
 
 # Najdi duplicity
-phone_duplicates = {k: v for k, v in phone_groups.items() if len(v) > 1}
+phone_duplicates = {
+    phone: [contact_summary(contacts_by_id[i]) for i in ids if i in contacts_by_id]
+    for phone, ids in phone_index.duplicates().items()
+}
 print(f"\nNalezeno {len(phone_duplicates)} skupin s duplicitním telefonem:\n")
 
 for phone, group in sorted(phone_duplicates.items(), key=lambda x: -len(x[1])):
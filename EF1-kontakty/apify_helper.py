@@ -2,11 +2,13 @@
 """
 Pomocný skript pro snadné použití Apify API.
 Umožňuje nastavit API token a spustit různé Apify úlohy.
+Úlohy běží ve stejném procesu přes kontakty.py (token z APIFY_API_TOKEN se předá rovnou).
 """
 
 import os
 import sys
-from pathlib import Path
+
+from kontakty import run_command
 
 def set_api_token():
     """Interaktivně nastaví API token"""
@@ -53,10 +55,10 @@ def main():
     
     if choice == "1":
         print("\n🔍 Spouštím hledání LinkedIn URL z Google search odkazů...")
-        os.system(f'python3 "{Path(__file__).parent / "find_linkedin_from_google_search.py"}"')
+        run_command("linkedin-search", [])
     elif choice == "2":
         print("\n📝 Spouštím aktualizaci pozic a firem z LinkedIn profilů...")
-        os.system(f'python3 "{Path(__file__).parent / "update_linkedin_positions.py"}"')
+        run_command("linkedin-update", [])
     elif choice == "3":
         set_api_token()
         print("\n✅ Token aktualizován!")
@@ -1,65 +1,27 @@
 #!/usr/bin/env python3
 """
 Audit Airtable databáze - kontrola konzistence a návrhy na zlepšení.
+
+Tabulky se načtou jednou a vazby Kontakty ↔ Klienti ↔ Deals se kontrolují
+v grafu (link_graph.py) – oběma směry, včetně vazeb na smazané záznamy.
+
+Použití:
+  python3 audit_airtable.py             # z čerstvě stažených tabulek
+  python3 audit_airtable.py --offline   # ze snapshotu .changesets/ (bez stahování)
 """
 
-import json
-import time
-from pathlib import Path
-from typing import Dict
-from urllib.parse import quote
+import argparse
 from collections import Counter
 
-import requests
+from link_graph import load_graph
 
-API_BASE = "https://api.airtable.com/v0"
 BASE_ID = "appEXpqOEIElHzScl"
 
 
-def get_token() -> str:
-    with open(Path.home() / ".cursor" / "mcp.json") as f:
-        return json.load(f)["mcpServers"]["airtable"]["env"]["AIRTABLE_API_KEY"]
-
-
-def headers(token: str) -> Dict[str, str]:
-    return {"Authorization": f"Bearer {token}", "Content-Type": "application/json"}
-
-
-def request_with_backoff(method: str, url: str, *, hdrs: dict, params=None) -> dict:
-    delay = 1.0
-    for attempt in range(1, 8):
-        resp = requests.request(method, url, headers=hdrs, params=params, timeout=60)
-        if resp.status_code in (429, 500, 502, 503, 504):
-            time.sleep(delay)
-            delay = min(delay * 2, 20)
-            continue
-        if not resp.ok:
-            raise RuntimeError(f"Airtable API error {resp.status_code}: {resp.text[:500]}")
-        return resp.json()
-    raise RuntimeError("Airtable API still failing after retries")
-
-
-def load_all_records(table_name: str, hdrs: dict) -> list:
-    url = f"{API_BASE}/{BASE_ID}/{quote(table_name, safe='')}"
-    records = []
-    offset = None
-    
-    while True:
-        params = {"pageSize": 100}
-        if offset:
-            params["offset"] = offset
-        data = request_with_backoff("GET", url, hdrs=hdrs, params=params)
-        records.extend(data.get("records", []))
-        offset = data.get("offset")
-        if not offset:
-            break
-    
-    return records
-
-
 def main():
-    token = get_token()
-    hdrs = headers(token)
+    ap = argparse.ArgumentParser(description="Audit konzistence Airtable")
+    ap.add_argument("--offline", action="store_true", help="Použít uložený snapshot tabulek místo stahování")
+    args = ap.parse_args()
     
     print("=" * 70)
     print("📊 AUDIT AIRTABLE DATABÁZE")
@@ -67,9 +29,10 @@ def main():
     
     # Načti všechna data
     print("\n🔎 Načítám data...")
-    kontakty = load_all_records("Kontakty", hdrs)
-    klienti = load_all_records("Klienti", hdrs)
-    deals = load_all_records("Deals", hdrs)
+    graph = load_graph(BASE_ID, ["Kontakty", "Klienti", "Deals"], refresh=not args.offline)
+    kontakty = [graph.records[i] for i in graph.ids["Kontakty"]]
+    klienti = [graph.records[i] for i in graph.ids["Klienti"]]
+    deals = [graph.records[i] for i in graph.ids["Deals"]]
     
     print(f"   Kontakty: {len(kontakty)}")
     print(f"   Klienti: {len(klienti)}")
@@ -102,7 +65,7 @@ def main():
     print(f"⚠️  Bez firmy: {no_firma}")
     
     # Bez linku na Klienta
-    no_klient_link = sum(1 for k in kontakty if not k.get("fields", {}).get("Klienti"))
+    no_klient_link = len(graph.orphans_by_field("Kontakty", "Klienti"))
     print(f"⚠️  Bez linku na Klienta: {no_klient_link}")
     
     # Stav emailu
@@ -117,11 +80,11 @@ def main():
     print("=" * 70)
     
     # Bez kontaktů
-    no_contacts = sum(1 for k in klienti if not k.get("fields", {}).get("Kontakty"))
+    no_contacts = len(graph.orphans_by_field("Klienti", "Kontakty"))
     print(f"\n⚠️  Bez kontaktů: {no_contacts}")
     
     # Bez dealů
-    no_deals = sum(1 for k in klienti if not k.get("fields", {}).get("Deals"))
+    no_deals = len(graph.orphans_by_field("Klienti", "Deals"))
     print(f"⚠️  Bez dealů: {no_deals}")
     
     # Počet zaměstnanců
@@ -136,11 +99,11 @@ def main():
     print("=" * 70)
     
     # Bez kontaktu
-    no_contact = sum(1 for d in deals if not d.get("fields", {}).get("Kontakt"))
+    no_contact = len(graph.orphans_by_field("Deals", "Kontakt"))
     print(f"\n⚠️  Bez kontaktu: {no_contact}")
     
     # Bez klienta
-    no_klient = sum(1 for d in deals if not d.get("fields", {}).get("Klienti"))
+    no_klient = len(graph.orphans_by_field("Deals", "Klienti"))
     print(f"⚠️  Bez klienta: {no_klient}")
     
     # Bez typu (Co poptávali)
@@ -163,6 +126,24 @@ def main():
     for t, count in typ_counts.most_common():
         print(f"      {t or 'Nevyplněno'}: {count}")
     
+    # === VAZBY ===
+    print("\n" + "=" * 70)
+    print("🔗 VAZBY")
+    print("=" * 70)
+    
+    # Vazby na smazané záznamy
+    dangling = sum(graph.dangling.values())
+    print(f"\n⚠️  Vazby na neexistující záznamy: {dangling}")
+    for (table, field), count in graph.dangling.most_common():
+        print(f"      {table}.{field}: {count}")
+    
+    # Nejvíc propojení klienti
+    top_klienti = sorted(graph.ids["Klienti"], key=lambda i: graph.degree_by_field(i, "Kontakty"), reverse=True)[:5]
+    print(f"\n📈 Klienti s nejvíce kontakty:")
+    for kid in top_klienti:
+        print(f"      {graph.fields(kid).get('Firma') or kid}: {graph.degree_by_field(kid, 'Kontakty')} kontaktů, "
+              f"{graph.degree_by_field(kid, 'Deals')} dealů")
+    
     # === NÁVRHY NA ZLEPŠENÍ ===
     print("\n" + "=" * 70)
     print("💡 NÁVRHY NA ZLEPŠENÍ")
@@ -197,6 +178,9 @@ def main():
     # View návrhy
     suggestions.append("9. Vytvořit Views: 'Aktivní dealy', 'Bez reakce', 'Dealy 2025', 'VIP klienti'")
     
+    if dangling > 0:
+        suggestions.append(f"10. Odstranit {dangling} vazeb na smazané záznamy")
+    
     print()
     for s in suggestions:
         print(f"   {s}")
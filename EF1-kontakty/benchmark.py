@@ -0,0 +1,585 @@
+#!/usr/bin/env python3
+"""
+Benchmark hlavních kroků (merge, hledání duplicit, oslovení) na syntetických datech.
+
+Generátor (seed → vždy stejná data) vyrobí realistické české kontakty, firmy,
+Pipedrive export, AT Deals, Filip akce a export mejlingu (bounced emaily pro
+suppression index): diakritika, právní formy (s.r.o., a. s., spol. s r.o. …),
+telefony v různých zápisech, více emailů v buňce, víceřádkové poznámky a část
+záznamů jako duplicity s jiným zápisem.
+
+Každý krok × velikost běží v samostatném procesu (čisté měření paměti):
+- seconds       doba kroku (bez generování a načtení dat)
+- peak_rss_mb   maximální RSS procesu
+- delta_mb      nárůst RSS během kroku
+
+Kroky, které by podle předchozí velikosti (lineární odhad) přesáhly --timeout,
+se přeskočí se stavem "skipped"; při překročení během běhu "timeout".
+
+Výsledek je JSON v bench_results/ (meta: commit, Python, seed, velikosti) –
+dva reporty se dají porovnat přes --compare.
+
+Použití:
+  python3 benchmark.py                                  # 1k, 10k, 100k, 1M, všechny kroky
+  python3 benchmark.py --sizes 1000,10000 --stages merge_contacts,vocative_czech
+  python3 benchmark.py --out bench_results/pred_upravou.json
+  python3 benchmark.py --compare bench_results/pred_upravou.json bench_results/po_uprave.json
+  python3 benchmark.py --generate-only --sizes 10000 --data-dir /tmp/bench_data   # jen data
+"""
+
+from __future__ import annotations
+
+import argparse
+import contextlib
+import csv
+import io
+import json
+import os
+import platform
+import random
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import unicodedata
+from functools import partial
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+BASE_DIR = Path(__file__).parent
+RESULTS_DIR = BASE_DIR / "bench_results"
+
+DEFAULT_SIZES = [1_000, 10_000, 100_000, 1_000_000]
+DEFAULT_SEED = 42
+DEFAULT_TIMEOUT = 600
+
+# podíl záznamů, které zopakují dřívější osobu/firmu jiným zápisem
+DUPLICATE_RATE = 0.15
+
+
+# --- Slovníky generátoru ---
+
+MALE_NAMES = ["Jan", "Petr", "Pavel", "Tomáš", "Martin", "Jakub", "Ondřej", "Lukáš", "Jiří", "Vojtěch",
+              "Matěj", "Zdeněk", "Václav", "Miroslav", "Radek", "Marek", "Štěpán", "František", "Aleš",
+              "Oldřich", "Dominik", "Patrik", "Filip", "Michal", "Karel", "Roman", "Igor", "Hendrich"]
+FEMALE_NAMES = ["Jana", "Eva", "Hana", "Lenka", "Kateřina", "Lucie", "Petra", "Tereza", "Michaela",
+                "Veronika", "Markéta", "Zuzana", "Věra", "Kristýna", "Adéla", "Eliška", "Šárka", "Klára",
+                "Natálie", "Silvie", "Marie", "Olga", "Dagmar", "Ivana", "Alžběta", "Miriam"]
+# (mužský tvar, ženský tvar)
+SURNAMES = [("Novák", "Nováková"), ("Svoboda", "Svobodová"), ("Novotný", "Novotná"), ("Dvořák", "Dvořáková"),
+            ("Černý", "Černá"), ("Procházka", "Procházková"), ("Kučera", "Kučerová"), ("Veselý", "Veselá"),
+            ("Horák", "Horáková"), ("Němec", "Němcová"), ("Pokorný", "Pokorná"), ("Pospíšil", "Pospíšilová"),
+            ("Hájek", "Hájková"), ("Jelínek", "Jelínková"), ("Růžička", "Růžičková"), ("Beneš", "Benešová"),
+            ("Fiala", "Fialová"), ("Sedláček", "Sedláčková"), ("Doležal", "Doležalová"), ("Zeman", "Zemanová"),
+            ("Kolář", "Kolářová"), ("Čermák", "Čermáková"), ("Kříž", "Křížová"), ("Šťastný", "Šťastná"),
+            ("Štěpánek", "Štěpánková"), ("Kadlec", "Kadlecová"), ("Vlček", "Vlčková"), ("Chládek", "Chládková"),
+            ("Herkus", "Herkusová"), ("Bakale", "Bakale"), ("Baránek", "Baránková"), ("Šimek", "Šimková")]
+
+KNOWN_COMPANIES = ["Škoda Auto", "Česká spořitelna", "ČEZ", "Komerční banka", "O2 Czech Republic",
+                   "T-Mobile Czech Republic", "Kooperativa pojišťovna", "Raiffeisenbank", "Moneta Money Bank",
+                   "Plzeňský Prazdroj", "Třinecké železárny", "Vodafone Czech Republic", "Alza.cz", "Rohlík.cz",
+                   "Seznam.cz", "Kofola ČeskoSlovensko", "Budějovický Budvar", "ČSOB", "ABB", "J&T Banka",
+                   "Generali Česká pojišťovna", "Aktuální paragrafy", "Úřad práce ČR", "Ředitelství silnic a dálnic"]
+COMPANY_ROOTS = ["Stavby", "Agro", "Elektro", "Dřevo", "Strojírny", "Pekárny", "Logistika", "Software", "Energie",
+                 "Účetnictví", "Zdravotnictví", "Tiskárny", "Sklárny", "Železárny", "Média", "Řemesla", "Pojištění"]
+REGIONS = ["Morava", "Vysočina", "Praha", "Brno", "Ostrava", "Plzeň", "Liberec", "Olomouc", "Zlín",
+           "Hradec Králové", "České Budějovice", "Ústí", "Jihlava", "Třebíč", "Žďár"]
+SYLLABLES = ["ko", "vá", "ře", "ště", "ná", "lo", "mí", "če", "du", "ra", "sví", "tě", "ží", "bo", "ka", "ny",
+             "mo", "pe", "lí", "dra", "zu", "ch", "ří", "no", "va", "te", "ši", "ja"]
+LEGAL_FORMS = ["s.r.o.", "s. r. o.", "spol. s r.o.", "a.s.", "a. s.", ", a.s.", ", s.r.o.", "k.s.", "v.o.s.",
+               "SE", "z.s.", "", "", ""]
+FREEMAIL = ["seznam.cz", "gmail.com", "email.cz", "centrum.cz", "post.cz"]
+POSITIONS = ["HR manažerka", "Head of People", "IT Expert", "Performance Engineer, Senior", "CEO", "Ředitel",
+             "Projektová manažerka", "Learning & Development", "Vedoucí oddělení", "Specialista vzdělávání", ""]
+PROGRAMS_TYPES = ["Přednáška / keynote", "Workshop", "Konference", "ACA", "Interní program", "Webinář", "přednáška \n"]
+ASSIGNEES = ["Filip", "Honza Hubka", "Helena", ""]
+AT_STATUSES = ["Bez reakce", "Potvrzeno", "Odmítnuto", "Jednání", "Čeká na rozpočet", ""]
+FILIP_DATES = ["26.6. - 17.9.", "9.7.", "5. + 19.8. (16-17 CEST)", "12.11.2025", "březen 2025", "TBD", ""]
+FILIP_PLACES = ["online", "Praha", "Brno", "Bergamo", "Ostrava", "hybrid"]
+FILIP_STATUSES = ["potvrzeno", "poptávka", "zrušeno", "odmítnuto", "nezávazně"]
+FILIP_CATEGORIES = ["Interní přednáška/workshop", "Interní program", "Veřejná konference", "Webinář", ""]
+PRICES = ["350 000 Kč", "1 400 EUR + knihy", "2 x 1 000 USD", "85 000 Kč", "zdarma", "", "2500 EUR"]
+VYSLEDKY = ["Potvrzeno", "Odmítnuto", "Bez reakce", "", "Realizováno"]
+NOTES = ["volat po 15h", "zájem o workshop {d}", "poděkoval a nic", "na základě akce v Bergamu",
+         "HR: {hr_name}, {hr_email}", "kontakt na HR {hr_name} ({hr_email})", "poslat nabídku do {d}",
+         "spíš prověřuju možné partnerství,\nakci můžu klidně odmítnout", "#ERROR!", ""]
+
+
+def ascii_fold(s: str) -> str:
+    return "".join(c for c in unicodedata.normalize("NFKD", s) if not unicodedata.combining(c))
+
+
+def slug(s: str) -> str:
+    return "".join(c for c in ascii_fold(s).lower() if c.isalnum())
+
+
+class CzechFaker:
+    """Deterministický generátor českých kontaktních dat."""
+
+    def __init__(self, seed: int):
+        self.rnd = random.Random(seed)
+        self.people: List[dict] = []
+        self.companies: List[str] = []
+
+    # --- základní prvky ---
+
+    def company_base(self) -> str:
+        r = self.rnd.random()
+        if r < 0.2:
+            return self.rnd.choice(KNOWN_COMPANIES)
+        if r < 0.6:
+            return f"{self.rnd.choice(COMPANY_ROOTS)} {self.rnd.choice(REGIONS)}"
+        word = "".join(self.rnd.choice(SYLLABLES) for _ in range(self.rnd.randint(2, 4))).capitalize()
+        return f"{word} {self.rnd.choice(COMPANY_ROOTS)}" if self.rnd.random() < 0.5 else word
+
+    def company(self) -> str:
+        if self.companies and self.rnd.random() < DUPLICATE_RATE * 2:
+            base = self.rnd.choice(self.companies)
+        else:
+            base = self.company_base()
+            self.companies.append(base)
+        form = self.rnd.choice(LEGAL_FORMS)
+        name = f"{base}{form}" if form.startswith(",") else f"{base} {form}".strip()
+        r = self.rnd.random()
+        if r < 0.05:
+            return name.upper()
+        if r < 0.08:
+            return ascii_fold(name)
+        if r < 0.1:
+            return f"  {name} "
+        return name
+
+    def phone(self) -> str:
+        n = f"{self.rnd.choice('67')}{self.rnd.randint(0, 99_999_999):08d}"
+        variants = [
+            f"+420 {n[:3]} {n[3:6]} {n[6:]}", f"00420{n}", n, f"{n[:3]} {n[3:6]} {n[6:]}", f"'+421{n}",
+            f"0{n}", f"+420{n}", f"00420 {n[:3]} {n[3:6]} {n[6:]}, 00420{n[::-1]}", "#ERROR!", "",
+        ]
+        return self.rnd.choice(variants)
+
+    def person(self) -> dict:
+        if self.people and self.rnd.random() < DUPLICATE_RATE:
+            p = dict(self.rnd.choice(self.people))
+            # stejná osoba, jiný zápis
+            if self.rnd.random() < 0.5:
+                p["email"] = p["email"].upper() if self.rnd.random() < 0.5 else f" {p['email']} "
+            p["phone"] = self.phone()
+            return p
+        female = self.rnd.random() < 0.5
+        jmeno = self.rnd.choice(FEMALE_NAMES if female else MALE_NAMES)
+        prijmeni = self.rnd.choice(SURNAMES)[1 if female else 0]
+        firma = self.company()
+        domain = self.rnd.choice(FREEMAIL) if self.rnd.random() < 0.3 else (slug(firma.split(",")[0])[:20] or "firma") + ".cz"
+        local = f"{slug(jmeno)}.{slug(prijmeni)}{self.rnd.randint(0, 999) if self.rnd.random() < 0.5 else ''}"
+        p = {"jmeno": jmeno, "prijmeni": prijmeni, "firma": firma, "email": f"{local}@{domain}",
+             "phone": self.phone(), "pozice": self.rnd.choice(POSITIONS)}
+        self.people.append(p)
+        return p
+
+    def note(self) -> str:
+        hr = self.rnd.choice(self.people) if self.people else {"jmeno": "Jana", "prijmeni": "Nováková", "email": "hr@firma.cz"}
+        return self.rnd.choice(NOTES).format(
+            d=f"{self.rnd.randint(1, 28)}.{self.rnd.randint(1, 12)}.{self.rnd.choice(['', '2024', '2025'])}",
+            hr_name=f"{hr['jmeno']} {hr['prijmeni']}", hr_email=hr["email"],
+        )
+
+    def linkedin(self, p: dict) -> str:
+        if self.rnd.random() < 0.4:
+            return ""
+        url = f"https://www.linkedin.com/in/{slug(p['jmeno'])}-{slug(p['prijmeni'])}-{self.rnd.randint(1000, 99999)}"
+        return url + self.rnd.choice(["", "/", "?originalSubdomain=cz"])
+
+
+# --- Generátory souborů ---
+
+def _write_csv(path: Path, rows, header: Optional[List[str]] = None) -> None:
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        w = csv.writer(f)
+        if header:
+            w.writerow(header)
+        w.writerows(rows)
+
+
+MEJLING_HEADER = ["Email", "", "Oslovení", "Campaign status", "", ""]
+
+
+def _gen_bounces(out: Path, fk: "CzechFaker", n: int) -> None:
+    """Export mejlingu (zdroj suppression indexu) – zhruba každý dvacátý email bounced."""
+    def row():
+        p = fk.person()
+        if fk.rnd.random() < 0.05:
+            return [p["email"], "", p["jmeno"], "EMAIL_BOUNCED", "", "adresa nenalezena"]
+        return [p["email"], "", p["jmeno"], "EMAIL_SENT", "", ""]
+
+    _write_csv(out / "Final mejling 2025 (AIP a AImpact) - List 1.csv", (row() for _ in range(n)), MEJLING_HEADER)
+
+
+def gen_contacts(out: Path, n: int, seed: int) -> None:
+    """Dva exporty programů ve formátu CONFIGS z merge_contacts.py (DLM7, FAIL podzim)."""
+    fk = CzechFaker(seed)
+
+    def dlm7_row():
+        p = fk.person()
+        row = [""] * 25
+        row[1], row[2], row[4] = p["jmeno"], "", p["prijmeni"]
+        row[5], row[6], row[7], row[8] = p["firma"], p["email"], p["phone"], p["pozice"]
+        for i in range(9, 9 + fk.rnd.randint(0, 3)):
+            row[i] = fk.note()
+        row[21] = fk.linkedin(p)
+        return row
+
+    def fail_row():
+        p = fk.person()
+        row = [""] * 40
+        row[1], row[2], row[3], row[4] = p["jmeno"], p["prijmeni"], p["email"], ""
+        row[5], row[6], row[7] = p["phone"], p["pozice"], p["firma"]
+        for i in range(8, 8 + fk.rnd.randint(0, 4)):
+            row[i] = fk.note()
+        row[31] = fk.linkedin(p)
+        return row
+
+    half = n // 2
+    _write_csv(out / "DLM7 - List 1.csv", (dlm7_row() for _ in range(half)))
+    _write_csv(out / "FAIL - podzim 2025 - List 1.csv", (fail_row() for _ in range(n - half)))
+    _gen_bounces(out, fk, n // 4)
+
+
+PIPEDRIVE_HEADER = ["Deal - Název", "Deal - Hodnota", "Deal - Organizace", "Deal - Kontaktní osoba",
+                    "Deal - Předpokládaný termín uzavření", "Deal - Datum další aktivity", "Deal - Vlastník",
+                    "Osoba - E-mail - Práce", "Osoba - E-mail - Domov", "Osoba - E-mail - Ostatní",
+                    "Osoba - Telefon - Práce", "Osoba - Telefon - Domov", "Osoba - Telefon - Mobil",
+                    "Osoba - Telefon - Ostatní"]
+
+
+def gen_deals_sources(out: Path, n: int, seed: int) -> None:
+    """Pipedrive export (60 %), AT Deals (20 %) a Filip akce (20 %) pro merge_all_deals_v2.py."""
+    fk = CzechFaker(seed)
+    rnd = fk.rnd
+
+    def pipedrive_row():
+        p = fk.person()
+        work = p["email"] if "@" in p["email"] and rnd.random() < 0.8 else ""
+        home = f"{slug(p['jmeno'])}{rnd.randint(1, 99)}@{rnd.choice(FREEMAIL)}" if rnd.random() < 0.3 else ""
+        date = f"2025-{rnd.randint(1, 12):02d}-{rnd.randint(1, 28):02d}"
+        return [f"{rnd.choice(PROGRAMS_TYPES).strip()} – {p['firma']}", str(rnd.choice([0, 25000, 85000, 350000])),
+                p["firma"], f"{p['jmeno']} {p['prijmeni']}", date, "", rnd.choice(ASSIGNEES),
+                work, home, "", p["phone"], "", fk.phone() if rnd.random() < 0.3 else "", ""]
+
+    def at_row():
+        p = fk.person()
+        return [f"{p['jmeno']} {p['prijmeni'].upper() if rnd.random() < 0.1 else p['prijmeni']}", p["email"],
+                p["firma"], rnd.choice(PROGRAMS_TYPES), rnd.choice(ASSIGNEES), rnd.choice(AT_STATUSES), fk.note()]
+
+    def filip_row():
+        firma = fk.company()
+        return [firma, rnd.choice(FILIP_DATES), rnd.choice(FILIP_PLACES), rnd.choice(PROGRAMS_TYPES),
+                rnd.choice(FILIP_STATUSES), rnd.choice(FILIP_CATEGORIES), str(rnd.randint(5, 500)),
+                fk.note() + "\n", rnd.choice(PRICES), rnd.choice(["již dříve potvrzeno", ""]), fk.note(),
+                rnd.choice(VYSLEDKY)]
+
+    n_pd = n * 6 // 10
+    n_at = n * 2 // 10
+    _write_csv(out / "deals-16044442-64.csv", (pipedrive_row() for _ in range(n_pd)), PIPEDRIVE_HEADER)
+    _write_csv(out / "AT - Deals - List 1.csv", (at_row() for _ in range(n_at)))
+    _write_csv(out / "Filip akce - poptávky - List 1.csv", (filip_row() for _ in range(n - n_pd - n_at)))
+    _gen_bounces(out, fk, n // 4)
+
+
+def gen_airtable(out: Path, n: int, seed: int) -> None:
+    """Záznamy Klienti, Kontakty (telefony) a Deals ve tvaru Airtable API ({"id", "fields"}) pro hledání duplicit."""
+    fk = CzechFaker(seed)
+    rnd = fk.rnd
+
+    def rec_id(prefix: int, i: int) -> str:
+        return f"rec{prefix}{i:013d}"
+
+    with open(out / "klienti.json", "w", encoding="utf-8") as f:
+        json.dump([{"id": rec_id(1, i), "fields": {
+            "Firma": fk.company(),
+            "Deals": [rec_id(2, rnd.randrange(n)) for _ in range(rnd.randint(0, 3))],
+            "Kontakty": [rec_id(3, rnd.randrange(n)) for _ in range(rnd.randint(0, 4))],
+        }} for i in range(n)], f, ensure_ascii=False)
+
+    with open(out / "kontakty.json", "w", encoding="utf-8") as f:
+        json.dump({"records": [{"id": rec_id(3, i), "fields": {"Telefon": fk.phone()}} for i in range(n)]}, f)
+
+    with open(out / "deals.json", "w", encoding="utf-8") as f:
+        records = []
+        for i in range(n):
+            p = fk.person()
+            records.append({"id": rec_id(2, i), "fields": {
+                "Firma": f"{p['firma']} {rnd.choice(['', '', 'konference', 'workshop'])}".strip(),
+                "Jméno a příjmení": f"{p['jmeno']} {p['prijmeni']}",
+                "Email": p["email"].strip().lower(),
+                "Co poptávali": rnd.choice(PROGRAMS_TYPES).strip(),
+                "Reakce/výsledek": rnd.choice(VYSLEDKY),
+                "Poznámka / Detaily": fk.note(),
+            }})
+        json.dump(records, f, ensure_ascii=False)
+
+
+def gen_names(out: Path, n: int, seed: int) -> None:
+    """Křestní jména (i neznámá a s překlepy) pro vocative_czech."""
+    rnd = random.Random(seed)
+    extra = ["Ognen", "Hendrich", "Nicole", "Xaver", "Bořivoj", "Kamil", "Ema", "Sofie", "Ilja", "Lea"]
+    pool = MALE_NAMES + FEMALE_NAMES + extra
+    with open(out / "jmena.txt", "w", encoding="utf-8") as f:
+        for _ in range(n):
+            name = rnd.choice(pool)
+            r = rnd.random()
+            if r < 0.05:
+                name = name.upper()
+            elif r < 0.1:
+                name = f" {name.lower()} "
+            elif r < 0.13:
+                name = f"{name} {rnd.choice(SURNAMES)[0]}"
+            f.write(name + "\n")
+
+
+GENERATORS: Dict[str, Callable[[Path, int, int], None]] = {
+    "contacts": gen_contacts,
+    "deals_sources": gen_deals_sources,
+    "airtable": gen_airtable,
+    "names": gen_names,
+}
+
+
+# --- Kroky ---
+# setup(data_dir) → funkce bez argumentů, jejíž běh se měří
+
+def _load_json(path: Path) -> list:
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def setup_merge_contacts(data: Path) -> Callable[[], None]:
+    import merge_contacts
+    import snapshots
+    import suppression
+    merge_contacts.DIR = data
+    merge_contacts.take_snapshot = partial(snapshots.take_snapshot, root=data / ".snapshots")
+    # suppression index i jeho zdroje (export mejlingu) z dat benchmarku, ne z repozitáře
+    merge_contacts.load_suppression = partial(suppression.load_suppression, base_dir=data)
+    return merge_contacts.main
+
+
+def setup_merge_all_deals_v2(data: Path) -> Callable[[], None]:
+    import merge_all_deals_v2 as m
+    import suppression
+    m.load_suppression = partial(suppression.load_suppression, base_dir=data)
+    m.AT_DEALS = data / "AT - Deals - List 1.csv"
+    m.PIPEDRIVE = data / "deals-16044442-64.csv"
+    m.FILIP_AKCE = data / "Filip akce - poptávky - List 1.csv"
+    m.OUTPUT = data / "deals_complete.csv"
+    return m.main
+
+
+def setup_dup_klienti(data: Path) -> Callable[[], None]:
+    from najdi_duplicity_klienti import group_duplicates
+    records = _load_json(data / "klienti.json")
+    return lambda: group_duplicates(records)
+
+
+def setup_dup_deals(data: Path) -> Callable[[], None]:
+    from najdi_duplicity_deals import duplicate_reason, group_by_company
+    records = _load_json(data / "deals.json")
+    return lambda: [duplicate_reason(d) for d in group_by_company(records)]
+
+
+def setup_dup_phones(data: Path) -> Callable[[], None]:
+    import phones
+    source = data / "kontakty.json"
+    return lambda: phones.load_phone_index(source, force=True).duplicates()
+
+
+def setup_vocative_czech(data: Path) -> Callable[[], None]:
+    from doplnit_osloveni_v2 import vocative_czech
+    with open(data / "jmena.txt", "r", encoding="utf-8") as f:
+        names = f.read().splitlines()
+    return lambda: [vocative_czech(n) for n in names]
+
+
+# krok → (setup, potřebná data)
+STAGES: Dict[str, tuple] = {
+    "merge_contacts": (setup_merge_contacts, "contacts"),
+    "merge_all_deals_v2": (setup_merge_all_deals_v2, "deals_sources"),
+    "dup_klienti": (setup_dup_klienti, "airtable"),
+    "dup_deals": (setup_dup_deals, "airtable"),
+    "dup_phones": (setup_dup_phones, "airtable"),
+    "vocative_czech": (setup_vocative_czech, "names"),
+}
+
+
+def _rss_mb() -> float:
+    """Aktuální RSS (Linux /proc), jinak maximum z getrusage."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2 ** 20
+    except (OSError, ValueError):
+        return _peak_mb()
+
+
+def _peak_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux vrací KB, macOS bajty
+    return peak / 2 ** 20 if sys.platform == "darwin" else peak / 1024
+
+
+def run_worker(stage: str, data: Path) -> dict:
+    setup, _ = STAGES[stage]
+    fn = setup(data)
+    before = _rss_mb()
+    with contextlib.redirect_stdout(io.StringIO()):
+        t0 = time.perf_counter()
+        fn()
+        seconds = time.perf_counter() - t0
+    peak = _peak_mb()
+    return {"seconds": round(seconds, 4), "peak_rss_mb": round(peak, 1), "delta_mb": round(max(0.0, peak - before), 1)}
+
+
+# --- Orchestrace ---
+
+def ensure_data(data_root: Path, kind: str, n: int, seed: int) -> Path:
+    out = data_root / f"{kind}_{n}_{seed}"
+    marker = out / ".done"
+    if not marker.exists():
+        if out.exists():
+            shutil.rmtree(out)
+        out.mkdir(parents=True)
+        t0 = time.perf_counter()
+        GENERATORS[kind](out, n, seed)
+        marker.write_text(f"{time.perf_counter() - t0:.2f}\n")
+    return out
+
+
+def _git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=BASE_DIR, capture_output=True,
+                              text=True, timeout=10).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        return ""
+
+
+def run_benchmarks(sizes: List[int], stages: List[str], seed: int, timeout: int, data_root: Path) -> dict:
+    report = {
+        "meta": {
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "commit": _git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "seed": seed,
+            "sizes": sizes,
+            "timeout": timeout,
+        },
+        "results": [],
+    }
+    last: Dict[str, tuple] = {}  # krok → (velikost, sekundy)
+
+    for n in sizes:
+        for stage in stages:
+            result = {"stage": stage, "rows": n}
+            prev = last.get(stage)
+            if prev and prev[1] * n / prev[0] > timeout:
+                estimate = prev[1] * n / prev[0]
+                result["status"] = "skipped"
+                if estimate != float("inf"):
+                    result["estimate_seconds"] = round(estimate, 1)
+                print(f"   ⏭️  {stage:20} {n:>9,}: přeskočeno (odhad nad {timeout} s)")
+                report["results"].append(result)
+                continue
+
+            data = ensure_data(data_root, STAGES[stage][1], n, seed)
+            cmd = [sys.executable, str(Path(__file__).resolve()), "--worker", stage, "--data-dir", str(data)]
+            try:
+                proc = subprocess.run(cmd, cwd=BASE_DIR, capture_output=True, text=True, timeout=timeout)
+            except subprocess.TimeoutExpired:
+                result.update(status="timeout", seconds=float(timeout))
+                last[stage] = (n, float("inf"))
+                print(f"   ⌛ {stage:20} {n:>9,}: timeout po {timeout} s")
+                report["results"].append(result)
+                continue
+
+            lines = proc.stdout.strip().splitlines()
+            if proc.returncode != 0 or not lines:
+                err = (proc.stderr.strip().splitlines() or ["?"])[-1]
+                result.update(status="error", error=err)
+                print(f"   ❌ {stage:20} {n:>9,}: {err}")
+            else:
+                result.update(status="ok", **json.loads(lines[-1]))
+                last[stage] = (n, result["seconds"])
+                print(f"   ✅ {stage:20} {n:>9,}: {result['seconds']:>9.3f} s  "
+                      f"peak {result['peak_rss_mb']:>8.1f} MB  (+{result['delta_mb']} MB)")
+            report["results"].append(result)
+    return report
+
+
+def compare(old_path: Path, new_path: Path) -> None:
+    old = _load_json(old_path)
+    new = _load_json(new_path)
+    old_by = {(r["stage"], r["rows"]): r for r in old["results"]}
+    print(f"📊 {old_path.name} ({old['meta'].get('commit')}) → {new_path.name} ({new['meta'].get('commit')})")
+    for r in new["results"]:
+        o = old_by.get((r["stage"], r["rows"]))
+        if not o or o.get("status") != "ok" or r.get("status") != "ok":
+            print(f"   {r['stage']:20} {r['rows']:>9,}: {o.get('status') if o else '-'} → {r.get('status')}")
+            continue
+        ratio = r["seconds"] / o["seconds"] if o["seconds"] else float("inf")
+        mark = "🐢" if ratio > 1.1 else ("🚀" if ratio < 0.9 else "  ")
+        print(f"   {mark} {r['stage']:20} {r['rows']:>9,}: {o['seconds']:>9.3f} s → {r['seconds']:>9.3f} s "
+              f"(×{ratio:.2f})   paměť {o['peak_rss_mb']} → {r['peak_rss_mb']} MB")
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Benchmark merge / dedup / oslovení na syntetických datech.")
+    ap.add_argument("--sizes", default=",".join(str(s) for s in DEFAULT_SIZES), help="Velikosti (čárkou)")
+    ap.add_argument("--stages", default=",".join(STAGES), help=f"Kroky (čárkou): {', '.join(STAGES)}")
+    ap.add_argument("--seed", type=int, default=DEFAULT_SEED)
+    ap.add_argument("--timeout", type=int, default=DEFAULT_TIMEOUT, help="Limit na jeden běh (s)")
+    ap.add_argument("--data-dir", default="", help="Kam generovat data (default: dočasná složka)")
+    ap.add_argument("--out", default="", help="Report JSON (default: bench_results/<datum>.json)")
+    ap.add_argument("--generate-only", action="store_true", help="Jen vygenerovat data")
+    ap.add_argument("--compare", nargs=2, metavar=("STARY", "NOVY"), help="Porovná dva reporty")
+    ap.add_argument("--worker", help=argparse.SUPPRESS)
+    args = ap.parse_args()
+
+    if args.worker:
+        print(json.dumps(run_worker(args.worker, Path(args.data_dir))))
+        return
+
+    if args.compare:
+        compare(Path(args.compare[0]), Path(args.compare[1]))
+        return
+
+    sizes = [int(s.replace("_", "")) for s in args.sizes.split(",") if s.strip()]
+    stages = [s.strip() for s in args.stages.split(",") if s.strip()]
+    unknown = [s for s in stages if s not in STAGES]
+    if unknown:
+        raise SystemExit(f"Neznámé kroky: {', '.join(unknown)} (dostupné: {', '.join(STAGES)})")
+
+    with contextlib.ExitStack() as stack:
+        data_root = Path(args.data_dir) if args.data_dir else Path(stack.enter_context(
+            tempfile.TemporaryDirectory(prefix="bench_data_")))
+        data_root.mkdir(parents=True, exist_ok=True)
+
+        if args.generate_only:
+            for n in sizes:
+                for kind in dict.fromkeys(STAGES[s][1] for s in stages):
+                    path = ensure_data(data_root, kind, n, args.seed)
+                    print(f"   🧪 {kind:15} {n:>9,} → {path}")
+            return
+
+        print(f"⏱️  Benchmark: velikosti {', '.join(f'{n:,}' for n in sizes)}, seed {args.seed}")
+        report = run_benchmarks(sizes, stages, args.seed, args.timeout, data_root)
+
+    out = Path(args.out) if args.out else RESULTS_DIR / f"{time.strftime('%Y%m%d-%H%M%S')}.json"
+    out.parent.mkdir(parents=True, exist_ok=True)
+    with open(out, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"\n💾 Report: {out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,314 @@
+#!/usr/bin/env python3
+"""
+Plán a zápis oprav Airtable odděleně – výpočet offline nad snapshotem, síť jen při zápisu.
+
+Opravné skripty (normalizuj_co_poptavali, aktualizuj_nazvy_s_datem,
+oprav_datumy_v_nazvech, doplnit_rok_deals) mají dva kroky:
+
+1. plán – tabulky se čtou z lokálního snapshotu (.changesets/snapshot/<Tabulka>.json,
+   stejný formát jako snapshot pipeline; chybějící tabulka se stáhne jednou).
+   Skript spočítá úplnou sadu změn a uloží ji do .changesets/<skript>_<čas>.json.gz:
+   sloupcově (seznam polí + [id, nové hodnoty, staré hodnoty]), bez záznamů,
+   které by se nezměnily. Plán jde počítat opakovaně a bez sítě.
+2. zápis – uložený plán se pošle přes airtable_api.write_records (dávky po 10,
+   pool pracovníků až do limitu Airtable z rate_control, pokračování po pádu
+   přes job_queue). Zapsané hodnoty se propíšou i do snapshotu, takže další
+   plán navazuje bez nového stažení; plán se přesune do .changesets/applied/.
+
+Plán platí pro stav snapshotu – když se Airtable mezitím měnil ručně, plánuj
+s --refresh. Bez přepínačů skript udělá obojí (čerstvý snapshot, plán, zápis)
+jako dřív.
+
+Použití:
+  python3 oprav_datumy_v_nazvech.py --plan            # jen plán (snapshot z disku)
+  python3 oprav_datumy_v_nazvech.py --plan --refresh  # plán z čerstvě stažených tabulek
+  python3 oprav_datumy_v_nazvech.py --apply           # zapíše poslední plán skriptu
+  python3 change_sets.py                              # neaplikované plány
+  python3 change_sets.py show .changesets/oprav_datumy_v_nazvech_20260301-101500.json.gz
+  python3 change_sets.py apply .changesets/oprav_datumy_v_nazvech_20260301-101500.json.gz
+  python3 change_sets.py fetch Deals Klienti          # obnoví snapshot tabulek
+"""
+
+from __future__ import annotations
+
+import argparse
+import gzip
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+from urllib.parse import quote
+
+BASE_DIR = Path(__file__).parent
+CHANGESET_DIR = Path(os.getenv("KONTAKTY_CHANGESET_DIR") or BASE_DIR / ".changesets")
+SNAPSHOT_DIR = CHANGESET_DIR / "snapshot"
+APPLIED_DIR = CHANGESET_DIR / "applied"
+
+BASE_ID = "appEXpqOEIElHzScl"
+PREVIEW = 15
+
+
+# --- snapshot tabulek ---
+
+def _snapshot_path(table: str) -> Path:
+    return SNAPSHOT_DIR / f"{table.replace('/', '_')}.json"
+
+
+def fetch_table(base_id: str, table: str) -> List[dict]:
+    """Stáhne celou tabulku z Airtable a uloží ji do snapshotu."""
+    from airtable_api import API_BASE, get_token, request_with_backoff
+
+    start = time.perf_counter()
+    hdrs = {"Authorization": f"Bearer {get_token()}", "Content-Type": "application/json"}
+    url = f"{API_BASE}/{base_id}/{quote(table, safe='')}"
+    records, offset = [], None
+    while True:
+        params = {"pageSize": 100}
+        if offset:
+            params["offset"] = offset
+        data = request_with_backoff("GET", url, headers=hdrs, params=params)
+        records.extend(data.get("records", []))
+        offset = data.get("offset")
+        if not offset:
+            break
+    _save_snapshot(table, {"base": base_id, "table": table, "fetched": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                           "records": records})
+    print(f"📸 Snapshot {table}: {len(records)} záznamů ({time.perf_counter() - start:.1f} s)", flush=True)
+    return records
+
+
+def _save_snapshot(table: str, data: dict) -> None:
+    target = _snapshot_path(table)
+    target.parent.mkdir(parents=True, exist_ok=True)
+    tmp = target.with_name(target.name + ".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False)
+    os.replace(tmp, target)
+
+
+def _load_snapshot(table: str) -> Optional[dict]:
+    path = _snapshot_path(table)
+    if not path.exists():
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def load_tables(base_id: str, tables: List[str], *, refresh: bool = False) -> Dict[str, List[dict]]:
+    """Záznamy tabulek ze snapshotu; chybějící (nebo všechny při refresh) se stáhnou souběžně."""
+    out: Dict[str, List[dict]] = {}
+    missing = []
+    for table in tables:
+        snap = None if refresh else _load_snapshot(table)
+        if snap is None or snap.get("base", base_id) != base_id:
+            missing.append(table)
+        else:
+            out[table] = snap["records"]
+            print(f"📂 {table}: {len(snap['records'])} záznamů ze snapshotu {snap.get('fetched', '')}")
+    if missing:
+        with ThreadPoolExecutor(max_workers=len(missing)) as pool:
+            for table, records in zip(missing, pool.map(lambda t: fetch_table(base_id, t), missing)):
+                out[table] = records
+    return out
+
+
+# --- sada změn ---
+
+class ChangeSet:
+    """Změny polí záznamů jedné tabulky: id → {pole: nová hodnota} (+ původní hodnoty pro náhled)."""
+
+    def __init__(self, name: str, base_id: str, table: str):
+        self.name = name
+        self.base_id = base_id
+        self.table = table
+        self.created = time.strftime("%Y-%m-%dT%H:%M:%S")
+        self.changes: Dict[str, dict] = {}
+        self.old: Dict[str, dict] = {}
+        self.path: Optional[Path] = None
+
+    def __len__(self) -> int:
+        return len(self.changes)
+
+    def update(self, record: dict, fields: dict) -> bool:
+        """Naplánuje změnu polí záznamu ze snapshotu; pole se stejnou hodnotou vynechá."""
+        current = record.get("fields", {})
+        diff = {k: v for k, v in fields.items() if current.get(k) != v}
+        if not diff:
+            return False
+        rec_id = record["id"]
+        self.changes.setdefault(rec_id, {}).update(diff)
+        old = self.old.setdefault(rec_id, {})
+        for k in diff:
+            old.setdefault(k, current.get(k))
+        return True
+
+    def preview(self, limit: int = PREVIEW, width: int = 60) -> None:
+        def short(v) -> str:
+            text = "" if v is None else str(v)
+            return text if len(text) <= width else text[:width - 1] + "…"
+
+        for rec_id in list(self.changes)[:limit]:
+            for field, new in self.changes[rec_id].items():
+                print(f"   {rec_id} {field}: {short(self.old.get(rec_id, {}).get(field))!r} → {short(new)!r}")
+        if len(self.changes) > limit:
+            print(f"   … a dalších {len(self.changes) - limit} záznamů")
+
+    # --- soubor plánu ---
+
+    def save(self) -> Path:
+        fields = sorted({k for f in self.changes.values() for k in f})
+        rows = [[rec_id, [f.get(k) for k in fields], [self.old.get(rec_id, {}).get(k) for k in fields]]
+                for rec_id, f in self.changes.items()]
+        data = {"name": self.name, "base": self.base_id, "table": self.table, "created": self.created,
+                "fields": fields, "present": [[k in f for k in fields] for f in self.changes.values()],
+                "rows": rows}
+        CHANGESET_DIR.mkdir(parents=True, exist_ok=True)
+        for older in pending_plans(self.name):
+            older.unlink()  # starší plán téhož skriptu je nahrazen – jeho zápis by vracel staré hodnoty
+        self.path = CHANGESET_DIR / f"{self.name}_{time.strftime('%Y%m%d-%H%M%S')}.json.gz"
+        with gzip.open(self.path, "wt", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, separators=(",", ":"))
+        return self.path
+
+    @classmethod
+    def load(cls, path: Path) -> "ChangeSet":
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            data = json.load(f)
+        cs = cls(data["name"], data["base"], data["table"])
+        cs.created = data["created"]
+        cs.path = Path(path)
+        fields = data["fields"]
+        for (rec_id, new, old), present in zip(data["rows"], data["present"]):
+            cs.changes[rec_id] = {k: v for k, v, p in zip(fields, new, present) if p}
+            cs.old[rec_id] = {k: v for k, v, p in zip(fields, old, present) if p}
+        return cs
+
+    # --- zápis ---
+
+    def apply(self, *, workers: Optional[int] = None) -> int:
+        """Zapíše změny do Airtable a do snapshotu; vrací počet zapsaných záznamů."""
+        from airtable_api import write_records
+
+        records = [{"id": rec_id, "fields": fields} for rec_id, fields in self.changes.items()]
+        if not records:
+            return 0
+        snap = _load_snapshot(self.table)
+        if snap is not None:
+            current = {r["id"]: r.get("fields", {}) for r in snap["records"]}
+            moved = sum(1 for rec_id, old in self.old.items()
+                        if rec_id in current and any(current[rec_id].get(k) != v for k, v in old.items()))
+            if moved:
+                print(f"   ⚠️  {moved} záznamů se ve snapshotu od plánu změnilo – plán je přepíše")
+        ids = write_records("PATCH", self.base_id, self.table, records, queue=self.name, workers=workers)
+        if snap is not None:
+            for rec in snap["records"]:
+                fields = self.changes.get(rec["id"])
+                if fields:
+                    rec.setdefault("fields", {}).update(fields)
+            _save_snapshot(self.table, snap)
+        if self.path is not None and self.path.resolve().parent == CHANGESET_DIR.resolve():
+            APPLIED_DIR.mkdir(parents=True, exist_ok=True)
+            os.replace(self.path, APPLIED_DIR / self.path.name)
+        return len(ids)
+
+
+def pending_plans(name: Optional[str] = None) -> List[Path]:
+    """Neaplikované plány (nejstarší první), případně jen jednoho skriptu."""
+    pattern = f"{name}_*.json.gz" if name else "*.json.gz"
+    return sorted(CHANGESET_DIR.glob(pattern), key=lambda p: p.name)
+
+
+# --- společné CLI opravných skriptů ---
+
+def run_script(name: str, table: str, reads: List[str],
+               plan: Callable[[Dict[str, List[dict]], ChangeSet], None], *,
+               base_id: str = BASE_ID, description: str = "", argv: Optional[List[str]] = None) -> None:
+    """
+    main() opravného skriptu: `plan(tabulky, změny)` naplní ChangeSet ze záznamů
+    snapshotu (a vypíše vlastní statistiky); o snapshot, soubor plánu a zápis se
+    postará tahle funkce podle přepínačů --plan / --apply / --refresh.
+    """
+    ap = argparse.ArgumentParser(description=description)
+    ap.add_argument("--plan", action="store_true", help="Jen spočítá změny a uloží plán do .changesets/")
+    ap.add_argument("--apply", nargs="?", const="", metavar="PLÁN",
+                    help="Zapíše uložený plán (bez cesty poslední plán skriptu)")
+    ap.add_argument("--refresh", action="store_true", help="Tabulky znovu stáhnout z Airtable místo snapshotu")
+    args = ap.parse_args(argv)
+
+    if args.apply is not None:
+        if args.apply:
+            path = Path(args.apply)
+        else:
+            plans = pending_plans(name)
+            if not plans:
+                raise SystemExit(f"❌ Žádný neaplikovaný plán {name} – nejdřív python3 {name}.py --plan")
+            path = plans[-1]
+        _apply_path(path)
+        return
+
+    tables = load_tables(base_id, reads, refresh=args.refresh or not args.plan)
+    changes = ChangeSet(name, base_id, table)
+    plan(tables, changes)
+
+    if not changes:
+        print("\n✅ Žádné změny.")
+        return
+    print(f"\n📋 Plán: {len(changes)} záznamů v {table}")
+    changes.preview()
+    path = changes.save()
+    print(f"💾 Plán uložen: {_display(path)}")
+    if args.plan:
+        print(f"   Zápis: python3 {name}.py --apply")
+        return
+    print("\n⬆️ Aktualizuji...")
+    written = changes.apply()
+    print(f"\n✅ Aktualizováno {written} záznamů v {table}.")
+
+
+def _display(path: Path) -> str:
+    try:
+        return str(path.relative_to(BASE_DIR))
+    except ValueError:
+        return str(path)
+
+
+def _apply_path(path: Path) -> None:
+    changes = ChangeSet.load(path)
+    print(f"⬆️ {path.name}: {len(changes)} záznamů v {changes.table} (plán z {changes.created})")
+    written = changes.apply()
+    print(f"✅ Aktualizováno {written} záznamů v {changes.table}.")
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Plány změn Airtable (.changesets/)")
+    sub = ap.add_subparsers(dest="action")
+    sub.add_parser("list", help="Neaplikované plány")
+    p_show = sub.add_parser("show", help="Vypíše změny plánu")
+    p_show.add_argument("path")
+    p_apply = sub.add_parser("apply", help="Zapíše plán do Airtable")
+    p_apply.add_argument("path")
+    p_fetch = sub.add_parser("fetch", help="Obnoví snapshot tabulek")
+    p_fetch.add_argument("tables", nargs="+")
+    args = ap.parse_args()
+
+    if args.action == "show":
+        changes = ChangeSet.load(Path(args.path))
+        print(f"📋 {changes.name} → {changes.table}: {len(changes)} záznamů (plán z {changes.created})")
+        changes.preview(limit=len(changes), width=200)
+    elif args.action == "apply":
+        _apply_path(Path(args.path))
+    elif args.action == "fetch":
+        load_tables(BASE_ID, args.tables, refresh=True)
+    else:
+        plans = pending_plans()
+        if not plans:
+            print("✅ Žádný neaplikovaný plán.")
+        for path in plans:
+            changes = ChangeSet.load(path)
+            print(f"   {path.name:<52} {changes.table:<22} {len(changes):>6} záznamů")
+
+
+if __name__ == "__main__":
+    main()
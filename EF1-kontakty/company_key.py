@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Jednotná normalizace názvů firem pro všechny matchery.
+
+Místo desítek `str.replace` v každém skriptu se název zpracuje jedním
+předkompilovaným regexem (jeden průchod textem) a výsledek se cachuje (LRU).
+Vrací strukturovaný klíč:
+
+  company_key("ČEZ, a. s.")            → CompanyKey(core="cez", legal_form="a.s.", tokens=("cez",))
+  company_key("Škoda Auto Czech s.r.o.") → CompanyKey(core="skoda auto", legal_form="s.r.o.", tokens=("skoda", "auto"))
+
+- core        název bez diakritiky, právní formy, závorek a "šumu" (group, holding, cz, ...)
+- legal_form  kanonická právní forma (s.r.o., a.s., gmbh, ...) nebo ""
+- tokens      slova jádra (pro fuzzy/částečné porovnání)
+
+Právní formy a šum se odstraňují jen jako celá slova – na rozdíl od původního
+`s.replace(' se', '')` už se nerozbije např. "Sensio" nebo "Seznam".
+
+Ve skriptech:
+  from company_key import company_key, normalize_company, fold
+  normalize_company("ČEZ, a.s.") == normalize_company("ČEZ")   # True
+
+Použití z příkazové řádky (ladění):
+  python3 company_key.py "ČEZ, a. s." "Komerční banka (KB)"
+"""
+
+from __future__ import annotations
+
+import re
+import sys
+import unicodedata
+from functools import lru_cache
+from typing import NamedTuple, Tuple
+
+
+CACHE_SIZE = 1 << 16
+
+# kanonický tvar → regex (po složení diakritiky a malých písmenech)
+LEGAL_FORMS = [
+    ("spol. s r.o.", r"spol\.?\s*s\s*r\.?\s*o\.?"),
+    ("s.r.o.", r"s\.?\s*r\.?\s*o\.?"),
+    ("a.s.", r"a\.\s*s\.?"),
+    ("k.s.", r"k\.\s*s\.?"),
+    ("v.o.s.", r"v\.\s*o\.\s*s\.?"),
+    ("o.p.s.", r"o\.\s*p\.\s*s\.?"),
+    ("z.s.", r"z\.\s*s\.?"),
+    ("z.u.", r"z\.\s*u\.?"),
+    ("s.p.", r"s\.\s*p\.?"),
+    ("s.a.", r"s\.\s*a\.?"),
+    ("n.v.", r"n\.\s*v\.?"),
+    ("b.v.", r"b\.\s*v\.?"),
+    ("spol.", r"spol\."),
+    ("gmbh", r"gmbh"),
+    ("ltd", r"ltd\.?"),
+    ("inc", r"inc\.?"),
+    ("llc", r"llc"),
+    ("plc", r"plc"),
+    ("corp", r"corp\.?"),
+    ("ag", r"ag"),
+    ("se", r"se"),
+]
+
+# slova, která nerozlišují firmu (země, skupina) – do jádra se nepočítají
+NOISE_WORDS = [
+    "czech republic", "ceska republika", "slovak republic", "slovenska republika",
+    "czech", "slovakia", "cz", "sk", "group", "holding",
+]
+
+_LEGAL_GROUPS = {f"l{i}": canonical for i, (canonical, _) in enumerate(LEGAL_FORMS)}
+
+_TOKEN_RE = re.compile(
+    r"(?P<paren>\([^)]*\))"
+    r"|(?<![a-z0-9])(?:"
+    + "|".join(f"(?P<l{i}>{pattern})" for i, (_, pattern) in enumerate(LEGAL_FORMS))
+    + r")(?![a-z0-9])"
+    r"|(?<![a-z0-9])(?P<noise>" + "|".join(re.escape(w) for w in NOISE_WORDS) + r")(?![a-z0-9])"
+    r"|(?P<word>[a-z0-9]+(?:[&'+][a-z0-9]+)*)"
+)
+
+
+class CompanyKey(NamedTuple):
+    core: str
+    legal_form: str
+    tokens: Tuple[str, ...]
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def fold(text: str) -> str:
+    """Malá písmena bez diakritiky ("Všechovský" → "vsechovsky")."""
+    decomposed = unicodedata.normalize("NFKD", text or "")
+    return "".join(c for c in decomposed if not unicodedata.combining(c)).lower()
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def company_key(name: str) -> CompanyKey:
+    words = []
+    noise = []
+    legal_form = ""
+    for m in _TOKEN_RE.finditer(fold(name or "")):
+        kind = m.lastgroup
+        if kind == "word":
+            words.append(m.group("word"))
+        elif kind == "noise":
+            noise.append(m.group("noise"))
+        elif kind != "paren" and not legal_form:
+            legal_form = _LEGAL_GROUPS[kind]
+    # název složený jen ze "šumu" (např. "Group") si šum ponechá
+    tokens = tuple(words) if words else tuple(noise)
+    return CompanyKey(" ".join(tokens), legal_form, tokens)
+
+
+def normalize_company(name: str) -> str:
+    """Klíč pro porovnání firem (jádro názvu)."""
+    return company_key(name or "").core
+
+
+def main() -> None:
+    for name in sys.argv[1:]:
+        key = company_key(name)
+        print(f"{name!r:40} → core={key.core!r} legal_form={key.legal_form!r} tokens={key.tokens}")
+
+
+if __name__ == "__main__":
+    main()
@@ -5,16 +5,15 @@ a propojí kontakty s jejich firmami.
 """
 
 import csv
-import json
 import os
-import time
 from pathlib import Path
 from typing import Dict, List, Set
 from urllib.parse import quote
 
-import requests
 
-API_BASE = "https://api.airtable.com/v0"
+from company_key import normalize_company
+from airtable_api import API_BASE, get_token, request_with_backoff as airtable_request
+
 BATCH_SIZE = 10
 
 # Názvy firem, které ignorovat (nejsou to skutečné firmy)
@@ -24,14 +23,6 @@ INVALID_COMPANIES = {
 }
 
 
-def get_token() -> str:
-    """Načte token z MCP konfigurace."""
-    mcp_path = Path.home() / ".cursor" / "mcp.json"
-    with open(mcp_path, "r") as f:
-        config = json.load(f)
-    return config["mcpServers"]["airtable"]["env"]["AIRTABLE_API_KEY"]
-
-
 def airtable_headers(token: str) -> Dict[str, str]:
     return {
         "Authorization": f"Bearer {token}",
@@ -40,28 +31,13 @@ def airtable_headers(token: str) -> Dict[str, str]:
 
 
 def request_with_backoff(method: str, url: str, *, headers: dict, json_data=None, params=None) -> dict:
-    delay = 1.0
-    for attempt in range(1, 8):
-        resp = requests.request(method, url, headers=headers, json=json_data, params=params, timeout=60)
-        if resp.status_code in (429, 500, 502, 503, 504):
-            time.sleep(delay)
-            delay = min(delay * 2, 20)
-            continue
-        if not resp.ok:
-            raise RuntimeError(f"Airtable API error {resp.status_code}: {resp.text[:500]}")
-        return resp.json()
-    raise RuntimeError(f"Airtable API still failing after retries")
+    return airtable_request(method, url, headers=headers, json=json_data, params=params)
 
 
 def chunked(items: List, size: int) -> List[List]:
     return [items[i:i + size] for i in range(0, len(items), size)]
 
 
-def normalize_company(name: str) -> str:
-    """Normalizuje název firmy pro porovnání."""
-    return (name or "").strip().lower()
-
-
 def is_valid_company(name: str) -> bool:
     """Kontroluje, zda je název firmy validní."""
     normalized = normalize_company(name)
@@ -69,7 +45,7 @@ def is_valid_company(name: str) -> bool:
         return False
     if name.strip() in INVALID_COMPANIES:
         return False
-    if normalized in {c.lower() for c in INVALID_COMPANIES}:
+    if normalized in {normalize_company(c) for c in INVALID_COMPANIES}:
         return False
     return True
 
@@ -154,7 +130,6 @@ def create_klienti(token: str, base_id: str, companies: List[str]) -> Dict[str,
         for rec in data.get("records", []):
             firma = rec.get("fields", {}).get("Firma", "")
             created[normalize_company(firma)] = rec["id"]
-        time.sleep(0.2)
     
     return created
 
@@ -216,7 +191,6 @@ def main():
             linked += 1
             if (i + 1) % 50 == 0:
                 print(f"   … propojeno {i + 1}/{len(batches)} firem", flush=True)
-            time.sleep(0.2)
     
     print(f"\n✅ Hotovo! Propojeno {linked} firem s jejich kontakty.")
 
@@ -0,0 +1,288 @@
+#!/usr/bin/env python3
+"""
+Sloupcová cache zdrojových CSV (Arrow IPC), aby se exporty neparsovaly pořád dokola.
+
+Každé zdrojové CSV se při prvním čtení převede do souboru `<název>.csv.arrow`
+vedle originálu. Další běhy soubor jen namapují do paměti (memory-map) a čtou
+pouze sloupce, které skript potřebuje – bez `csv.reader`.
+
+Invalidace:
+- pokud se nezměnilo mtime ani velikost CSV → cache je platná,
+- pokud se změnilo mtime, spočítá se SHA-1 obsahu; stejný hash = cache se jen
+  "přerazítkuje", jiný hash = CSV se znovu naparsuje.
+
+Bez nainstalovaného `pyarrow` se použije záložní `<název>.csv.pickle`
+(bez memory-mapu, ale pořád bez parsování CSV).
+
+Použití:
+  python3 csv_cache.py                    # převede všechny známé zdroje (SOURCES)
+  python3 csv_cache.py --force            # přegeneruje cache i když je platná
+  python3 csv_cache.py "DLM7 - List 1.csv" "deals-16044442-64.csv"
+
+Ve skriptech:
+  from csv_cache import read_rows, read_dicts
+  for row in read_rows(path, has_header=False, columns=[1, 4, 6]):   # jako csv.reader
+      ...
+  for row in read_dicts(path, columns=["Deal - Název", "Deal - Organizace"]):  # jako csv.DictReader
+      ...
+"""
+
+from __future__ import annotations
+
+import argparse
+import csv
+import hashlib
+import os
+import pickle
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence
+
+try:
+    import pyarrow as pa
+except ImportError:  # pyarrow je volitelný
+    pa = None
+
+
+BASE_DIR = Path(__file__).parent
+
+# Zdroje, které čtou merge a enrichment skripty
+SOURCES = [
+    "ACA 2024 - List 1.csv",
+    "AILM - List 1.csv",
+    "dlm 1-4.csv",
+    "DLM5.csv",
+    "dlm6.csv",
+    "DLM7 - List 1.csv",
+    "FAIL - jaro 2025 - List 1.csv",
+    "FAIL - podzim 2025 - List 1.csv",
+    "AT - Deals - List 1.csv",
+    "deals-16044442-64.csv",
+    "Filip akce - poptávky - List 1.csv",
+    "Final mejling 2025 (AIP a AImpact) - List 1.csv",
+    "merged_emails_old_dlm_2024 vcetne bounced.csv",
+    "analyza_emailu_poptavky_firemni_s_info a výsledky - analyza_emailu_poptavky_firemni_s_info.csv",
+]
+
+CACHE_VERSION = "1"
+LEN_COLUMN = "__len"
+
+
+def column_name(i: int) -> str:
+    return f"c{i}"
+
+
+def file_sha1(path: Path) -> str:
+    h = hashlib.sha1()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def cache_path(path: Path) -> Path:
+    suffix = ".arrow" if pa is not None else ".pickle"
+    return path.with_name(path.name + suffix)
+
+
+def parse_csv(path: Path) -> List[List[str]]:
+    """Naparsuje CSV stejně jako ostatní skripty (utf-8, csv.reader, řádky mohou mít různou délku)."""
+    with open(path, "r", encoding="utf-8", newline="") as f:
+        return list(csv.reader(f))
+
+
+# --- Arrow backend ---
+
+def _write_arrow(rows: List[List[str]], target: Path, meta: Dict[str, str]) -> None:
+    width = max((len(r) for r in rows), default=0)
+    columns = {LEN_COLUMN: pa.array([len(r) for r in rows], type=pa.int32())}
+    for i in range(width):
+        columns[column_name(i)] = pa.array([r[i] if i < len(r) else None for r in rows], type=pa.string())
+    table = pa.table(columns).replace_schema_metadata(meta)
+    _write_arrow_table(table, target)
+
+
+def _write_arrow_table(table, target: Path) -> None:
+    tmp = target.with_name(target.name + ".tmp")
+    # bez komprese, aby šel soubor číst přímo přes memory-map
+    with pa.OSFile(str(tmp), "wb") as sink:
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+    os.replace(tmp, target)
+
+
+def _open_arrow(target: Path):
+    source = pa.memory_map(str(target), "r")
+    return pa.ipc.open_file(source).read_all()
+
+
+def _arrow_meta(table) -> Dict[str, str]:
+    raw = table.schema.metadata or {}
+    return {k.decode("utf-8"): v.decode("utf-8") for k, v in raw.items()}
+
+
+# --- Pickle backend (bez pyarrow) ---
+
+def _write_pickle(rows: List[List[str]], target: Path, meta: Dict[str, str]) -> None:
+    tmp = target.with_name(target.name + ".tmp")
+    with open(tmp, "wb") as f:
+        pickle.dump({"meta": meta, "rows": rows}, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp, target)
+
+
+def _open_pickle(target: Path) -> dict:
+    with open(target, "rb") as f:
+        return pickle.load(f)
+
+
+# --- Společná logika ---
+
+def _source_meta(path: Path, sha1: Optional[str] = None) -> Dict[str, str]:
+    st = path.stat()
+    return {
+        "version": CACHE_VERSION,
+        "mtime_ns": str(st.st_mtime_ns),
+        "size": str(st.st_size),
+        "sha1": sha1 or file_sha1(path),
+    }
+
+
+def _load_cached(path: Path, force: bool = False):
+    """Vrátí načtenou cache (Arrow tabulku nebo dict s řádky); při neplatnosti ji přegeneruje."""
+    path = Path(path)
+    target = cache_path(path)
+    st = path.stat()
+
+    if target.exists() and not force:
+        try:
+            loaded = _open_arrow(target) if pa is not None else _open_pickle(target)
+        except Exception:
+            loaded = None
+        if loaded is not None:
+            meta = _arrow_meta(loaded) if pa is not None else loaded["meta"]
+            if meta.get("version") == CACHE_VERSION:
+                if meta.get("mtime_ns") == str(st.st_mtime_ns) and meta.get("size") == str(st.st_size):
+                    return loaded
+                # mtime se změnilo (např. touch / git checkout) – rozhodne obsah
+                sha1 = file_sha1(path)
+                if meta.get("sha1") == sha1:
+                    new_meta = _source_meta(path, sha1)
+                    if pa is not None:
+                        loaded = loaded.replace_schema_metadata(new_meta)
+                        _write_arrow_table(loaded, target)
+                    else:
+                        loaded["meta"] = new_meta
+                        _write_pickle(loaded["rows"], target, new_meta)
+                    return loaded
+
+    rows = parse_csv(path)
+    meta = _source_meta(path)
+    if pa is not None:
+        _write_arrow(rows, target, meta)
+        return _open_arrow(target)
+    _write_pickle(rows, target, meta)
+    return {"meta": meta, "rows": rows}
+
+
+def _iter_raw_rows(path: Path, columns: Optional[Sequence[int]] = None, loaded=None) -> Iterator[List[str]]:
+    """
+    Iteruje řádky jako csv.reader; při zadaných `columns` vyplní jen tyto indexy (ostatní jsou "").
+    `loaded` = už načtená cache (aby se nenačítala podruhé).
+    """
+    if loaded is None:
+        loaded = _load_cached(path)
+
+    if pa is None:
+        rows = loaded["rows"]
+        if columns is None:
+            for r in rows:
+                yield list(r)
+            return
+        wanted = set(columns)
+        for r in rows:
+            yield [v if i in wanted else "" for i, v in enumerate(r)]
+        return
+
+    table = loaded
+    lengths = table.column(LEN_COLUMN).to_pylist()
+    names = set(table.column_names)
+    indices = range(table.num_columns - 1) if columns is None else sorted(set(columns))
+    selected = []
+    for i in indices:
+        name = column_name(i)
+        if name in names:
+            selected.append((i, table.column(name).to_pylist()))
+
+    for r, n in enumerate(lengths):
+        row = [""] * n
+        for i, values in selected:
+            if i < n:
+                row[i] = values[r] if values[r] is not None else ""
+        yield row
+
+
+def read_rows(path: Path, has_header: bool = False, columns: Optional[Iterable[int]] = None) -> Iterator[List[str]]:
+    """Náhrada za `csv.reader` (s volitelným přeskočením hlavičky) nad cache."""
+    it = _iter_raw_rows(Path(path), list(columns) if columns is not None else None)
+    if has_header:
+        next(it, None)
+    yield from it
+
+
+def _header(loaded) -> List[str]:
+    """První řádek načtené cache – u Arrow jen jeden řádek, ne celé sloupce."""
+    if pa is None:
+        rows = loaded["rows"]
+        return list(rows[0]) if rows else []
+    if loaded.num_rows == 0:
+        return []
+    first = loaded.slice(0, 1).to_pydict()
+    n = first[LEN_COLUMN][0]
+    return [first.get(column_name(i), [None])[0] or "" for i in range(n)]
+
+
+def read_header(path: Path) -> List[str]:
+    return _header(_load_cached(Path(path)))
+
+
+def read_dicts(path: Path, columns: Optional[Iterable[str]] = None) -> Iterator[Dict[str, Optional[str]]]:
+    """Náhrada za `csv.DictReader` nad cache (prázdné řádky přeskočí, chybějící hodnoty = None)."""
+    path = Path(path)
+    loaded = _load_cached(path)
+    header = _header(loaded)
+    if columns is None:
+        wanted = list(range(len(header)))
+    else:
+        names = set(columns)
+        wanted = [i for i, h in enumerate(header) if h in names]
+
+    it = _iter_raw_rows(path, wanted, loaded)
+    next(it, None)
+    for row in it:
+        if not row:
+            continue
+        out: Dict[str, Optional[str]] = {}
+        for i in wanted:
+            out[header[i]] = row[i] if i < len(row) else None
+        yield out
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Převede zdrojová CSV do sloupcové cache.")
+    ap.add_argument("files", nargs="*", help="CSV soubory (default: všechny známé zdroje)")
+    ap.add_argument("--force", action="store_true", help="Přegenerovat cache i když je platná")
+    args = ap.parse_args()
+
+    files = [Path(f) for f in args.files] or [BASE_DIR / name for name in SOURCES]
+    backend = "Arrow (memory-map)" if pa is not None else "pickle (pyarrow není nainstalovaný)"
+    print(f"📦 Cache backend: {backend}")
+
+    for path in files:
+        if not path.exists():
+            print(f"   ⏭️  Nenalezeno: {path.name}")
+            continue
+        _load_cached(path, force=args.force)
+        print(f"   ✅ {path.name} → {cache_path(path).name}")
+
+
+if __name__ == "__main__":
+    main()
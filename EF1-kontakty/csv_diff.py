@@ -0,0 +1,265 @@
+#!/usr/bin/env python3
+"""
+Klíčový diff dvou verzí CSV (kontakty, dealy) – přidané, odebrané a změněné
+řádky po polích, nezávisle na pořadí řádků.
+
+Oba soubory se čtou proudově. Malé soubory se spojí hash joinem v paměti;
+větší než MEMORY_BYTES se nejdřív rozdělí podle hashe klíče do dočasných
+oddílů (Grace hash join) a každý oddíl se spojí zvlášť – běh zůstává
+lineární i pro soubory, které se nevejdou do paměti.
+
+Formáty výstupu:
+- summary  počty + které sloupce se měnily (default)
+- json     JSON Lines: {"change", "key", "fields": {sloupec: [staré, nové]}, "row"}
+- csv      změněné řádky + sloupce _change a _fields
+- upsert   jen přidané a změněné řádky s hlavičkou nového souboru
+           → přímo vstup pro `airtable_upsert.py --csv` (smazané hodnoty se
+           propíšou jen s --overwrite-empty)
+
+Použití:
+  python3 csv_diff.py kontakty_unified.before_master_xlsx.csv kontakty_unified.csv
+  python3 csv_diff.py stary.csv novy.csv --format json --out zmeny.jsonl
+  python3 csv_diff.py stary.csv novy.csv --format upsert --out k_upsertu.csv
+  python3 airtable_upsert.py --csv k_upsertu.csv
+  python3 csv_diff.py deals_old.csv deals_complete.csv --key "Název dealu"
+  python3 csv_diff.py a.csv b.csv --key Jméno,Příjmení --ignore "Oslovení"
+
+Snapshot (snapshots.py) se dá porovnat po obnovení do souboru:
+  python3 snapshots.py restore kontakty_unified.csv <id> --out /tmp/stary.csv
+"""
+
+from __future__ import annotations
+
+import argparse
+import csv
+import json
+import os
+import sys
+import tempfile
+import zlib
+from collections import Counter
+from contextlib import ExitStack
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+csv.field_size_limit(sys.maxsize)
+
+DEFAULT_KEY = "Email"
+
+# nad tuto velikost (součet obou souborů) se dělí na oddíly na disku
+MEMORY_BYTES = 256 * 1024 * 1024
+MAX_PARTITIONS = 256
+
+ADDED = "added"
+REMOVED = "removed"
+CHANGED = "changed"
+
+
+def norm_key(s: str) -> str:
+    return (s or "").strip().lower()
+
+
+def _open_rows(path: Path) -> Tuple[List[str], Iterator[List[str]], object]:
+    f = open(path, "r", encoding="utf-8-sig", newline="")
+    reader = csv.reader(f)
+    header = next(reader, [])
+    return header, reader, f
+
+
+def _key_getter(header: List[str], key: Sequence[str], path: Path):
+    missing = [k for k in key if k not in header]
+    if missing:
+        raise SystemExit(f"V {path.name} chybí klíčový sloupec: {', '.join(missing)}")
+    cols = [header.index(k) for k in key]
+
+    def get(cells: List[str]) -> str:
+        return "\x1f".join(norm_key(cells[c]) if c < len(cells) else "" for c in cols)
+
+    return get
+
+
+class DiffStats:
+    def __init__(self):
+        self.counts: Counter = Counter()
+        self.fields: Counter = Counter()
+        self.no_key = {"old": 0, "new": 0}
+        self.duplicate_keys = {"old": 0, "new": 0}
+
+
+def _join(old_rows: Iterable[Tuple[int, str, List[str]]], new_rows: Iterable[Tuple[int, str, List[str]]],
+          old_header: List[str], new_header: List[str], columns: List[str], ignore: set,
+          stats: DiffStats) -> Iterator[dict]:
+    """Hash join jednoho oddílu. Duplicitní klíče se párují podle pořadí výskytu."""
+    old_pos = {c: i for i, c in enumerate(old_header)}
+    new_pos = {c: i for i, c in enumerate(new_header)}
+
+    def as_dict(cells: List[str], pos: Dict[str, int]) -> Dict[str, str]:
+        return {c: (cells[pos[c]] if pos.get(c, len(cells)) < len(cells) else "") for c in columns}
+
+    seen_old: Counter = Counter()
+    old: Dict[Tuple[str, int], Tuple[int, List[str]]] = {}
+    for idx, key, cells in old_rows:
+        n = seen_old[key]
+        if n:
+            stats.duplicate_keys["old"] += 1
+        seen_old[key] += 1
+        old[(key, n)] = (idx, cells)
+
+    seen_new: Counter = Counter()
+    for _, key, cells in new_rows:
+        n = seen_new[key]
+        if n:
+            stats.duplicate_keys["new"] += 1
+        seen_new[key] += 1
+        prev = old.pop((key, n), None)
+        new_row = as_dict(cells, new_pos)
+        if prev is None:
+            stats.counts[ADDED] += 1
+            yield {"change": ADDED, "key": key, "fields": {}, "row": new_row}
+            continue
+        old_row = as_dict(prev[1], old_pos)
+        fields = {c: [old_row[c], new_row[c]] for c in columns if c not in ignore and old_row[c] != new_row[c]}
+        if fields:
+            stats.counts[CHANGED] += 1
+            stats.fields.update(fields.keys())
+            yield {"change": CHANGED, "key": key, "fields": fields, "row": new_row}
+        else:
+            stats.counts["unchanged"] += 1
+
+    for (key, _), (_, cells) in sorted(old.items(), key=lambda x: x[1][0]):
+        stats.counts[REMOVED] += 1
+        yield {"change": REMOVED, "key": key, "fields": {}, "row": as_dict(cells, old_pos)}
+
+
+def _keyed(reader: Iterator[List[str]], get_key, stats: DiffStats, side: str) -> Iterator[Tuple[int, str, List[str]]]:
+    for idx, cells in enumerate(reader):
+        if not any(cells):
+            continue
+        key = get_key(cells)
+        if not key.strip("\x1f"):
+            stats.no_key[side] += 1
+            continue
+        yield idx, key, cells
+
+
+def _partition(rows: Iterator[Tuple[int, str, List[str]]], parts: int, tmpdir: Path, side: str) -> List[Path]:
+    paths = [tmpdir / f"{side}.{i}.csv" for i in range(parts)]
+    with ExitStack() as stack:
+        writers = [csv.writer(stack.enter_context(open(p, "w", encoding="utf-8", newline=""))) for p in paths]
+        for idx, key, cells in rows:
+            writers[zlib.crc32(key.encode("utf-8")) % parts].writerow([idx, key] + cells)
+    return paths
+
+
+def _read_partition(path: Path) -> Iterator[Tuple[int, str, List[str]]]:
+    with open(path, "r", encoding="utf-8", newline="") as f:
+        for row in csv.reader(f):
+            yield int(row[0]), row[1], row[2:]
+
+
+def diff_files(old_path: Path, new_path: Path, key: Sequence[str] = (DEFAULT_KEY,), ignore: Iterable[str] = (),
+               stats: Optional[DiffStats] = None, memory_bytes: int = MEMORY_BYTES) -> Iterator[dict]:
+    """Proudově vrací změny {"change", "key", "fields", "row"} mezi dvěma CSV."""
+    old_path, new_path = Path(old_path), Path(new_path)
+    stats = stats if stats is not None else DiffStats()
+    ignore = set(ignore)
+
+    old_header, old_reader, old_f = _open_rows(old_path)
+    new_header, new_reader, new_f = _open_rows(new_path)
+    try:
+        columns = new_header + [c for c in old_header if c not in new_header]
+        old_rows = _keyed(old_reader, _key_getter(old_header, key, old_path), stats, "old")
+        new_rows = _keyed(new_reader, _key_getter(new_header, key, new_path), stats, "new")
+
+        total = old_path.stat().st_size + new_path.stat().st_size
+        if total <= memory_bytes:
+            yield from _join(old_rows, new_rows, old_header, new_header, columns, ignore, stats)
+            return
+
+        # ~2 oddíly na každý násobek paměťového limitu, ať se oddíl pohodlně vejde
+        parts = min(MAX_PARTITIONS, 2 * (total // max(1, memory_bytes) + 1))
+        with tempfile.TemporaryDirectory(prefix="csv_diff_") as tmp:
+            tmpdir = Path(tmp)
+            old_parts = _partition(old_rows, parts, tmpdir, "old")
+            new_parts = _partition(new_rows, parts, tmpdir, "new")
+            for op, np_ in zip(old_parts, new_parts):
+                yield from _join(_read_partition(op), _read_partition(np_), old_header, new_header, columns, ignore, stats)
+                os.remove(op)
+                os.remove(np_)
+    finally:
+        old_f.close()
+        new_f.close()
+
+
+def write_changes(changes: Iterable[dict], out, fmt: str, header: List[str]) -> None:
+    if fmt == "json":
+        for ch in changes:
+            out.write(json.dumps(ch, ensure_ascii=False) + "\n")
+        return
+    if fmt == "upsert":
+        w = csv.DictWriter(out, fieldnames=header, extrasaction="ignore")
+        w.writeheader()
+        for ch in changes:
+            if ch["change"] != REMOVED:
+                w.writerow(ch["row"])
+        return
+    if fmt == "csv":
+        w = csv.DictWriter(out, fieldnames=["_change", "_fields"] + header, extrasaction="ignore")
+        w.writeheader()
+        for ch in changes:
+            w.writerow({"_change": ch["change"], "_fields": ", ".join(ch["fields"]), **ch["row"]})
+        return
+    for _ in changes:
+        pass
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Klíčový diff dvou CSV (přidané / odebrané / změněné řádky).")
+    ap.add_argument("old", help="Starší verze")
+    ap.add_argument("new", help="Novější verze")
+    ap.add_argument("--key", default=DEFAULT_KEY, help="Klíčový sloupec, více oddělit čárkou (default: Email)")
+    ap.add_argument("--ignore", default="", help="Sloupce, jejichž změny ignorovat (čárkou)")
+    ap.add_argument("--format", choices=["summary", "json", "csv", "upsert"], default="summary")
+    ap.add_argument("--out", default="", help="Výstupní soubor (default: stdout)")
+    ap.add_argument("--memory-mb", type=int, default=MEMORY_BYTES // (1024 * 1024),
+                    help="Nad tuto velikost dělit na oddíly na disku")
+    args = ap.parse_args()
+
+    old_path, new_path = Path(args.old), Path(args.new)
+    for p in (old_path, new_path):
+        if not p.exists():
+            raise SystemExit(f"Soubor nenalezen: {p}")
+    key = [k.strip() for k in args.key.split(",") if k.strip()]
+    ignore = [c.strip() for c in args.ignore.split(",") if c.strip()]
+
+    with open(new_path, "r", encoding="utf-8-sig", newline="") as f:
+        header = next(csv.reader(f), [])
+
+    stats = DiffStats()
+    changes = diff_files(old_path, new_path, key=key, ignore=ignore, stats=stats,
+                         memory_bytes=args.memory_mb * 1024 * 1024)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8", newline="") as out:
+            write_changes(changes, out, args.format, header)
+    elif args.format == "summary":
+        write_changes(changes, None, args.format, header)
+    else:
+        write_changes(changes, sys.stdout, args.format, header)
+
+    log = sys.stderr if (args.format != "summary" and not args.out) else sys.stdout
+    print(f"🔍 {old_path.name} → {new_path.name} (klíč: {', '.join(key)})", file=log)
+    print(f"   ➕ přidáno: {stats.counts[ADDED]}   ➖ odebráno: {stats.counts[REMOVED]}   "
+          f"✏️  změněno: {stats.counts[CHANGED]}   beze změny: {stats.counts['unchanged']}", file=log)
+    for col, n in stats.fields.most_common():
+        print(f"      {col}: {n}", file=log)
+    if any(stats.no_key.values()):
+        print(f"   ⚠️  Řádky bez klíče (přeskočeno): starý {stats.no_key['old']}, nový {stats.no_key['new']}", file=log)
+    if any(stats.duplicate_keys.values()):
+        print(f"   ⚠️  Duplicitní klíče (párováno podle pořadí): starý {stats.duplicate_keys['old']}, "
+              f"nový {stats.duplicate_keys['new']}", file=log)
+    if args.out:
+        print(f"✅ Zapsáno: {args.out}", file=log)
+
+
+if __name__ == "__main__":
+    main()
@@ -3,6 +3,17 @@
 Jednoduchý lokální server pro csv_editor.html:
 - servíruje statické soubory ze složky projektu
 - umí uložit CSV zpět do vybraného CSV přes POST /save (whitelist)
+- GET /rows?file=&offset=&limit=&sort=&filter= vrací okno řádků jako JSON
+  (CSV se naparsuje jednou a drží v paměti; sort = název sloupce, "-" = sestupně;
+  filter = text bez ohledu na diakritiku a velikost písmen)
+- POST /patch {"file", "version", "changes": {id_řádku: {index_sloupce: hodnota}}}
+  přepíše jen řádky se změněnými buňkami (ostatní řádky zůstanou beze změny);
+  verze (ETag / If-Match) chrání před přepsáním novějšího souboru (409),
+  zápis jde přes dočasný soubor + rename
+- GET /search?q=&limit=&source= fulltext bez diakritiky přes kontakty, dealy
+  a zrcadlo Airtable (search_index.py; index se doindexuje při změně souborů)
+- GET /events?file= posílá změny řádků (Server-Sent Events), když soubor
+  přepíše jiný skript nebo jiná záložka – editor nemusí stahovat celý CSV
 
 Spuštění:
   cd "/Users/helenamich/Desktop/KONTAKTY EF1 čištění"
@@ -12,9 +23,21 @@ Spuštění:
 
 from __future__ import annotations
 
+import codecs
+import csv
+import hashlib
+import io
 import json
 import os
+import queue
+import threading
+import time
 from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+from company_key import fold
+from search_index import DEFAULT_LIMIT as SEARCH_LIMIT, load_search_index
 
 
 DEFAULT_FILE = "kontakty_unified.csv"
@@ -26,6 +49,310 @@ ALLOWED_FILES = {
     "poptavky_deals_filtered.csv",
 }
 
+DEFAULT_LIMIT = 200
+MAX_LIMIT = 5000
+# kolik různých kombinací sort/filter držet v paměti na soubor
+VIEW_CACHE_SIZE = 16
+
+# jak často kontrolovat soubory s otevřeným editorem (stat, bez čtení obsahu)
+WATCH_INTERVAL = 1.0
+# SSE komentář proti zavření nečinného spojení
+HEARTBEAT_SECONDS = 25
+# při větší změně (např. vložené řádky uprostřed) se pošle "reload" místo delty
+MAX_DELTA_ROWS = 1000
+
+
+class ChangeHub:
+    """Odběratelé SSE podle souboru; každý má vlastní frontu událostí."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers: Dict[str, List[queue.Queue]] = {}
+
+    def subscribe(self, filename: str) -> queue.Queue:
+        q: queue.Queue = queue.Queue()
+        with self._lock:
+            self._subscribers.setdefault(filename, []).append(q)
+        return q
+
+    def unsubscribe(self, filename: str, q: queue.Queue) -> None:
+        with self._lock:
+            subs = self._subscribers.get(filename, [])
+            if q in subs:
+                subs.remove(q)
+            if not subs:
+                self._subscribers.pop(filename, None)
+
+    def watched_files(self) -> List[str]:
+        with self._lock:
+            return list(self._subscribers)
+
+    def publish(self, filename: str, event: str, payload: dict) -> None:
+        with self._lock:
+            subs = list(self._subscribers.get(filename, []))
+        for q in subs:
+            q.put((event, payload))
+
+
+HUB = ChangeHub()
+
+
+def row_delta(old: List[List[str]], new: List[List[str]]) -> Optional[dict]:
+    """Změny po řádcích (id = pořadí). None = změna je moc velká, editor má načíst znovu."""
+    changed = [i for i in range(min(len(old), len(new))) if old[i] != new[i]]
+    added = list(range(len(old), len(new)))
+    if len(changed) + len(added) > MAX_DELTA_ROWS:
+        return None
+    return {
+        "changed": [{"id": i, "cells": new[i]} for i in changed],
+        "added": [{"id": i, "cells": new[i]} for i in added],
+        "removed_from": len(new) if len(new) < len(old) else None,
+    }
+
+
+class CsvDocument:
+    """CSV naparsované v paměti; znovu se načte jen když se soubor na disku změní.
+
+    Id řádku = pořadí řádku v souboru (0 = první řádek pod hlavičkou).
+    Drží i původní text záznamů: PATCH přepíše jen změněné řádky, ostatní
+    (včetně prázdných řádků a buněk za šířkou hlavičky) zůstanou beze změny.
+    """
+
+    def __init__(self, filename: str):
+        self.filename = filename
+        self.lock = threading.RLock()
+        self.stamp: Optional[Tuple[int, int]] = None
+        self.version = ""
+        self.headers: List[str] = []
+        self.rows: List[List[str]] = []
+        self.records: List[Tuple[str, List[str]]] = []   # (původní text, buňky) všech záznamů
+        self.row_records: List[int] = []                  # id řádku → index v records
+        self.bom = False
+        self._folded: Optional[List[str]] = None
+        self._views: Dict[Tuple[str, str], List[int]] = {}
+
+    def _disk_stamp(self) -> Tuple[int, int]:
+        st = os.stat(self.filename)
+        return (st.st_mtime_ns, st.st_size)
+
+    def refresh(self) -> bool:
+        """Načte soubor, pokud se změnil (a pošle deltu odběratelům). True = došlo k novému načtení."""
+        with self.lock:
+            stamp = self._disk_stamp()
+            if stamp == self.stamp:
+                return False
+            with open(self.filename, "rb") as f:
+                raw = f.read()
+            old_headers, old_rows, old_version = self.headers, self.rows, self.version
+            self.bom = raw.startswith(codecs.BOM_UTF8)
+            self.records = split_csv_records(raw.decode("utf-8-sig", errors="replace"))
+            self.headers, self.rows, self.row_records = normalize_records(self.records)
+            self._set_version(raw, stamp)
+            if old_version and old_version != self.version:
+                delta = row_delta(old_rows, self.rows) if old_headers == self.headers else None
+                self._publish(old_version, delta)
+            return True
+
+    def _publish(self, prev_version: str, delta: Optional[dict]) -> None:
+        payload = {"file": self.filename, "version": self.version, "prev_version": prev_version,
+                   "total": len(self.rows)}
+        if delta is None:
+            HUB.publish(self.filename, "reload", payload)
+        else:
+            HUB.publish(self.filename, "delta", {**payload, **delta})
+
+    def _set_version(self, raw: bytes, stamp: Tuple[int, int]) -> None:
+        self.version = hashlib.sha1(raw).hexdigest()[:16]
+        self.stamp = stamp
+        self._folded = None
+        self._views.clear()
+
+    def apply_patch(self, changes: Dict[int, Dict[int, str]]) -> int:
+        """Aplikuje změněné buňky a zapíše soubor. Vrací počet skutečně změněných buněk."""
+        with self.lock:
+            changed = 0
+            touched = []
+            for row_id, cells in changes.items():
+                row = self.rows[row_id]
+                for col, value in cells.items():
+                    if row[col] != value:
+                        row[col] = value
+                        changed += 1
+                        touched.append(row_id)
+            if changed:
+                ids = sorted(set(touched))
+                for row_id in ids:
+                    self._rewrite_record(row_id, changes[row_id])
+                text = "".join(t for t, _ in self.records)
+                raw = (codecs.BOM_UTF8 if self.bom else b"") + text.encode("utf-8")
+                prev_version = self.version
+                write_atomic(self.filename, raw)
+                self._set_version(raw, self._disk_stamp())
+                # ostatní otevřené záložky dostanou jen změněné řádky
+                self._publish(prev_version, {
+                    "changed": [{"id": i, "cells": self.rows[i]} for i in ids],
+                    "added": [],
+                    "removed_from": None,
+                })
+            return changed
+
+    def _rewrite_record(self, row_id: int, cells: Dict[int, str]) -> None:
+        """Nový text jednoho záznamu; buňky za šířkou hlavičky a konec řádku zůstanou původní."""
+        idx = self.row_records[row_id]
+        text, values = self.records[idx]
+        values = values + [""] * (len(self.headers) - len(values))
+        for col in cells:
+            values[col] = self.rows[row_id][col]
+        body = text.rstrip("\r\n")
+        buf = io.StringIO()
+        csv.writer(buf, lineterminator=text[len(body):]).writerow(values)
+        self.records[idx] = (buf.getvalue(), values)
+
+    def _folded_rows(self) -> List[str]:
+        if self._folded is None:
+            self._folded = [fold("\x1f".join(r)) for r in self.rows]
+        return self._folded
+
+    def view(self, sort: str = "", filter_text: str = "") -> List[int]:
+        """Id řádků po filtru a řazení (výsledek se cachuje do další změny souboru)."""
+        key = (sort, filter_text)
+        with self.lock:
+            ids = self._views.get(key)
+            if ids is not None:
+                return ids
+
+            needle = fold(filter_text.strip())
+            if needle:
+                folded = self._folded_rows()
+                ids = [i for i, text in enumerate(folded) if needle in text]
+            else:
+                ids = list(range(len(self.rows)))
+
+            column, descending = sort.lstrip("-"), sort.startswith("-")
+            if column in self.headers:
+                col = self.headers.index(column)
+                # prázdné hodnoty vždy na konec, bez ohledu na směr
+                filled = [i for i in ids if self.rows[i][col].strip()]
+                empty = [i for i in ids if not self.rows[i][col].strip()]
+                filled.sort(key=lambda i: fold(self.rows[i][col]), reverse=descending)
+                ids = filled + empty
+
+            if len(self._views) >= VIEW_CACHE_SIZE:
+                self._views.pop(next(iter(self._views)))
+            self._views[key] = ids
+            return ids
+
+
+def split_csv_records(text: str) -> List[Tuple[str, List[str]]]:
+    """Záznamy CSV i s původním textem (víceřádková buňka = jeden záznam, konce řádků zachované)."""
+    lines = list(io.StringIO(text, newline=""))
+    reader = csv.reader(lines)
+    records = []
+    start = 0
+    for values in reader:
+        records.append(("".join(lines[start:reader.line_num]), values))
+        start = reader.line_num
+    return records
+
+
+def normalize_records(records: List[Tuple[str, List[str]]]) -> Tuple[List[str], List[List[str]], List[int]]:
+    """
+    Stejná pravidla jako parseCSVText v editoru: prázdné řádky pryč, řádky zarovnané
+    na hlavičku. Vrací (hlavička, řádky, index záznamu každého řádku).
+    """
+    kept = [i for i, (_, values) in enumerate(records) if any(values)]
+    if not kept:
+        return [], [], []
+    headers = records[kept[0]][1]
+    width = len(headers)
+    data = [(records[i][1] + [""] * (width - len(records[i][1])))[:width] for i in kept[1:]]
+    return headers, data, kept[1:]
+
+
+_SEARCH_INDEX = None
+_SEARCH_LOCK = threading.Lock()
+
+
+def search(query: str, limit: int, source: str = "") -> list:
+    """Hledání přes sdílený index; změněné zdroje se doindexují (stat je levný)."""
+    global _SEARCH_INDEX
+    with _SEARCH_LOCK:
+        if _SEARCH_INDEX is None:
+            _SEARCH_INDEX = load_search_index()
+        else:
+            _SEARCH_INDEX.refresh()
+            if _SEARCH_INDEX.dirty:
+                _SEARCH_INDEX.save()
+        return _SEARCH_INDEX.search(query, limit=limit, source=source)
+
+
+def write_atomic(filename: str, data: bytes) -> None:
+    """Zápis přes dočasný soubor + rename – pád uprostřed zápisu nepoškodí původní CSV."""
+    tmp = f"{filename}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, filename)
+
+
+def parse_changes(raw_changes: dict, doc: CsvDocument) -> Dict[int, Dict[int, str]]:
+    """{"12": {"3": "x"}} → {12: {3: "x"}}; sloupec může být i název. Neplatné id → ValueError."""
+    if raw_changes is None:
+        raw_changes = {}
+    if not isinstance(raw_changes, dict):
+        raise ValueError("Pole 'changes' musí být objekt {id_řádku: {sloupec: hodnota}}")
+    changes: Dict[int, Dict[int, str]] = {}
+    for row_key, cells in raw_changes.items():
+        row_id = int(row_key)
+        if not 0 <= row_id < len(doc.rows) or not isinstance(cells, dict):
+            raise ValueError(f"Neplatný řádek: {row_key}")
+        for col_key, value in cells.items():
+            col = doc.headers.index(col_key) if col_key in doc.headers else int(col_key)
+            if not 0 <= col < len(doc.headers):
+                raise ValueError(f"Neplatný sloupec: {col_key}")
+            changes.setdefault(row_id, {})[col] = "" if value is None else str(value)
+    return changes
+
+
+_DOCUMENTS: Dict[str, CsvDocument] = {}
+_DOCUMENTS_LOCK = threading.Lock()
+
+
+def get_document(filename: str) -> CsvDocument:
+    with _DOCUMENTS_LOCK:
+        doc = _DOCUMENTS.get(filename)
+        if doc is None:
+            doc = _DOCUMENTS[filename] = CsvDocument(filename)
+    doc.refresh()
+    return doc
+
+
+def allowed_filename(name: str) -> Optional[str]:
+    """Vrátí bezpečný název souboru z whitelistu, jinak None."""
+    if name is not None and not isinstance(name, str):
+        return None
+    filename = os.path.basename((name or DEFAULT_FILE).strip())
+    return filename if filename in ALLOWED_FILES else None
+
+
+def watch_files(stop: threading.Event) -> None:
+    """Hlídá soubory, které má někdo otevřené v editoru; změnu rozešle přes HUB."""
+    while not stop.wait(WATCH_INTERVAL):
+        for filename in HUB.watched_files():
+            try:
+                if os.path.exists(filename):
+                    get_document(filename)
+            except Exception as e:
+                print(f"⚠️  Nepodařilo se načíst {filename}: {e}")
+
+
+def _int_param(params: dict, name: str, default: int) -> int:
+    try:
+        return int((params.get(name) or [default])[0])
+    except ValueError:
+        return default
+
 
 class Handler(SimpleHTTPRequestHandler):
     def end_headers(self) -> None:
@@ -35,25 +362,160 @@ class Handler(SimpleHTTPRequestHandler):
         self.send_header("Expires", "0")
         super().end_headers()
 
-    def _send_json(self, status: int, payload: dict) -> None:
+    def _send_json(self, status: int, payload: dict, etag: str = "") -> None:
         data = json.dumps(payload, ensure_ascii=False).encode("utf-8")
         self.send_response(status)
         self.send_header("Content-Type", "application/json; charset=utf-8")
         self.send_header("Content-Length", str(len(data)))
+        if etag:
+            self.send_header("ETag", f'"{etag}"')
         # allow fetch from same-origin; harmless to allow local tools too
         self.send_header("Access-Control-Allow-Origin", "*")
         self.end_headers()
         self.wfile.write(data)
 
+    def do_GET(self):  # noqa: N802
+        url = urlparse(self.path)
+        if url.path.rstrip("/") == "/rows":
+            return self._handle_rows(parse_qs(url.query))
+        if url.path.rstrip("/") == "/search":
+            return self._handle_search(parse_qs(url.query))
+        if url.path.rstrip("/") == "/events":
+            return self._handle_events(parse_qs(url.query))
+        return super().do_GET()
+
+    def _handle_search(self, params: dict) -> None:
+        query = (params.get("q") or [""])[0]
+        limit = min(MAX_LIMIT, max(1, _int_param(params, "limit", SEARCH_LIMIT)))
+        source = (params.get("source") or [""])[0]
+        started = time.perf_counter()
+        try:
+            hits = search(query, limit, source)
+        except Exception as e:
+            return self._send_json(500, {"ok": False, "error": f"Search failed: {e}"})
+        return self._send_json(200, {
+            "ok": True,
+            "q": query,
+            "hits": hits,
+            "ms": round((time.perf_counter() - started) * 1000, 1),
+        })
+
+    def _send_event(self, event: str, payload: dict) -> None:
+        data = json.dumps(payload, ensure_ascii=False)
+        self.wfile.write(f"event: {event}\ndata: {data}\n\n".encode("utf-8"))
+        self.wfile.flush()
+
+    def _handle_events(self, params: dict) -> None:
+        filename = allowed_filename((params.get("file") or [DEFAULT_FILE])[0])
+        if filename is None or not os.path.exists(filename):
+            return self._send_json(404, {"ok": False, "error": "File not allowed or missing"})
+
+        q = HUB.subscribe(filename)
+        try:
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream; charset=utf-8")
+            self.send_header("Access-Control-Allow-Origin", "*")
+            self.end_headers()
+            doc = get_document(filename)
+            self._send_event("hello", {"file": filename, "version": doc.version, "total": len(doc.rows)})
+            while True:
+                try:
+                    event, payload = q.get(timeout=HEARTBEAT_SECONDS)
+                except queue.Empty:
+                    self.wfile.write(b": ping\n\n")
+                    self.wfile.flush()
+                    continue
+                self._send_event(event, payload)
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+        finally:
+            HUB.unsubscribe(filename, q)
+
+    def _handle_rows(self, params: dict) -> None:
+        filename = allowed_filename((params.get("file") or [DEFAULT_FILE])[0])
+        if filename is None:
+            return self._send_json(400, {"ok": False, "error": f"File not allowed. Allowed: {sorted(ALLOWED_FILES)}"})
+        if not os.path.exists(filename):
+            return self._send_json(404, {"ok": False, "error": f"Soubor nenalezen: {filename}"})
+
+        offset = max(0, _int_param(params, "offset", 0))
+        limit = min(MAX_LIMIT, max(0, _int_param(params, "limit", DEFAULT_LIMIT)))
+        sort = (params.get("sort") or [""])[0]
+        filter_text = (params.get("filter") or [""])[0]
+
+        try:
+            doc = get_document(filename)
+        except Exception as e:
+            return self._send_json(500, {"ok": False, "error": f"Read failed: {e}"})
+
+        with doc.lock:
+            ids = doc.view(sort, filter_text)
+            window = ids[offset: offset + limit]
+            payload = {
+                "ok": True,
+                "file": filename,
+                "version": doc.version,
+                "headers": doc.headers,
+                "total": len(doc.rows),
+                "filtered": len(ids),
+                "offset": offset,
+                "limit": limit,
+                "rows": [{"id": i, "cells": doc.rows[i]} for i in window],
+            }
+        return self._send_json(200, payload, etag=payload["version"])
+
+    def _handle_patch(self, raw: bytes) -> None:
+        try:
+            payload = json.loads(raw.decode("utf-8"))
+        except Exception:
+            return self._send_json(400, {"ok": False, "error": "Invalid JSON"})
+        if not isinstance(payload, dict):
+            return self._send_json(400, {"ok": False, "error": "Expected a JSON object"})
+
+        filename = allowed_filename(payload.get("filename") or payload.get("file"))
+        if filename is None:
+            return self._send_json(400, {"ok": False, "error": f"File not allowed. Allowed: {sorted(ALLOWED_FILES)}"})
+
+        expected = (self.headers.get("If-Match") or "").strip().strip('"') or str(payload.get("version") or "")
+        try:
+            doc = get_document(filename)
+        except Exception as e:
+            return self._send_json(500, {"ok": False, "error": f"Read failed: {e}"})
+
+        with doc.lock:
+            # soubor se mohl změnit na disku (skripty) i jinou záložkou
+            doc.refresh()
+            if not expected or expected != doc.version:
+                return self._send_json(
+                    409,
+                    {"ok": False, "error": "Soubor se mezitím změnil – načti ho znovu.", "version": doc.version},
+                    etag=doc.version,
+                )
+            try:
+                changes = parse_changes(payload.get("changes"), doc)
+            except (ValueError, TypeError) as e:
+                return self._send_json(400, {"ok": False, "error": str(e)})
+            try:
+                changed = doc.apply_patch(changes)
+            except Exception as e:
+                return self._send_json(500, {"ok": False, "error": f"Write failed: {e}"})
+            return self._send_json(
+                200,
+                {"ok": True, "saved": filename, "changed": changed, "version": doc.version},
+                etag=doc.version,
+            )
+
     def do_OPTIONS(self):  # noqa: N802
         self.send_response(204)
         self.send_header("Access-Control-Allow-Origin", "*")
         self.send_header("Access-Control-Allow-Methods", "GET, POST, OPTIONS")
-        self.send_header("Access-Control-Allow-Headers", "Content-Type")
+        self.send_header("Access-Control-Allow-Headers", "Content-Type, If-Match")
+        self.send_header("Access-Control-Expose-Headers", "ETag")
         self.end_headers()
 
     def do_POST(self):  # noqa: N802
-        if self.path.rstrip("/") != "/save":
+        path = urlparse(self.path).path.rstrip("/")
+        if path not in ("/save", "/patch"):
             return self._send_json(404, {"ok": False, "error": "Not found"})
 
         try:
@@ -62,6 +524,8 @@ class Handler(SimpleHTTPRequestHandler):
             length = 0
 
         raw = self.rfile.read(length) if length > 0 else b""
+        if path == "/patch":
+            return self._handle_patch(raw)
         ctype = (self.headers.get("Content-Type") or "").split(";")[0].strip().lower()
 
         filename = DEFAULT_FILE
@@ -72,15 +536,19 @@ class Handler(SimpleHTTPRequestHandler):
                 payload = json.loads(raw.decode("utf-8"))
             except Exception:
                 return self._send_json(400, {"ok": False, "error": "Invalid JSON"})
-            filename = (payload.get("filename") or DEFAULT_FILE).strip()
+            if not isinstance(payload, dict):
+                return self._send_json(400, {"ok": False, "error": "Expected a JSON object"})
+            filename = payload.get("filename") or DEFAULT_FILE
             csv_text = payload.get("csv") or ""
+            if not isinstance(csv_text, str):
+                return self._send_json(400, {"ok": False, "error": "Field 'csv' must be a string"})
         else:
             # fallback: raw CSV body
             csv_text = raw.decode("utf-8", errors="replace")
 
         # bezpečnost: povolíme uložit jen do whitelistu (žádné jiné cesty)
-        filename = os.path.basename(filename)
-        if filename not in ALLOWED_FILES:
+        filename = allowed_filename(filename)
+        if filename is None:
             return self._send_json(
                 400,
                 {
@@ -90,8 +558,7 @@ class Handler(SimpleHTTPRequestHandler):
             )
 
         try:
-            with open(filename, "w", encoding="utf-8", newline="") as f:
-                f.write(csv_text)
+            write_atomic(filename, csv_text.encode("utf-8"))
         except Exception as e:
             return self._send_json(500, {"ok": False, "error": f"Write failed: {e}"})
 
@@ -106,6 +573,8 @@ def main() -> None:
     host = "0.0.0.0"
     port = 8000
     httpd = ThreadingHTTPServer((host, port), Handler)
+    stop = threading.Event()
+    threading.Thread(target=watch_files, args=(stop,), daemon=True).start()
     print(f"CSV editor server running on http://127.0.0.1:{port}/csv_editor.html")
     print(f"CSV editor server running on http://localhost:{port}/csv_editor.html")
     httpd.serve_forever()
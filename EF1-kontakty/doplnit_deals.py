@@ -4,47 +4,30 @@ Doplní tabulku Deals o záznamy z Pipedrive a Filip akce.
 """
 
 import csv
-import json
-import time
 import re
 from pathlib import Path
 from typing import Dict, List, Set
 from urllib.parse import quote
 
-import requests
+
+from pipedrive_index import load_pipedrive
+from company_key import normalize_company
+from airtable_api import API_BASE, get_token, request_with_backoff as airtable_request
 
 BASE_DIR = Path(__file__).parent
 PIPEDRIVE = BASE_DIR / "deals-16044442-64.csv"
 FILIP_AKCE = BASE_DIR / "Filip akce - poptávky - List 1.csv"
 
-API_BASE = "https://api.airtable.com/v0"
 BASE_ID = "appEXpqOEIElHzScl"
 BATCH_SIZE = 10
 
 
-def get_token() -> str:
-    mcp_path = Path.home() / ".cursor" / "mcp.json"
-    with open(mcp_path, "r") as f:
-        config = json.load(f)
-    return config["mcpServers"]["airtable"]["env"]["AIRTABLE_API_KEY"]
-
-
 def headers(token: str) -> Dict[str, str]:
     return {"Authorization": f"Bearer {token}", "Content-Type": "application/json"}
 
 
 def request_with_backoff(method: str, url: str, *, hdrs: dict, json_data=None, params=None) -> dict:
-    delay = 1.0
-    for attempt in range(1, 8):
-        resp = requests.request(method, url, headers=hdrs, json=json_data, params=params, timeout=60)
-        if resp.status_code in (429, 500, 502, 503, 504):
-            time.sleep(delay)
-            delay = min(delay * 2, 20)
-            continue
-        if not resp.ok:
-            raise RuntimeError(f"Airtable API error {resp.status_code}: {resp.text[:500]}")
-        return resp.json()
-    raise RuntimeError("Airtable API still failing after retries")
+    return airtable_request(method, url, headers=hdrs, json=json_data, params=params)
 
 
 def chunked(items: List, size: int) -> List[List]:
@@ -55,14 +38,6 @@ def normalize(s):
     return (s or "").strip().lower()
 
 
-def normalize_company(s):
-    s = normalize(s)
-    for suffix in [' s.r.o.', ' a.s.', ' s.r.o', ' a.s', ' spol.', ' k.s.', 
-                   ' gmbh', ' ltd', ' inc', ' n.v.', ' ag', ' se', ',']:
-        s = s.replace(suffix, '')
-    return s.strip()
-
-
 def map_typ_to_choice(typ: str, kategorie: str = "") -> str:
     """Mapuje typ na hodnoty v Airtable single select."""
     typ_lower = (typ or "").lower()
@@ -102,55 +77,39 @@ def map_vysledek(vysledek: str, status: str = "") -> str:
     return vysledek or status or ""
 
 
-def get_best_email(emails: List[str]) -> str:
-    for e in emails:
-        if e and '@' in e:
-            return e.strip()
-    return ""
-
-
 def parse_pipedrive() -> List[dict]:
-    """Načte Pipedrive deals."""
+    """Načte Pipedrive deals (sdílený index)."""
     records = []
     
-    with open(PIPEDRIVE, "r", encoding="utf-8") as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            deal_name = row.get("Deal - Název", "").strip()
-            company = row.get("Deal - Organizace", "").strip()
-            contact = row.get("Deal - Kontaktní osoba", "").strip()
-            value = row.get("Deal - Hodnota", "").strip()
-            
-            emails = [
-                row.get("Osoba - E-mail - Práce", ""),
-                row.get("Osoba - E-mail - Domov", ""),
-                row.get("Osoba - E-mail - Ostatní", "")
-            ]
-            email = get_best_email(emails)
-            
-            # Urči typ z názvu dealu
-            typ = ""
-            deal_lower = deal_name.lower()
-            if "workshop" in deal_lower:
-                typ = "Workshop"
-            elif "přednáška" in deal_lower or "keynote" in deal_lower:
-                typ = "Přednáška / keynote"
-            elif "školení" in deal_lower or "kurz" in deal_lower:
-                typ = "Školení"
-            elif "webinář" in deal_lower or "webinar" in deal_lower:
-                typ = "Přednáška / keynote"
-            elif "program" in deal_lower or "masterclass" in deal_lower:
-                typ = "Jiné (interní program apod.)"
-            
-            if company or contact:
-                records.append({
-                    "jmeno": contact,
-                    "email": email,
-                    "firma": company,
-                    "typ": typ,
-                    "poznamka": deal_name,
-                    "zdroj": "Pipedrive"
-                })
+    for r in load_pipedrive(PIPEDRIVE).records:
+        deal_name = r["deal_name"]
+        company = r["firma"]
+        contact = r["kontakt"]
+        email = r["email_prvni"]
+        
+        # Urči typ z názvu dealu
+        typ = ""
+        deal_lower = deal_name.lower()
+        if "workshop" in deal_lower:
+            typ = "Workshop"
+        elif "přednáška" in deal_lower or "keynote" in deal_lower:
+            typ = "Přednáška / keynote"
+        elif "školení" in deal_lower or "kurz" in deal_lower:
+            typ = "Školení"
+        elif "webinář" in deal_lower or "webinar" in deal_lower:
+            typ = "Přednáška / keynote"
+        elif "program" in deal_lower or "masterclass" in deal_lower:
+            typ = "Jiné (interní program apod.)"
+        
+        if company or contact:
+            records.append({
+                "jmeno": contact,
+                "email": email,
+                "firma": company,
+                "typ": typ,
+                "poznamka": deal_name,
+                "zdroj": "Pipedrive"
+            })
     
     return records
 
@@ -324,7 +283,6 @@ def main():
         created += len(batch)
         if created % 50 == 0:
             print(f"   ... {created}/{len(deals_to_create)}")
-        time.sleep(0.2)
     
     print(f"\n✅ Vytvořeno {created} nových deals!")
 
@@ -3,90 +3,59 @@
 Doplní kontakty z analýzy emailů k deals bez kontaktů.
 """
 
-import csv
-import json
-import time
 import re
 from pathlib import Path
 from typing import Dict, List
 from urllib.parse import quote
 
-import requests
+
+from csv_cache import read_dicts
+from company_key import normalize_company
+from airtable_api import API_BASE, get_token, request_with_backoff as airtable_request
 
 BASE_DIR = Path(__file__).parent
 EMAIL_CSV = Path.home() / "Downloads" / "analyza_emailu_poptavky_firemni_s_info a výsledky - analyza_emailu_poptavky_firemni_s_info.csv"
 
-API_BASE = "https://api.airtable.com/v0"
 BASE_ID = "appEXpqOEIElHzScl"
 BATCH_SIZE = 10
 
 
-def get_token() -> str:
-    mcp_path = Path.home() / ".cursor" / "mcp.json"
-    with open(mcp_path, "r") as f:
-        config = json.load(f)
-    return config["mcpServers"]["airtable"]["env"]["AIRTABLE_API_KEY"]
-
-
 def headers(token: str) -> Dict[str, str]:
     return {"Authorization": f"Bearer {token}", "Content-Type": "application/json"}
 
 
 def request_with_backoff(method: str, url: str, *, hdrs: dict, json_data=None, params=None) -> dict:
-    delay = 1.0
-    for attempt in range(1, 8):
-        resp = requests.request(method, url, headers=hdrs, json=json_data, params=params, timeout=60)
-        if resp.status_code in (429, 500, 502, 503, 504):
-            time.sleep(delay)
-            delay = min(delay * 2, 20)
-            continue
-        if not resp.ok:
-            raise RuntimeError(f"Airtable API error {resp.status_code}: {resp.text[:500]}")
-        return resp.json()
-    raise RuntimeError("Airtable API still failing after retries")
+    return airtable_request(method, url, headers=hdrs, json=json_data, params=params)
 
 
 def chunked(items: List, size: int) -> List[List]:
     return [items[i:i + size] for i in range(0, len(items), size)]
 
 
-def normalize_company(s):
-    s = (s or "").strip().lower()
-    # Odstraň právní formy a zkratky
-    for suffix in [' s.r.o.', ' a.s.', ' s.r.o', ' a.s', ' spol.', ' k.s.', 
-                   ' gmbh', ' ltd', ' inc', ' n.v.', ' ag', ' se', ',',
-                   ' czech republic', ' česká republika', ' cz', ' sk',
-                   ' pharma', ' group', ' holding']:
-        s = s.replace(suffix, '')
-    return s.strip()
-
-
 def parse_email_csv() -> Dict[str, dict]:
     """Načte kontakty z CSV analýzy emailů podle firmy."""
     by_company = {}
     
-    with open(EMAIL_CSV, "r", encoding="utf-8") as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            # Různé varianty názvu firmy
-            firma1 = row.get("firma_extrahovaná", "").strip()
-            firma2 = row.get("firma", "").strip()
-            jmeno = row.get("jméno_příjmení", "").strip()
-            email = row.get("email", "").strip()
-            
-            if not email or '@' not in email or not jmeno:
-                continue
-            
-            # Normalizuj obě firmy
-            for firma in [firma1, firma2]:
-                if firma:
-                    firma_norm = normalize_company(firma)
-                    if firma_norm and firma_norm not in by_company:
-                        by_company[firma_norm] = {
-                            "contact": jmeno,
-                            "email": email,
-                            "firma_original": firma
-                        }
+    for row in read_dicts(EMAIL_CSV):
+        # Různé varianty názvu firmy
+        firma1 = row.get("firma_extrahovaná", "").strip()
+        firma2 = row.get("firma", "").strip()
+        jmeno = row.get("jméno_příjmení", "").strip()
+        email = row.get("email", "").strip()
+        
+        if not email or '@' not in email or not jmeno:
+            continue
+        
+        # Normalizuj obě firmy
+        for firma in [firma1, firma2]:
+            if firma:
+                firma_norm = normalize_company(firma)
+                if firma_norm and firma_norm not in by_company:
+                    by_company[firma_norm] = {
+                        "contact": jmeno,
+                        "email": email,
+                        "firma_original": firma
+                    }
     
     return by_company
 
@@ -185,7 +154,6 @@ def main():
         request_with_backoff("PATCH", deals_url, hdrs=hdrs, 
                             json_data={"records": batch, "typecast": True})
         updated += len(batch)
-        time.sleep(0.2)
     
     print(f"\n✅ Doplněno {updated} kontaktů!")
 
@@ -3,114 +3,55 @@
 Doplní kontakty z Pipedrive k deals z Filip akce.
 """
 
-import csv
-import json
-import time
-import re
 from pathlib import Path
 from typing import Dict, List
 from urllib.parse import quote
 
-import requests
+
+from pipedrive_index import load_pipedrive
+from company_key import normalize_company
+from airtable_api import API_BASE, get_token, request_with_backoff as airtable_request
 
 BASE_DIR = Path(__file__).parent
 PIPEDRIVE = BASE_DIR / "deals-16044442-64.csv"
 
-API_BASE = "https://api.airtable.com/v0"
 BASE_ID = "appEXpqOEIElHzScl"
 BATCH_SIZE = 10
 
 
-def get_token() -> str:
-    mcp_path = Path.home() / ".cursor" / "mcp.json"
-    with open(mcp_path, "r") as f:
-        config = json.load(f)
-    return config["mcpServers"]["airtable"]["env"]["AIRTABLE_API_KEY"]
-
-
 def headers(token: str) -> Dict[str, str]:
     return {"Authorization": f"Bearer {token}", "Content-Type": "application/json"}
 
 
 def request_with_backoff(method: str, url: str, *, hdrs: dict, json_data=None, params=None) -> dict:
-    delay = 1.0
-    for attempt in range(1, 8):
-        resp = requests.request(method, url, headers=hdrs, json=json_data, params=params, timeout=60)
-        if resp.status_code in (429, 500, 502, 503, 504):
-            time.sleep(delay)
-            delay = min(delay * 2, 20)
-            continue
-        if not resp.ok:
-            raise RuntimeError(f"Airtable API error {resp.status_code}: {resp.text[:500]}")
-        return resp.json()
-    raise RuntimeError("Airtable API still failing after retries")
+    return airtable_request(method, url, headers=hdrs, json=json_data, params=params)
 
 
 def chunked(items: List, size: int) -> List[List]:
     return [items[i:i + size] for i in range(0, len(items), size)]
 
 
-def normalize_company(s):
-    s = (s or "").strip().lower()
-    # Odstraň právní formy a zkratky
-    for suffix in [' s.r.o.', ' a.s.', ' s.r.o', ' a.s', ' spol.', ' k.s.', 
-                   ' gmbh', ' ltd', ' inc', ' n.v.', ' ag', ' se', ',',
-                   ' czech republic', ' česká republika', ' cz', ' sk']:
-        s = s.replace(suffix, '')
-    return s.strip()
-
-
-def get_best_email(emails: List[str]) -> str:
-    for e in emails:
-        if e and '@' in e:
-            return e.strip()
-    return ""
-
-
-def get_best_phone(phones: List[str]) -> str:
-    for p in phones:
-        if p and len(re.sub(r'\D', '', p)) >= 9:
-            return p.strip()
-    return ""
-
-
 def parse_pipedrive() -> Dict[str, dict]:
-    """Načte Pipedrive kontakty podle firmy."""
+    """Načte Pipedrive kontakty podle firmy (sdílený index)."""
     by_company = {}
     
-    with open(PIPEDRIVE, "r", encoding="utf-8") as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            company = row.get("Deal - Organizace", "").strip()
-            contact = row.get("Deal - Kontaktní osoba", "").strip()
-            
-            if not company or not contact:
-                continue
-            
-            emails = [
-                row.get("Osoba - E-mail - Práce", ""),
-                row.get("Osoba - E-mail - Domov", ""),
-                row.get("Osoba - E-mail - Ostatní", "")
-            ]
-            email = get_best_email(emails)
-            
-            phones = [
-                row.get("Osoba - Telefon - Práce", ""),
-                row.get("Osoba - Telefon - Mobil", ""),
-                row.get("Osoba - Telefon - Domov", ""),
-                row.get("Osoba - Telefon - Ostatní", "")
-            ]
-            phone = get_best_phone(phones)
-            
-            company_norm = normalize_company(company)
-            
-            # Ulož jen pokud máme email
-            if email and company_norm not in by_company:
-                by_company[company_norm] = {
-                    "contact": contact,
-                    "email": email,
-                    "phone": phone
-                }
+    for r in load_pipedrive(PIPEDRIVE).records:
+        company = r["firma"]
+        contact = r["kontakt"]
+        
+        if not company or not contact:
+            continue
+        
+        email = r["email_prvni"]
+        company_norm = normalize_company(company)
+        
+        # Ulož jen pokud máme email
+        if email and company_norm not in by_company:
+            by_company[company_norm] = {
+                "contact": contact,
+                "email": email,
+                "phone": r["telefon"]
+            }
     
     return by_company
 
@@ -200,7 +141,6 @@ def main():
         request_with_backoff("PATCH", deals_url, hdrs=hdrs, 
                             json_data={"records": batch, "typecast": True})
         updated += len(batch)
-        time.sleep(0.2)
     
     print(f"\n✅ Doplněno {updated} kontaktů!")
 
@@ -4,32 +4,28 @@ Obohacení Airtable dat:
 1. Doplní Deals o data z Filip akce a Pipedrive
 2. Vytvoří/aktualizuje Kontakty (jméno, příjmení, oslovení, telefon)
 3. Vytvoří/propojí Klienty (firmy)
+
+Zápisy jdou přes žurnál (mutation_journal.py); přerušený běh dokončí
+`python3 enrich_deals_and_contacts.py --resume` bez duplicit.
 """
 
-import csv
-import json
-import time
 import re
 from pathlib import Path
-from typing import Dict, List, Optional, Set
+from typing import Dict, Optional, Set
 from urllib.parse import quote
 
-import requests
+
+from csv_cache import read_rows
+from pipedrive_index import load_pipedrive
+from company_key import normalize_company
+from airtable_api import API_BASE, get_token, request_with_backoff as airtable_request
+from mutation_journal import MutationJournal, resume_requested
 
 BASE_DIR = Path(__file__).parent
 FILIP_AKCE = BASE_DIR / "Filip akce - poptávky - List 1.csv"
 PIPEDRIVE = BASE_DIR / "deals-16044442-64.csv"
 
-API_BASE = "https://api.airtable.com/v0"
 BASE_ID = "appEXpqOEIElHzScl"
-BATCH_SIZE = 10
-
-
-def get_token() -> str:
-    mcp_path = Path.home() / ".cursor" / "mcp.json"
-    with open(mcp_path, "r") as f:
-        config = json.load(f)
-    return config["mcpServers"]["airtable"]["env"]["AIRTABLE_API_KEY"]
 
 
 def headers(token: str) -> Dict[str, str]:
@@ -37,33 +33,7 @@ def headers(token: str) -> Dict[str, str]:
 
 
 def request_with_backoff(method: str, url: str, *, hdrs: dict, json_data=None, params=None) -> dict:
-    delay = 1.0
-    for attempt in range(1, 8):
-        resp = requests.request(method, url, headers=hdrs, json=json_data, params=params, timeout=60)
-        if resp.status_code in (429, 500, 502, 503, 504):
-            time.sleep(delay)
-            delay = min(delay * 2, 20)
-            continue
-        if not resp.ok:
-            raise RuntimeError(f"Airtable API error {resp.status_code}: {resp.text[:500]}")
-        return resp.json()
-    raise RuntimeError("Airtable API still failing after retries")
-
-
-def chunked(items: List, size: int) -> List[List]:
-    return [items[i:i + size] for i in range(0, len(items), size)]
-
-
-def normalize(s):
-    return (s or "").strip().lower()
-
-
-def normalize_company(s):
-    s = normalize(s)
-    for suffix in [' s.r.o.', ' a.s.', ' s.r.o', ' a.s', ' spol.', ' k.s.', 
-                   ' gmbh', ' ltd', ' inc', ' n.v.', ' ag', ' se', ',']:
-        s = s.replace(suffix, '')
-    return s.strip()
+    return airtable_request(method, url, headers=hdrs, json=json_data, params=params)
 
 
 def split_name(full_name: str) -> tuple:
@@ -160,104 +130,61 @@ def vocative_czech(name: str) -> str:
     return name
 
 
-def get_best_phone(phones):
-    """Vybere nejlepší telefon."""
-    for p in phones:
-        if p and len(re.sub(r'\D', '', p)) >= 9:
-            phone = p.strip()
-            # Přidej + před 420 pokud chybí
-            if phone.startswith('420'):
-                phone = '+' + phone
-            return phone
-    return ""
-
-
 def parse_filip_akce() -> Dict[str, dict]:
     """Načte Filip akce - vrací dict by normalized company name."""
     by_company = {}
     
-    with open(FILIP_AKCE, "r", encoding="utf-8") as f:
-        reader = csv.reader(f)
-        for row in reader:
-            if len(row) < 4:
-                continue
-            
-            firma = row[0].strip() if len(row) > 0 else ""
-            if not firma:
-                continue
-            
-            datum = row[1].strip() if len(row) > 1 else ""
-            misto = row[2].strip() if len(row) > 2 else ""
-            typ = row[3].strip() if len(row) > 3 else ""
-            cena = row[8].strip() if len(row) > 8 else ""
-            vysledek = row[11].strip() if len(row) > 11 else ""
-            popis = row[7].strip() if len(row) > 7 else ""
-            
-            company_norm = normalize_company(firma)
-            by_company[company_norm] = {
-                "firma": firma,
-                "datum": datum,
-                "misto": misto,
-                "typ": typ,
-                "cena": cena,
-                "vysledek": vysledek,
-                "popis": popis
-            }
+    for row in read_rows(FILIP_AKCE):
+        if len(row) < 4:
+            continue
+        
+        firma = row[0].strip() if len(row) > 0 else ""
+        if not firma:
+            continue
+        
+        datum = row[1].strip() if len(row) > 1 else ""
+        misto = row[2].strip() if len(row) > 2 else ""
+        typ = row[3].strip() if len(row) > 3 else ""
+        cena = row[8].strip() if len(row) > 8 else ""
+        vysledek = row[11].strip() if len(row) > 11 else ""
+        popis = row[7].strip() if len(row) > 7 else ""
+        
+        company_norm = normalize_company(firma)
+        by_company[company_norm] = {
+            "firma": firma,
+            "datum": datum,
+            "misto": misto,
+            "typ": typ,
+            "cena": cena,
+            "vysledek": vysledek,
+            "popis": popis
+        }
     
     return by_company
 
 
 def parse_pipedrive() -> Dict[str, dict]:
-    """Načte Pipedrive - vrací dict by normalized company name."""
-    by_company = {}
-    by_email = {}
-    
-    with open(PIPEDRIVE, "r", encoding="utf-8") as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            company = row.get("Deal - Organizace", "").strip()
-            contact = row.get("Deal - Kontaktní osoba", "").strip()
-            value = row.get("Deal - Hodnota", "").strip()
-            deal_name = row.get("Deal - Název", "").strip()
-            
-            emails = [
-                row.get("Osoba - E-mail - Práce", ""),
-                row.get("Osoba - E-mail - Domov", ""),
-                row.get("Osoba - E-mail - Ostatní", "")
-            ]
-            email = next((e.strip() for e in emails if e and '@' in e), "")
-            
-            phones = [
-                row.get("Osoba - Telefon - Práce", ""),
-                row.get("Osoba - Telefon - Mobil", ""),
-                row.get("Osoba - Telefon - Domov", ""),
-                row.get("Osoba - Telefon - Ostatní", "")
-            ]
-            phone = get_best_phone(phones)
-            
-            record = {
-                "kontakt": contact,
-                "email": email,
-                "telefon": phone,
-                "firma": company,
-                "hodnota": value,
-                "deal_name": deal_name
-            }
-            
-            if company:
-                company_norm = normalize_company(company)
-                if company_norm not in by_company:
-                    by_company[company_norm] = record
-            
-            if email:
-                by_email[normalize(email)] = record
-    
+    """Načte Pipedrive (sdílený index) - vrací dict by normalized company name."""
+    pd = load_pipedrive(PIPEDRIVE)
+    records = []
+    for r in pd.records:
+        records.append({
+            "kontakt": r["kontakt"],
+            "email": r["email_prvni"],
+            "telefon": r["telefon"],  # už v E.164 (pipedrive_index → phones.py)
+            "firma": r["firma"],
+            "hodnota": r["hodnota"],
+            "deal_name": r["deal_name"]
+        })
+    by_company = {k: records[ids[0]] for k, ids in pd.by_company.items()}
+    by_email = {k: records[ids[-1]] for k, ids in pd.by_email.items()}
     return by_company, by_email
 
 
 def main():
     token = get_token()
     hdrs = headers(token)
+    journal = MutationJournal("enrich_deals_and_contacts", resume=resume_requested())
     
     # 1. Načti data z CSV
     print("📋 Načítám data z CSV...")
@@ -390,14 +317,12 @@ def main():
     # 7. Vytvoř nové Kontakty
     if kontakty_to_create:
         print(f"\n➕ Vytvářím {len(kontakty_to_create)} nových kontaktů...")
-        for batch in chunked(kontakty_to_create, BATCH_SIZE):
-            result = request_with_backoff("POST", kontakty_url, hdrs=hdrs, 
-                                         json_data={"records": batch, "typecast": True})
-            for rec in result.get("records", []):
-                email = (rec.get("fields", {}).get("E-mail") or "").strip().lower()
-                if email:
-                    existing_kontakty[email] = rec["id"]
-            time.sleep(0.2)
+        created = journal.write("kontakty_create", "POST", BASE_ID, "Kontakty", kontakty_to_create,
+                                merge_on=["E-mail"])
+        for rec in created:
+            email = (rec.get("fields", {}).get("E-mail") or "").strip().lower()
+            if email:
+                existing_kontakty[email] = rec["id"]
         print(f"   ✅ Vytvořeno")
     
     # 8. Aktualizuj existující Kontakty (telefony)
@@ -406,23 +331,17 @@ def main():
         kontakty_to_update = [r for r in kontakty_to_update if r.get("fields", {}).get("Telefon")]
         if kontakty_to_update:
             print(f"\n♻️ Aktualizuji {len(kontakty_to_update)} kontaktů (telefony)...")
-            for batch in chunked(kontakty_to_update, BATCH_SIZE):
-                request_with_backoff("PATCH", kontakty_url, hdrs=hdrs, 
-                                    json_data={"records": batch, "typecast": True})
-                time.sleep(0.2)
+            journal.write("kontakty_update", "PATCH", BASE_ID, "Kontakty", kontakty_to_update)
             print(f"   ✅ Aktualizováno")
     
     # 9. Vytvoř nové Klienty
     if klienti_to_create:
         print(f"\n➕ Vytvářím {len(klienti_to_create)} nových klientů...")
-        for batch in chunked(klienti_to_create, BATCH_SIZE):
-            result = request_with_backoff("POST", klienti_url, hdrs=hdrs, 
-                                         json_data={"records": batch, "typecast": True})
-            for rec in result.get("records", []):
-                firma = (rec.get("fields", {}).get("Firma") or "").strip()
-                if firma:
-                    existing_klienti[normalize_company(firma)] = rec["id"]
-            time.sleep(0.2)
+        created = journal.write("klienti_create", "POST", BASE_ID, "Klienti", klienti_to_create, merge_on=["Firma"])
+        for rec in created:
+            firma = (rec.get("fields", {}).get("Firma") or "").strip()
+            if firma:
+                existing_klienti[normalize_company(firma)] = rec["id"]
         print(f"   ✅ Vytvořeno")
     
     # 10. Propoj Kontakty s Klienty
@@ -454,12 +373,10 @@ def main():
     
     if kontakty_to_link:
         print(f"   Propojuji {len(kontakty_to_link)} kontaktů...")
-        for batch in chunked(kontakty_to_link, BATCH_SIZE):
-            request_with_backoff("PATCH", kontakty_url, hdrs=hdrs, 
-                                json_data={"records": batch, "typecast": True})
-            time.sleep(0.2)
+        journal.write("kontakty_link", "PATCH", BASE_ID, "Kontakty", kontakty_to_link)
         print(f"   ✅ Propojeno")
     
+    journal.finish()
     print("\n✅ Hotovo!")
     print(f"\n📊 Souhrn:")
     print(f"   Nových kontaktů: {len(kontakty_to_create)}")
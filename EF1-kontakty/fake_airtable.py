@@ -0,0 +1,1054 @@
+#!/usr/bin/env python3
+"""
+Lokální náhrada Airtable API pro offline testy a měření propustnosti synchronizace.
+
+Pokrývá to, co používají naše skripty:
+- GET    /v0/{base}/{tabulka}            list (pageSize ≤ 100, offset, fields[], filterByFormula,
+                                          maxRecords, sort[i][field|direction])
+- GET    /v0/{base}/{tabulka}/{rec}
+- POST   /v0/{base}/{tabulka}            create (≤ 10 záznamů, typecast, performUpsert.fieldsToMergeOn)
+- PATCH  /v0/{base}/{tabulka}            update (≤ 10), PUT přepíše celý záznam; i s performUpsert
+- PATCH  /v0/{base}/{tabulka}/{rec}
+- DELETE /v0/{base}/{tabulka}?records[]=…  (≤ 10), DELETE /v0/{base}/{tabulka}/{rec}
+- GET    /v0/meta/bases/{base}/tables    schéma (pole, typy, volby selectů, vazby)
+- POST   /v0/meta/bases/{base}/tables/{tabulka}/fields, PATCH/DELETE …/fields/{pole}
+
+Tabulky jde adresovat názvem i tbl… id. Vazby (multipleRecordLinks) se drží
+obousměrně – zápis do Kontakty.Klienti doplní i Klienti.Kontakty a smazání
+záznamu ho odebere ze všech vazeb.
+
+Chování „jako produkce“ (vše nastavitelné, i za běhu přes PATCH /_config):
+- --rate / --burst      token bucket na base (Airtable: 5 req/s) → 429 + Retry-After
+- --penalty             po překročení limitu odmítat vše N sekund (Airtable: 30 s)
+- --latency-ms/--jitter-ms  umělá latence každé odpovědi
+- --error-rate / --rate-limit-rate  náhodné 5xx / 429 (fault injection)
+- --strict              neznámá pole → 422 UNKNOWN_FIELD_NAME (jinak se pole založí)
+
+Data: prázdné tabulky Kontakty/Klienti/Deals/Projekty / Poptávky (pole podle skriptů,
+DEFAULT_SCHEMA), nebo --mirror (airtable_mirror/*.json
+ze search_index.py --mirror), --synthetic N (generátor z benchmark.py), --state
+(JSON stav, při ukončení se uloží zpět). Statistiky: GET /_stats, POST /_reset.
+
+Použití:
+  python3 fake_airtable.py                                # http://127.0.0.1:8787/v0
+  python3 fake_airtable.py --synthetic 5000 --rate 5 --penalty 30 --latency-ms 120
+  python3 fake_airtable.py --mirror --state /tmp/fake_base.json --error-rate 0.02
+  AIRTABLE_API_BASE=http://127.0.0.1:8787/v0 python3 propoj_kontakty_klienti.py
+  curl -s http://127.0.0.1:8787/_stats
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import re
+import secrets
+import threading
+import time
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, unquote, urlparse
+
+
+BASE_DIR = Path(__file__).parent
+MIRROR_DIR = BASE_DIR / "airtable_mirror"
+
+DEFAULT_BASE_ID = "appEXpqOEIElHzScl"
+DEFAULT_PORT = 8787
+
+MAX_PAGE_SIZE = 100
+MAX_BATCH = 10
+
+# výchozí schéma – názvy polí, jak je skripty čtou/zapisují; ostatní vzniknou při zápisu (bez --strict).
+# "link:<tabulka>[:<zpětné pole>]" – zpětné pole se jmenuje podle zdrojové tabulky, pokud není dané
+DEFAULT_SCHEMA = {
+    "Kontakty": [
+        ("Jméno", "singleLineText"), ("Příjmení", "singleLineText"), ("E-mail", "email"),
+        ("Oslovení", "singleLineText"), ("Telefon", "phoneNumber"), ("LinkedIn profil", "url"),
+        ("Pracovní pozice", "singleLineText"), ("Společnost / Firma", "singleLineText"),
+        ("Koupil / účastnil se", "multipleSelects"), ("HR Kontakt", "multilineText"), ("Stav", "singleSelect"),
+        ("Oddělení", "multipleSelects"), ("Program / Deal / Poptávka", "multipleSelects"),
+        ("Klienti", "link:Klienti"), ("Deals", "link:Deals"),
+    ],
+    "Klienti": [
+        ("Firma", "singleLineText"), ("Co poptává", "multipleSelects"), ("Počet zaměstnanců", "singleSelect"),
+        ("Kontakty", "link:Kontakty"), ("Deals", "link:Deals"),
+        ("HR Kontakt", "link:Kontakty:Klienti (HR)"),
+    ],
+    "Deals": [
+        ("Název dealu", "singleLineText"), ("Jméno a příjmení", "singleLineText"), ("Email", "email"),
+        ("Firma", "singleLineText"), ("Co poptávali", "multipleSelects"), ("Reakce/výsledek", "singleSelect"),
+        ("Komu určeno / Nabídnut pro realizaci", "singleLineText"), ("Cena", "singleLineText"),
+        ("Datum", "singleLineText"), ("Poznámka", "multilineText"), ("Poznámka / Detaily", "multilineText"),
+        ("Kontakty", "link:Kontakty"), ("Kontakt", "link:Kontakty:Deals (Kontakt)"), ("Klienti", "link:Klienti"),
+    ],
+    # import_deals_to_airtable.py
+    "Projekty / Poptávky": [
+        ("Název", "singleLineText"), ("Co poptávali", "singleLineText"), ("Komu nabídnuto", "singleLineText"),
+        ("Reakce / výsledek", "singleLineText"), ("Cena", "singleLineText"), ("Poznámky", "multilineText"),
+        ("Zdroj", "singleLineText"),
+        ("Objednatel", "link:Klienti:Poptávky"), ("Kontakt", "link:Kontakty:Poptávky"),
+    ],
+}
+
+
+class ApiError(Exception):
+    def __init__(self, status: int, error_type: str, message: str = ""):
+        super().__init__(message or error_type)
+        self.status = status
+        self.error_type = error_type
+        self.message = message or error_type
+
+    def body(self) -> dict:
+        if self.status == 429:
+            return {"errors": [{"error": "RATE_LIMIT_REACHED", "message": self.message}]}
+        return {"error": {"type": self.error_type, "message": self.message}}
+
+
+def _new_id(prefix: str) -> str:
+    alphabet = "ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789"
+    return prefix + "".join(secrets.choice(alphabet) for _ in range(14))
+
+
+def _now_iso() -> str:
+    return datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.000Z")
+
+
+# --- Schéma a data ---
+
+class Table:
+    def __init__(self, name: str, table_id: str = ""):
+        self.id = table_id or _new_id("tbl")
+        self.name = name
+        self.fields: Dict[str, dict] = {}         # id pole → definice
+        self.by_name: Dict[str, str] = {}         # název pole → id pole
+        self.primary_field_id = ""
+        self.records: Dict[str, dict] = {}        # id záznamu → {"id", "createdTime", "fields"}
+
+    def add_field(self, name: str, ftype: str, options: Optional[dict] = None, field_id: str = "") -> dict:
+        fid = field_id or _new_id("fld")
+        field = {"id": fid, "name": name, "type": ftype}
+        if options:
+            field["options"] = options
+        elif ftype in ("singleSelect", "multipleSelects"):
+            field["options"] = {"choices": []}
+        self.fields[fid] = field
+        self.by_name[name] = fid
+        if not self.primary_field_id:
+            self.primary_field_id = fid
+        return field
+
+    def field(self, name_or_id: str) -> Optional[dict]:
+        fid = self.by_name.get(name_or_id, name_or_id)
+        return self.fields.get(fid)
+
+    def schema(self) -> dict:
+        return {"id": self.id, "name": self.name, "primaryFieldId": self.primary_field_id,
+                "fields": list(self.fields.values()), "views": [{"id": "viwGrid", "name": "Grid view", "type": "grid"}]}
+
+
+class Base:
+    """Stav jedné base. Všechny operace drží `lock` (server je vícevláknový)."""
+
+    def __init__(self, base_id: str = DEFAULT_BASE_ID):
+        self.id = base_id
+        self.tables: Dict[str, Table] = {}
+        self.lock = threading.RLock()
+
+    # --- schéma ---
+
+    def table(self, name_or_id: str) -> Table:
+        name_or_id = unquote(name_or_id)
+        t = self.tables.get(name_or_id)
+        if t is None:
+            t = next((t for t in self.tables.values() if t.name == name_or_id), None)
+        if t is None:
+            raise ApiError(404, "TABLE_NOT_FOUND", f"Could not find table {name_or_id} in application {self.id}")
+        return t
+
+    def add_table(self, name: str, table_id: str = "") -> Table:
+        t = Table(name, table_id)
+        self.tables[t.id] = t
+        return t
+
+    def add_link_field(self, table: Table, name: str, target: Table, inverse_name: str = "") -> dict:
+        """Založí vazbu a (pokud chybí) i zpětné pole v cílové tabulce."""
+        field = table.add_field(name, "multipleRecordLinks", {"linkedTableId": target.id, "inverseLinkFieldId": ""})
+        inverse = target.field(inverse_name or table.name)
+        if inverse is None or inverse["type"] != "multipleRecordLinks":
+            inverse = target.add_field(inverse_name or table.name, "multipleRecordLinks",
+                                       {"linkedTableId": table.id, "inverseLinkFieldId": field["id"]})
+        inverse["options"]["inverseLinkFieldId"] = field["id"]
+        field["options"]["inverseLinkFieldId"] = inverse["id"]
+        return field
+
+    @classmethod
+    def from_schema(cls, schema: Dict[str, list], base_id: str = DEFAULT_BASE_ID) -> "Base":
+        base = cls(base_id)
+        for name in schema:
+            base.add_table(name)
+        for name, fields in schema.items():
+            t = base.table(name)
+            for fname, ftype in fields:
+                if t.field(fname):
+                    continue
+                if ftype.startswith("link:"):
+                    target, _, inverse = ftype[5:].partition(":")
+                    base.add_link_field(t, fname, base.table(target), inverse_name=inverse or name)
+                else:
+                    t.add_field(fname, ftype)
+        return base
+
+    # --- převod hodnot ---
+
+    def _coerce(self, table: Table, field: dict, value: Any, typecast: bool) -> Any:
+        ftype = field["type"]
+        if value is None or value == "" or value == []:
+            return None
+        if ftype == "multipleRecordLinks":
+            target = self.tables[field["options"]["linkedTableId"]]
+            ids = value if isinstance(value, list) else [value]
+            out = []
+            for v in ids:
+                rid = v.get("id") if isinstance(v, dict) else v
+                if rid not in target.records:
+                    raise ApiError(422, "ROW_DOES_NOT_EXIST", f"Record ID {rid} does not exist in {target.name}")
+                out.append(rid)
+            return list(dict.fromkeys(out))
+        if ftype in ("singleSelect", "multipleSelects"):
+            values = value if isinstance(value, list) else ([value] if ftype == "singleSelect" or not typecast
+                                                            else [v.strip() for v in str(value).split(",")])
+            choices = field["options"].setdefault("choices", [])
+            names = {c["name"] for c in choices}
+            for v in values:
+                if not isinstance(v, str):
+                    raise ApiError(422, "INVALID_VALUE_FOR_COLUMN", f"Field \"{field['name']}\" cannot accept {v!r}")
+                if v not in names:
+                    if not typecast:
+                        raise ApiError(422, "INVALID_MULTIPLE_CHOICE_OPTIONS",
+                                       f"Insufficient permissions to create new select option \"{v}\"")
+                    choices.append({"id": _new_id("sel"), "name": v})
+                    names.add(v)
+            return values[0] if ftype == "singleSelect" else list(dict.fromkeys(values))
+        if ftype == "number":
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                return value
+            if typecast:
+                try:
+                    return float(str(value).replace(" ", "").replace(",", "."))
+                except ValueError:
+                    return None
+            raise ApiError(422, "INVALID_VALUE_FOR_COLUMN", f"Field \"{field['name']}\" cannot accept {value!r}")
+        if ftype == "checkbox":
+            return bool(value) or None
+        if isinstance(value, (list, dict)):
+            if not typecast:
+                raise ApiError(422, "INVALID_VALUE_FOR_COLUMN", f"Field \"{field['name']}\" cannot accept {value!r}")
+            return ", ".join(str(v) for v in value) if isinstance(value, list) else json.dumps(value)
+        return str(value) if typecast or isinstance(value, str) else value
+
+    def _resolve_field(self, table: Table, name: str, value: Any, strict: bool) -> dict:
+        field = table.field(name)
+        if field is not None:
+            return field
+        if strict:
+            raise ApiError(422, "UNKNOWN_FIELD_NAME", f"Unknown field name: \"{name}\"")
+        ftype = "multipleSelects" if isinstance(value, list) else (
+            "number" if isinstance(value, (int, float)) and not isinstance(value, bool) else "singleLineText")
+        return table.add_field(name, ftype)
+
+    # --- zápis ---
+
+    def _set_links(self, table: Table, field: dict, rec_id: str, old: List[str], new: List[str]) -> None:
+        """Udržuje zpětné pole vazby v cílové tabulce."""
+        target = self.tables[field["options"]["linkedTableId"]]
+        inverse_id = field["options"].get("inverseLinkFieldId")
+        if not inverse_id or inverse_id not in target.fields:
+            return
+        inv_name = target.fields[inverse_id]["name"]
+        for rid in set(old) - set(new):
+            f = target.records[rid]["fields"] if rid in target.records else None
+            if f and rec_id in f.get(inv_name, []):
+                f[inv_name] = [x for x in f[inv_name] if x != rec_id]
+                if not f[inv_name]:
+                    del f[inv_name]
+        for rid in new:
+            if rid in old:
+                continue
+            f = target.records[rid]["fields"]
+            links = f.setdefault(inv_name, [])
+            if rec_id not in links:
+                links.append(rec_id)
+
+    def write_fields(self, table: Table, rec: dict, fields: Dict[str, Any], typecast: bool, strict: bool,
+                     replace: bool = False) -> None:
+        current = rec["fields"]
+        coerced: Dict[str, Any] = {}
+        for name, value in (fields or {}).items():
+            field = self._resolve_field(table, name, value, strict)
+            coerced[field["name"]] = (field, self._coerce(table, field, value, typecast))
+        if replace:
+            for name in list(current):
+                if name not in coerced:
+                    field = table.field(name)
+                    coerced[name] = (field, None)
+        for name, (field, value) in coerced.items():
+            if field is not None and field["type"] == "multipleRecordLinks":
+                self._set_links(table, field, rec["id"], current.get(name, []), value or [])
+            if value is None:
+                current.pop(name, None)
+            else:
+                current[name] = value
+
+    def create(self, table: Table, fields: dict, typecast: bool, strict: bool) -> dict:
+        rec = {"id": _new_id("rec"), "createdTime": _now_iso(), "fields": {}}
+        table.records[rec["id"]] = rec
+        try:
+            self.write_fields(table, rec, fields, typecast, strict)
+        except ApiError:
+            del table.records[rec["id"]]
+            raise
+        return rec
+
+    def delete(self, table: Table, rec_id: str) -> None:
+        rec = table.records.pop(rec_id, None)
+        if rec is None:
+            raise ApiError(404, "NOT_FOUND", f"Record {rec_id} not found")
+        for name, value in rec["fields"].items():
+            field = table.field(name)
+            if field and field["type"] == "multipleRecordLinks":
+                self._set_links(table, field, rec_id, value, [])
+
+    # --- čtení ---
+
+    def render(self, table: Table, rec: dict, only: Optional[List[str]] = None) -> dict:
+        fields = rec["fields"]
+        if only is not None:
+            fields = {k: v for k, v in fields.items() if k in only}
+        return {"id": rec["id"], "createdTime": rec["createdTime"], "fields": dict(fields)}
+
+    def cell_text(self, table: Table, name: str, rec: dict) -> Any:
+        """Hodnota pole, jak ji vidí vzorec (vazby → primární hodnoty, seznamy → "a, b")."""
+        field = table.field(name)
+        value = rec["fields"].get(field["name"] if field else name)
+        if field and field["type"] == "multipleRecordLinks" and value:
+            target = self.tables[field["options"]["linkedTableId"]]
+            prim = target.fields[target.primary_field_id]["name"] if target.primary_field_id else ""
+            value = [str(target.records[r]["fields"].get(prim, "")) for r in value if r in target.records]
+        if isinstance(value, list):
+            return ", ".join(str(v) for v in value)
+        return value
+
+    # --- perzistence ---
+
+    def to_dict(self) -> dict:
+        return {"id": self.id, "tables": [{**t.schema(), "records": list(t.records.values())}
+                                          for t in self.tables.values()]}
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "Base":
+        base = cls(data.get("id", DEFAULT_BASE_ID))
+        for td in data["tables"]:
+            t = base.add_table(td["name"], td["id"])
+            for f in td["fields"]:
+                t.add_field(f["name"], f["type"], f.get("options"), f["id"])
+            t.primary_field_id = td.get("primaryFieldId") or t.primary_field_id
+            t.records = {r["id"]: r for r in td.get("records", [])}
+        return base
+
+
+def load_mirror(base: Base, mirror_dir: Path = MIRROR_DIR) -> Dict[str, int]:
+    """Naplní tabulky ze zrcadla airtable_mirror/<Tabulka>.json (id záznamů zůstanou)."""
+    counts = {}
+    files = sorted(Path(mirror_dir).glob("*.json"))
+    for path in files:
+        if path.stem not in {t.name for t in base.tables.values()}:
+            base.add_table(path.stem)
+    all_ids: Dict[str, str] = {}
+    loaded: Dict[str, list] = {}
+    for path in files:
+        with open(path, "r", encoding="utf-8") as f:
+            records = json.load(f).get("records", [])
+        loaded[path.stem] = records
+        for r in records:
+            all_ids[r["id"]] = path.stem
+    for name, records in loaded.items():
+        t = base.table(name)
+        for r in records:
+            for fname, value in r.get("fields", {}).items():
+                if t.field(fname):
+                    continue
+                if isinstance(value, list) and value and all(isinstance(v, str) and v in all_ids for v in value):
+                    base.add_link_field(t, fname, base.table(all_ids[value[0]]), inverse_name=name)
+                else:
+                    base._resolve_field(t, fname, value, strict=False)
+            t.records[r["id"]] = {"id": r["id"], "createdTime": r.get("createdTime") or _now_iso(),
+                                  "fields": dict(r.get("fields", {}))}
+        counts[name] = len(records)
+    return counts
+
+
+def load_synthetic(base: Base, n: int, seed: int = 42) -> Dict[str, int]:
+    """Vygeneruje n kontaktů (+ klienty a dealy) generátorem z benchmark.py, včetně vazeb."""
+    from benchmark import CzechFaker, PROGRAMS_TYPES, VYSLEDKY
+
+    fk = CzechFaker(seed)
+    kontakty, klienti, deals = base.table("Kontakty"), base.table("Klienti"), base.table("Deals")
+    firms: Dict[str, str] = {}
+    for _ in range(n):
+        p = fk.person()
+        firma = p["firma"].strip()
+        if firma not in firms:
+            firms[firma] = base.create(klienti, {"Firma": firma}, typecast=True, strict=True)["id"]
+        fields = {"Jméno": p["jmeno"], "Příjmení": p["prijmeni"], "E-mail": p["email"].strip().lower(),
+                  "Telefon": p["phone"], "Společnost / Firma": firma, "Pracovní pozice": p["pozice"],
+                  "Stav": "Aktivní"}
+        if fk.rnd.random() < 0.1:
+            fields["Oddělení"] = ["HR"]     # pro propoj_hr_kontakty (link-hr)
+        if fk.rnd.random() < 0.7:
+            fields["Klienti"] = [firms[firma]]
+        kid = base.create(kontakty, fields, typecast=True, strict=True)["id"]
+        if fk.rnd.random() < 0.3:
+            typ = fk.rnd.choice(PROGRAMS_TYPES).strip()
+            base.create(deals, {"Název dealu": f"{typ} – {firma}", "Firma": firma,
+                                "Jméno a příjmení": f"{p['jmeno']} {p['prijmeni']}", "Email": fields["E-mail"],
+                                "Co poptávali": [typ], "Reakce/výsledek": fk.rnd.choice(VYSLEDKY),
+                                "Poznámka / Detaily": fk.note(), "Kontakty": [kid], "Kontakt": [kid],
+                                "Klienti": [firms[firma]]}, typecast=True, strict=True)
+    return {t.name: len(t.records) for t in base.tables.values()}
+
+
+# --- filterByFormula (podmnožina jazyka vzorců Airtable) ---
+
+_TOKEN_RE = re.compile(r"""\s*(?:
+    (?P<num>\d+(?:\.\d+)?) |
+    (?P<str>"(?:[^"\\]|\\.)*"|'(?:[^'\\]|\\.)*') |
+    (?P<field>\{[^}]*\}) |
+    (?P<name>[A-Za-z_][A-Za-z_0-9]*) |
+    (?P<op><=|>=|!=|=|<|>|&|\+|-|\*|/|\(|\)|,)
+)""", re.X)
+
+
+def _truthy(v: Any) -> bool:
+    return v not in (None, "", 0, False, [])
+
+
+def _num(v: Any) -> float:
+    if isinstance(v, bool):
+        return float(v)
+    if isinstance(v, (int, float)):
+        return float(v)
+    try:
+        return float(str(v or 0).replace(",", "."))
+    except ValueError:
+        return 0.0
+
+
+def _text(v: Any) -> str:
+    if v is None:
+        return ""
+    if isinstance(v, bool):
+        return "1" if v else "0"
+    if isinstance(v, float) and v.is_integer():
+        return str(int(v))
+    return str(v)
+
+
+FUNCTIONS: Dict[str, Callable[..., Any]] = {
+    "AND": lambda *a: all(_truthy(x) for x in a),
+    "OR": lambda *a: any(_truthy(x) for x in a),
+    "NOT": lambda a: not _truthy(a),
+    "XOR": lambda *a: sum(_truthy(x) for x in a) % 2 == 1,
+    "IF": lambda c, a, b="": a if _truthy(c) else b,
+    "BLANK": lambda: "",
+    "TRUE": lambda: True,
+    "FALSE": lambda: False,
+    "LOWER": lambda s: _text(s).lower(),
+    "UPPER": lambda s: _text(s).upper(),
+    "TRIM": lambda s: _text(s).strip(),
+    "LEN": lambda s: len(_text(s)),
+    "FIND": lambda needle, hay, start=0: (_text(hay).find(_text(needle), max(0, int(_num(start)) - 1)) + 1),
+    "SEARCH": lambda needle, hay, start=0: (_text(hay).lower().find(_text(needle).lower(), max(0, int(_num(start)) - 1)) + 1) or "",
+    "LEFT": lambda s, n: _text(s)[: int(_num(n))],
+    "RIGHT": lambda s, n: _text(s)[-int(_num(n)):] if int(_num(n)) else "",
+    "MID": lambda s, start, n: _text(s)[int(_num(start)) - 1: int(_num(start)) - 1 + int(_num(n))],
+    "CONCATENATE": lambda *a: "".join(_text(x) for x in a),
+    "ARRAYJOIN": lambda a, sep=", ": _text(a) if sep == ", " else _text(a).replace(", ", _text(sep)),
+    "VALUE": lambda s: _num(s),
+    "ISERROR": lambda a: False,
+    "SUBSTITUTE": lambda s, old, new: _text(s).replace(_text(old), _text(new)),
+}
+
+
+class FormulaParser:
+    """Rekurzivní sestup → funkce (záznam → hodnota)."""
+
+    def __init__(self, text: str):
+        self.tokens: List[Tuple[str, str]] = []
+        pos = 0
+        text = text.strip()
+        while pos < len(text):
+            m = _TOKEN_RE.match(text, pos)
+            if not m or m.end() == pos:
+                raise ApiError(422, "INVALID_FILTER_BY_FORMULA", f"The formula for filtering records is invalid: {text}")
+            kind = m.lastgroup
+            self.tokens.append((kind, m.group(kind)))
+            pos = m.end()
+        self.i = 0
+
+    def peek(self) -> Tuple[str, str]:
+        return self.tokens[self.i] if self.i < len(self.tokens) else ("eof", "")
+
+    def take(self, value: Optional[str] = None) -> Tuple[str, str]:
+        tok = self.peek()
+        if value is not None and tok[1] != value:
+            raise ApiError(422, "INVALID_FILTER_BY_FORMULA", f"Expected {value!r}, got {tok[1]!r}")
+        self.i += 1
+        return tok
+
+    def parse(self) -> Callable[[Callable[[str], Any]], Any]:
+        fn = self.comparison()
+        if self.peek()[0] != "eof":
+            raise ApiError(422, "INVALID_FILTER_BY_FORMULA", f"Unexpected {self.peek()[1]!r}")
+        return fn
+
+    def comparison(self):
+        left = self.concat()
+        while self.peek()[1] in ("=", "!=", "<", ">", "<=", ">="):
+            op = self.take()[1]
+            right = self.concat()
+            left = self._compare(op, left, right)
+        return left
+
+    @staticmethod
+    def _compare(op, left, right):
+        def fn(get):
+            a, b = left(get), right(get)
+            if isinstance(a, (int, float)) and not isinstance(a, bool) or isinstance(b, (int, float)) and not isinstance(b, bool):
+                if a in (None, "") and b in (None, ""):
+                    x, y = 0.0, 0.0
+                elif a in (None, "") or b in (None, ""):
+                    x, y = _text(a), _text(b)
+                else:
+                    x, y = _num(a), _num(b)
+            else:
+                x, y = _text(a), _text(b)
+            return {"=": x == y, "!=": x != y, "<": x < y, ">": x > y, "<=": x <= y, ">=": x >= y}[op]
+        return fn
+
+    def concat(self):
+        left = self.additive()
+        while self.peek()[1] == "&":
+            self.take()
+            right = self.additive()
+            left = (lambda l, r: lambda get: _text(l(get)) + _text(r(get)))(left, right)
+        return left
+
+    def additive(self):
+        left = self.term()
+        while self.peek()[1] in ("+", "-"):
+            op = self.take()[1]
+            right = self.term()
+            left = (lambda l, r, op: lambda get: _num(l(get)) + _num(r(get)) if op == "+" else _num(l(get)) - _num(r(get)))(left, right, op)
+        return left
+
+    def term(self):
+        left = self.unary()
+        while self.peek()[1] in ("*", "/"):
+            op = self.take()[1]
+            right = self.unary()
+            left = (lambda l, r, op: lambda get: _num(l(get)) * _num(r(get)) if op == "*"
+                    else (_num(l(get)) / _num(r(get)) if _num(r(get)) else ""))(left, right, op)
+        return left
+
+    def unary(self):
+        if self.peek()[1] == "-":
+            self.take()
+            inner = self.unary()
+            return lambda get: -_num(inner(get))
+        return self.primary()
+
+    def primary(self):
+        kind, value = self.take()
+        if kind == "num":
+            n = float(value)
+            return lambda get: n
+        if kind == "str":
+            s = bytes(value[1:-1], "utf-8").decode("unicode_escape").encode("latin-1").decode("utf-8") if "\\" in value else value[1:-1]
+            return lambda get: s
+        if kind == "field":
+            name = value[1:-1]
+            return lambda get: get(name)
+        if kind == "op" and value == "(":
+            inner = self.comparison()
+            self.take(")")
+            return inner
+        if kind == "name":
+            fname = value.upper()
+            if fname == "RECORD_ID":
+                self.take("(")
+                self.take(")")
+                return lambda get: get("__id__")
+            if fname not in FUNCTIONS:
+                raise ApiError(422, "INVALID_FILTER_BY_FORMULA", f"Unknown function {value}")
+            self.take("(")
+            args = []
+            if self.peek()[1] != ")":
+                args.append(self.comparison())
+                while self.peek()[1] == ",":
+                    self.take()
+                    args.append(self.comparison())
+            self.take(")")
+            func = FUNCTIONS[fname]
+            if fname == "IF":
+                # líné vyhodnocení větví
+                return lambda get: (args[1](get) if _truthy(args[0](get)) else (args[2](get) if len(args) > 2 else ""))
+            return lambda get: func(*(a(get) for a in args))
+        raise ApiError(422, "INVALID_FILTER_BY_FORMULA", f"Unexpected {value!r}")
+
+
+def compile_formula(text: str) -> Callable[[Callable[[str], Any]], Any]:
+    return FormulaParser(text).parse()
+
+
+# --- Limity a chyby ---
+
+class Limits:
+    """Token bucket na base + umělá latence a náhodné chyby."""
+
+    def __init__(self, rate: float = 5.0, burst: float = 0.0, penalty: float = 0.0, latency_ms: float = 0.0,
+                 jitter_ms: float = 0.0, error_rate: float = 0.0, rate_limit_rate: float = 0.0,
+                 retry_after: float = 1.0, strict: bool = False, seed: Optional[int] = None):
+        self.rate = rate
+        self.burst = burst or max(1.0, rate)
+        self.penalty = penalty
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.retry_after = retry_after
+        self.strict = strict
+        self.rnd = random.Random(seed)
+        self._buckets: Dict[str, Tuple[float, float]] = {}   # base → (tokeny, čas)
+        self._blocked_until: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def config(self) -> dict:
+        return {k: getattr(self, k) for k in ("rate", "burst", "penalty", "latency_ms", "jitter_ms", "error_rate",
+                                               "rate_limit_rate", "retry_after", "strict")}
+
+    def update(self, values: dict) -> None:
+        for k, v in values.items():
+            if k in self.config():
+                setattr(self, k, type(getattr(self, k))(v))
+
+    def admit(self, base_id: str) -> None:
+        """Vyhodí ApiError 429/5xx, pokud požadavek neprojde."""
+        now = time.monotonic()
+        with self._lock:
+            if self._blocked_until.get(base_id, 0) > now:
+                raise ApiError(429, "RATE_LIMIT_REACHED", "Rate limit exceeded. Please try again later")
+            if self.rate > 0:
+                tokens, last = self._buckets.get(base_id, (self.burst, now))
+                tokens = min(self.burst, tokens + (now - last) * self.rate)
+                if tokens < 1:
+                    self._buckets[base_id] = (tokens, now)
+                    if self.penalty:
+                        self._blocked_until[base_id] = now + self.penalty
+                    raise ApiError(429, "RATE_LIMIT_REACHED", "Rate limit exceeded. Please try again later")
+                self._buckets[base_id] = (tokens - 1, now)
+            roll = self.rnd.random()
+        if roll < self.rate_limit_rate:
+            raise ApiError(429, "RATE_LIMIT_REACHED", "Rate limit exceeded (injected)")
+        if roll < self.rate_limit_rate + self.error_rate:
+            raise ApiError(self.rnd.choice([500, 502, 503]), "SERVER_ERROR", "Injected server error")
+
+    def delay(self) -> None:
+        ms = self.latency_ms + (self.rnd.uniform(0, self.jitter_ms) if self.jitter_ms else 0)
+        if ms > 0:
+            time.sleep(ms / 1000)
+
+
+class Stats:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        self.started = time.time()
+        self.requests: Dict[str, int] = {}
+        self.statuses: Dict[str, int] = {}
+        self.records_read = 0
+        self.records_written = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+
+    def add(self, key: str, status: int, bytes_in: int, bytes_out: int, read: int = 0, written: int = 0) -> None:
+        with self.lock:
+            self.requests[key] = self.requests.get(key, 0) + 1
+            self.statuses[str(status)] = self.statuses.get(str(status), 0) + 1
+            self.bytes_in += bytes_in
+            self.bytes_out += bytes_out
+            self.records_read += read
+            self.records_written += written
+
+    def to_dict(self) -> dict:
+        with self.lock:
+            elapsed = max(1e-9, time.time() - self.started)
+            total = sum(self.requests.values())
+            return {"elapsed_seconds": round(elapsed, 3), "requests_total": total,
+                    "requests_per_second": round(total / elapsed, 2), "requests": dict(self.requests),
+                    "statuses": dict(self.statuses), "records_read": self.records_read,
+                    "records_written": self.records_written, "bytes_in": self.bytes_in, "bytes_out": self.bytes_out}
+
+
+# --- HTTP ---
+
+class FakeAirtable:
+    """Obsluha API nad jednou nebo více bases."""
+
+    def __init__(self, bases: Dict[str, Base], limits: Limits):
+        self.bases = bases
+        self.limits = limits
+        self.stats = Stats()
+
+    def base(self, base_id: str) -> Base:
+        base = self.bases.get(base_id)
+        if base is None:
+            raise ApiError(404, "NOT_FOUND", f"Could not find base {base_id}")
+        return base
+
+    def handle(self, method: str, path: str, query: Dict[str, List[str]], body: Optional[dict]) -> Tuple[int, dict, dict]:
+        """Vrací (status, payload, meta pro statistiky)."""
+        parts = [unquote(p) for p in path.strip("/").split("/")]
+        if len(parts) < 2 or parts[0] != "v0":
+            raise ApiError(404, "NOT_FOUND", "Unknown endpoint")
+        parts = parts[1:]
+        if parts[0] == "meta":
+            return self._meta(method, parts, body)
+        base = self.base(parts[0])
+        self.limits.admit(base.id)
+        with base.lock:
+            table = base.table(parts[1]) if len(parts) > 1 else None
+            if table is None:
+                raise ApiError(404, "NOT_FOUND", "Missing table")
+            rec_id = parts[2] if len(parts) > 2 else ""
+            if method == "GET":
+                return self._get(base, table, rec_id, query)
+            if method in ("POST", "PATCH", "PUT"):
+                return self._write(base, table, method, rec_id, body or {})
+            if method == "DELETE":
+                ids = [rec_id] if rec_id else (query.get("records[]") or query.get("records") or [])
+                if len(ids) > MAX_BATCH:
+                    raise ApiError(422, "INVALID_RECORDS", f"Max {MAX_BATCH} records per request")
+                for rid in ids:
+                    base.delete(table, rid)
+                if rec_id:
+                    return 200, {"id": rec_id, "deleted": True}, {"written": 1}
+                return 200, {"records": [{"id": rid, "deleted": True} for rid in ids]}, {"written": len(ids)}
+        raise ApiError(404, "NOT_FOUND", f"Unsupported method {method}")
+
+    def _get(self, base: Base, table: Table, rec_id: str, query: Dict[str, List[str]]) -> Tuple[int, dict, dict]:
+        if rec_id:
+            rec = table.records.get(rec_id)
+            if rec is None:
+                raise ApiError(404, "NOT_FOUND", f"Record {rec_id} not found")
+            return 200, base.render(table, rec), {"read": 1}
+
+        page_size = min(MAX_PAGE_SIZE, max(1, int((query.get("pageSize") or [MAX_PAGE_SIZE])[0])))
+        max_records = int((query.get("maxRecords") or [0])[0] or 0)
+        only = query.get("fields[]") or query.get("fields") or None
+        formula = (query.get("filterByFormula") or [""])[0]
+
+        ids = list(table.records)
+        if formula:
+            fn = compile_formula(formula)
+            kept = []
+            for rid in ids:
+                rec = table.records[rid]
+                get = (lambda rec: lambda name: rec["id"] if name == "__id__" else base.cell_text(table, name, rec))(rec)
+                if _truthy(fn(get)):
+                    kept.append(rid)
+            ids = kept
+        sort_keys = sorted(
+            (int(k[5:k.index("]")]), k) for k in query if k.startswith("sort[") and k.endswith("[field]"))
+        for _, k in reversed(sort_keys):
+            fname = query[k][0]
+            direction = (query.get(k.replace("[field]", "[direction]")) or ["asc"])[0]
+            ids.sort(key=lambda rid: (_text(base.cell_text(table, fname, table.records[rid])).lower()),
+                     reverse=direction == "desc")
+        if max_records:
+            ids = ids[:max_records]
+
+        start = 0
+        offset = (query.get("offset") or [""])[0]
+        if offset:
+            m = re.match(r"itr(\d+)/", offset)
+            if not m:
+                raise ApiError(422, "LIST_RECORDS_ITERATOR_NOT_AVAILABLE", "Invalid offset")
+            start = int(m.group(1))
+        window = ids[start: start + page_size]
+        payload: Dict[str, Any] = {"records": [base.render(table, table.records[r], only) for r in window]}
+        if start + page_size < len(ids):
+            payload["offset"] = f"itr{start + page_size}/{window[-1]}"
+        return 200, payload, {"read": len(window)}
+
+    def _write(self, base: Base, table: Table, method: str, rec_id: str, body: dict) -> Tuple[int, dict, dict]:
+        typecast = bool(body.get("typecast"))
+        strict = self.limits.strict
+        replace = method == "PUT"
+
+        if rec_id:
+            rec = table.records.get(rec_id)
+            if rec is None:
+                raise ApiError(404, "NOT_FOUND", f"Record {rec_id} not found")
+            base.write_fields(table, rec, body.get("fields") or {}, typecast, strict, replace)
+            return 200, base.render(table, rec), {"written": 1}
+
+        records = body.get("records")
+        if not isinstance(records, list) or not records:
+            raise ApiError(422, "INVALID_RECORDS", "Missing records")
+        if len(records) > MAX_BATCH:
+            raise ApiError(422, "INVALID_RECORDS", f"Max {MAX_BATCH} records per request")
+
+        upsert = body.get("performUpsert")
+        if upsert:
+            merge_on = upsert.get("fieldsToMergeOn") or []
+            if not merge_on or len(merge_on) > 3:
+                raise ApiError(422, "INVALID_REQUEST_UNKNOWN", "performUpsert.fieldsToMergeOn must have 1-3 fields")
+            out, created, updated = [], [], []
+            for r in records:
+                fields = r.get("fields") or {}
+                key = tuple(_text(fields.get(f)) for f in merge_on)
+                matches = [x for x in table.records.values()
+                           if tuple(_text(base.cell_text(table, f, x)) for f in merge_on) == key]
+                if len(matches) > 1:
+                    raise ApiError(422, "INVALID_REQUEST_UNKNOWN", "Multiple records match fieldsToMergeOn")
+                if matches:
+                    base.write_fields(table, matches[0], fields, typecast, strict, replace)
+                    updated.append(matches[0]["id"])
+                    out.append(base.render(table, matches[0]))
+                else:
+                    rec = base.create(table, fields, typecast, strict)
+                    created.append(rec["id"])
+                    out.append(base.render(table, rec))
+            return 200, {"records": out, "createdRecords": created, "updatedRecords": updated}, {"written": len(out)}
+
+        if method == "POST":
+            out = [base.render(table, base.create(table, r.get("fields") or {}, typecast, strict)) for r in records]
+            return 200, {"records": out}, {"written": len(out)}
+
+        missing = [r.get("id") for r in records if r.get("id") not in table.records]
+        if missing:
+            raise ApiError(404 if len(records) == 1 else 422, "ROW_DOES_NOT_EXIST", f"Record ID {missing[0]} does not exist")
+        out = []
+        for r in records:
+            rec = table.records[r["id"]]
+            base.write_fields(table, rec, r.get("fields") or {}, typecast, strict, replace)
+            out.append(base.render(table, rec))
+        return 200, {"records": out}, {"written": len(out)}
+
+    def _meta(self, method: str, parts: List[str], body: Optional[dict]) -> Tuple[int, dict, dict]:
+        # meta / bases / {base} / tables [/ {table} / fields [/ {field}]]
+        if len(parts) < 4 or parts[1] != "bases" or parts[3] != "tables":
+            raise ApiError(404, "NOT_FOUND", "Unknown meta endpoint")
+        base = self.base(parts[2])
+        self.limits.admit(base.id)
+        with base.lock:
+            if len(parts) == 4 and method == "GET":
+                return 200, {"tables": [t.schema() for t in base.tables.values()]}, {}
+            if len(parts) >= 6 and parts[5] == "fields":
+                table = base.table(parts[4])
+                body = body or {}
+                if len(parts) == 6 and method == "POST":
+                    name = body.get("name") or ""
+                    if not name or table.field(name):
+                        raise ApiError(422, "DUPLICATE_OR_EMPTY_FIELD_NAME", f"Field name {name!r} invalid or taken")
+                    ftype = body.get("type") or "singleLineText"
+                    if ftype == "multipleRecordLinks":
+                        target = base.table((body.get("options") or {}).get("linkedTableId", ""))
+                        field = base.add_link_field(table, name, target)
+                    else:
+                        field = table.add_field(name, ftype, body.get("options"))
+                    if body.get("description"):
+                        field["description"] = body["description"]
+                    return 200, field, {}
+                if len(parts) == 7:
+                    field = table.field(parts[6])
+                    if field is None:
+                        raise ApiError(404, "NOT_FOUND", f"Field {parts[6]} not found")
+                    if method == "PATCH":
+                        new_name = body.get("name")
+                        if new_name and new_name != field["name"]:
+                            if table.field(new_name):
+                                raise ApiError(422, "DUPLICATE_FIELD_NAME", f"Field {new_name!r} already exists")
+                            for rec in table.records.values():
+                                if field["name"] in rec["fields"]:
+                                    rec["fields"][new_name] = rec["fields"].pop(field["name"])
+                            del table.by_name[field["name"]]
+                            table.by_name[new_name] = field["id"]
+                            field["name"] = new_name
+                        if "description" in body:
+                            field["description"] = body["description"]
+                        return 200, field, {}
+                    if method == "DELETE":
+                        # skutečné API mazání polí nepodporuje; tady ho dovolíme kvůli testům migrací
+                        for rec in table.records.values():
+                            rec["fields"].pop(field["name"], None)
+                        del table.fields[field["id"]]
+                        del table.by_name[field["name"]]
+                        if table.primary_field_id == field["id"]:
+                            table.primary_field_id = next(iter(table.fields), "")
+                        return 200, {"id": field["id"], "deleted": True}, {}
+        raise ApiError(404, "NOT_FOUND", "Unknown meta endpoint")
+
+
+def make_handler(app: FakeAirtable):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, fmt, *args):
+            pass
+
+        def _send(self, status: int, payload: dict, headers: Optional[dict] = None) -> int:
+            data = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+            self.send_header("Content-Length", str(len(data)))
+            for k, v in (headers or {}).items():
+                self.send_header(k, v)
+            self.end_headers()
+            self.wfile.write(data)
+            return len(data)
+
+        def _dispatch(self, method: str) -> None:
+            parsed = urlparse(self.path)
+            query = parse_qs(parsed.query, keep_blank_values=True)
+            length = int(self.headers.get("Content-Length") or 0)
+            raw = self.rfile.read(length) if length else b""
+
+            if parsed.path == "/_stats":
+                self._send(200, {**app.stats.to_dict(), "config": app.limits.config()})
+                return
+            if parsed.path == "/_reset" and method == "POST":
+                app.stats.reset()
+                self._send(200, {"ok": True})
+                return
+            if parsed.path == "/_config":
+                if method == "PATCH":
+                    app.limits.update(json.loads(raw or b"{}"))
+                self._send(200, app.limits.config())
+                return
+
+            key = f"{method} {parsed.path}"
+            status, meta, extra = 500, {}, {}
+            try:
+                if not (self.headers.get("Authorization") or "").startswith("Bearer "):
+                    raise ApiError(401, "AUTHENTICATION_REQUIRED", "Authentication required")
+                body = json.loads(raw) if raw else None
+                parts = parsed.path.strip("/").split("/")
+                key = f"{method} {'/'.join(parts[:3] if parts[1:2] != ['meta'] else parts[:4])}"
+                app.limits.delay()
+                status, payload, meta = app.handle(method, parsed.path, query, body)
+            except ApiError as e:
+                status, payload = e.status, e.body()
+                if e.status == 429:
+                    extra = {"Retry-After": str(int(app.limits.retry_after) or 1)}
+            except (ValueError, KeyError) as e:
+                status, payload = 422, {"error": {"type": "INVALID_REQUEST_UNKNOWN", "message": str(e)}}
+            sent = self._send(status, payload, extra)
+            app.stats.add(unquote(key), status, len(raw), sent, meta.get("read", 0), meta.get("written", 0))
+
+        def do_GET(self):
+            self._dispatch("GET")
+
+        def do_POST(self):
+            self._dispatch("POST")
+
+        def do_PATCH(self):
+            self._dispatch("PATCH")
+
+        def do_PUT(self):
+            self._dispatch("PUT")
+
+        def do_DELETE(self):
+            self._dispatch("DELETE")
+
+    return Handler
+
+
+def build_base(args) -> Base:
+    if args.state and Path(args.state).exists():
+        with open(args.state, "r", encoding="utf-8") as f:
+            return Base.from_dict(json.load(f))
+    base = Base.from_schema(DEFAULT_SCHEMA, args.base_id)
+    if args.mirror:
+        counts = load_mirror(base, Path(args.mirror_dir))
+        print(f"📥 Zrcadlo: {', '.join(f'{k} {v}' for k, v in counts.items()) or 'prázdné'}")
+    if args.synthetic:
+        counts = load_synthetic(base, args.synthetic, args.seed)
+        print(f"🧪 Syntetická data: {', '.join(f'{k} {v}' for k, v in counts.items())}")
+    return base
+
+
+def serve(base: Base, limits: Limits, host: str = "127.0.0.1", port: int = DEFAULT_PORT) -> Tuple[ThreadingHTTPServer, FakeAirtable]:
+    """Spustí server ve vlákně (pro použití z testů/benchmarků). Vrací (server, app)."""
+    app = FakeAirtable({base.id: base}, limits)
+    httpd = ThreadingHTTPServer((host, port), make_handler(app))
+    httpd.daemon_threads = True
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    return httpd, app
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Lokální náhrada Airtable API (limity, latence, chyby).")
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=DEFAULT_PORT)
+    ap.add_argument("--base-id", default=DEFAULT_BASE_ID)
+    ap.add_argument("--rate", type=float, default=5.0, help="Požadavků/s na base (0 = bez limitu)")
+    ap.add_argument("--burst", type=float, default=0.0, help="Velikost bucketu (default = rate)")
+    ap.add_argument("--penalty", type=float, default=0.0, help="Po překročení limitu odmítat N s (Airtable: 30)")
+    ap.add_argument("--retry-after", type=float, default=1.0, help="Hodnota hlavičky Retry-After u 429")
+    ap.add_argument("--latency-ms", type=float, default=0.0)
+    ap.add_argument("--jitter-ms", type=float, default=0.0)
+    ap.add_argument("--error-rate", type=float, default=0.0, help="Podíl náhodných 5xx")
+    ap.add_argument("--rate-limit-rate", type=float, default=0.0, help="Podíl náhodných 429")
+    ap.add_argument("--strict", action="store_true", help="Neznámá pole → 422 (jinak se založí)")
+    ap.add_argument("--mirror", action="store_true", help="Načíst data z airtable_mirror/")
+    ap.add_argument("--mirror-dir", default=str(MIRROR_DIR))
+    ap.add_argument("--synthetic", type=int, default=0, help="Vygenerovat N kontaktů (+ klienty, dealy)")
+    ap.add_argument("--seed", type=int, default=42)
+    ap.add_argument("--state", default="", help="JSON se stavem base (načte se a při ukončení uloží)")
+    args = ap.parse_args()
+
+    base = build_base(args)
+    limits = Limits(rate=args.rate, burst=args.burst, penalty=args.penalty, latency_ms=args.latency_ms,
+                    jitter_ms=args.jitter_ms, error_rate=args.error_rate, rate_limit_rate=args.rate_limit_rate,
+                    retry_after=args.retry_after, strict=args.strict, seed=args.seed)
+    httpd, app = serve(base, limits, args.host, args.port)
+    print(f"🧰 Fake Airtable běží na http://{args.host}:{args.port}/v0 (base {base.id})")
+    print(f"   export AIRTABLE_API_BASE=http://{args.host}:{args.port}/v0")
+    print(f"   limity: {limits.config()}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        httpd.shutdown()
+        if args.state:
+            with base.lock:
+                data = base.to_dict()
+            tmp = Path(args.state).with_name(Path(args.state).name + ".tmp")
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(data, f, ensure_ascii=False)
+            tmp.replace(args.state)
+            print(f"💾 Stav uložen: {args.state}")
+        print(f"📊 {json.dumps(app.stats.to_dict(), ensure_ascii=False)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,350 @@
+#!/usr/bin/env python3
+"""
+Online migrace polí Airtable – změna typu, převod hodnot, rozdělení a sloučení polí po dávkách.
+
+Migrace se deklaruje (Migration): zdrojová pole, cílová pole (název, typ,
+volby) a transformace `fields → {cílové pole: hodnota}`. Běh má fáze:
+
+1. create   – založí chybějící cílová pole (metadata API, schéma z airtable_schema),
+2. backfill – projde tabulku (jen potřebná pole) a pošle vypočtené hodnoty přes
+              write_records: dávky po 10, pool pracovníků až do limitu Airtable
+              (rate_control), hotové dávky se po pádu neposílají znovu (job_queue);
+              záznamy, které už správnou hodnotu mají, se přeskočí,
+3. verify   – tabulku přečte znovu a porovná cílová pole s transformací; při
+              rozdílech skončí (další běh je dopíše) a k přepnutí nedojde,
+4. cutover  – smaže nahrazená pole (`drop`) a přejmenuje cílová (`rename`).
+
+Stav fází se ukládá do .migrations/<migrace>.json, takže přerušená migrace
+pokračuje tam, kde skončila; hotová migrace se znovu nespouští.
+
+Ve skriptech:
+  from field_migration import FieldSpec, Migration, map_value, run_cli
+  run_cli(Migration("reakce_select", BASE_ID, TABLE_ID,
+                    targets=[FieldSpec("Výsledek", "singleSelect", {"choices": CHOICES})],
+                    transform=map_value("Reakce/výsledek", "Výsledek", VALUE_MAP),
+                    drop=["Reakce/výsledek"], rename={"Výsledek": "Reakce/výsledek"}))
+
+  map_value(zdroj, cíl, mapa)                  # převod hodnot / změna typu (typecast)
+  split_value(zdroj, [cíl1, cíl2], sep=" ")    # rozdělení pole
+  merge_values([zdroj1, zdroj2], cíl, sep=" ") # sloučení polí
+
+Použití:
+  python3 konvertuj_reakce_select.py                 # celá migrace (nebo pokračování)
+  python3 konvertuj_reakce_select.py --no-cutover    # backfill + kontrola, pole zatím nepřepne
+  python3 konvertuj_reakce_select.py --dry-run       # jen spočítá, co by se změnilo
+  python3 field_migration.py                         # stav migrací
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import time
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, NamedTuple, Optional
+
+BASE_DIR = Path(__file__).parent
+STATE_DIR = Path(os.getenv("KONTAKTY_MIGRATIONS_DIR") or BASE_DIR / ".migrations")
+
+PHASES = ("create", "backfill", "verify", "cutover", "done")
+SHOW_MISMATCHES = 10
+
+
+class FieldSpec(NamedTuple):
+    name: str
+    type: str
+    options: Optional[dict] = None
+
+
+Transform = Callable[[dict], Dict[str, object]]
+
+
+class Migration:
+    """Deklarace migrace polí jedné tabulky."""
+
+    def __init__(self, name: str, base_id: str, table: str, *, targets: List[FieldSpec],
+                 transform: Transform, sources: Optional[List[str]] = None,
+                 drop: Optional[List[str]] = None, rename: Optional[Dict[str, str]] = None,
+                 typecast: bool = True):
+        self.name = name
+        self.base_id = base_id
+        self.table = table
+        self.targets = targets
+        self.transform = transform
+        self.sources = sources if sources is not None else list(getattr(transform, "sources", []))
+        self.drop = drop or []
+        self.rename = rename or {}
+        self.typecast = typecast
+
+    @property
+    def target_names(self) -> List[str]:
+        return [t.name for t in self.targets]
+
+
+# --- typické transformace ---
+
+def _empty(value) -> bool:
+    return value is None or value == "" or value == []
+
+
+def map_value(source: str, target: str, mapping: Optional[Dict[str, str]] = None, *,
+              keep_unmapped: bool = True) -> Transform:
+    """Převod hodnoty podle mapy (po strip); nenamapovaná hodnota zůstane (nebo se vynechá)."""
+
+    def transform(fields: dict) -> Dict[str, object]:
+        value = fields.get(source)
+        if _empty(value):
+            return {target: None}
+        text = value.strip() if isinstance(value, str) else value
+        if mapping and isinstance(text, str) and text in mapping:
+            return {target: mapping[text]}
+        return {target: text if keep_unmapped else None}
+
+    transform.sources = [source]
+    return transform
+
+
+def split_value(source: str, targets: List[str], sep: Optional[str] = None) -> Transform:
+    """Rozdělí text na části do cílových polí; zbytek připadne poslednímu."""
+
+    def transform(fields: dict) -> Dict[str, object]:
+        value = (fields.get(source) or "").strip()
+        parts = value.split(sep, len(targets) - 1) if value else []
+        return {t: (parts[i].strip() or None) if i < len(parts) else None for i, t in enumerate(targets)}
+
+    transform.sources = [source]
+    return transform
+
+
+def merge_values(sources: List[str], target: str, sep: str = " ") -> Transform:
+    """Spojí neprázdné hodnoty zdrojových polí do jednoho."""
+
+    def transform(fields: dict) -> Dict[str, object]:
+        parts = [str(fields[s]).strip() for s in sources if not _empty(fields.get(s))]
+        return {target: sep.join(p for p in parts if p) or None}
+
+    transform.sources = list(sources)
+    return transform
+
+
+# --- stav ---
+
+def _state_path(name: str) -> Path:
+    return STATE_DIR / f"{name}.json"
+
+
+def load_state(name: str) -> dict:
+    path = _state_path(name)
+    if not path.exists():
+        return {"phase": PHASES[0]}
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_state(name: str, state: dict) -> None:
+    STATE_DIR.mkdir(parents=True, exist_ok=True)
+    state["updated"] = time.strftime("%Y-%m-%dT%H:%M:%S")
+    target = _state_path(name)
+    tmp = target.with_name(target.name + ".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(state, f, ensure_ascii=False, indent=2)
+    os.replace(tmp, target)
+
+
+# --- fáze ---
+
+def _headers() -> Dict[str, str]:
+    from airtable_api import get_token
+
+    return {"Authorization": f"Bearer {get_token()}", "Content-Type": "application/json"}
+
+
+def _fields_url(m: Migration) -> str:
+    from airtable_api import API_META_BASE
+    from airtable_schema import schema
+
+    return f"{API_META_BASE}/{m.base_id}/tables/{schema(m.base_id).table_id(m.table) or m.table}/fields"
+
+
+def iter_records(m: Migration, fields: List[str]) -> Iterator[dict]:
+    """Záznamy tabulky po stránkách (jen uvedená pole, která v tabulce existují)."""
+    from urllib.parse import quote
+
+    from airtable_api import API_BASE, request_with_backoff
+    from airtable_schema import schema
+
+    existing = schema(m.base_id).field_names(m.table)
+    fields = [f for f in fields if f in existing]
+
+    url = f"{API_BASE}/{m.base_id}/{quote(m.table, safe='')}"
+    hdrs = _headers()
+    offset = None
+    while True:
+        params = {"pageSize": 100, "fields[]": fields}
+        if offset:
+            params["offset"] = offset
+        data = request_with_backoff("GET", url, headers=hdrs, params=params)
+        yield from data.get("records", [])
+        offset = data.get("offset")
+        if not offset:
+            break
+
+
+def _same(expected, actual) -> bool:
+    if _empty(expected):
+        return _empty(actual)
+    if isinstance(expected, list) and isinstance(actual, list):
+        return sorted(map(str, expected)) == sorted(map(str, actual))
+    return expected == actual
+
+
+def _diff(m: Migration, fields: dict) -> Dict[str, object]:
+    """Cílová pole, která se liší od transformace (hodnota None = vyprázdnit)."""
+    expected = m.transform(fields)
+    return {k: v for k, v in expected.items() if not _same(v, fields.get(k))}
+
+
+def phase_create(m: Migration, dry_run: bool = False) -> None:
+    from airtable_api import request_with_backoff
+    from airtable_schema import schema
+
+    missing = [t for t in m.targets if schema(m.base_id).field(m.table, t.name) is None]
+    for t in missing:
+        print(f"📋 Zakládám pole '{t.name}' ({t.type})" + (" – dry-run" if dry_run else ""))
+        if dry_run:
+            continue
+        body = {"name": t.name, "type": t.type}
+        if t.options:
+            body["options"] = t.options
+        result = request_with_backoff("POST", _fields_url(m), headers=_headers(), json=body)
+        print(f"   ✅ {result.get('id')}")
+    if not missing:
+        print(f"📋 Cílová pole existují: {', '.join(m.target_names)}")
+
+
+def phase_backfill(m: Migration, dry_run: bool = False) -> int:
+    from airtable_api import write_records
+
+    print(f"\n🔄 Backfill {m.table}: {', '.join(m.sources)} → {', '.join(m.target_names)}")
+    updates, total = [], 0
+    for rec in iter_records(m, m.sources + m.target_names):
+        total += 1
+        diff = _diff(m, rec.get("fields", {}))
+        if diff:
+            updates.append({"id": rec["id"], "fields": diff})
+    print(f"   {total} záznamů, ke změně {len(updates)}")
+    if dry_run:
+        for u in updates[:SHOW_MISMATCHES]:
+            print(f"   {u['id']} {u['fields']}")
+        return len(updates)
+    if updates:
+        write_records("PATCH", m.base_id, m.table, updates, typecast=m.typecast, queue=f"migrace-{m.name}")
+        print(f"   ✅ Zapsáno {len(updates)} záznamů")
+    return len(updates)
+
+
+def phase_verify(m: Migration) -> dict:
+    print("\n🔍 Kontrola...")
+    total, filled, mismatches = 0, 0, []
+    for rec in iter_records(m, m.sources + m.target_names):
+        fields = rec.get("fields", {})
+        total += 1
+        if any(not _empty(fields.get(t)) for t in m.target_names):
+            filled += 1
+        diff = _diff(m, fields)
+        if diff:
+            mismatches.append((rec["id"], diff, {k: fields.get(k) for k in diff}))
+    print(f"   {total} záznamů, {filled} s vyplněným cílovým polem, rozdílů {len(mismatches)}")
+    for rec_id, expected, actual in mismatches[:SHOW_MISMATCHES]:
+        print(f"   ❌ {rec_id}: čekáno {expected}, je {actual}")
+    return {"records": total, "filled": filled, "mismatches": len(mismatches)}
+
+
+def phase_cutover(m: Migration) -> None:
+    from airtable_api import request_with_backoff
+    from airtable_schema import schema
+
+    url = _fields_url(m)
+    for name in m.drop:
+        field_id = schema(m.base_id).field_id(m.table, name)
+        if field_id:
+            print(f"\n🗑️ Mažu pole '{name}'...")
+            request_with_backoff("DELETE", f"{url}/{field_id}", headers=_headers())
+    for old, new in m.rename.items():
+        field_id = schema(m.base_id).field_id(m.table, old)
+        if field_id:
+            print(f"\n✏️ Přejmenovávám '{old}' → '{new}'...")
+            request_with_backoff("PATCH", f"{url}/{field_id}", headers=_headers(), json={"name": new})
+
+
+def run(m: Migration, *, dry_run: bool = False, cutover: bool = True) -> dict:
+    """Spustí (nebo dokončí) migraci; vrací uložený stav."""
+    state = load_state(m.name)
+    if state["phase"] == "done":
+        print(f"✅ Migrace {m.name} už proběhla ({state.get('updated', '')}).")
+        return state
+    if state["phase"] != PHASES[0]:
+        print(f"↩️  Pokračuji v migraci {m.name} od fáze {state['phase']}")
+    start = time.perf_counter()
+
+    if dry_run:
+        if state["phase"] == "create":
+            phase_create(m, dry_run=True)
+        if state["phase"] in ("create", "backfill", "verify"):
+            phase_backfill(m, dry_run=True)
+        return state
+
+    if state["phase"] == "create":
+        phase_create(m)
+        state["phase"] = "backfill"
+        save_state(m.name, state)
+    if state["phase"] == "backfill":
+        state["backfilled"] = state.get("backfilled", 0) + phase_backfill(m)
+        state["phase"] = "verify"
+        save_state(m.name, state)
+    if state["phase"] == "verify":
+        state["verify"] = phase_verify(m)
+        if state["verify"]["mismatches"]:
+            state["phase"] = "backfill"
+            save_state(m.name, state)
+            raise SystemExit("⛔ Kontrola našla rozdíly – pole se nepřepnula. Spusť migraci znovu.")
+        state["phase"] = "cutover"
+        save_state(m.name, state)
+    if state["phase"] == "cutover":
+        if not cutover:
+            print("\n⏸️  Přepnutí polí vynecháno – dokončí ho další běh bez --no-cutover.")
+            return state
+        phase_cutover(m)
+        state["phase"] = "done"
+        save_state(m.name, state)
+    print(f"\n✅ Migrace {m.name} hotová ({time.perf_counter() - start:.1f} s).")
+    return state
+
+
+def run_cli(m: Migration, argv: Optional[List[str]] = None, description: str = "") -> None:
+    ap = argparse.ArgumentParser(description=description or f"Migrace polí {m.name}")
+    ap.add_argument("--dry-run", action="store_true", help="Nic nezapisovat, jen spočítat změny")
+    ap.add_argument("--no-cutover", action="store_true", help="Backfill a kontrola bez smazání/přejmenování polí")
+    ap.add_argument("--restart", action="store_true", help="Zahodit uložený stav a začít od fáze create")
+    args = ap.parse_args(argv)
+    if args.restart and _state_path(m.name).exists():
+        _state_path(m.name).unlink()
+    run(m, dry_run=args.dry_run, cutover=not args.no_cutover)
+
+
+def main() -> None:
+    paths = sorted(STATE_DIR.glob("*.json"))
+    if not paths:
+        print("✅ Žádná migrace.")
+        return
+    for path in paths:
+        with open(path, "r", encoding="utf-8") as f:
+            state = json.load(f)
+        verify = state.get("verify") or {}
+        extra = f", kontrola {verify['records']} záznamů / {verify['mismatches']} rozdílů" if verify else ""
+        print(f"   {path.stem:<28} {state['phase']:<9} {state.get('updated', '')}{extra}")
+
+
+if __name__ == "__main__":
+    main()
@@ -7,13 +7,21 @@ Extracts name and company from Google search URLs and searches for LinkedIn prof
 import csv
 import os
 import sys
-import time
 import urllib.parse
+from functools import lru_cache
 from pathlib import Path
 from apify_client import ApifyClient
 
+from company_key import fold
+from snapshots import take_snapshot
+from http_metrics import timed
+from job_queue import PermanentError, open_queue
+
 CSV_FILE = Path(__file__).parent / "kontakty_unified.csv"
 APIFY_ACTOR = "harvestapi/linkedin-profile-search"  # No Cookies, searchQuery for name
+# Fronta úloh (job_queue.py): souběžnost hledání řídí rate_control, výsledek platí 30 dní
+JOB_QUEUE = "linkedin_search"
+SEARCH_FRESH_FOR = 30 * 86400
 
 def extract_name_company_from_google_search(url: str) -> tuple:
     """Extract name and company from Google search URL"""
@@ -36,57 +44,67 @@ def search_linkedin_by_name_company(client: ApifyClient, name: str, company: str
     """
     Search for LinkedIn profile by name using HarvestAPI LinkedIn Profile Search (No Cookies).
     Uses searchQuery for fuzzy search by full name.
+    Chyby Apify propadnou ven – fronta úlohu zopakuje s backoffem.
     """
-    print(f"  Hledám: {name} @ {company}...", end=" ", flush=True)
+    if not name or not name.strip():
+        return {}
+    
+    run_input = {
+        "profileScraperMode": "Short",
+        "searchQuery": name.strip(),
+        "maxItems": 10,
+    }
     
     try:
-        if not name or not name.strip():
-            print("✗ (chybí jméno)")
-            return {}
-        
-        run_input = {
-            "profileScraperMode": "Short",
-            "searchQuery": name.strip(),
-            "maxItems": 10,
-        }
-        
-        run = client.actor(APIFY_ACTOR).call(run_input=run_input)
-        run_result = client.run(run["data"]["id"]).wait_for_finish()
-        
-        dataset = client.dataset(run_result["defaultDatasetId"])
-        items = list(dataset.iterate_items())
-        
-        name_parts_lower = name.lower().split()
-        for item in items:
-            profile_name = (item.get("fullName") or item.get("name") or "").lower()
-            profile_company = (item.get("currentCompany") or item.get("company") or "").lower()
-            profile_url = item.get("profileUrl") or item.get("url") or item.get("linkedInUrl") or ""
-            if not profile_url and item.get("publicIdentifier"):
-                profile_url = f"https://www.linkedin.com/in/{item['publicIdentifier']}"
-            
-            name_ok = all(part in profile_name for part in name_parts_lower if len(part) > 2)
-            company_ok = not company or company.lower() in profile_company
-            
-            if name_ok and company_ok and profile_url:
-                if not profile_url.startswith("http"):
-                    profile_url = "https://" + profile_url
-                result = {
-                    "linkedinUrl": profile_url,
-                    "headline": item.get("headline", ""),
-                    "currentPosition": item.get("title") or item.get("currentPosition", ""),
-                    "company": item.get("currentCompany") or item.get("company", ""),
-                }
-                print("✓")
-                return result
-        
-        print("✗ (nenalezeno)")
-        return {}
+        with timed("apify", f"actor/{APIFY_ACTOR}"):
+            run = client.actor(APIFY_ACTOR).call(run_input=run_input)
+            run_result = client.run(run["data"]["id"]).wait_for_finish()
     except Exception as e:
         err_msg = str(e)
-        print(f"✗ Error: {err_msg[:120]}")
         if "authentication" in err_msg.lower() or "token" in err_msg.lower():
             print("   → Zkontrolujte: 1) APIFY_API_TOKEN 2) V Apify Console přidejte actor z Store (HarvestAPI LinkedIn Search)")
-        return {}
+            raise PermanentError(err_msg) from e
+        raise
+    
+    with timed("apify", "dataset/items"):
+        dataset = client.dataset(run_result["defaultDatasetId"])
+        items = list(dataset.iterate_items())
+    
+    name_parts_lower = name.lower().split()
+    for item in items:
+        profile_name = (item.get("fullName") or item.get("name") or "").lower()
+        profile_company = (item.get("currentCompany") or item.get("company") or "").lower()
+        profile_url = item.get("profileUrl") or item.get("url") or item.get("linkedInUrl") or ""
+        if not profile_url and item.get("publicIdentifier"):
+            profile_url = f"https://www.linkedin.com/in/{item['publicIdentifier']}"
+        
+        name_ok = all(part in profile_name for part in name_parts_lower if len(part) > 2)
+        company_ok = not company or company.lower() in profile_company
+        
+        if name_ok and company_ok and profile_url:
+            if not profile_url.startswith("http"):
+                profile_url = "https://" + profile_url
+            print(f"  Hledám: {name} @ {company} ✓", flush=True)
+            return {
+                "linkedinUrl": profile_url,
+                "headline": item.get("headline", ""),
+                "currentPosition": item.get("title") or item.get("currentPosition", ""),
+                "company": item.get("currentCompany") or item.get("company", ""),
+            }
+    
+    print(f"  Hledám: {name} @ {company} ✗ (nenalezeno)", flush=True)
+    return {}
+
+
+@lru_cache(maxsize=None)
+def get_apify_client() -> ApifyClient:
+    return ApifyClient(os.environ["APIFY_API_TOKEN"])
+
+
+def search_job(payload: dict) -> dict:
+    """Handler fronty (job_queue): jedno hledání profilu podle jména a firmy."""
+    return search_linkedin_by_name_company(get_apify_client(), payload["name"], payload["company"])
+
 
 def main():
     # Get API token
@@ -99,8 +117,6 @@ def main():
         print("3. Set it: export APIFY_API_TOKEN='your-token-here'")
         sys.exit(1)
     
-    client = ApifyClient(api_token)
-    
     # Read CSV and find contacts from FAIL - jaro 2025 without LinkedIn profiles
     print(f"📖 Reading {CSV_FILE}...")
     rows = []
@@ -129,6 +145,7 @@ def main():
                     })
             
             rows.append(row)
+    take_snapshot(CSV_FILE, label="pred_linkedin_search")
     
     print(f"\n📊 Found {len(contacts_to_find)} contacts from FAIL - jaro 2025 without LinkedIn profiles")
     
@@ -153,6 +170,18 @@ def main():
     # Auto-confirm (no interactive input needed)
     print(f"\n🚀 Starting search for LinkedIn URLs...")
     
+    # Hledání běží ve frontě (souběžně, s opakováním); přerušený běh stačí spustit znovu
+    queue = open_queue()
+    for contact in contacts_to_find:
+        contact['job_key'] = f"linkedin_search:{fold(contact['name'])}|{fold(contact['firma'])}"
+    queue.enqueue_many(
+        JOB_QUEUE, "apify", "find_linkedin_from_google_search:search_job",
+        [(c['job_key'], {"name": c['name'], "company": c['firma']}) for c in contacts_to_find],
+        fresh_for=SEARCH_FRESH_FOR,
+    )
+    queue.run_workers(JOB_QUEUE)
+    found = queue.results(c['job_key'] for c in contacts_to_find)
+    
     # Find LinkedIn URLs
     updated_count = 0
     failed_count = 0
@@ -160,47 +189,29 @@ def main():
     for idx, contact in enumerate(contacts_to_find, 1):
         print(f"\n[{idx}/{len(contacts_to_find)}] {contact['name']}")
         
-        try:
-            profile_data = search_linkedin_by_name_company(
-                client,
-                contact['name'],
-                contact['firma']
-            )
+        profile_data = found.get(contact['job_key'])
+        
+        if profile_data and profile_data.get("linkedinUrl"):
+            linkedin_url = profile_data["linkedinUrl"]
+            # Normalize URL
+            if not linkedin_url.startswith("http"):
+                linkedin_url = "https://" + linkedin_url
+            linkedin_url = linkedin_url.replace("cz.linkedin.com", "www.linkedin.com")
+            linkedin_url = linkedin_url.replace("sk.linkedin.com", "www.linkedin.com")
+            
+            rows[contact['row_idx']]['LinkedIn profil'] = linkedin_url
+            updated_count += 1
+            print(f"  → Found: {linkedin_url[:60]}")
             
-            if profile_data and profile_data.get("linkedinUrl"):
-                linkedin_url = profile_data["linkedinUrl"]
-                # Normalize URL
-                if not linkedin_url.startswith("http"):
-                    linkedin_url = "https://" + linkedin_url
-                linkedin_url = linkedin_url.replace("cz.linkedin.com", "www.linkedin.com")
-                linkedin_url = linkedin_url.replace("sk.linkedin.com", "www.linkedin.com")
-                
-                rows[contact['row_idx']]['LinkedIn profil'] = linkedin_url
-                updated_count += 1
-                print(f"  → Found: {linkedin_url[:60]}")
-                
-                # Also update position/company if available
-                if profile_data.get("currentPosition"):
-                    rows[contact['row_idx']]['Pracovní pozice'] = profile_data["currentPosition"]
-                if profile_data.get("company") and not rows[contact['row_idx']].get('Společnost / Firma', '').strip():
-                    rows[contact['row_idx']]['Společnost / Firma'] = profile_data["company"]
-            else:
-                failed_count += 1
-        except Exception as e:
-            print(f"  ✗ Exception: {str(e)[:100]}")
+            # Also update position/company if available
+            if profile_data.get("currentPosition"):
+                rows[contact['row_idx']]['Pracovní pozice'] = profile_data["currentPosition"]
+            if profile_data.get("company") and not rows[contact['row_idx']].get('Společnost / Firma', '').strip():
+                rows[contact['row_idx']]['Společnost / Firma'] = profile_data["company"]
+        else:
             failed_count += 1
-        
-        # Rate limiting - be nice to Apify
-        if idx < len(contacts_to_find):
-            time.sleep(2)  # 2 second delay between requests
-        
-        # Save progress every 10 contacts
-        if idx % 10 == 0:
-            print(f"\n💾 Saving progress... ({updated_count} found so far)")
-            with open(CSV_FILE, 'w', encoding='utf-8', newline='') as f:
-                writer = csv.DictWriter(f, fieldnames=headers)
-                writer.writeheader()
-                writer.writerows(rows)
+            if contact['job_key'] not in found:
+                print("  ✗ Hledání selhalo (viz python3 job_queue.py status linkedin_search)")
     
     # Save updated CSV
     if updated_count > 0:
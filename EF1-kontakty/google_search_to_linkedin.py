@@ -17,11 +17,15 @@ import csv
 import os
 import re
 import sys
-import time
 import urllib.parse
 import warnings
 from pathlib import Path
 
+from company_key import fold, normalize_company
+from snapshots import take_snapshot
+from http_metrics import request, timed
+from job_queue import RetryLater, open_queue
+
 warnings.filterwarnings("ignore", message=".*duckduckgo_search.*renamed.*")
 
 try:
@@ -39,6 +43,19 @@ UNIFIED_CSV = DIR / "kontakty_unified.csv"
 LINKEDIN_COL_INDEX = 45
 EMAIL_COL_INDEX = 4
 FIRMA_COL_INDEX = 7
+# Fronta úloh (job_queue.py): souběžná hledání, výsledek platí 30 dní
+JOB_QUEUE = "linkedin_google"
+SEARCH_FRESH_FOR = 30 * 86400
+
+
+def _raise_if_rate_limited(r) -> None:
+    """429 od vyhledávače → fronta úlohu odloží (Retry-After, jinak 30 s)."""
+    if r.status_code == 429:
+        try:
+            delay = float(r.headers.get("Retry-After") or 30)
+        except ValueError:
+            delay = 30.0
+        raise RetryLater(delay, f"429 od {urllib.parse.urlparse(r.url).netloc}")
 
 
 def get_query_from_google_url(url: str) -> str:
@@ -54,17 +71,6 @@ def get_query_from_google_url(url: str) -> str:
         return ""
 
 
-def normalize_firma_for_match(firma: str) -> str:
-    """Pro porovnání: malá písmena, bez s.r.o. / a.s. atd., zkrácené mezery."""
-    if not firma:
-        return ""
-    s = firma.lower().strip()
-    for suffix in (" s.r.o.", " a.s.", " s.r.o", " a.s", ", s.r.o.", ", a.s."):
-        s = s.replace(suffix, "")
-    s = " ".join(s.split())
-    return s
-
-
 def firma_matches(firma: str, title: str, snippet: str) -> bool:
     """
     Pokud firma není zadaná → True (bereme první výsledek).
@@ -74,10 +80,11 @@ def firma_matches(firma: str, title: str, snippet: str) -> bool:
         return True
     if not (title or snippet):
         return False
-    norm = normalize_firma_for_match(firma)
+    norm = normalize_company(firma)
     if not norm:
         return True
-    text = ((title or "") + " " + (snippet or "")).lower()
+    # stejné skládání diakritiky jako u klíče firmy ("Škoda" v titulku = "skoda")
+    text = fold((title or "") + " " + (snippet or ""))
     words = [w for w in norm.split() if len(w) > 2]
     if not words:
         return norm in text
@@ -96,7 +103,8 @@ def first_linkedin_from_google_search(
     url = "https://www.googleapis.com/customsearch/v1"
     params = {"key": api_key, "cx": cse_id, "q": query, "num": 10}
     try:
-        r = requests.get(url, params=params, timeout=15)
+        r = request("google_cse", "GET", url, params=params, timeout=15)
+        _raise_if_rate_limited(r)
         r.raise_for_status()
         data = r.json()
         for item in data.get("items", []):
@@ -110,6 +118,8 @@ def first_linkedin_from_google_search(
             link = link.split("?")[0].split("#")[0]
             if "linkedin.com" in link:
                 return link
+    except RetryLater:
+        raise
     except Exception as e:
         print(f"    API chyba: {e}")
     return ""
@@ -129,7 +139,8 @@ def first_linkedin_from_google_page(google_url: str) -> str:
         "Accept-Language": "cs,en;q=0.9",
     }
     try:
-        r = requests.get(google_url, headers=headers, timeout=15)
+        r = request("google", "GET", google_url, endpoint="www.google.com/search", headers=headers, timeout=15)
+        _raise_if_rate_limited(r)
         r.raise_for_status()
         html = r.text
         # 1) Odkazy ve tvaru /url?q=https://www.linkedin.com/in/...
@@ -151,6 +162,8 @@ def first_linkedin_from_google_page(google_url: str) -> str:
             url = m.group(0).split("?")[0].split("#")[0]
             if "linkedin.com" in url:
                 return url
+    except RetryLater:
+        raise
     except Exception as e:
         print(f"    Chyba načtení stránky: {e}")
     return ""
@@ -193,7 +206,7 @@ def first_linkedin_from_duckduckgo_html(query: str) -> str:
         "Accept-Language": "en-US,en;q=0.9",
     }
     try:
-        r = requests.post(url, data={"q": query}, headers=headers, timeout=15)
+        r = request("duckduckgo", "POST", url, data={"q": query}, headers=headers, timeout=15)
         r.raise_for_status()
         return _extract_first_linkedin_from_html(r.text)
     except Exception as e:
@@ -212,7 +225,7 @@ def first_linkedin_from_bing_page(query: str) -> str:
         "Accept-Language": "en-US,en;q=0.9",
     }
     try:
-        r = requests.get(url, params={"q": query}, headers=headers, timeout=15)
+        r = request("bing", "GET", url, params={"q": query}, headers=headers, timeout=15)
         r.raise_for_status()
         return _extract_first_linkedin_from_html(r.text)
     except Exception as e:
@@ -228,8 +241,9 @@ def first_linkedin_from_duckduckgo(query: str, firma: str) -> str:
     if not query or DDGS is None:
         return ""
     try:
-        with DDGS() as ddgs:
-            for r in ddgs.text(query, max_results=10):
+        with DDGS() as ddgs, timed("duckduckgo", "ddgs.text"):
+            results = list(ddgs.text(query, max_results=10))
+            for r in results:
                 link = (r.get("href") or r.get("link") or "").strip()
                 if not link or "linkedin.com/in/" not in link.lower():
                     continue
@@ -245,6 +259,22 @@ def first_linkedin_from_duckduckgo(query: str, firma: str) -> str:
     return ""
 
 
+def lookup_job(payload: dict) -> dict:
+    """Handler fronty (job_queue): LinkedIn pro jeden Google odkaz (CSE, jinak Google → DDG → Bing)."""
+    query, firma, google_url = payload["query"], payload["firma"], payload["google_url"]
+    api_key = os.getenv("GOOGLE_API_KEY")
+    cse_id = os.getenv("GOOGLE_CSE_ID")
+    if api_key and cse_id:
+        link = first_linkedin_from_google_search(api_key, cse_id, query, firma)
+    else:
+        link = first_linkedin_from_google_page(google_url)
+        if not link:
+            link = first_linkedin_from_duckduckgo_html(query)
+        if not link:
+            link = first_linkedin_from_bing_page(query)
+    return {"link": link}
+
+
 def main():
     api_key = os.getenv("GOOGLE_API_KEY")
     cse_id = os.getenv("GOOGLE_CSE_ID")
@@ -304,18 +334,26 @@ def main():
         reader = csv.DictReader(f)
         headers = list(reader.fieldnames)
         rows = list(reader)
+    take_snapshot(UNIFIED_CSV, label="pred_google_linkedin")
+
+    # Vyhledávání běží ve frontě (souběžně, 429 → odklad podle Retry-After); přerušený běh stačí spustit znovu
+    provider = "google_cse" if use_google else "search"
+    mode = "cse" if use_google else "web"
+    job_keys = {email: f"linkedin_google:{mode}:{fold(q)}|{fold(firma)}" for email, (q, firma, _) in email_to_data.items()}
+    queue = open_queue()
+    queue.enqueue_many(
+        JOB_QUEUE, provider, "google_search_to_linkedin:lookup_job",
+        [(job_keys[email], {"query": q, "firma": firma, "google_url": google_url})
+         for email, (q, firma, google_url) in email_to_data.items()],
+        fresh_for=SEARCH_FRESH_FOR,
+    )
+    queue.run_workers(JOB_QUEUE)
+    found = queue.results(job_keys.values())
 
     for i, (email, data) in enumerate(email_to_data.items(), 1):
-        query, firma, google_url = data[0], data[1], data[2]
+        query = data[0]
         print(f"[{i}/{len(email_to_data)}] {query[:50]}…")
-        if use_google:
-            link = first_linkedin_from_google_search(api_key, cse_id, query, firma)
-        else:
-            link = first_linkedin_from_google_page(google_url)
-            if not link:
-                link = first_linkedin_from_duckduckgo_html(query)
-            if not link:
-                link = first_linkedin_from_bing_page(query)
+        link = (found.get(job_keys[email]) or {}).get("link", "")
         if link:
             email_to_linkedin[email] = link
             print(f"    → LinkedIn: {link[:60]}…")
@@ -325,14 +363,6 @@ def main():
                     break
         else:
             print("    → žádný vhodný LinkedIn")
-        time.sleep(0.3)
-        # Průběžné ukládání každých 10 kontaktů
-        if i % 10 == 0 and headers and rows:
-            with open(UNIFIED_CSV, "w", encoding="utf-8", newline="") as f:
-                w = csv.DictWriter(f, fieldnames=headers)
-                w.writeheader()
-                w.writerows(rows)
-            print(f"    💾 uloženo ({len(email_to_linkedin)} doplněno)")
 
     if not email_to_linkedin:
         print("\nNepodařilo se získat žádné LinkedIn URL.")
@@ -0,0 +1,369 @@
+#!/usr/bin/env python3
+"""
+Měření HTTP volání jednoho běhu skriptu – Airtable, Apify i vyhledávače.
+
+Každé volání přes `request()` (nebo blok `timed()` kolem SDK volání, např.
+Apify klienta) se započítá do počítadel po endpointech: počet, stavové kódy,
+histogram latence, bajty tam a zpět; `record_retry()` přičte opakování
+a čas strávený backoffem (429/5xx).
+
+Při ukončení skriptu se (pokud proběhlo aspoň jedno volání) zapíše:
+- metrics/<skript>_<čas>.json   souhrn běhu
+- metrics/<skript>.prom         Prometheus textfile (node_exporter --collector.textfile.directory)
+a vypíše se jednořádkové shrnutí.
+
+Souběžnost a tempo volání řídí rate_control.py (AIMD podle 429/Retry-After,
+zvlášť pro každého poskytovatele); aktuální limity jsou součástí souhrnu.
+
+Proměnné prostředí:
+  KONTAKTY_METRICS=0          vypnout zápis (počítá se dál, jen se nic neuloží)
+  KONTAKTY_METRICS_DIR=...    jiný adresář než EF1-kontakty/metrics
+
+Použití:
+  from http_metrics import request, timed, record_retry
+  resp = request("google", "GET", url, params=params, timeout=15)
+  with timed("apify", f"actor/{APIFY_ACTOR}"):
+      run = client.actor(APIFY_ACTOR).call(run_input=run_input)
+
+  python3 http_metrics.py metrics/propoj_kontakty_klienti_20260301-101500.json   # výpis souhrnu
+"""
+
+from __future__ import annotations
+
+import atexit
+import json
+import os
+import re
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+from urllib.parse import unquote, urlparse
+
+from rate_control import THROTTLE_STATUSES, limiter, limits
+
+
+BASE_DIR = Path(__file__).parent
+METRICS_DIR = Path(os.getenv("KONTAKTY_METRICS_DIR") or BASE_DIR / "metrics")
+
+# hranice histogramu latence (sekundy)
+BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+_ID_SEGMENT = re.compile(r"^(rec|tbl|fld|viw|sel|app)[A-Za-z0-9]{14}$|^[0-9a-f-]{16,}$|^\d+$|^[A-Za-z0-9]{17,}$")
+
+
+def endpoint_label(url: str) -> str:
+    """
+    Stabilní název endpointu pro agregaci:
+    Airtable → "Kontakty", "Kontakty/:id", "meta/tables/:id/fields";
+    ostatní → host + cesta s id nahrazenými ":id".
+    """
+    parsed = urlparse(url)
+    parts = [unquote(p) for p in parsed.path.strip("/").split("/") if p]
+    if parts and parts[0] == "v0":
+        parts = parts[1:]
+        if parts[:1] == ["meta"]:
+            # meta/bases/{base}/tables[/{table}/fields[/{field}]]
+            rest = parts[3:]
+            return "meta/" + "/".join(":id" if _ID_SEGMENT.match(p) else p for p in rest)
+        parts = parts[1:]   # base id
+        return "/".join(":id" if i and _ID_SEGMENT.match(p) else p for i, p in enumerate(parts)) or "/"
+    path = "/".join(":id" if _ID_SEGMENT.match(p) else p for p in parts)
+    return f"{parsed.netloc}/{path}".rstrip("/")
+
+
+class Histogram:
+    __slots__ = ("counts", "total", "count", "max")
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.total = 0.0
+        self.count = 0
+        self.max = 0.0
+
+    def observe(self, seconds: float) -> None:
+        i = 0
+        while i < len(BUCKETS) and seconds > BUCKETS[i]:
+            i += 1
+        self.counts[i] += 1
+        self.total += seconds
+        self.count += 1
+        self.max = max(self.max, seconds)
+
+    def quantile(self, q: float) -> float:
+        """Odhad kvantilu z histogramu (horní hranice koše, u posledního maximum)."""
+        if not self.count:
+            return 0.0
+        target = q * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            seen += n
+            if seen >= target:
+                return min(BUCKETS[i], self.max) if i < len(BUCKETS) else self.max
+        return self.max
+
+
+class EndpointStats:
+    __slots__ = ("statuses", "latency", "retries", "backoff_seconds", "bytes_out", "bytes_in")
+
+    def __init__(self):
+        self.statuses: Dict[str, int] = {}
+        self.latency = Histogram()
+        self.retries = 0
+        self.backoff_seconds = 0.0
+        self.bytes_out = 0
+        self.bytes_in = 0
+
+    def to_dict(self) -> dict:
+        h = self.latency
+        return {"requests": h.count, "statuses": dict(self.statuses), "seconds_total": round(h.total, 3),
+                "latency_avg": round(h.total / h.count, 4) if h.count else 0.0,
+                "latency_p50": round(h.quantile(0.5), 4), "latency_p95": round(h.quantile(0.95), 4),
+                "latency_max": round(h.max, 4), "retries": self.retries,
+                "backoff_seconds": round(self.backoff_seconds, 3),
+                "bytes_out": self.bytes_out, "bytes_in": self.bytes_in}
+
+
+class Metrics:
+    """Počítadla jednoho běhu; klíč = (provider, metoda, endpoint). Bezpečné pro vlákna."""
+
+    def __init__(self, script: str = ""):
+        self.lock = threading.Lock()
+        self._exit_registered = False
+        self.reset(script)
+
+    def reset(self, script: str = "") -> None:
+        """Vynuluje počítadla (kontakty.py mezi řetězenými příkazy)."""
+        with self.lock:
+            self.script = script or Path(sys.argv[0] or "python").stem or "python"
+            self.started = time.time()
+            self.endpoints: Dict[Tuple[str, str, str], EndpointStats] = {}
+
+    def _get(self, provider: str, method: str, endpoint: str) -> EndpointStats:
+        key = (provider, method.upper(), endpoint)
+        st = self.endpoints.get(key)
+        if st is None:
+            st = self.endpoints[key] = EndpointStats()
+            if not self._exit_registered:
+                self._exit_registered = True
+                atexit.register(self.emit)
+        return st
+
+    def observe(self, provider: str, method: str, endpoint: str, status, seconds: float,
+                bytes_out: int = 0, bytes_in: int = 0) -> None:
+        with self.lock:
+            st = self._get(provider, method, endpoint)
+            st.statuses[str(status)] = st.statuses.get(str(status), 0) + 1
+            st.latency.observe(seconds)
+            st.bytes_out += bytes_out
+            st.bytes_in += bytes_in
+
+    def retry(self, provider: str, method: str, endpoint: str, backoff_seconds: float) -> None:
+        with self.lock:
+            st = self._get(provider, method, endpoint)
+            st.retries += 1
+            st.backoff_seconds += backoff_seconds
+
+    # --- výstupy ---
+
+    def summary(self) -> dict:
+        with self.lock:
+            rows = [{"provider": p, "method": m, "endpoint": e, **st.to_dict()}
+                    for (p, m, e), st in sorted(self.endpoints.items())]
+        finished = time.time()
+        totals = {k: sum(r[k] for r in rows) for k in ("requests", "retries", "bytes_out", "bytes_in")}
+        totals["http_seconds"] = round(sum(r["seconds_total"] for r in rows), 3)
+        totals["backoff_seconds"] = round(sum(r["backoff_seconds"] for r in rows), 3)
+        return {"script": self.script, "started": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(self.started)),
+                "elapsed_seconds": round(finished - self.started, 3), "totals": totals, "endpoints": rows,
+                "limits": limits()}
+
+    def prometheus(self) -> str:
+        def labels(**kw) -> str:
+            return "{" + ",".join(f'{k}="{str(v).replace(chr(92), chr(92) * 2).replace(chr(34), chr(92) + chr(34))}"'
+                                  for k, v in kw.items()) + "}"
+
+        out: List[str] = []
+
+        def metric(name: str, mtype: str, help_text: str, samples: List[Tuple[str, float]]) -> None:
+            out.append(f"# HELP {name} {help_text}")
+            out.append(f"# TYPE {name} {mtype}")
+            out.extend(f"{name}{lab} {val:g}" if isinstance(val, float) else f"{name}{lab} {val}" for lab, val in samples)
+
+        with self.lock:
+            items = sorted(self.endpoints.items())
+            s = self.script
+            metric("kontakty_http_requests_total", "counter", "HTTP requests by endpoint and status.",
+                   [(labels(script=s, provider=p, method=m, endpoint=e, status=code), n)
+                    for (p, m, e), st in items for code, n in sorted(st.statuses.items())])
+            hist: List[Tuple[str, float]] = []
+            for (p, m, e), st in items:
+                acc = 0
+                for i, le in enumerate(BUCKETS):
+                    acc += st.latency.counts[i]
+                    hist.append((labels(script=s, provider=p, method=m, endpoint=e, le=f"{le:g}"), acc))
+                hist.append((labels(script=s, provider=p, method=m, endpoint=e, le="+Inf"), st.latency.count))
+            out.append("# HELP kontakty_http_request_duration_seconds HTTP request latency.")
+            out.append("# TYPE kontakty_http_request_duration_seconds histogram")
+            for lab, val in hist:
+                out.append(f"kontakty_http_request_duration_seconds_bucket{lab} {val}")
+            for (p, m, e), st in items:
+                lab = labels(script=s, provider=p, method=m, endpoint=e)
+                out.append(f"kontakty_http_request_duration_seconds_sum{lab} {st.latency.total:.6f}")
+                out.append(f"kontakty_http_request_duration_seconds_count{lab} {st.latency.count}")
+            metric("kontakty_http_retries_total", "counter", "Retried requests (429/5xx/connection errors).",
+                   [(labels(script=s, provider=p, method=m, endpoint=e), st.retries) for (p, m, e), st in items])
+            metric("kontakty_http_backoff_seconds_total", "counter", "Time spent sleeping before retries.",
+                   [(labels(script=s, provider=p, method=m, endpoint=e), round(st.backoff_seconds, 6))
+                    for (p, m, e), st in items])
+            metric("kontakty_http_request_bytes_total", "counter", "Request payload bytes.",
+                   [(labels(script=s, provider=p, method=m, endpoint=e), st.bytes_out) for (p, m, e), st in items])
+            metric("kontakty_http_response_bytes_total", "counter", "Response payload bytes.",
+                   [(labels(script=s, provider=p, method=m, endpoint=e), st.bytes_in) for (p, m, e), st in items])
+        current = limits()
+        metric("kontakty_concurrency_limit", "gauge", "Adaptive (AIMD) concurrency limit per provider.",
+               [(labels(script=s, provider=p), st["limit"]) for p, st in current.items()])
+        metric("kontakty_throttled_total", "counter", "Throttled responses (429/503) per provider.",
+               [(labels(script=s, provider=p), st["throttled"]) for p, st in current.items()])
+        metric("kontakty_run_duration_seconds", "gauge", "Wall time of the run.",
+               [(labels(script=s), round(time.time() - self.started, 3))])
+        metric("kontakty_run_finished_timestamp_seconds", "gauge", "Unix time the run finished.",
+               [(labels(script=s), round(time.time(), 3))])
+        return "\n".join(out) + "\n"
+
+    def emit(self, out_dir: Optional[Path] = None, quiet: bool = False) -> Optional[Path]:
+        """Zapíše JSON souhrn a Prometheus textfile; vrací cestu k JSON (nebo None)."""
+        if not self.endpoints:
+            return None
+        summary = self.summary()
+        t = summary["totals"]
+        json_path = None
+        if os.getenv("KONTAKTY_METRICS", "1") != "0":
+            out_dir = Path(out_dir or METRICS_DIR)
+            try:
+                out_dir.mkdir(parents=True, exist_ok=True)
+                stamp = time.strftime("%Y%m%d-%H%M%S", time.localtime(self.started))
+                json_path = out_dir / f"{self.script}_{stamp}.json"
+                _atomic_write(json_path, json.dumps(summary, ensure_ascii=False, indent=2))
+                _atomic_write(out_dir / f"{self.script}.prom", self.prometheus())
+            except OSError as e:
+                print(f"⚠️  Metriky se nepodařilo uložit: {e}", file=sys.stderr)
+                json_path = None
+        if not quiet:
+            print(f"📡 API: {t['requests']} požadavků, {t['retries']} opakování (backoff {t['backoff_seconds']:.1f} s), "
+                  f"HTTP {t['http_seconds']:.1f} s z {summary['elapsed_seconds']:.1f} s běhu, "
+                  f"↑{_fmt_bytes(t['bytes_out'])} ↓{_fmt_bytes(t['bytes_in'])}"
+                  + (f" → {json_path}" if json_path else ""), file=sys.stderr)
+        return json_path
+
+
+def _atomic_write(path: Path, text: str) -> None:
+    tmp = path.with_name(path.name + ".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(tmp, path)
+
+
+def _fmt_bytes(n: int) -> str:
+    for unit in ("B", "kB", "MB"):
+        if n < 1024:
+            return f"{n:.0f} {unit}" if unit == "B" else f"{n:.1f} {unit}"
+        n /= 1024
+    return f"{n:.1f} GB"
+
+
+METRICS = Metrics()
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def session():
+    """Sdílená requests.Session (keep-alive spojení mezi voláními)."""
+    global _session
+    if _session is None:
+        import requests
+
+        with _session_lock:
+            if _session is None:
+                _session = requests.Session()
+    return _session
+
+
+def request(provider: str, method: str, url: str, *, endpoint: str = "", **kwargs):
+    """
+    requests.request() s měřením a adaptivním limitem poskytovatele (rate_control).
+    Výjimky (timeout, spojení) se započítají se stavem "error" a propadnou dál;
+    stavové kódy se nekontrolují – 429/503 jen sníží limit a pozastaví poskytovatele.
+    """
+    endpoint = endpoint or endpoint_label(url)
+    with limiter(provider).slot() as slot:
+        start = time.perf_counter()
+        try:
+            resp = session().request(method, url, **kwargs)
+        except Exception:
+            METRICS.observe(provider, method, endpoint, "error", time.perf_counter() - start)
+            raise
+        slot.observe(resp.status_code, resp.headers.get("Retry-After"))
+    body = resp.request.body
+    bytes_out = len(body) if isinstance(body, (bytes, str)) else 0
+    METRICS.observe(provider, method, endpoint, resp.status_code, time.perf_counter() - start,
+                    bytes_out, len(resp.content))
+    return resp
+
+
+def record_retry(provider: str, method: str, url_or_endpoint: str, backoff_seconds: float) -> None:
+    endpoint = endpoint_label(url_or_endpoint) if "://" in url_or_endpoint else url_or_endpoint
+    METRICS.retry(provider, method, endpoint, backoff_seconds)
+
+
+@contextmanager
+def timed(provider: str, endpoint: str, method: str = "CALL") -> Iterator[None]:
+    """
+    Změří blok kódu (SDK volání bez přístupu k HTTP odpovědi) jako jeden požadavek;
+    blok běží pod limitem poskytovatele, výjimka se status_code 429 ho sníží.
+    """
+    with limiter(provider).slot() as slot:
+        start = time.perf_counter()
+        status = "ok"
+        try:
+            yield
+        except Exception as e:
+            code = getattr(e, "status_code", None)
+            status = code if code in THROTTLE_STATUSES else "error"
+            raise
+        finally:
+            slot.observe(status)
+            METRICS.observe(provider, method, endpoint, status, time.perf_counter() - start)
+
+
+def print_summary(summary: dict) -> None:
+    t = summary["totals"]
+    print(f"📡 {summary['script']} ({summary['started']}, {summary['elapsed_seconds']:.1f} s)")
+    print(f"   požadavků {t['requests']}, opakování {t['retries']}, backoff {t['backoff_seconds']:.1f} s, "
+          f"HTTP {t['http_seconds']:.1f} s, ↑{_fmt_bytes(t['bytes_out'])} ↓{_fmt_bytes(t['bytes_in'])}")
+    rows = sorted(summary["endpoints"], key=lambda r: -(r["seconds_total"] + r["backoff_seconds"]))
+    print(f"\n   {'endpoint':<40} {'n':>6} {'čas s':>8} {'p50':>6} {'p95':>6} {'retry':>6} {'backoff':>8}  stavy")
+    for r in rows:
+        name = f"{r['provider']} {r['method']} {r['endpoint']}"[:40]
+        statuses = ", ".join(f"{k}×{v}" for k, v in sorted(r["statuses"].items()))
+        print(f"   {name:<40} {r['requests']:>6} {r['seconds_total']:>8.1f} {r['latency_p50']:>6.2f} "
+              f"{r['latency_p95']:>6.2f} {r['retries']:>6} {r['backoff_seconds']:>8.1f}  {statuses}")
+
+
+def main() -> None:
+    paths = [Path(p) for p in sys.argv[1:]]
+    if not paths:
+        paths = sorted(METRICS_DIR.glob("*.json"), key=lambda p: p.stat().st_mtime)[-1:]
+    if not paths:
+        raise SystemExit(f"Žádné souhrny v {METRICS_DIR}")
+    for p in paths:
+        with open(p, "r", encoding="utf-8") as f:
+            print_summary(json.load(f))
+        print()
+
+
+if __name__ == "__main__":
+    main()
@@ -4,30 +4,28 @@ Importuje deals_complete.csv do Airtable:
 - Vytvoří/aktualizuje Kontakty
 - Vytvoří/aktualizuje Klienti (firmy)
 - Vytvoří záznamy v Projekty / Poptávky s propojením
+
+Zápisy jdou přes žurnál (mutation_journal.py); přerušený import dokončí
+`python3 import_deals_to_airtable.py --resume`. Kontakty a Klienti se dopíšou
+bez duplicit (upsert podle E-mailu / Firmy); Poptávky nemají klíč, posílají se
+po jedné dávce a po pádu může být nejistá nejvýš jedna (skript na ni upozorní).
 """
 
 import csv
-import json
-import time
 from pathlib import Path
 from typing import Dict, List, Optional, Set
 from urllib.parse import quote
 
-import requests
+
+from company_key import normalize_company
+from phones import normalize_phones
+from airtable_api import API_BASE, get_token, request_with_backoff as airtable_request
+from mutation_journal import MutationJournal, resume_requested
 
 BASE_DIR = Path(__file__).parent
 DEALS_CSV = BASE_DIR / "deals_complete.csv"
 
-API_BASE = "https://api.airtable.com/v0"
 BASE_ID = "appEXpqOEIElHzScl"
-BATCH_SIZE = 10
-
-
-def get_token() -> str:
-    mcp_path = Path.home() / ".cursor" / "mcp.json"
-    with open(mcp_path, "r") as f:
-        config = json.load(f)
-    return config["mcpServers"]["airtable"]["env"]["AIRTABLE_API_KEY"]
 
 
 def headers(token: str) -> Dict[str, str]:
@@ -35,34 +33,13 @@ def headers(token: str) -> Dict[str, str]:
 
 
 def request_with_backoff(method: str, url: str, *, hdrs: dict, json_data=None, params=None) -> dict:
-    delay = 1.0
-    for attempt in range(1, 8):
-        resp = requests.request(method, url, headers=hdrs, json=json_data, params=params, timeout=60)
-        if resp.status_code in (429, 500, 502, 503, 504):
-            time.sleep(delay)
-            delay = min(delay * 2, 20)
-            continue
-        if not resp.ok:
-            raise RuntimeError(f"Airtable API error {resp.status_code}: {resp.text[:500]}")
-        return resp.json()
-    raise RuntimeError("Airtable API still failing after retries")
-
-
-def chunked(items: List, size: int) -> List[List]:
-    return [items[i:i + size] for i in range(0, len(items), size)]
+    return airtable_request(method, url, headers=hdrs, json=json_data, params=params)
 
 
 def normalize_email(s: str) -> str:
     return (s or "").strip().lower()
 
 
-def normalize_company(s: str) -> str:
-    s = (s or "").strip().lower()
-    for suffix in [' s.r.o.', ' a.s.', ' s.r.o', ' a.s', ' spol.', ' k.s.', ' gmbh', ' ltd', ' inc', ',']:
-        s = s.replace(suffix, '')
-    return s.strip()
-
-
 def get_existing_records(token: str, table: str, key_field: str) -> Dict[str, str]:
     """Vrátí mapu: normalized_key -> record_id."""
     url = f"{API_BASE}/{BASE_ID}/{quote(table, safe='')}"
@@ -85,36 +62,20 @@ def get_existing_records(token: str, table: str, key_field: str) -> Dict[str, st
     return existing
 
 
-def create_records(token: str, table: str, records: List[dict]) -> List[dict]:
-    """Vytvoří záznamy, vrátí vytvořené."""
-    url = f"{API_BASE}/{BASE_ID}/{quote(table, safe='')}"
-    hdrs = headers(token)
-    created = []
-    
-    for batch in chunked(records, BATCH_SIZE):
-        data = request_with_backoff("POST", url, hdrs=hdrs, json_data={"records": batch, "typecast": True})
-        created.extend(data.get("records", []))
-        time.sleep(0.2)
-    
-    return created
+def create_records(journal: MutationJournal, step: str, table: str, records: List[dict],
+                   merge_on: Optional[List[str]] = None) -> List[dict]:
+    """Vytvoří záznamy (přes žurnál), vrátí vytvořené."""
+    return journal.write(step, "POST", BASE_ID, table, records, merge_on=merge_on)
 
 
-def update_records(token: str, table: str, records: List[dict]) -> List[dict]:
-    """Aktualizuje záznamy."""
-    url = f"{API_BASE}/{BASE_ID}/{quote(table, safe='')}"
-    hdrs = headers(token)
-    updated = []
-    
-    for batch in chunked(records, BATCH_SIZE):
-        data = request_with_backoff("PATCH", url, hdrs=hdrs, json_data={"records": batch, "typecast": True})
-        updated.extend(data.get("records", []))
-        time.sleep(0.2)
-    
-    return updated
+def update_records(journal: MutationJournal, step: str, table: str, records: List[dict]) -> List[dict]:
+    """Aktualizuje záznamy (přes žurnál)."""
+    return journal.write(step, "PATCH", BASE_ID, table, records)
 
 
 def main():
     token = get_token()
+    journal = MutationJournal("import_deals_to_airtable", resume=resume_requested())
     
     # Načti CSV
     print("📋 Načítám deals_complete.csv...")
@@ -150,7 +111,7 @@ def main():
         firma = (deal.get("Firma") or "").strip()
         firma_norm = normalize_company(firma)
         kontakt = (deal.get("Kontakt") or "").strip()
-        telefon = (deal.get("Telefon") or "").strip()
+        telefon = "; ".join(normalize_phones(deal.get("Telefon") or ""))
         stav_email = (deal.get("Stav emailu") or "").strip()
         
         # Kontakt
@@ -209,7 +170,7 @@ def main():
     # 4. Vytvoř nové Kontakty
     if kontakty_to_create:
         print(f"\n➕ Vytvářím {len(kontakty_to_create)} nových kontaktů...")
-        created = create_records(token, "Kontakty", kontakty_to_create)
+        created = create_records(journal, "kontakty_create", "Kontakty", kontakty_to_create, merge_on=["E-mail"])
         for rec in created:
             email = normalize_email(rec.get("fields", {}).get("E-mail", ""))
             if email:
@@ -222,12 +183,12 @@ def main():
         kontakty_to_update = [r for r in kontakty_to_update if r.get("fields")]
         if kontakty_to_update:
             print(f"\n♻️ Aktualizuji {len(kontakty_to_update)} kontaktů...")
-            update_records(token, "Kontakty", kontakty_to_update)
+            update_records(journal, "kontakty_update", "Kontakty", kontakty_to_update)
     
     # 6. Vytvoř nové Klienty
     if klienti_to_create:
         print(f"\n➕ Vytvářím {len(klienti_to_create)} nových firem...")
-        created = create_records(token, "Klienti", klienti_to_create)
+        created = create_records(journal, "klienti_create", "Klienti", klienti_to_create, merge_on=["Firma"])
         for rec in created:
             firma = (rec.get("fields", {}).get("Firma") or "").strip()
             if firma:
@@ -261,9 +222,11 @@ def main():
         
         poptavky_records.append({"fields": fields})
     
-    created = create_records(token, "Projekty / Poptávky", poptavky_records)
+    # bez merge_on (Název není unikátní) – žurnál posílá dávky po jedné
+    created = create_records(journal, "poptavky_create", "Projekty / Poptávky", poptavky_records)
     print(f"   Vytvořeno: {len(created)}")
     
+    journal.finish()
     print("\n✅ Hotovo!")
 
 
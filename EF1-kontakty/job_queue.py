@@ -0,0 +1,479 @@
+#!/usr/bin/env python3
+"""
+Perzistentní fronta úloh pro volání externích API (Apify, Google/DDG/Bing, zápisy do Airtable).
+
+Místo smyčky `for … : volání; time.sleep(2)` skript úlohy zařadí do fronty
+(SQLite jobs.sqlite3) a spustí pracovníky – pro každého poskytovatele vlastní
+pool vláken (apify, search, airtable…). Propustnost tak určuje počet
+pracovníků a backoff při chybách, ne pevné pauzy.
+
+Každá úloha má:
+- klíč (unikátní) – stejná úloha se nezařadí dvakrát; hotová úloha mladší než
+  `fresh_for` se znovu nespouští a skript použije uložený výsledek,
+- stav pending → running → done / dead, počet pokusů a čas dalšího pokusu
+  (exponenciální backoff, RetryLater(s) = počkat přesně s sekund),
+- handler "modul:funkce" – funkce dostane payload (dict) a vrací výsledek (JSON).
+
+Fronta přežije pád i Ctrl+C: rozpracované úlohy se vrátí do pending (úlohy
+mrtvého procesu se převezmou při dalším běhu, cizí běžící úlohy až po vypršení
+zápůjčky), hotové úlohy se neopakují. Přerušený skript stačí spustit znovu.
+
+Proměnná prostředí KONTAKTY_JOBS_DB=... přepíše umístění databáze.
+
+Ve skriptech:
+  from job_queue import open_queue
+  q = open_queue()
+  q.enqueue_many("linkedin_profile", "apify", "update_linkedin_positions:profile_job",
+                 [(f"linkedin_profile:{username}", {"url": url}) for …], fresh_for=30 * 86400)
+  q.run_workers("linkedin_profile")          # pool apify až do maxima limitu (rate_control)
+  hotove = q.results(keys)
+
+Použití:
+  python3 job_queue.py                      # stav front
+  python3 job_queue.py run [fronta]         # dokončí rozpracované úlohy
+  python3 job_queue.py retry-dead [fronta]  # mrtvé úlohy znovu do pending
+  python3 job_queue.py purge [fronta] [--days 30]
+  python3 kontakty.py jobs
+"""
+
+from __future__ import annotations
+
+import argparse
+import importlib
+import json
+import os
+import socket
+import sqlite3
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from rate_control import bounds_for
+
+BASE_DIR = Path(__file__).parent
+DB_PATH = Path(os.getenv("KONTAKTY_JOBS_DB") or BASE_DIR / "jobs.sqlite3")
+
+PENDING, RUNNING, DONE, DEAD = "pending", "running", "done", "dead"
+STATES = (PENDING, RUNNING, DONE, DEAD)
+
+# velikosti poolů mimo HTTP poskytovatele; u ostatních je pool horní mez limitu
+# z rate_control a skutečnou souběžnost drží AIMD limiter
+DEFAULT_POOLS = {"search": 3}
+
+MAX_ATTEMPTS = 5
+BACKOFF_BASE = 2.0
+BACKOFF_MAX = 300.0
+LEASE_SECONDS = 900
+PROGRESS_EVERY = 10.0
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id           INTEGER PRIMARY KEY,
+    key          TEXT NOT NULL UNIQUE,
+    queue        TEXT NOT NULL,
+    provider     TEXT NOT NULL,
+    handler      TEXT NOT NULL,
+    payload      TEXT NOT NULL,
+    state        TEXT NOT NULL DEFAULT 'pending',
+    attempts     INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL DEFAULT 5,
+    not_before   REAL NOT NULL DEFAULT 0,
+    lease_until  REAL,
+    worker       TEXT,
+    result       TEXT,
+    error        TEXT,
+    created      REAL NOT NULL,
+    updated      REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS jobs_claim ON jobs (queue, provider, state, not_before);
+"""
+
+
+class RetryLater(Exception):
+    """Handler: zkus to znovu za `delay` sekund (např. Retry-After) – pokus se nezapočítá."""
+
+    def __init__(self, delay: float, message: str = ""):
+        super().__init__(message or f"retry after {delay:.1f} s")
+        self.delay = float(delay)
+
+
+class PermanentError(Exception):
+    """Handler: úloha nemá smysl opakovat (chybný vstup, 4xx) – rovnou dead."""
+
+
+def _resolve(handler: str):
+    module, _, func = handler.partition(":")
+    return getattr(importlib.import_module(module), func)
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    # zabitý, ale ještě nesklizený proces (zombie) už nic nedokončí
+    try:
+        with open(f"/proc/{pid}/stat", "r") as f:
+            return f.read().rsplit(")", 1)[1].split()[0] != "Z"
+    except (OSError, IndexError):
+        return True
+
+
+class JobQueue:
+    """Fronta nad jedním SQLite souborem; spojení je zvlášť pro každé vlákno."""
+
+    def __init__(self, path: Path = DB_PATH):
+        self.path = Path(path)
+        self.host = socket.gethostname()
+        self._local = threading.local()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn().executescript(SCHEMA)
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None, check_same_thread=False)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA busy_timeout=30000")
+            self._local.conn = conn
+        return conn
+
+    def _worker_id(self) -> str:
+        return f"{self.host}:{os.getpid()}:{threading.get_ident()}"
+
+    # --- zařazení ---
+
+    def enqueue_many(self, queue: str, provider: str, handler: str,
+                     items: Iterable[Tuple[str, dict]], *, max_attempts: int = MAX_ATTEMPTS,
+                     fresh_for: Optional[float] = None) -> int:
+        """
+        Zařadí úlohy (klíč, payload); vrací počet nově zařazených.
+        Existující klíč se přeskočí – kromě mrtvé úlohy a hotové úlohy starší
+        než `fresh_for` sekund (None = hotová platí navždy), ty se zařadí znovu.
+        """
+        now = time.time()
+        stale_before = now - fresh_for if fresh_for is not None else -1.0
+        rows = [(key, queue, provider, handler, json.dumps(payload, ensure_ascii=False),
+                 max_attempts, now, now, stale_before) for key, payload in items]
+        if not rows:
+            return 0
+        conn = self._conn()
+        before = conn.total_changes
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.executemany(
+                """
+                INSERT INTO jobs (key, queue, provider, handler, payload, max_attempts, created, updated)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(key) DO UPDATE SET
+                    state = 'pending', queue = excluded.queue, provider = excluded.provider,
+                    handler = excluded.handler, payload = excluded.payload,
+                    max_attempts = excluded.max_attempts, attempts = 0, not_before = 0,
+                    lease_until = NULL, worker = NULL, result = NULL, error = NULL,
+                    updated = excluded.updated
+                WHERE jobs.state = 'dead' OR (jobs.state = 'done' AND jobs.updated < ?)
+                """,
+                rows,
+            )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return conn.total_changes - before
+
+    def enqueue(self, queue: str, provider: str, handler: str, key: str, payload: dict, **kwargs) -> int:
+        return self.enqueue_many(queue, provider, handler, [(key, payload)], **kwargs)
+
+    # --- zpracování ---
+
+    def claim(self, queue: str, provider: str, lease: float = LEASE_SECONDS) -> Optional[dict]:
+        """Atomicky převezme další splatnou úlohu (nebo úlohu s propadlou zápůjčkou)."""
+        now = time.time()
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(
+                """
+                SELECT id, key, handler, payload, attempts FROM jobs
+                WHERE queue = ? AND provider = ?
+                  AND ((state = 'pending' AND not_before <= ?) OR (state = 'running' AND lease_until < ?))
+                ORDER BY not_before, id LIMIT 1
+                """,
+                (queue, provider, now, now),
+            ).fetchone()
+            if row is not None:
+                conn.execute(
+                    "UPDATE jobs SET state = 'running', attempts = attempts + 1, lease_until = ?,"
+                    " worker = ?, updated = ? WHERE id = ?",
+                    (now + lease, self._worker_id(), now, row["id"]),
+                )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        if row is None:
+            return None
+        job = dict(row)
+        job["payload"] = json.loads(job["payload"])
+        job["attempts"] += 1
+        return job
+
+    def complete(self, job_id: int, result=None) -> None:
+        self._conn().execute(
+            "UPDATE jobs SET state = 'done', result = ?, error = NULL, lease_until = NULL, updated = ? WHERE id = ?",
+            (json.dumps(result, ensure_ascii=False), time.time(), job_id),
+        )
+
+    def fail(self, job_id: int, error: BaseException) -> str:
+        """Zapíše chybu; vrací nový stav (pending s backoffem, nebo dead)."""
+        conn = self._conn()
+        row = conn.execute("SELECT attempts, max_attempts FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        attempts, max_attempts = row["attempts"], row["max_attempts"]
+        now = time.time()
+        message = f"{type(error).__name__}: {error}"[:500]
+        if isinstance(error, RetryLater):
+            state, delay = PENDING, error.delay
+            attempts -= 1
+        elif isinstance(error, PermanentError) or attempts >= max_attempts:
+            state, delay = DEAD, 0.0
+        else:
+            state, delay = PENDING, min(BACKOFF_MAX, BACKOFF_BASE * 2 ** (attempts - 1))
+        conn.execute(
+            "UPDATE jobs SET state = ?, attempts = ?, not_before = ?, error = ?, lease_until = NULL,"
+            " updated = ? WHERE id = ?",
+            (state, attempts, now + delay, message, now, job_id),
+        )
+        return state
+
+    def release(self, job_id: int) -> None:
+        """Vrátí rozpracovanou úlohu do fronty bez započtení pokusu (Ctrl+C)."""
+        self._conn().execute(
+            "UPDATE jobs SET state = 'pending', attempts = MAX(attempts - 1, 0), lease_until = NULL,"
+            " worker = NULL, updated = ? WHERE id = ? AND state = 'running'",
+            (time.time(), job_id),
+        )
+
+    def recover(self) -> int:
+        """Úlohy, které drží mrtvý proces na tomto stroji (nebo tento proces z dřívějška), vrátí do pending."""
+        conn = self._conn()
+        stale = []
+        for row in conn.execute("SELECT id, worker FROM jobs WHERE state = 'running'"):
+            host, _, rest = (row["worker"] or "").partition(":")
+            pid = rest.split(":", 1)[0]
+            if host == self.host and pid.isdigit() and (int(pid) == os.getpid() or not _pid_alive(int(pid))):
+                stale.append(row["id"])
+        for job_id in stale:
+            self.release(job_id)
+        return len(stale)
+
+    def _next_due(self, queue: str, provider: str) -> Optional[float]:
+        """Za kolik sekund bude splatná další úloha poskytovatele; None = žádná nečeká."""
+        row = self._conn().execute(
+            """
+            SELECT MIN(CASE WHEN state = 'pending' THEN not_before ELSE lease_until END) AS due
+            FROM jobs WHERE queue = ? AND provider = ?
+              AND (state = 'pending' OR (state = 'running' AND worker NOT LIKE ?))
+            """,
+            (queue, provider, f"{self.host}:{os.getpid()}:%"),
+        ).fetchone()
+        if row["due"] is None:
+            return None
+        return max(0.0, row["due"] - time.time())
+
+    def _work(self, queue: str, provider: str, lease: float, active: Dict[int, int],
+              stop: threading.Event) -> None:
+        ident = threading.get_ident()
+        while not stop.is_set():
+            job = self.claim(queue, provider, lease)
+            if job is None:
+                due = self._next_due(queue, provider)
+                if due is None:
+                    return
+                stop.wait(min(due, 1.0) or 0.05)
+                continue
+            active[ident] = job["id"]
+            try:
+                result = _resolve(job["handler"])(job["payload"])
+            except Exception as e:
+                state = self.fail(job["id"], e)
+                if state == DEAD:
+                    print(f"   ☠️  {job['key']}: {str(e)[:100]}", flush=True)
+            else:
+                self.complete(job["id"], result)
+            finally:
+                active.pop(ident, None)
+
+    def run_workers(self, queue: str, pools: Optional[Dict[str, int]] = None, *,
+                    lease: float = LEASE_SECONDS, progress: bool = True) -> Dict[str, int]:
+        """
+        Zpracuje frontu – pro každého poskytovatele `pools[provider]` vláken –
+        a vrátí počty podle stavu. Bez velikosti poolu platí DEFAULT_POOLS,
+        jinak maximum limitu poskytovatele (rate_control.bounds_for).
+        """
+        self.recover()
+        providers = [r["provider"] for r in self._conn().execute(
+            "SELECT DISTINCT provider FROM jobs WHERE queue = ? AND state IN ('pending', 'running')", (queue,))]
+        sizes = {p: max(1, int((pools or {}).get(p) or DEFAULT_POOLS.get(p) or bounds_for(p).max))
+                 for p in providers}
+        if sizes and progress:
+            pools_text = ", ".join(f"{p}×{n}" for p, n in sizes.items())
+            print(f"   ⚙️  Fronta {queue}: {self.counts(queue).get(PENDING, 0)} úloh čeká, pracovníci {pools_text}",
+                  flush=True)
+
+        stop = threading.Event()
+        active: Dict[int, int] = {}
+        threads = [
+            threading.Thread(target=self._work, args=(queue, provider, lease, active, stop),
+                             name=f"jobs-{provider}-{i}", daemon=True)
+            for provider, size in sizes.items() for i in range(size)
+        ]
+        for t in threads:
+            t.start()
+        last = time.monotonic()
+        try:
+            while any(t.is_alive() for t in threads):
+                for t in threads:
+                    t.join(timeout=0.5)
+                    if t.is_alive():
+                        break
+                if progress and time.monotonic() - last >= PROGRESS_EVERY:
+                    last = time.monotonic()
+                    c = self.counts(queue)
+                    print(f"   ⏳ {queue}: hotovo {c.get(DONE, 0)}, čeká {c.get(PENDING, 0)}, "
+                          f"běží {c.get(RUNNING, 0)}, mrtvé {c.get(DEAD, 0)}", flush=True)
+        except KeyboardInterrupt:
+            stop.set()
+            for job_id in list(active.values()):
+                self.release(job_id)
+            print(f"\n⏸️  Přerušeno – rozpracované úlohy vráceny do fronty {queue}.", flush=True)
+            raise
+        return self.counts(queue)
+
+    # --- výsledky a správa ---
+
+    def results(self, keys: Iterable[str]) -> Dict[str, object]:
+        """klíč → výsledek hotových úloh."""
+        out = {}
+        keys = list(keys)
+        conn = self._conn()
+        for i in range(0, len(keys), 500):
+            chunk = keys[i:i + 500]
+            marks = ",".join("?" * len(chunk))
+            for row in conn.execute(f"SELECT key, result FROM jobs WHERE state = 'done' AND key IN ({marks})", chunk):
+                out[row["key"]] = json.loads(row["result"]) if row["result"] is not None else None
+        return out
+
+    def forget(self, keys: Iterable[str]) -> int:
+        """Smaže hotové úlohy s danými klíči – stejný klíč se příště zařadí znovu."""
+        keys = list(keys)
+        deleted = 0
+        conn = self._conn()
+        for i in range(0, len(keys), 500):
+            chunk = keys[i:i + 500]
+            marks = ",".join("?" * len(chunk))
+            deleted += conn.execute(f"DELETE FROM jobs WHERE state = 'done' AND key IN ({marks})", chunk).rowcount
+        return deleted
+
+    def counts(self, queue: Optional[str] = None) -> Dict[str, int]:
+        sql = "SELECT state, COUNT(*) AS n FROM jobs"
+        args: tuple = ()
+        if queue:
+            sql += " WHERE queue = ?"
+            args = (queue,)
+        return {r["state"]: r["n"] for r in self._conn().execute(sql + " GROUP BY state", args)}
+
+    def queues(self) -> List[dict]:
+        rows = self._conn().execute(
+            "SELECT queue, provider, state, COUNT(*) AS n, MAX(updated) AS updated FROM jobs"
+            " GROUP BY queue, provider, state ORDER BY queue, provider"
+        )
+        return [dict(r) for r in rows]
+
+    def retry_dead(self, queue: Optional[str] = None) -> int:
+        sql = "UPDATE jobs SET state = 'pending', attempts = 0, not_before = 0, updated = ? WHERE state = 'dead'"
+        args: tuple = (time.time(),)
+        if queue:
+            sql += " AND queue = ?"
+            args += (queue,)
+        return self._conn().execute(sql, args).rowcount
+
+    def purge(self, queue: Optional[str] = None, older_than_days: float = 0) -> int:
+        sql = "DELETE FROM jobs WHERE state IN ('done', 'dead') AND updated < ?"
+        args: tuple = (time.time() - older_than_days * 86400,)
+        if queue:
+            sql += " AND queue = ?"
+            args += (queue,)
+        deleted = self._conn().execute(sql, args).rowcount
+        self._conn().execute("VACUUM")
+        return deleted
+
+
+_queues: Dict[Path, JobQueue] = {}
+_queues_lock = threading.Lock()
+
+
+def open_queue(path: Optional[Path] = None) -> JobQueue:
+    """Sdílená instance fronty pro daný soubor (výchozí DB_PATH)."""
+    path = Path(path or DB_PATH)
+    with _queues_lock:
+        if path not in _queues:
+            _queues[path] = JobQueue(path)
+        return _queues[path]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Perzistentní fronta úloh (jobs.sqlite3)")
+    parser.add_argument("action", nargs="?", default="status", choices=["status", "run", "retry-dead", "purge"])
+    parser.add_argument("queue", nargs="?", help="jen tato fronta")
+    parser.add_argument("--db", type=Path, default=DB_PATH, help="soubor fronty")
+    parser.add_argument("--days", type=float, default=30, help="purge: hotové/mrtvé starší než N dní")
+    parser.add_argument("--pool", action="append", default=[], metavar="PROVIDER=N", help="run: velikost poolu")
+    args = parser.parse_args()
+
+    if BASE_DIR.as_posix() not in sys.path:
+        sys.path.insert(0, BASE_DIR.as_posix())
+    q = open_queue(args.db)
+
+    if args.action == "run":
+        pools = {}
+        for spec in args.pool:
+            provider, _, n = spec.partition("=")
+            pools[provider] = int(n or 1)
+        names = [args.queue] if args.queue else sorted({r["queue"] for r in q.queues()
+                                                         if r["state"] in (PENDING, RUNNING)})
+        for name in names:
+            c = q.run_workers(name, pools)
+            print(f"✅ {name}: hotovo {c.get(DONE, 0)}, mrtvé {c.get(DEAD, 0)}")
+        return
+    if args.action == "retry-dead":
+        print(f"🔁 Znovu zařazeno {q.retry_dead(args.queue)} mrtvých úloh")
+        return
+    if args.action == "purge":
+        print(f"🧹 Smazáno {q.purge(args.queue, args.days)} úloh starších než {args.days:g} dní")
+        return
+
+    rows = [r for r in q.queues() if not args.queue or r["queue"] == args.queue]
+    if not rows:
+        print(f"📭 Fronta je prázdná ({q.path.name})")
+        return
+    print(f"{'fronta':<24} {'poskytovatel':<12} {'stav':<8} {'počet':>7}  poslední změna")
+    for r in rows:
+        when = time.strftime("%Y-%m-%d %H:%M", time.localtime(r["updated"]))
+        print(f"{r['queue']:<24} {r['provider']:<12} {r['state']:<8} {r['n']:>7}  {when}")
+    dead = q._conn().execute(
+        "SELECT key, error FROM jobs WHERE state = 'dead'" + (" AND queue = ?" if args.queue else "")
+        + " ORDER BY updated DESC LIMIT 5", (args.queue,) if args.queue else ()).fetchall()
+    if dead:
+        print("\n☠️  Poslední mrtvé úlohy:")
+        for r in dead:
+            print(f"   {r['key'][:50]:<50} {(r['error'] or '')[:70]}")
+
+
+if __name__ == "__main__":
+    main()
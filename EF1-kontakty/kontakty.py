@@ -0,0 +1,247 @@
+#!/usr/bin/env python3
+"""
+Jednotný vstup pro všechny skripty – `kontakty <příkaz> [argumenty]`.
+
+Příkaz spustí příslušný skript ve stejném procesu (jako `python3 skript.py`);
+těžké závislosti (requests, apify_client, openpyxl…) se načtou až ve chvíli,
+kdy je příkaz opravdu potřebuje – samotný výpis příkazů nic z toho neimportuje.
+
+Příkazy jde řetězit oddělovačem `+`. Kroky běží v jednom procesu, takže
+sdílí načtené moduly, Airtable token (airtable_api.get_token), HTTP session
+s keep-alive spojeními i cache CSV; metriky (http_metrics) se ukládají
+po každém kroku zvlášť. Řetěz se zastaví na prvním kroku s chybou
+(--keep-going pokračuje dál).
+
+Použití:
+  python3 kontakty.py                          # seznam příkazů
+  python3 kontakty.py merge
+  python3 kontakty.py upsert --csv kontakty_unified.csv --dry-run
+  python3 kontakty.py merge + upsert + klienti + link + link-hr + osloveni + audit
+  python3 kontakty.py --time dedup + dedup-deals
+  python3 kontakty.py shell                    # příkazy po řádcích ze stdin (jedna session)
+
+Alias v shellu:  alias kontakty='python3 ~/…/EF1-kontakty/kontakty.py'
+"""
+
+import os
+import sys
+import time
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+CHAIN_SEPARATOR = "+"
+
+# příkaz → (modul, popis); pořadí skupin odpovídá WORKFLOW_KONTAKTY.md
+COMMANDS = {
+    # Kontakty (CSV)
+    "merge": ("merge_contacts", "Sloučí zdrojová CSV do kontakty_unified.csv"),
+    "diff": ("csv_diff", "Klíčový diff dvou verzí CSV"),
+    "snapshot": ("snapshots", "Snapshoty CSV (take / list / restore)"),
+    "search": ("search_index", "Fulltextové hledání v kontaktech, dealech a klientech"),
+    "editor": ("csv_editor_server", "Lokální server pro csv_editor.html"),
+    # Airtable – kontakty a klienti
+    "upsert": ("airtable_upsert", "Upsert kontakty_unified.csv do Airtable (podle Email)"),
+    "klienti": ("create_klienti", "Založí Klienty pro unikátní firmy z Kontaktů"),
+    "link": ("propoj_kontakty_klienti", "Propojí Kontakty s Klienty podle firmy"),
+    "link-hr": ("propoj_hr_kontakty", "Propojí HR kontakty s Klienty"),
+    "osloveni": ("doplnit_osloveni_v2", "Doplní chybějící oslovení (5. pád)"),
+    "osloveni-v1": ("doplnit_osloveni", "Doplní oslovení – původní verze"),
+    "jmena": ("oprav_jmena", "Opraví prohozená jména/příjmení"),
+    "dedup": ("najdi_duplicity_klienti", "Najde duplicitní Klienty"),
+    "dedup-merge": ("sluc_duplicity_klienti", "Sloučí duplicitní Klienty"),
+    "dedup-kontakty": ("analyze_duplicates", "Analýza duplicitních kontaktů v Airtable"),
+    "oznac": ("oznac_deal_nebo_poptavka", "Označí kontakty: deal vs. poptávka"),
+    "audit": ("audit_airtable", "Audit konzistence Airtable"),
+    # Airtable – dealy
+    "deals-merge": ("merge_all_deals_v2", "Sloučí všechny zdroje dealů do CSV"),
+    "deals-import": ("import_deals_to_airtable", "Importuje deals_complete.csv do Airtable"),
+    "deals-doplnit": ("doplnit_deals", "Doplní Deals z Pipedrive a Filip akce"),
+    "deals-kopiruj": ("kopiruj_deals", "Zkopíruje Deals do Deals - doplněk"),
+    "deals-preusporadat": ("preusporadat_deals", "Přeuspořádá Deals - doplněk"),
+    "deals-nazvy": ("vytvor_nazvy_dealu_v2", "Vytvoří názvy dealů"),
+    "deals-nazvy-datum": ("aktualizuj_nazvy_s_datem", "Doplní datum do názvů dealů"),
+    "deals-datumy": ("oprav_datumy_v_nazvech", "Opraví datumy v názvech dealů"),
+    "deals-rok": ("doplnit_rok_deals", "Doplní rok k datům v Deals - doplněk"),
+    "deals-poptavky": ("normalizuj_co_poptavali", "Normalizuje „Co poptávali“"),
+    "deals-reakce": ("konvertuj_reakce_select", "Převede Reakce/výsledek na single select"),
+    "deals-reakce-hodnoty": ("ziskej_reakce_hodnoty", "Vypíše hodnoty Reakce/výsledek"),
+    "dedup-deals": ("najdi_duplicity_deals", "Najde duplicitní Deals"),
+    "dedup-deals-merge": ("sluc_duplicity", "Sloučí duplicitní Deals"),
+    "link-deals": ("propoj_deals_kontakty", "Propojí Deals s Kontakty podle emailu"),
+    "link-deals-klienti": ("propoj_deals_klienti", "Propojí Deals - doplněk s Klienty"),
+    "link-klienti-deals": ("propoj_klienti_deals", "Propojí Klienty s Deals"),
+    "link-klienti-doplnek": ("propoj_klienti_deals_doplnek", "Propojí Klienty s Deals - doplněk"),
+    "unlink-deals": ("odpoj_deals_kontakty", "Odpojí Deals od Kontaktů"),
+    "klienti-poptavky": ("doplnit_klienti_poptavky", "Doplní „Co poptává“ do Klientů"),
+    "kontakty-z-deals": ("vytvor_kontakty_z_deals", "Vytvoří chybějící kontakty z Deals"),
+    "kontakty-filip": ("doplnit_kontakty_filip", "Doplní kontakty k dealům z Filip akce"),
+    "kontakty-emaily": ("doplnit_kontakty_email_analyza", "Doplní kontakty z analýzy emailů"),
+    "enrich": ("enrich_deals_and_contacts", "Obohacení Deals a Kontaktů"),
+    # LinkedIn
+    "linkedin-search": ("find_linkedin_from_google_search", "Najde LinkedIn URL přes Apify"),
+    "linkedin-update": ("update_linkedin_positions", "Aktualizuje pozice a firmy z LinkedIn (Apify)"),
+    "linkedin-google": ("google_search_to_linkedin", "Google/DDG odkazy → LinkedIn profily"),
+    # Nástroje
+    "pipeline": ("pipeline", "Celé obnovení kontaktů jako DAG (merge → Airtable → audit)"),
+    "jobs": ("job_queue", "Fronta úloh externích API (stav / run / retry-dead / purge)"),
+    "journal": ("mutation_journal", "Žurnál zápisů do Airtable (stav / replay / discard)"),
+    "schema": ("airtable_schema", "Schéma Airtable base z cache (tabulky, pole, id)"),
+    "kopie": ("table_copy", "Mapy id kopií tabulek (list / reset)"),
+    "migrace": ("field_migration", "Stav migrací polí Airtable"),
+    "graf": ("link_graph", "Graf vazeb Kontakty ↔ Klienti ↔ Deals (sirotci, stupně)"),
+    "changesets": ("change_sets", "Plány změn Airtable (list / show / apply / fetch)"),
+    "bench": ("benchmark", "Benchmark na syntetických datech"),
+    "fake-airtable": ("fake_airtable", "Lokální náhrada Airtable API"),
+    "metrics": ("http_metrics", "Výpis souhrnu metrik HTTP volání"),
+}
+
+GROUPS = [
+    ("Kontakty (CSV)", "merge"),
+    ("Airtable – kontakty a klienti", "upsert"),
+    ("Airtable – dealy", "deals-merge"),
+    ("LinkedIn", "linkedin-search"),
+    ("Nástroje", "pipeline"),
+]
+
+
+def print_commands(out=sys.stdout) -> None:
+    print("Použití: kontakty [--time] [--keep-going] <příkaz> [argumenty] [+ <příkaz> …]", file=out)
+    starts = {first: title for title, first in GROUPS}
+    for name, (module, desc) in COMMANDS.items():
+        if name in starts:
+            print(f"\n{starts[name]}:", file=out)
+        print(f"  {name:<22} {desc}", file=out)
+    print("\n  shell                  Příkazy po řádcích ze stdin v jedné session", file=out)
+    print("\nNápověda příkazu: kontakty <příkaz> --help", file=out)
+
+
+def split_chain(argv: list) -> list:
+    """["merge", "+", "upsert", "--dry-run"] → [["merge"], ["upsert", "--dry-run"]]"""
+    steps, current = [], []
+    for arg in argv:
+        if arg == CHAIN_SEPARATOR:
+            if current:
+                steps.append(current)
+            current = []
+        else:
+            current.append(arg)
+    if current:
+        steps.append(current)
+    return steps
+
+
+def run_command(name: str, args: list) -> int:
+    """Spustí příkaz ve stávajícím procesu jako `python3 <modul>.py args…`; vrací exit kód."""
+    import runpy
+
+    if name not in COMMANDS:
+        print(f"❌ Neznámý příkaz: {name}", file=sys.stderr)
+        close = [c for c in COMMANDS if c.startswith(name[:3])]
+        if close:
+            print(f"   Nemysleli jste: {', '.join(close)}?", file=sys.stderr)
+        return 2
+    module = COMMANDS[name][0]
+
+    metrics = sys.modules.get("http_metrics")
+    if metrics is not None:
+        metrics.METRICS.reset(module)
+
+    saved_argv = sys.argv
+    sys.argv = [os.path.join(BASE_DIR, f"{module}.py")] + list(args)
+    try:
+        runpy.run_module(module, run_name="__main__", alter_sys=False)
+        code = 0
+    except SystemExit as e:
+        code = e.code if isinstance(e.code, int) else (0 if e.code is None else 1)
+        if e.code is not None and not isinstance(e.code, int):
+            print(e.code, file=sys.stderr)
+    finally:
+        sys.argv = saved_argv
+        metrics = sys.modules.get("http_metrics")
+        if metrics is not None:
+            metrics.METRICS.emit()
+            metrics.METRICS.reset()
+    return code
+
+
+def run_chain(steps: list, keep_going: bool = False, timing: bool = False) -> int:
+    worst = 0
+    for i, step in enumerate(steps):
+        name, args = step[0], step[1:]
+        if len(steps) > 1:
+            print(f"\n▶️  [{i + 1}/{len(steps)}] {' '.join(step)}", flush=True)
+        start = time.perf_counter()
+        try:
+            code = run_command(name, args)
+        except Exception as e:
+            import traceback
+
+            traceback.print_exc()
+            print(f"❌ {name}: {e}", file=sys.stderr)
+            code = 1
+        if timing:
+            print(f"⏱️  {name}: {time.perf_counter() - start:.2f} s (exit {code})", file=sys.stderr)
+        if code:
+            worst = worst or code
+            if not keep_going:
+                if i + 1 < len(steps):
+                    print(f"⛔ {name} skončil s chybou {code} – zbylé kroky přeskočeny.", file=sys.stderr)
+                return code
+    return worst
+
+
+def shell(keep_going: bool, timing: bool) -> int:
+    """Čte příkazy po řádcích (i s `+`) a spouští je v jedné session."""
+    import shlex
+
+    interactive = sys.stdin.isatty()
+    worst = 0
+    while True:
+        try:
+            line = input("kontakty> " if interactive else "")
+        except EOFError:
+            break
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        if line in ("exit", "quit"):
+            break
+        if line in ("help", "?"):
+            print_commands()
+            continue
+        steps = split_chain(shlex.split(line))
+        code = run_chain(steps, keep_going=keep_going, timing=timing)
+        worst = worst or code
+        if code and not keep_going and not interactive:
+            return code
+    return worst
+
+
+def main(argv: list = None) -> int:
+    argv = list(sys.argv[1:] if argv is None else argv)
+    keep_going = timing = False
+    while argv and argv[0].startswith("--"):
+        opt = argv.pop(0)
+        if opt == "--keep-going":
+            keep_going = True
+        elif opt == "--time":
+            timing = True
+        elif opt == "--help":
+            print_commands()
+            return 0
+        else:
+            print(f"❌ Neznámý přepínač: {opt}", file=sys.stderr)
+            return 2
+    if not argv or argv[0] in ("-h", "help"):
+        print_commands()
+        return 0
+
+    if BASE_DIR not in sys.path:
+        sys.path.insert(0, BASE_DIR)
+    if argv[0] == "shell":
+        return shell(keep_going, timing)
+    return run_chain(split_chain(argv), keep_going=keep_going, timing=timing)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+"""
+Graf vazeb mezi záznamy Airtable (Kontakty ↔ Klienti ↔ Deals) v paměti.
+
+Graf se postaví jednou ze snapshotu tabulek (change_sets.load_tables) a drží
+sousedy oběma směry pro každé vazební pole: vazba Deals.Klienti se promítne
+i ke klientovi, i kdyby jeho zpětné pole Deals chybělo nebo bylo neúplné.
+Sousedé podle tabulky (neighbours, has, degree, orphans) spojují všechna
+vazební pole na danou tabulku – Klienti.Kontakty i Klienti.HR Kontakt; dotazy
+na jedno pole jsou linked, referrers, degree_by_field a orphans_by_field.
+Dotazy jsou O(1) na záznam:
+
+  g.neighbours(deal_id, "Klienti")   # id klientů dealu (obousměrně, přes všechna pole)
+  g.linked(deal_id, "Klienti")       # vazby z pole záznamu v původním pořadí
+  g.referrers(kontakt_id, "Klienti", "Kontakty")  # klienti, jejichž pole Kontakty ho obsahuje
+  g.degree(klient_id, "Kontakty")    # počet kontaktů klienta
+  g.has(klient_id, "Deals")          # má klient nějaký deal?
+  g.orphans("Kontakty", "Klienti")   # kontakty bez klienta
+  g.orphans_by_field("Deals", "Kontakt")   # dealy s prázdným polem Kontakt
+  g.fields(rec_id)                   # pole záznamu ze snapshotu
+
+Vazební pole se berou ze schématu base (airtable_schema, cache), bez práv ke
+schématu z DEFAULT_LINKS. Vazby na záznamy, které v načtené tabulce nejsou
+(smazané), se do grafu nepřidají a počítají se v `dangling`.
+
+Použití:
+  python3 link_graph.py                  # souhrn grafu (snapshot z disku, chybějící tabulky stáhne)
+  python3 link_graph.py --refresh        # z čerstvě stažených tabulek
+"""
+
+from __future__ import annotations
+
+import argparse
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+BASE_ID = "appEXpqOEIElHzScl"
+TABLES = ["Kontakty", "Klienti", "Deals"]
+
+# vazební pole → propojená tabulka (když schéma není k dispozici)
+DEFAULT_LINKS = {
+    "Kontakty": {"Klienti": "Klienti", "Deals": "Deals"},
+    "Klienti": {"Kontakty": "Kontakty", "Deals": "Deals", "HR Kontakt": "Kontakty"},
+    "Deals": {"Kontakty": "Kontakty", "Kontakt": "Kontakty", "Klienti": "Klienti"},
+    "Deals - doplněk": {"Klienti": "Klienti", "Kontakty": "Kontakty"},
+}
+
+_EMPTY: frozenset = frozenset()
+
+
+def link_fields(base_id: str, tables: Iterable[str]) -> Dict[str, Dict[str, str]]:
+    """Tabulka → {vazební pole: propojená tabulka} ze schématu base, jinak DEFAULT_LINKS."""
+    from airtable_schema import schema
+
+    try:
+        s = schema(base_id)
+    except (RuntimeError, OSError, ValueError):     # bez práv ke schématu / offline
+        s = None
+    out = {}
+    for table in tables:
+        t = s.table(table) if s else None
+        if t is None:
+            out[table] = dict(DEFAULT_LINKS.get(table, {}))
+            continue
+        out[table] = {f["name"]: s.table_name((f.get("options") or {}).get("linkedTableId", ""))
+                      for f in t.get("fields", []) or [] if f.get("type") == "multipleRecordLinks"}
+    return out
+
+
+class LinkGraph:
+    """Záznamy několika tabulek a jejich vazby oběma směry."""
+
+    def __init__(self):
+        self.records: Dict[str, dict] = {}
+        self.table_of: Dict[str, str] = {}
+        self.ids: Dict[str, List[str]] = {}
+        self.links: Dict[str, Dict[str, str]] = {}
+        self.dangling: Counter = Counter()      # (tabulka, pole) → počet vazeb na neexistující záznam
+        self._adj: Dict[str, Dict[str, Set[str]]] = {}
+        self._rev: Dict[Tuple[str, str], Dict[str, Set[str]]] = {}   # (tabulka, pole) → cíl → zdroje
+
+    @classmethod
+    def build(cls, tables: Dict[str, List[dict]], links: Dict[str, Dict[str, str]]) -> "LinkGraph":
+        g = cls()
+        g.links = links
+        for table, records in tables.items():
+            g.ids[table] = [r["id"] for r in records]
+            for r in records:
+                g.records[r["id"]] = r
+                g.table_of[r["id"]] = table
+        for table, records in tables.items():
+            for field, other in links.get(table, {}).items():
+                loaded = other in tables
+                for r in records:
+                    for target in r.get("fields", {}).get(field) or []:
+                        if loaded and target not in g.records:
+                            g.dangling[(table, field)] += 1
+                            continue
+                        g._adj.setdefault(r["id"], {}).setdefault(other, set()).add(target)
+                        g._adj.setdefault(target, {}).setdefault(table, set()).add(r["id"])
+                        g._rev.setdefault((table, field), {}).setdefault(target, set()).add(r["id"])
+        return g
+
+    # --- dotazy ---
+
+    def fields(self, rec_id: str) -> dict:
+        rec = self.records.get(rec_id)
+        return rec.get("fields", {}) if rec else {}
+
+    def neighbours(self, rec_id: str, table: str) -> Set[str]:
+        """Id záznamů tabulky `table` propojených s rec_id (libovolným směrem)."""
+        return self._adj.get(rec_id, {}).get(table, _EMPTY)
+
+    def has(self, rec_id: str, table: str) -> bool:
+        return bool(self._adj.get(rec_id, {}).get(table))
+
+    def degree(self, rec_id: str, table: Optional[str] = None) -> int:
+        """Počet propojených záznamů (tabulky `table`, jinak všech) přes všechna vazební pole."""
+        adj = self._adj.get(rec_id, {})
+        if table is not None:
+            return len(adj.get(table, _EMPTY))
+        return sum(len(ids) for ids in adj.values())
+
+    def linked(self, rec_id: str, field: str) -> List[str]:
+        """Vazby z pole záznamu v pořadí jako v Airtable (jen existující záznamy)."""
+        table = self.table_of.get(rec_id)
+        other = self.links.get(table, {}).get(field)
+        ids = self.fields(rec_id).get(field) or []
+        if other in self.ids:
+            return [i for i in ids if i in self.records]
+        return list(ids)
+
+    def referrers(self, rec_id: str, table: str, field: str) -> Set[str]:
+        """Záznamy tabulky `table`, jejichž vazební pole `field` obsahuje rec_id."""
+        return self._rev.get((table, field), {}).get(rec_id, _EMPTY)
+
+    def orphans(self, table: str, other: str) -> List[str]:
+        """Záznamy tabulky bez jediné vazby na `other` (libovolným polem a směrem)."""
+        return [i for i in self.ids.get(table, []) if not self.has(i, other)]
+
+    def degree_by_field(self, rec_id: str, field: str) -> int:
+        """Počet existujících záznamů ve vazebním poli `field` záznamu."""
+        return len(set(self.linked(rec_id, field)))
+
+    def orphans_by_field(self, table: str, field: str) -> List[str]:
+        """Záznamy tabulky, jejichž pole `field` neodkazuje na žádný existující záznam."""
+        linked: Set[str] = set()
+        for sources in self._rev.get((table, field), {}).values():
+            linked |= sources
+        return [i for i in self.ids.get(table, []) if i not in linked]
+
+    def first_with(self, rec_id: str, field: str, value_field: str) -> str:
+        """Hodnota `value_field` prvního propojeného záznamu (pole `field`), který ji má vyplněnou."""
+        for other_id in self.linked(rec_id, field):
+            value = self.fields(other_id).get(value_field)
+            if value:
+                return value
+        return ""
+
+    def summary(self) -> Dict[str, dict]:
+        out = {}
+        for table, ids in self.ids.items():
+            linked_tables = sorted({t for i in ids for t in self._adj.get(i, {})})
+            out[table] = {
+                "records": len(ids),
+                "links": {t: {"linked": sum(1 for i in ids if self.has(i, t)),
+                              "max_degree": max((self.degree(i, t) for i in ids), default=0)}
+                          for t in linked_tables},
+            }
+        return out
+
+
+def load_graph(base_id: str = BASE_ID, tables: Optional[List[str]] = None, *,
+               refresh: bool = True) -> LinkGraph:
+    """Načte tabulky (change_sets snapshot; refresh = stáhnout znovu) a postaví z nich graf."""
+    from change_sets import load_tables
+
+    tables = tables or TABLES
+    return graph_from(load_tables(base_id, tables, refresh=refresh), base_id)
+
+
+def graph_from(tables: Dict[str, List[dict]], base_id: str = BASE_ID) -> LinkGraph:
+    """Graf z už načtených tabulek (např. v plánu change_sets)."""
+    return LinkGraph.build(tables, link_fields(base_id, tables))
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Graf vazeb Kontakty ↔ Klienti ↔ Deals")
+    ap.add_argument("--refresh", action="store_true", help="Tabulky stáhnout znovu místo snapshotu")
+    ap.add_argument("tables", nargs="*", help=f"Tabulky (výchozí: {', '.join(TABLES)})")
+    args = ap.parse_args()
+
+    g = load_graph(BASE_ID, args.tables or TABLES, refresh=args.refresh)
+    for table, info in g.summary().items():
+        print(f"\n📋 {table}: {info['records']} záznamů")
+        for other, stats in info["links"].items():
+            orphans = info["records"] - stats["linked"]
+            print(f"   ↔ {other:<18} propojeno {stats['linked']:>6}, bez vazby {orphans:>6}, "
+                  f"max {stats['max_degree']} na záznam")
+    for (table, field), count in sorted(g.dangling.items()):
+        print(f"⚠️  {table}.{field}: {count} vazeb na neexistující záznam")
+
+
+if __name__ == "__main__":
+    main()
@@ -8,17 +8,19 @@ Komplexní merge všech deal/poptávka dat:
 """
 
 import csv
-import re
 from pathlib import Path
 from collections import defaultdict
 
+from pipedrive_index import load_pipedrive
+from company_key import normalize_company
+from suppression import load_suppression
+
 BASE_DIR = Path(__file__).parent
 
 # Soubory
 AT_DEALS = BASE_DIR / "AT - Deals - List 1.csv"
 PIPEDRIVE = BASE_DIR / "deals-16044442-64.csv"
 FILIP_AKCE = BASE_DIR / "Filip akce - poptávky - List 1.csv"
-MEJLING = BASE_DIR / "Final mejling 2025 (AIP a AImpact) - List 1.csv"
 OUTPUT = BASE_DIR / "deals_complete.csv"
 
 
@@ -32,97 +34,28 @@ def normalize_email(s):
     return normalize(s).rstrip()
 
 
-def normalize_company(s):
-    """Normalizuje název firmy pro matching."""
-    s = normalize(s)
-    # Odstraň právní formy
-    for suffix in [' s.r.o.', ' a.s.', ' s.r.o', ' a.s', ' spol.', ' k.s.', 
-                   ' gmbh', ' ltd', ' inc', ' n.v.', ' ag', ' se', ',']:
-        s = s.replace(suffix, '')
-    return s.strip()
-
-
-def get_best_email(emails):
-    """Vybere nejlepší email z listu."""
-    for e in emails:
-        if e and '@' in e:
-            # Preferuj pracovní emaily
-            if not any(x in e.lower() for x in ['gmail', 'seznam', 'email.cz', 'centrum.cz']):
-                return e.strip()
-    for e in emails:
-        if e and '@' in e:
-            return e.strip()
-    return ""
-
-
-def get_best_phone(phones):
-    """Vybere nejlepší telefon z listu."""
-    for p in phones:
-        if p and len(re.sub(r'\D', '', p)) >= 9:
-            return p.strip()
-    return ""
-
-
 def parse_bounced_emails():
-    """Načte bounced emaily z mejlingu."""
-    bounced = set()
-    with open(MEJLING, "r", encoding="utf-8") as f:
-        reader = csv.reader(f)
-        next(reader, None)  # skip header
-        for row in reader:
-            if len(row) >= 4:
-                email = normalize_email(row[0])
-                status = row[3].strip() if len(row) > 3 else ""
-                if status == "EMAIL_BOUNCED" and email:
-                    bounced.add(email)
-    return bounced
+    """Bounced emaily ze sdíleného suppression indexu (mejling + starý DLM export)."""
+    return load_suppression()
 
 
 def parse_pipedrive():
-    """Načte Pipedrive export - vrátí dict by company a by email."""
-    by_company = defaultdict(list)
-    by_email = {}
-    
-    with open(PIPEDRIVE, "r", encoding="utf-8") as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            deal_name = row.get("Deal - Název", "").strip()
-            company = row.get("Deal - Organizace", "").strip()
-            contact = row.get("Deal - Kontaktní osoba", "").strip()
-            value = row.get("Deal - Hodnota", "").strip()
-            
-            # Emaily
-            emails = [
-                row.get("Osoba - E-mail - Práce", ""),
-                row.get("Osoba - E-mail - Domov", ""),
-                row.get("Osoba - E-mail - Ostatní", "")
-            ]
-            email = get_best_email(emails)
-            
-            # Telefony
-            phones = [
-                row.get("Osoba - Telefon - Práce", ""),
-                row.get("Osoba - Telefon - Mobil", ""),
-                row.get("Osoba - Telefon - Domov", ""),
-                row.get("Osoba - Telefon - Ostatní", "")
-            ]
-            phone = get_best_phone(phones)
-            
-            record = {
-                "deal_name": deal_name,
-                "company": company,
-                "contact": contact,
-                "email": email,
-                "phone": phone,
-                "value": value,
-                "source": "Pipedrive"
-            }
-            
-            if company:
-                by_company[normalize_company(company)].append(record)
-            if email:
-                by_email[normalize_email(email)] = record
-    
+    """Načte Pipedrive export (sdílený index) - vrátí dict by company a by email."""
+    pd = load_pipedrive(PIPEDRIVE)
+    records = [
+        {
+            "deal_name": r["deal_name"],
+            "company": r["firma"],
+            "contact": r["kontakt"],
+            "email": r["email"],
+            "phone": r["telefon"],
+            "value": r["hodnota"],
+            "source": "Pipedrive"
+        }
+        for r in pd.records
+    ]
+    by_company = defaultdict(list, {k: [records[i] for i in ids] for k, ids in pd.by_company.items()})
+    by_email = {k: records[ids[-1]] for k, ids in pd.by_email.items()}
     return by_company, by_email
 
 
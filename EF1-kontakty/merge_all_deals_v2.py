@@ -17,13 +17,17 @@ from pathlib import Path
 from collections import defaultdict
 from io import StringIO
 
+from csv_cache import read_rows
+from pipedrive_index import load_pipedrive
+from company_key import normalize_company
+from suppression import load_suppression
+
 BASE_DIR = Path(__file__).parent
 
 # Soubory
 AT_DEALS = BASE_DIR / "AT - Deals - List 1.csv"
 PIPEDRIVE = BASE_DIR / "deals-16044442-64.csv"
 FILIP_AKCE = BASE_DIR / "Filip akce - poptávky - List 1.csv"
-MEJLING = BASE_DIR / "Final mejling 2025 (AIP a AImpact) - List 1.csv"
 OUTPUT = BASE_DIR / "deals_complete.csv"
 
 
@@ -35,14 +39,6 @@ def normalize_email(s):
     return normalize(s)
 
 
-def normalize_company(s):
-    s = normalize(s)
-    for suffix in [' s.r.o.', ' a.s.', ' s.r.o', ' a.s', ' spol.', ' k.s.', 
-                   ' gmbh', ' ltd', ' inc', ' n.v.', ' ag', ' se', ',']:
-        s = s.replace(suffix, '')
-    return s.strip()
-
-
 def clean_name(s):
     """Vyčistí název - odstraní datumy, ceny, statusy."""
     if not s:
@@ -68,82 +64,28 @@ def extract_price(s):
     return ""
 
 
-def get_best_email(emails):
-    for e in emails:
-        if e and '@' in e:
-            if not any(x in e.lower() for x in ['gmail', 'seznam', 'email.cz', 'centrum.cz']):
-                return e.strip()
-    for e in emails:
-        if e and '@' in e:
-            return e.strip()
-    return ""
-
-
-def get_best_phone(phones):
-    for p in phones:
-        if p and len(re.sub(r'\D', '', p)) >= 9:
-            return p.strip()
-    return ""
-
-
 def parse_bounced_emails():
-    """Načte bounced emaily."""
-    bounced = set()
-    with open(MEJLING, "r", encoding="utf-8") as f:
-        reader = csv.reader(f)
-        next(reader, None)
-        for row in reader:
-            if len(row) >= 4:
-                email = normalize_email(row[0])
-                status = row[3].strip() if len(row) > 3 else ""
-                if status == "EMAIL_BOUNCED" and email:
-                    bounced.add(email)
-    return bounced
+    """Bounced emaily ze sdíleného suppression indexu (mejling + starý DLM export)."""
+    return load_suppression()
 
 
 def parse_pipedrive():
-    """Načte Pipedrive - vrací dict by email."""
-    by_email = {}
-    by_company = defaultdict(list)
-    
-    with open(PIPEDRIVE, "r", encoding="utf-8") as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            deal_name = row.get("Deal - Název", "").strip()
-            company = row.get("Deal - Organizace", "").strip()
-            contact = row.get("Deal - Kontaktní osoba", "").strip()
-            value = row.get("Deal - Hodnota", "").strip()
-            
-            emails = [
-                row.get("Osoba - E-mail - Práce", ""),
-                row.get("Osoba - E-mail - Domov", ""),
-                row.get("Osoba - E-mail - Ostatní", "")
-            ]
-            email = get_best_email(emails)
-            
-            phones = [
-                row.get("Osoba - Telefon - Práce", ""),
-                row.get("Osoba - Telefon - Mobil", ""),
-                row.get("Osoba - Telefon - Domov", ""),
-                row.get("Osoba - Telefon - Ostatní", "")
-            ]
-            phone = get_best_phone(phones)
-            
-            record = {
-                "nazev": clean_name(deal_name),
-                "firma": company,
-                "kontakt": contact,
-                "email": email,
-                "telefon": phone,
-                "hodnota": value,
-                "zdroj": "Pipedrive"
-            }
-            
-            if email:
-                by_email[normalize_email(email)] = record
-            if company:
-                by_company[normalize_company(company)].append(record)
-    
+    """Načte Pipedrive (sdílený index) - vrací dict by email."""
+    pd = load_pipedrive(PIPEDRIVE)
+    records = [
+        {
+            "nazev": clean_name(r["deal_name"]),
+            "firma": r["firma"],
+            "kontakt": r["kontakt"],
+            "email": r["email"],
+            "telefon": r["telefon"],
+            "hodnota": r["hodnota"],
+            "zdroj": "Pipedrive"
+        }
+        for r in pd.records
+    ]
+    by_email = {k: records[ids[-1]] for k, ids in pd.by_email.items()}
+    by_company = defaultdict(list, {k: [records[i] for i in ids] for k, ids in pd.by_company.items()})
     return by_email, by_company
 
 
@@ -151,34 +93,32 @@ def parse_at_deals():
     """Načte AT - Deals pomocí csv modulu (správné parsování uvozovek)."""
     records = []
     
-    with open(AT_DEALS, "r", encoding="utf-8") as f:
-        reader = csv.reader(f)
-        for row in reader:
-            if len(row) < 3:
-                continue
-            
-            kontakt = row[0].strip() if len(row) > 0 else ""
-            email = row[1].strip() if len(row) > 1 else ""
-            firma = row[2].strip() if len(row) > 2 else ""
-            typ = row[3].strip() if len(row) > 3 else ""
-            prirazeno = row[4].strip() if len(row) > 4 else ""
-            status = row[5].strip() if len(row) > 5 else ""
-            poznamky = row[6].strip() if len(row) > 6 else ""
-            
-            # Přeskoč řádky bez dat
-            if not kontakt and not firma and not email:
-                continue
-            
-            records.append({
-                "kontakt": kontakt,
-                "email": email,
-                "firma": firma,
-                "typ": typ,
-                "prirazeno": prirazeno,
-                "status": status,
-                "poznamky": poznamky,
-                "zdroj": "AT Deals"
-            })
+    for row in read_rows(AT_DEALS):
+        if len(row) < 3:
+            continue
+        
+        kontakt = row[0].strip() if len(row) > 0 else ""
+        email = row[1].strip() if len(row) > 1 else ""
+        firma = row[2].strip() if len(row) > 2 else ""
+        typ = row[3].strip() if len(row) > 3 else ""
+        prirazeno = row[4].strip() if len(row) > 4 else ""
+        status = row[5].strip() if len(row) > 5 else ""
+        poznamky = row[6].strip() if len(row) > 6 else ""
+        
+        # Přeskoč řádky bez dat
+        if not kontakt and not firma and not email:
+            continue
+        
+        records.append({
+            "kontakt": kontakt,
+            "email": email,
+            "firma": firma,
+            "typ": typ,
+            "prirazeno": prirazeno,
+            "status": status,
+            "poznamky": poznamky,
+            "zdroj": "AT Deals"
+        })
     
     return records
 
@@ -187,43 +127,41 @@ def parse_filip_akce():
     """Načte Filip akce pomocí csv modulu (správné parsování víceřádkových polí)."""
     records = []
     
-    with open(FILIP_AKCE, "r", encoding="utf-8") as f:
-        reader = csv.reader(f)
-        for row in reader:
-            if len(row) < 4:
-                continue
-            
-            firma = row[0].strip() if len(row) > 0 else ""
-            if not firma:
-                continue
-            
-            datum = row[1].strip() if len(row) > 1 else ""
-            misto = row[2].strip() if len(row) > 2 else ""
-            typ = row[3].strip() if len(row) > 3 else ""
-            status_poptavky = row[4].strip() if len(row) > 4 else ""
-            kategorie = row[5].strip() if len(row) > 5 else ""
-            ucastnici = row[6].strip() if len(row) > 6 else ""
-            popis = row[7].strip() if len(row) > 7 else ""
-            cena = row[8].strip() if len(row) > 8 else ""
-            potvrzeni = row[9].strip() if len(row) > 9 else ""
-            interni_pozn = row[10].strip() if len(row) > 10 else ""
-            vysledek = row[11].strip() if len(row) > 11 else ""
-            
-            records.append({
-                "firma": firma,
-                "datum": datum,
-                "misto": misto,
-                "typ": typ,  # workshop, přednáška, etc.
-                "status_poptavky": status_poptavky,
-                "kategorie": kategorie,  # Interní přednáška/workshop, Veřejná konference, etc.
-                "ucastnici": ucastnici,
-                "popis": popis,
-                "cena": cena,
-                "potvrzeni": potvrzeni,
-                "interni_pozn": interni_pozn,
-                "vysledek": vysledek,
-                "zdroj": "Filip akce"
-            })
+    for row in read_rows(FILIP_AKCE):
+        if len(row) < 4:
+            continue
+        
+        firma = row[0].strip() if len(row) > 0 else ""
+        if not firma:
+            continue
+        
+        datum = row[1].strip() if len(row) > 1 else ""
+        misto = row[2].strip() if len(row) > 2 else ""
+        typ = row[3].strip() if len(row) > 3 else ""
+        status_poptavky = row[4].strip() if len(row) > 4 else ""
+        kategorie = row[5].strip() if len(row) > 5 else ""
+        ucastnici = row[6].strip() if len(row) > 6 else ""
+        popis = row[7].strip() if len(row) > 7 else ""
+        cena = row[8].strip() if len(row) > 8 else ""
+        potvrzeni = row[9].strip() if len(row) > 9 else ""
+        interni_pozn = row[10].strip() if len(row) > 10 else ""
+        vysledek = row[11].strip() if len(row) > 11 else ""
+        
+        records.append({
+            "firma": firma,
+            "datum": datum,
+            "misto": misto,
+            "typ": typ,  # workshop, přednáška, etc.
+            "status_poptavky": status_poptavky,
+            "kategorie": kategorie,  # Interní přednáška/workshop, Veřejná konference, etc.
+            "ucastnici": ucastnici,
+            "popis": popis,
+            "cena": cena,
+            "potvrzeni": potvrzeni,
+            "interni_pozn": interni_pozn,
+            "vysledek": vysledek,
+            "zdroj": "Filip akce"
+        })
     
     return records
 
@@ -14,6 +14,11 @@ import os
 from pathlib import Path
 from collections import defaultdict
 
+from csv_cache import read_rows
+from phones import normalize_phones
+from snapshots import take_snapshot
+from suppression import load_suppression
+
 # --- Config: directory and exclude pattern ---
 DIR = Path(__file__).resolve().parent
 EXCLUDE_PATTERN = re.compile(r"merged_emails", re.I)
@@ -188,26 +193,13 @@ def extract_hr_from_text(text: str) -> list[str]:
     return list(dict.fromkeys(found))
 
 def read_csv_rows(path: Path, has_header: bool):
-    with open(path, "r", encoding="utf-8", newline="") as f:
-        reader = csv.reader(f)
-        if has_header:
-            next(reader, None)
-        for row in reader:
-            yield row
+    # parsování přes sloupcovou cache (csv_cache.py) – opakované běhy nečtou CSV znovu
+    yield from read_rows(path, has_header=has_header)
 
 def main():
-    # 0) Load bounced emails
-    bounced_emails = set()
-    bounced_file = DIR / "merged_emails_old_dlm_2024 vcetne bounced.csv"
-    if bounced_file.exists():
-        with open(bounced_file, "r", encoding="utf-8", newline="") as f:
-            reader = csv.DictReader(f)
-            for row in reader:
-                email = norm_email(row.get("Email", ""))
-                bounced = row.get("Bounced", "").strip().lower()
-                if email and bounced == "bounced":
-                    bounced_emails.add(email)
-        print(f"Načteno {len(bounced_emails)} bounced emailů")
+    # 0) Load bounced emails (sdílený suppression index – suppression.py)
+    bounced_emails = load_suppression()
+    print(f"Načteno {len(bounced_emails)} bounced emailů")
     
     # 1) Collect all rows keyed by normalized email
     by_email = defaultdict(lambda: {
@@ -257,7 +249,8 @@ def main():
 
             t = safe_get(row, cfg["telefon"])
             if t:
-                rec["telefon"].add(t)
+                # kanonický tvar E.164 (phones.py) – "00420 724…" a "724…" splynou
+                rec["telefon"].update(normalize_phones(t))
             # Get LinkedIn from specified column(s) OR search in all columns
             linkedin_found = False
             
@@ -365,6 +358,8 @@ def main():
 
     # 3) Write CSV
     out_path = DIR / "kontakty_unified.csv"
+    if out_path.exists():
+        take_snapshot(out_path, label="pred_merge")
     with open(out_path, "w", encoding="utf-8", newline="") as f:
         w = csv.DictWriter(f, fieldnames=target_columns)
         w.writeheader()
@@ -0,0 +1,266 @@
+#!/usr/bin/env python3
+"""
+Write-ahead žurnál zápisů do Airtable – pád uprostřed synchronizace stojí jen rozpracované dávky.
+
+Skript (airtable_upsert, import_deals_to_airtable, enrich_deals_and_contacts)
+posílá dávkové zápisy přes MutationJournal.write(). Ten nejdřív do
+.journal/<skript>.jsonl zapíše (a fsyncne) celý plán kroku – všechny dávky –
+a teprve pak dávky odesílá; po každé odpovědi zapíše vrácená id záznamů.
+Řádky žurnálu:
+  {"op": "start", …}                          začátek běhu (argumenty)
+  {"op": "plan", "step", "method", "table", "batches", "merge_on"}   celý krok jedním řádkem
+  {"op": "send", "step", "batch"}             dávka odeslána (odpověď zatím nepřišla)
+  {"op": "done", "step", "batch", "records"}  vrácené záznamy (id + pole)
+  {"op": "drop", "step"}                      Airtable plán odmítl (4xx) a nic z něj neprošlo
+  {"op": "end"}                               běh doběhl – žurnál se přesune do .journal/done/
+
+Když skript spadne, žurnál zůstane otevřený a další běh bez --resume odmítne
+začít (hrozily by duplicity). `--resume` spustí skript znovu, ale kroky, které
+už v žurnálu mají plán, použijí uložený plán místo nově spočítaného: hotové
+dávky se neposílají (vrátí se uložená id, takže navazující propojení dostanou
+správná id), zbytek se dopošle. Rozpracované vytváření (POST) s klíčovým polem
+(`merge_on`, např. E-mail) se dopošle jako upsert podle klíče, takže nevznikne
+duplicita ani když Airtable dávku stihl zapsat. Vytváření bez klíče se posílá
+po jedné dávce: po pádu je nejistá nejvýš jedna (≤ 10 záznamů) – pošle se
+znovu a skript vypíše upozornění, ať ji zkontroluješ na duplicity.
+
+Když Airtable krok odmítne chybou, kterou nemá smysl opakovat (4xx – např.
+UNKNOWN_FIELD_NAME), a žádná jeho dávka neprošla, plán kroku se zahodí: opravený
+běh (třeba s jinými přepínači) ho spočítá znovu a nepotřebuje --resume.
+
+Použití:
+  python3 import_deals_to_airtable.py --resume
+  python3 mutation_journal.py                      # nedokončené žurnály
+  python3 mutation_journal.py replay enrich_deals_and_contacts   # dopošle naplánované dávky bez skriptu
+  python3 mutation_journal.py discard airtable_upsert            # zahodí nedokončený žurnál
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional
+from urllib.parse import quote
+
+from airtable_api import API_BASE, BATCH_SIZE, AirtableError, get_token, request_with_backoff
+from rate_control import bounds_for
+
+BASE_DIR = Path(__file__).parent
+JOURNAL_DIR = Path(os.getenv("KONTAKTY_JOURNAL_DIR") or BASE_DIR / ".journal")
+RESUME_FLAG = "--resume"
+
+
+def _read(path: Path) -> List[dict]:
+    entries = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                entries.append(json.loads(line))
+            except json.JSONDecodeError:
+                break  # useknutý poslední řádek (pád při zápisu) – plán dávky se neodeslal
+    return entries
+
+
+class JournalStep:
+    """Plán jednoho kroku (např. „kontakty_create“) a stav jeho dávek."""
+
+    def __init__(self, plan: dict):
+        self.name = plan["step"]
+        self.plan = plan
+        self.batches: List[List[dict]] = plan["batches"]
+        self.sent: set = set()
+        self.done: Dict[int, List[dict]] = {}
+
+    @property
+    def pending(self) -> List[int]:
+        return [i for i in range(len(self.batches)) if i not in self.done]
+
+
+def _load_steps(entries: List[dict]) -> Dict[str, JournalStep]:
+    steps: Dict[str, JournalStep] = {}
+    for e in entries:
+        if e["op"] == "plan":
+            steps[e["step"]] = JournalStep(e)
+        elif e["op"] == "send":
+            steps[e["step"]].sent.add(e["batch"])
+        elif e["op"] == "done":
+            steps[e["step"]].done[e["batch"]] = e["records"]
+        elif e["op"] == "drop":
+            steps.pop(e["step"], None)
+    return steps
+
+
+class MutationJournal:
+    """Žurnál jednoho běhu skriptu; `with MutationJournal("skript", resume=…) as journal:`."""
+
+    def __init__(self, name: str, *, resume: bool = False, directory: Path = JOURNAL_DIR):
+        self.name = name
+        self.path = Path(directory) / f"{name}.jsonl"
+        self.lock = threading.Lock()
+        self.steps: Dict[str, JournalStep] = {}
+        self.resumed = False
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+
+        entries = _read(self.path) if self.path.exists() else []
+        if not _load_steps(entries):
+            entries = []  # běh spadl dřív, než cokoli naplánoval (nebo vše zahodil) – není na co navazovat
+        if entries:
+            if not resume:
+                planned = sum(len(s.batches) for s in _load_steps(entries).values())
+                raise SystemExit(
+                    f"⛔ Předchozí běh {name} nedoběhl ({self.path}, {planned} naplánovaných dávek).\n"
+                    f"   Pokračuj: python3 {name}.py {RESUME_FLAG}\n"
+                    f"   nebo ho zahoď: python3 mutation_journal.py discard {name}"
+                )
+            self.steps = _load_steps(entries)
+            self.resumed = True
+            done = sum(len(s.done) for s in self.steps.values())
+            total = sum(len(s.batches) for s in self.steps.values())
+            print(f"↩️  Navazuji na nedokončený běh: {done}/{total} dávek už zapsáno ({self.path.name})")
+        self._file = open(self.path, "a" if entries else "w", encoding="utf-8")
+        self._append({"op": "start", "argv": sys.argv[1:], "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                      "resume": self.resumed})
+
+    def __enter__(self) -> "MutationJournal":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if exc_type is None:
+            self.finish()
+            return
+        self._file.close()
+        if not self.steps:
+            self.path.unlink()
+
+    def _append(self, entry: dict) -> None:
+        line = json.dumps(entry, ensure_ascii=False)
+        with self.lock:
+            self._file.write(line + "\n")
+            self._file.flush()
+            os.fsync(self._file.fileno())
+
+    def finish(self) -> None:
+        """Běh doběhl – žurnál se uzavře a archivuje do .journal/done/."""
+        self._append({"op": "end"})
+        self._file.close()
+        archive = self.path.parent / "done"
+        archive.mkdir(exist_ok=True)
+        os.replace(self.path, archive / f"{self.name}_{time.strftime('%Y%m%d-%H%M%S')}.jsonl")
+
+    # --- zápisy ---
+
+    def write(self, step: str, method: str, base_id: str, table: str, records: List[dict], *,
+              merge_on: Optional[List[str]] = None, typecast: bool = True) -> List[dict]:
+        """
+        Zapíše záznamy po dávkách (POST/PATCH) se žurnálem; vrací záznamy
+        z odpovědí Airtable (id + pole) v pořadí dávek. Při --resume se pro krok,
+        který už má plán, použije uložený plán a `records` se ignorují.
+        """
+        planned = self.steps.get(step)
+        if planned is None:
+            # celý plán kroku jedním řádkem – useknutý zápis = krok se neplánoval vůbec
+            plan = {"op": "plan", "step": step, "method": method, "base": base_id, "table": table,
+                    "merge_on": merge_on, "typecast": typecast,
+                    "batches": [records[i:i + BATCH_SIZE] for i in range(0, len(records), BATCH_SIZE)]}
+            self._append(plan)
+            planned = self.steps[step] = JournalStep(plan)
+        elif planned.pending:
+            print(f"   ↩️  {step}: {len(planned.done)} dávek hotových, dopisuji {len(planned.pending)}")
+        try:
+            self._send(planned)
+        except AirtableError:
+            if not planned.done:
+                # plán Airtable odmítl a nic z něj neprošlo – opravený běh ho musí spočítat znovu
+                self._append({"op": "drop", "step": step})
+                del self.steps[step]
+            raise
+        return [rec for i in range(len(planned.batches)) for rec in planned.done.get(i, [])]
+
+    def _send(self, step: JournalStep) -> None:
+        pending = step.pending
+        if not pending:
+            return
+        hdrs = {"Authorization": f"Bearer {get_token()}", "Content-Type": "application/json"}
+        plan = step.plan
+        url = f"{API_BASE}/{plan['base']}/{quote(plan['table'], safe='')}"
+
+        def send(i: int) -> None:
+            method, body = plan["method"], {"records": step.batches[i]}
+            if plan.get("typecast"):
+                body["typecast"] = True
+            if i in step.sent and method == "POST":
+                if plan.get("merge_on"):
+                    # mohla už projít – upsert podle klíče ji nezdvojí
+                    method = "PATCH"
+                    body["performUpsert"] = {"fieldsToMergeOn": plan["merge_on"]}
+                else:
+                    print(f"   ⚠️  {step.name}: dávka {i} mohla projít už minule – zkontroluj duplicity")
+            self._append({"op": "send", "step": step.name, "batch": i})
+            data = request_with_backoff(method, url, headers=hdrs, json=body)
+            returned = [{"id": r["id"], "fields": r.get("fields", {})} for r in data.get("records", [])]
+            self._append({"op": "done", "step": step.name, "batch": i, "records": returned})
+            step.done[i] = returned
+
+        workers = max(1, min(len(pending), int(bounds_for("airtable").max)))
+        if plan["method"] == "POST" and not plan.get("merge_on"):
+            # bez klíče nejde nejistou dávku dopsat bez rizika duplicit – ať je po pádu nejvýš jedna
+            workers = 1
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            for future in [pool.submit(send, i) for i in pending]:
+                future.result()
+
+
+def resume_requested(argv: Optional[List[str]] = None) -> bool:
+    return RESUME_FLAG in (sys.argv if argv is None else argv)
+
+
+def main() -> None:
+    args = sys.argv[1:]
+    action = args[0] if args else "status"
+
+    if action == "status":
+        paths = sorted(JOURNAL_DIR.glob("*.jsonl"))
+        if not paths:
+            print("✅ Žádný nedokončený běh.")
+            return
+        for path in paths:
+            steps = _load_steps(_read(path))
+            print(f"⏸️  {path.stem}")
+            for step in steps.values():
+                print(f"   {step.name:<24} {len(step.done):>5}/{len(step.batches)} dávek"
+                      + (f", rozpracováno {len(step.sent - set(step.done))}" if step.sent - set(step.done) else ""))
+        return
+
+    if action in ("replay", "discard") and len(args) > 1:
+        name = Path(args[1]).stem
+        path = JOURNAL_DIR / f"{name}.jsonl"
+        if not path.exists():
+            raise SystemExit(f"❌ Nedokončený žurnál {name} neexistuje.")
+        if action == "discard":
+            archive = JOURNAL_DIR / "done"
+            archive.mkdir(exist_ok=True)
+            os.replace(path, archive / f"{name}_{time.strftime('%Y%m%d-%H%M%S')}.discarded.jsonl")
+            print(f"🗑️  Žurnál {name} zahozen (archivován).")
+            return
+        with MutationJournal(name, resume=True) as journal:
+            for step in journal.steps.values():
+                if step.pending:
+                    print(f"⬆️  {step.name}: {len(step.pending)} dávek")
+                    journal._send(step)
+        print("✅ Naplánované dávky dopsány. Kroky, které se naplánovat nestihly, doplní nový běh skriptu.")
+        return
+
+    print(__doc__)
+    sys.exit(2)
+
+
+if __name__ == "__main__":
+    main()
@@ -3,25 +3,16 @@
 Najde potenciální duplicity v Deals tabulce.
 """
 
-import json
-import time
 import re
-from pathlib import Path
 from typing import Dict, List
 from urllib.parse import quote
 from collections import defaultdict
 
-import requests
-
-API_BASE = "https://api.airtable.com/v0"
-BASE_ID = "appEXpqOEIElHzScl"
 
+from company_key import company_key
+from airtable_api import API_BASE, get_token, request_with_backoff as airtable_request
 
-def get_token() -> str:
-    mcp_path = Path.home() / ".cursor" / "mcp.json"
-    with open(mcp_path, "r") as f:
-        config = json.load(f)
-    return config["mcpServers"]["airtable"]["env"]["AIRTABLE_API_KEY"]
+BASE_ID = "appEXpqOEIElHzScl"
 
 
 def headers(token: str) -> Dict[str, str]:
@@ -29,34 +20,17 @@ def headers(token: str) -> Dict[str, str]:
 
 
 def request_with_backoff(method: str, url: str, *, hdrs: dict, json_data=None, params=None) -> dict:
-    delay = 1.0
-    for attempt in range(1, 8):
-        resp = requests.request(method, url, headers=hdrs, json=json_data, params=params, timeout=60)
-        if resp.status_code in (429, 500, 502, 503, 504):
-            time.sleep(delay)
-            delay = min(delay * 2, 20)
-            continue
-        if not resp.ok:
-            raise RuntimeError(f"Airtable API error {resp.status_code}: {resp.text[:500]}")
-        return resp.json()
-    raise RuntimeError("Airtable API still failing after retries")
+    return airtable_request(method, url, headers=hdrs, json=json_data, params=params)
+
+
+# Slova popisující akci, která se v Deals dostala do názvu firmy, a "pharma"
+# (původní normalizace ho v Deals vynechávala: "Zentiva Pharma" = "Zentiva")
+EVENT_WORDS = {"konference", "firemni", "workshop", "prednaska", "pharma"}
 
 
 def normalize_company(s):
-    """Normalizuje název firmy pro porovnání."""
-    s = (s or "").strip().lower()
-    # Odstraň právní formy a zkratky
-    for suffix in [' s.r.o.', ' a.s.', ' s.r.o', ' a.s', ' spol.', ' k.s.', 
-                   ' gmbh', ' ltd', ' inc', ' n.v.', ' ag', ' se', ',',
-                   ' czech republic', ' česká republika', ' cz', ' sk',
-                   ' pharma', ' group', ' holding', '(eng)', '(sk)',
-                   ' konference', ' firemní', ' workshop', ' přednáška']:
-        s = s.replace(suffix, '')
-    # Odstraň závorky a jejich obsah
-    s = re.sub(r'\([^)]*\)', '', s)
-    # Odstraň speciální znaky
-    s = re.sub(r'[^a-záčďéěíňóřšťúůýž0-9\s]', '', s)
-    return s.strip()
+    """Normalizuje název firmy pro porovnání (sdílený klíč bez slov popisujících akci)."""
+    return " ".join(t for t in company_key(s or "").tokens if t not in EVENT_WORDS)
 
 
 def extract_date(text):
@@ -70,30 +44,8 @@ def extract_date(text):
     return None
 
 
-def main():
-    token = get_token()
-    hdrs = headers(token)
-    
-    deals_url = f"{API_BASE}/{BASE_ID}/{quote('Deals', safe='')}"
-    
-    # Načti všechny deals
-    print("🔎 Načítám všechny deals...")
-    all_deals = []
-    offset = None
-    
-    while True:
-        params = {"pageSize": 100}
-        if offset:
-            params["offset"] = offset
-        data = request_with_backoff("GET", deals_url, hdrs=hdrs, params=params)
-        all_deals.extend(data.get("records", []))
-        offset = data.get("offset")
-        if not offset:
-            break
-    
-    print(f"   Celkem {len(all_deals)} deals")
-    
-    # Seskup podle normalizované firmy
+def group_by_company(all_deals: List[dict]) -> List[dict]:
+    """Seskupí deals (záznamy Airtable) podle normalizované firmy; vrací skupiny s více deals."""
     by_company = defaultdict(list)
     for rec in all_deals:
         fields = rec.get("fields", {})
@@ -110,25 +62,68 @@ def main():
                 "poznamka": fields.get("Poznámka / Detaily", "")[:200] if fields.get("Poznámka / Detaily") else ""
             })
     
-    # Najdi duplicity
-    print("\n🔍 Hledám duplicity...\n")
     duplicates = []
-    
     for firma_norm, deals in by_company.items():
         if len(deals) > 1:
-            # Ověř, že to jsou skutečné duplicity (podobné datum/akce)
-            # Porovnej datumy v poznámkách
-            dates = []
-            for d in deals:
-                date = extract_date(d["poznamka"])
-                dates.append(date)
-            
-            # Pokud mají stejné nebo žádné datum, jsou to pravděpodobně duplicity
+            # Porovnej datumy v poznámkách (podobné datum = stejná akce)
+            dates = [extract_date(d["poznamka"]) for d in deals]
             duplicates.append({
                 "firma_norm": firma_norm,
                 "deals": deals,
                 "dates": dates
             })
+    return duplicates
+
+
+def duplicate_reason(dup: dict) -> str:
+    """Důvod, proč je skupina skutečná duplicita; "" = není."""
+    deals = dup["deals"]
+    
+    # Stejný email = určitě duplicita
+    emails = [d["email"] for d in deals if d["email"]]
+    if len(set(emails)) == 1 and len(emails) > 1:
+        return f"Stejný email: {emails[0]}"
+    
+    # Stejné datum = pravděpodobně duplicita, různá data = různé akce
+    non_null_dates = [d for d in dup["dates"] if d]
+    if len(non_null_dates) > 1:
+        if len(set(non_null_dates)) == 1:
+            return f"Stejné datum: {non_null_dates[0]}"
+        return ""
+    
+    if len(deals) == 2:
+        # Pokud jeden má detaily a druhý ne, pravděpodobně duplicita
+        details = [len(d["poznamka"]) for d in deals]
+        if max(details) > 50 and min(details) < 30:
+            return "Jeden záznam má více detailů"
+    return ""
+
+
+def main():
+    token = get_token()
+    hdrs = headers(token)
+    
+    deals_url = f"{API_BASE}/{BASE_ID}/{quote('Deals', safe='')}"
+    
+    # Načti všechny deals
+    print("🔎 Načítám všechny deals...")
+    all_deals = []
+    offset = None
+    
+    while True:
+        params = {"pageSize": 100}
+        if offset:
+            params["offset"] = offset
+        data = request_with_backoff("GET", deals_url, hdrs=hdrs, params=params)
+        all_deals.extend(data.get("records", []))
+        offset = data.get("offset")
+        if not offset:
+            break
+    
+    print(f"   Celkem {len(all_deals)} deals")
+    
+    print("\n🔍 Hledám duplicity...\n")
+    duplicates = group_by_company(all_deals)
     
     if not duplicates:
         print("✅ Žádné duplicity nenalezeny!")
@@ -141,39 +136,9 @@ def main():
     
     for dup in duplicates:
         deals = dup["deals"]
-        dates = dup["dates"]
-        
-        # Ověř, zda jsou to skutečné duplicity
-        # Stejný email = určitě duplicita
-        emails = [d["email"] for d in deals if d["email"]]
-        unique_emails = set(emails)
-        
-        # Stejné nebo podobné datum = pravděpodobně duplicita
-        non_null_dates = [d for d in dates if d]
-        
-        is_duplicate = False
-        reason = ""
-        
-        if len(unique_emails) == 1 and len(emails) > 1:
-            is_duplicate = True
-            reason = f"Stejný email: {emails[0]}"
-        elif len(non_null_dates) > 1:
-            # Porovnej datumy
-            date_set = set(non_null_dates)
-            if len(date_set) == 1:
-                is_duplicate = True
-                reason = f"Stejné datum: {non_null_dates[0]}"
-            else:
-                # Různá data = různé akce, ne duplicita
-                continue
-        elif len(deals) == 2:
-            # Pokud jeden má detaily a druhý ne, pravděpodobně duplicita
-            details = [len(d["poznamka"]) for d in deals]
-            if max(details) > 50 and min(details) < 30:
-                is_duplicate = True
-                reason = "Jeden záznam má více detailů"
+        reason = duplicate_reason(dup)
         
-        if is_duplicate:
+        if reason:
             real_duplicates.append(dup)
             print(f"\n🔴 DUPLICITA: {dup['firma_norm'].upper()}")
             print(f"   Důvod: {reason}")
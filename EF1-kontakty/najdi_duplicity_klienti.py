@@ -3,23 +3,15 @@
 Najde duplicitní klienty v Airtable.
 """
 
-import json
-import time
-import re
-from pathlib import Path
 from typing import Dict, List
 from urllib.parse import quote
 from collections import defaultdict
 
-import requests
-
-API_BASE = "https://api.airtable.com/v0"
-BASE_ID = "appEXpqOEIElHzScl"
 
+from company_key import normalize_company
+from airtable_api import API_BASE, get_token, request_with_backoff as airtable_request
 
-def get_token() -> str:
-    with open(Path.home() / ".cursor" / "mcp.json") as f:
-        return json.load(f)["mcpServers"]["airtable"]["env"]["AIRTABLE_API_KEY"]
+BASE_ID = "appEXpqOEIElHzScl"
 
 
 def headers(token: str) -> Dict[str, str]:
@@ -27,32 +19,28 @@ def headers(token: str) -> Dict[str, str]:
 
 
 def request_with_backoff(method: str, url: str, *, hdrs: dict, json_data=None, params=None) -> dict:
-    delay = 1.0
-    for attempt in range(1, 8):
-        resp = requests.request(method, url, headers=hdrs, json=json_data, params=params, timeout=60)
-        if resp.status_code in (429, 500, 502, 503, 504):
-            time.sleep(delay)
-            delay = min(delay * 2, 20)
-            continue
-        if not resp.ok:
-            raise RuntimeError(f"Airtable API error {resp.status_code}: {resp.text[:500]}")
-        return resp.json()
-    raise RuntimeError("Airtable API still failing after retries")
+    return airtable_request(method, url, headers=hdrs, json=json_data, params=params)
 
 
-def normalize_company(s):
-    """Normalizuje název firmy pro porovnání."""
-    s = (s or "").strip().lower()
-    # Odstraň právní formy
-    for suffix in [' s.r.o.', ' a.s.', ' s.r.o', ' a.s', ' spol.', ' k.s.', 
-                   ' gmbh', ' ltd', ' ltd.', ' inc', ' n.v.', ' ag', ' se',
-                   ' czech republic', ' česká republika', ' cz', ' sk',
-                   ' czech', ' slovakia', ' group', ' holding']:
-        s = s.replace(suffix, '')
-    # Odstraň speciální znaky
-    s = re.sub(r'[,\.\-\(\)]', ' ', s)
-    s = re.sub(r'\s+', ' ', s)
-    return s.strip()
+def group_duplicates(all_klienti: List[dict]) -> List[dict]:
+    """Seskupí klienty (záznamy Airtable) podle normalizovaného názvu; největší skupiny první."""
+    by_name = defaultdict(list)
+    for rec in all_klienti:
+        firma = rec.get("fields", {}).get("Firma", "")
+        if firma:
+            firma_norm = normalize_company(firma)
+            if len(firma_norm) > 2:  # Ignoruj příliš krátké
+                by_name[firma_norm].append({
+                    "id": rec["id"],
+                    "firma": firma,
+                    "deals": len(rec.get("fields", {}).get("Deals", [])),
+                    "kontakty": len(rec.get("fields", {}).get("Kontakty", []))
+                })
+    
+    duplicates = [{"norm": firma_norm, "klienti": klienti} for firma_norm, klienti in by_name.items() if len(klienti) > 1]
+    # Seřaď podle počtu duplicit
+    duplicates.sort(key=lambda x: -len(x["klienti"]))
+    return duplicates
 
 
 def main():
@@ -78,33 +66,8 @@ def main():
     
     print(f"   Celkem {len(all_klienti)} klientů")
     
-    # Seskup podle normalizovaného názvu
-    by_name = defaultdict(list)
-    for rec in all_klienti:
-        firma = rec.get("fields", {}).get("Firma", "")
-        if firma:
-            firma_norm = normalize_company(firma)
-            if len(firma_norm) > 2:  # Ignoruj příliš krátké
-                by_name[firma_norm].append({
-                    "id": rec["id"],
-                    "firma": firma,
-                    "deals": len(rec.get("fields", {}).get("Deals", [])),
-                    "kontakty": len(rec.get("fields", {}).get("Kontakty", []))
-                })
-    
-    # Najdi duplicity
     print("\n🔍 Hledám duplicity...\n")
-    
-    duplicates = []
-    for firma_norm, klienti in by_name.items():
-        if len(klienti) > 1:
-            duplicates.append({
-                "norm": firma_norm,
-                "klienti": klienti
-            })
-    
-    # Seřaď podle počtu duplicit
-    duplicates.sort(key=lambda x: -len(x["klienti"]))
+    duplicates = group_duplicates(all_klienti)
     
     print(f"📋 Nalezeno {len(duplicates)} skupin duplicit:\n")
     print("=" * 80)
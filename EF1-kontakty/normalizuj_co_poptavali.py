@@ -2,21 +2,22 @@
 """
 Normalizuje hodnoty ve sloupci "Co poptávali" v Airtable 
 na předefinované kategorie pro multiple choice.
+
+Změny se počítají nad snapshotem tabulky a ukládají jako plán (change_sets.py).
+
+Použití:
+  python3 normalizuj_co_poptavali.py          # plán z čerstvých dat + zápis
+  python3 normalizuj_co_poptavali.py --plan   # jen plán
+  python3 normalizuj_co_poptavali.py --apply  # zapíše poslední plán
 """
 
-import json
-import time
-import re
-from pathlib import Path
 from typing import Dict, List, Optional
-from urllib.parse import quote
 
-import requests
+from change_sets import ChangeSet, run_script
 
-API_BASE = "https://api.airtable.com/v0"
 BASE_ID = "appEXpqOEIElHzScl"
 TABLE_ID = "tblN14nLVWXQ7jLbG"  # Projekty / Poptávky
-BATCH_SIZE = 10
+TABLE = "Projekty / Poptávky"
 
 # Validní kategorie
 VALID_OPTIONS = {
@@ -28,35 +29,6 @@ VALID_OPTIONS = {
 }
 
 
-def get_token() -> str:
-    mcp_path = Path.home() / ".cursor" / "mcp.json"
-    with open(mcp_path, "r") as f:
-        config = json.load(f)
-    return config["mcpServers"]["airtable"]["env"]["AIRTABLE_API_KEY"]
-
-
-def headers(token: str) -> Dict[str, str]:
-    return {"Authorization": f"Bearer {token}", "Content-Type": "application/json"}
-
-
-def request_with_backoff(method: str, url: str, *, hdrs: dict, json_data=None, params=None) -> dict:
-    delay = 1.0
-    for attempt in range(1, 8):
-        resp = requests.request(method, url, headers=hdrs, json=json_data, params=params, timeout=60)
-        if resp.status_code in (429, 500, 502, 503, 504):
-            time.sleep(delay)
-            delay = min(delay * 2, 20)
-            continue
-        if not resp.ok:
-            raise RuntimeError(f"Airtable API error {resp.status_code}: {resp.text[:500]}")
-        return resp.json()
-    raise RuntimeError("Airtable API still failing after retries")
-
-
-def chunked(items: List, size: int) -> List[List]:
-    return [items[i:i + size] for i in range(0, len(items), size)]
-
-
 def classify_poptavka(text: str) -> Optional[str]:
     """
     Klasifikuje text do jedné z kategorií.
@@ -123,98 +95,49 @@ def classify_poptavka(text: str) -> Optional[str]:
     return None
 
 
-def main():
-    token = get_token()
-    
-    print("🔎 Načítám záznamy z Projekty / Poptávky...")
-    url = f"{API_BASE}/{BASE_ID}/{quote('Projekty / Poptávky', safe='')}"
-    hdrs = headers(token)
-    
-    to_update = []
+def plan(tables: Dict[str, List[dict]], changes: ChangeSet) -> None:
+    records = tables[TABLE]
     stats = {"already_valid": 0, "to_normalize": 0, "unrecognized": 0, "empty": 0}
     unrecognized_values = []
     
-    offset = None
-    total = 0
-    
-    while True:
-        params = {"pageSize": 100}
-        if offset:
-            params["offset"] = offset
+    for rec in records:
+        fields = rec.get("fields", {})
+        original = fields.get("Co poptávali", "")
+        
+        if not original:
+            stats["empty"] += 1
+            continue
         
-        data = request_with_backoff("GET", url, hdrs=hdrs, params=params)
-        records = data.get("records", [])
-        total += len(records)
+        if original in VALID_OPTIONS:
+            stats["already_valid"] += 1
+            continue
         
-        for rec in records:
-            fields = rec.get("fields", {})
-            original = fields.get("Co poptávali", "")
-            
-            if not original:
-                stats["empty"] += 1
-                continue
-            
-            if original in VALID_OPTIONS:
-                stats["already_valid"] += 1
-                continue
-            
-            # Zkus klasifikovat
-            new_value = classify_poptavka(original)
-            
-            if new_value:
-                stats["to_normalize"] += 1
-                to_update.append({
-                    "id": rec["id"],
-                    "fields": {"Co poptávali": new_value},
-                    "_original": original
-                })
-            else:
-                stats["unrecognized"] += 1
-                unrecognized_values.append((rec["id"], original))
+        # Zkus klasifikovat
+        new_value = classify_poptavka(original)
         
-        offset = data.get("offset")
-        if not offset:
-            break
-    
-    print(f"\n📊 Statistika ({total} záznamů celkem):")
+        if new_value:
+            stats["to_normalize"] += 1
+            changes.update(rec, {"Co poptávali": new_value})
+        else:
+            stats["unrecognized"] += 1
+            unrecognized_values.append((rec["id"], original))
+    
+    print(f"\n📊 Statistika ({len(records)} záznamů celkem):")
     print(f"   ✅ Už validní: {stats['already_valid']}")
     print(f"   🔄 K normalizaci: {stats['to_normalize']}")
     print(f"   ❓ Nerozpoznáno: {stats['unrecognized']}")
     print(f"   ⬜ Prázdné: {stats['empty']}")
     
-    if to_update:
-        print(f"\n📋 Ukázka normalizací:")
-        for rec in to_update[:10]:
-            print(f"   '{rec['_original']}' → '{rec['fields']['Co poptávali']}'")
-    
+    # Nerozpoznané hodnoty ponecháme - můžeš je opravit ručně v Airtable
     if unrecognized_values:
         print(f"\n⚠️ Nerozpoznané hodnoty (ponechám prázdné nebo původní):")
         for rec_id, val in unrecognized_values[:10]:
             print(f"   - {val[:80]}...")
-    
-    if not to_update:
-        print("\n✅ Vše je již normalizované!")
-        return
-    
-    # Aktualizace - automaticky
-    
-    print(f"\n⬆️ Aktualizuji...")
-    
-    # Odstraníme pomocné pole
-    for rec in to_update:
-        del rec["_original"]
-    
-    updated = 0
-    for batch in chunked(to_update, BATCH_SIZE):
-        request_with_backoff("PATCH", url, hdrs=hdrs, json_data={"records": batch, "typecast": True})
-        updated += len(batch)
-        if updated % 50 == 0:
-            print(f"   ... {updated}/{len(to_update)}")
-        time.sleep(0.2)
-    
-    print(f"\n✅ Normalizováno {updated} záznamů!")
-    
-    # Nerozpoznané hodnoty ponecháme - můžeš je opravit ručně v Airtable
+
+
+def main():
+    run_script("normalizuj_co_poptavali", TABLE, [TABLE], plan, base_id=BASE_ID,
+               description="Normalizace „Co poptávali“ na kategorie")
 
 
 if __name__ == "__main__":
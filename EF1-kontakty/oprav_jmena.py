@@ -3,18 +3,19 @@
 Opraví kontakty kde je prohozené jméno/příjmení a doplní správné oslovení.
 """
 
-import json
 import re
 import time
-from pathlib import Path
 from urllib.parse import quote
 import requests
 
-token = json.load(open(Path.home() / '.cursor' / 'mcp.json'))['mcpServers']['airtable']['env']['AIRTABLE_API_KEY']
+from airtable_api import API_BASE, get_token
+from http_metrics import record_retry, request
+
+token = get_token()
 hdrs = {'Authorization': f'Bearer {token}', 'Content-Type': 'application/json'}
 
 BASE_ID = 'appEXpqOEIElHzScl'
-url = f'https://api.airtable.com/v0/{BASE_ID}/{quote("Kontakty", safe="")}'
+url = f'{API_BASE}/{BASE_ID}/{quote("Kontakty", safe="")}'
 
 
 def is_likely_surname(name):
@@ -118,11 +119,12 @@ def request_with_retry(method, url, **kwargs):
     """Request s retry logikou."""
     for attempt in range(5):
         try:
-            resp = requests.request(method, url, timeout=30, **kwargs)
+            resp = request("airtable", method, url, timeout=30, **kwargs)
             return resp
         except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
             if attempt < 4:
                 print(f"   Připojení selhalo, zkouším znovu ({attempt+1}/5)...")
+                record_retry("airtable", method, url, 2 ** attempt)
                 time.sleep(2 ** attempt)
             else:
                 raise
@@ -209,6 +211,5 @@ for i, f in enumerate(to_fix, 1):
         print(f"   ❌ Chyba u {f['old_jmeno']}: {resp.text[:100]}")
     else:
         print(f"   ✓ {i}/{len(to_fix)} {f['new_jmeno']} {f['new_prijmeni']}")
-    time.sleep(0.3)
 
 print(f'\n✅ Opraveno {len(to_fix)} kontaktů!')
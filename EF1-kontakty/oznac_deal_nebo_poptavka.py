@@ -3,42 +3,21 @@
 Označí kontakty podle toho, jestli byl deal realizovaný nebo jen poptávka.
 """
 
-import json
-import time
-from pathlib import Path
 from typing import Dict, List
 from urllib.parse import quote
 
-import requests
+from airtable_api import API_BASE, get_token, request_with_backoff as airtable_request
 
-API_BASE = "https://api.airtable.com/v0"
 BASE_ID = "appEXpqOEIElHzScl"
 BATCH_SIZE = 10
 
 
-def get_token() -> str:
-    mcp_path = Path.home() / ".cursor" / "mcp.json"
-    with open(mcp_path, "r") as f:
-        config = json.load(f)
-    return config["mcpServers"]["airtable"]["env"]["AIRTABLE_API_KEY"]
-
-
 def headers(token: str) -> Dict[str, str]:
     return {"Authorization": f"Bearer {token}", "Content-Type": "application/json"}
 
 
 def request_with_backoff(method: str, url: str, *, hdrs: dict, json_data=None, params=None) -> dict:
-    delay = 1.0
-    for attempt in range(1, 8):
-        resp = requests.request(method, url, headers=hdrs, json=json_data, params=params, timeout=60)
-        if resp.status_code in (429, 500, 502, 503, 504):
-            time.sleep(delay)
-            delay = min(delay * 2, 20)
-            continue
-        if not resp.ok:
-            raise RuntimeError(f"Airtable API error {resp.status_code}: {resp.text[:500]}")
-        return resp.json()
-    raise RuntimeError("Airtable API still failing after retries")
+    return airtable_request(method, url, headers=hdrs, json=json_data, params=params)
 
 
 def chunked(items: List, size: int) -> List[List]:
@@ -154,7 +133,6 @@ def main():
         updated += len(batch)
         if updated % 50 == 0:
             print(f"   ... {updated}/{len(kontakty_to_update)}")
-        time.sleep(0.2)
     
     print(f"\n✅ Označeno {updated} kontaktů!")
     
@@ -0,0 +1,340 @@
+#!/usr/bin/env python3
+"""
+Normalizace telefonních čísel do E.164 (CZ/SK) + perzistentní index telefon → kontakt.
+
+Místo ručního odstraňování předvoleb v každém skriptu a jednorázových oprav
+(phone_fixes.json / phone_updates.json) se každé číslo převede na kanonický
+tvar E.164 bez mezer:
+
+  normalize_phone("00420 724 222 027")   → "+420724222027"
+  normalize_phone("'+421904507468")      → "+421904507468"
+  normalize_phone("724222027")           → "+420724222027"   (výchozí region CZ)
+  normalize_phone("0905 620 082")        → "+421905620082"   (SK s národní nulou)
+  normalize_phone("+421 0907 715 069")   → "+421907715069"   (nula za předvolbou)
+  normalize_phone("447963502482")        → "+447963502482"   (cizí číslo bez +)
+  normalize_phone("#ERROR!")             → ""
+  normalize_phones("00420733626763, 00420734000000") → ["+420733626763", "+420734000000"]
+  normalize_phones("kl. 25")             → ["kl. 25"]           (nerozpoznané zůstane jako text)
+
+Hromadná normalizace sloupce (`normalize_column`) převádí každou unikátní
+hodnotu jen jednou (cache), takže je levná i pro statisíce řádků.
+
+Index (`PhoneIndex`) mapuje E.164 → klíče kontaktů (Airtable record id nebo
+email) a ukládá se vedle zdroje do `<zdroj>.phone.index.pickle`. Přestaví se
+jen při změně obsahu zdroje (mtime/velikost → SHA-1), dotaz na duplicitu je O(1).
+
+Použití:
+  python3 phones.py "00420 724 222 027" "0905 620 082"     # ukáže normalizaci
+  python3 phones.py --index kontakty_unified.csv --duplicates
+  python3 phones.py --index export_kontakty.json --find 724222027
+  python3 phones.py --updates export_kontakty.json > phone_updates.json
+
+Ve skriptech:
+  from phones import normalize_phone, load_phone_index
+  idx = load_phone_index(Path("kontakty_unified.csv"))
+  idx.find("724 222 027")          # → ["jan.novak@firma.cz", ...]
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import pickle
+import re
+import sys
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+from csv_cache import file_sha1, read_dicts
+
+
+BASE_DIR = Path(__file__).parent
+KONTAKTY_CSV = BASE_DIR / "kontakty_unified.csv"
+
+INDEX_VERSION = "1"
+
+DEFAULT_REGION = "CZ"
+# země → mezinárodní předvolba; národní číslo má vždy 9 číslic
+COUNTRY_CODES = {"CZ": "420", "SK": "421"}
+NATIONAL_LENGTH = 9
+# cizí číslo bez "+" / "00" (E.164 má nejvýš 15 číslic)
+BARE_INTERNATIONAL = (10, 15)
+
+# hodnoty, které nejsou číslo (chyby ze Sheets apod.)
+JUNK_VALUES = {"#error!", "x", "-", "n/a", "na"}
+
+_SPLIT_RE = re.compile(r"[;,\n]+|\s{2,}")
+_NON_DIGIT_RE = re.compile(r"\D")
+
+
+@lru_cache(maxsize=1 << 16)
+def normalize_phone(raw: str, region: str = DEFAULT_REGION) -> str:
+    """Jedno číslo → E.164 ("+420724222027"); nerozpoznané → ""."""
+    s = (raw or "").strip().lstrip("'").strip()
+    if not s or s.lower() in JUNK_VALUES:
+        return ""
+    has_plus = s.startswith("+")
+    digits = _NON_DIGIT_RE.sub("", s)
+    if not digits:
+        return ""
+
+    if not has_plus and digits.startswith("00"):
+        digits = digits[2:]
+        # "00775898186" – za 00 zbylo národní číslo, ne předvolba
+        if len(digits) == NATIONAL_LENGTH:
+            return _national(digits, region)
+        has_plus = True
+
+    if has_plus:
+        return _international(digits)
+
+    digits = _strip_trunk(digits)
+    for code in COUNTRY_CODES.values():
+        if digits.startswith(code) and len(digits) == len(code) + NATIONAL_LENGTH:
+            return "+" + digits
+    # SK národní formát s nulou ("0905 620 082")
+    if len(digits) == NATIONAL_LENGTH + 1 and digits.startswith("0"):
+        return "+" + COUNTRY_CODES["SK"] + digits[1:]
+    if len(digits) == NATIONAL_LENGTH:
+        return _national(digits, region)
+    # cizí číslo zapsané bez "+" ("447963502482")
+    lo, hi = BARE_INTERNATIONAL
+    if lo <= len(digits) <= hi and not digits.startswith("0"):
+        return "+" + digits
+    return ""
+
+
+def _strip_trunk(digits: str) -> str:
+    """Národní nula za předvolbou CZ/SK ("421 0907…") → bez ní."""
+    for code in COUNTRY_CODES.values():
+        if digits.startswith(code + "0") and len(digits) == len(code) + 1 + NATIONAL_LENGTH:
+            return code + digits[len(code) + 1:]
+    return digits
+
+
+def _national(digits: str, region: str) -> str:
+    if digits.startswith("0"):
+        return ""
+    return "+" + COUNTRY_CODES.get(region, COUNTRY_CODES[DEFAULT_REGION]) + digits
+
+
+def _international(digits: str) -> str:
+    digits = _strip_trunk(digits)
+    for code in COUNTRY_CODES.values():
+        if digits.startswith(code):
+            return "+" + digits if len(digits) == len(code) + NATIONAL_LENGTH else ""
+    # ostatní země: jen kontrola délky podle E.164
+    return "+" + digits if 8 <= len(digits) <= 15 else ""
+
+
+def _split_cell(cell: str, region: str) -> List[str]:
+    parts = []
+    for part in _SPLIT_RE.split(cell):
+        pieces = part.split("/")
+        if len(pieces) > 1 and all(normalize_phone(p, region) for p in pieces):
+            parts.extend(pieces)
+        else:
+            parts.append(part)
+    return parts
+
+
+def normalize_phones(cell: str, region: str = DEFAULT_REGION) -> List[str]:
+    """
+    Buňka s více čísly ("a; b", "a, b") → unikátní E.164 v původním pořadí.
+    "a / b" se dělí, jen když obě strany jsou celá čísla ("724/222/027" je jedno číslo).
+    Co se nepodaří rozpoznat, zůstane jako původní text (bez chybových hodnot) – číslo se neztratí.
+    """
+    out = []
+    for part in _split_cell(cell or "", region):
+        e164 = normalize_phone(part, region)
+        if e164:
+            out.append(e164)
+            continue
+        raw = part.strip().lstrip("'").strip()
+        if raw and raw.lower() not in JUNK_VALUES:
+            out.append(raw)
+    return list(dict.fromkeys(out))
+
+
+def normalize_column(values: Iterable[str], region: str = DEFAULT_REGION) -> List[str]:
+    """Hromadně normalizuje sloupec; každá unikátní hodnota se zpracuje jen jednou."""
+    cache: Dict[str, str] = {}
+    out = []
+    for v in values:
+        if v not in cache:
+            cache[v] = "; ".join(normalize_phones(v, region))
+        out.append(cache[v])
+    return out
+
+
+def format_phone(e164: str) -> str:
+    """E.164 → čitelný tvar ("+420 724 222 027") pro CZ/SK, jinak beze změny."""
+    for code in COUNTRY_CODES.values():
+        if e164.startswith("+" + code) and len(e164) == len(code) + NATIONAL_LENGTH + 1:
+            n = e164[len(code) + 1:]
+            return f"+{code} {n[:3]} {n[3:6]} {n[6:]}"
+    return e164
+
+
+# --- Index telefon → kontakt ---
+
+class PhoneIndex:
+    def __init__(self, sha1: str = "", by_phone: Optional[Dict[str, List[str]]] = None,
+                 by_key: Optional[Dict[str, List[str]]] = None):
+        self.sha1 = sha1
+        self.by_phone: Dict[str, List[str]] = by_phone or {}   # E.164 → klíče kontaktů
+        self.by_key: Dict[str, List[str]] = by_key or {}       # klíč kontaktu → E.164
+
+    def find(self, phone: str) -> List[str]:
+        return list(self.by_phone.get(normalize_phone(phone) or phone, []))
+
+    def is_duplicate(self, phone: str, key: str = "") -> bool:
+        """Patří číslo už jinému kontaktu než `key`?"""
+        return any(k != key for k in self.find(phone))
+
+    def duplicates(self) -> Dict[str, List[str]]:
+        return {p: keys for p, keys in self.by_phone.items() if len(keys) > 1}
+
+    def set_phones(self, key: str, cell: str) -> None:
+        """Nahradí čísla kontaktu (inkrementální aktualizace po změně v Airtable)."""
+        self.remove(key)
+        phones = normalize_phones(cell)
+        if not phones:
+            return
+        self.by_key[key] = phones
+        for p in phones:
+            self.by_phone.setdefault(p, []).append(key)
+
+    def remove(self, key: str) -> None:
+        for p in self.by_key.pop(key, []):
+            keys = self.by_phone.get(p, [])
+            if key in keys:
+                keys.remove(key)
+            if not keys:
+                self.by_phone.pop(p, None)
+
+    def __len__(self) -> int:
+        return len(self.by_phone)
+
+    def to_dict(self) -> dict:
+        return {"sha1": self.sha1, "by_phone": self.by_phone, "by_key": self.by_key}
+
+
+def iter_contacts(path: Path):
+    """(klíč, telefon) ze zdroje: CSV (kontakty_unified – klíč Email) nebo JSON export Airtable (klíč id)."""
+    if path.suffix.lower() == ".csv":
+        for row in read_dicts(path, columns=["Email", "Telefon"]):
+            key = (row.get("Email") or "").strip().lower()
+            if key:
+                yield key, row.get("Telefon") or ""
+        return
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    records = data.get("records", []) if isinstance(data, dict) else data
+    for rec in records:
+        phone = (rec.get("fields") or {}).get("Telefon")
+        if rec.get("id"):
+            yield rec["id"], str(phone or "")
+
+
+def build_phone_index(path: Path, sha1: str) -> PhoneIndex:
+    idx = PhoneIndex(sha1=sha1)
+    for key, phone in iter_contacts(path):
+        idx.set_phones(key, phone)
+    return idx
+
+
+def phone_index_path(path: Path) -> Path:
+    return path.with_name(path.name + ".phone.index.pickle")
+
+
+def load_phone_index(path: Path = KONTAKTY_CSV, force: bool = False) -> PhoneIndex:
+    """Vrátí index telefonů zdroje; přestaví ho jen když se změnil obsah zdroje."""
+    path = Path(path)
+    target = phone_index_path(path)
+    st = path.stat()
+    stamp = [st.st_mtime_ns, st.st_size]
+
+    if target.exists() and not force:
+        try:
+            with open(target, "rb") as f:
+                cached = pickle.load(f)
+        except Exception:
+            cached = None
+        if cached and cached.get("version") == INDEX_VERSION:
+            if cached.get("stamp") == stamp:
+                return PhoneIndex(**cached["index"])
+            if cached["index"]["sha1"] == file_sha1(path):
+                cached["stamp"] = stamp
+                _save(target, cached)
+                return PhoneIndex(**cached["index"])
+
+    idx = build_phone_index(path, file_sha1(path))
+    save_phone_index(idx, path, stamp)
+    return idx
+
+
+def save_phone_index(idx: PhoneIndex, path: Path, stamp: Optional[list] = None) -> None:
+    """Uloží index (např. po inkrementálních `set_phones`)."""
+    path = Path(path)
+    if stamp is None:
+        st = path.stat()
+        stamp = [st.st_mtime_ns, st.st_size]
+    _save(phone_index_path(path), {"version": INDEX_VERSION, "stamp": stamp, "index": idx.to_dict()})
+
+
+def _save(target: Path, payload: dict) -> None:
+    tmp = target.with_name(target.name + ".tmp")
+    with open(tmp, "wb") as f:
+        pickle.dump(payload, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp, target)
+
+
+def plan_updates(path: Path) -> List[dict]:
+    """Změny Telefon pro JSON export Airtable ve formátu phone_updates.json ({id, old, new})."""
+    updates = []
+    for key, phone in iter_contacts(Path(path)):
+        if not phone:
+            continue
+        new = "; ".join(normalize_phones(phone)) or None
+        if new != phone:
+            updates.append({"id": key, "old": phone, "new": new})
+    return updates
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Normalizace telefonů do E.164 a index telefon → kontakt.")
+    ap.add_argument("phones", nargs="*", help="Čísla k normalizaci")
+    ap.add_argument("--index", help="Zdroj indexu (kontakty_unified.csv nebo JSON export Airtable)")
+    ap.add_argument("--force", action="store_true", help="Přestavět index")
+    ap.add_argument("--find", nargs="*", default=[], help="Najde kontakty podle čísla")
+    ap.add_argument("--duplicates", action="store_true", help="Vypíše čísla sdílená více kontakty")
+    ap.add_argument("--updates", help="JSON export Airtable → opravy Telefon (stdout, formát phone_updates.json)")
+    args = ap.parse_args()
+
+    for raw in args.phones:
+        phones = normalize_phones(raw)
+        print(f"{raw!r:30} → {'; '.join(phones) or '(neplatné)'}")
+
+    if args.updates:
+        json.dump(plan_updates(Path(args.updates)), sys.stdout, ensure_ascii=False, indent=2)
+        print()
+        return
+
+    if args.index or args.find or args.duplicates:
+        idx = load_phone_index(Path(args.index) if args.index else KONTAKTY_CSV, force=args.force)
+        print(f"📞 Index telefonů ({idx.sha1[:12]}): {len(idx)} čísel, {len(idx.by_key)} kontaktů")
+        for phone in args.find:
+            keys = idx.find(phone)
+            print(f"   {format_phone(normalize_phone(phone)) or phone}: {', '.join(keys) or 'nenalezeno'}")
+        if args.duplicates:
+            dups = idx.duplicates()
+            print(f"   Duplicitní čísla: {len(dups)}")
+            for phone, keys in sorted(dups.items(), key=lambda x: -len(x[1])):
+                print(f"   • {format_phone(phone)}: {', '.join(keys)}")
+
+
+if __name__ == "__main__":
+    main()
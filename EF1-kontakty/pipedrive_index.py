@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+"""
+Sdílený loader Pipedrive exportu (deals-16044442-64.csv) s perzistentními indexy.
+
+Export se naparsuje jednou (přes csv_cache), pro každý řádek se jednou vybere
+nejlepší email a telefon (E.164) a postaví se indexy:
+- by_email      normalizovaný email  → indexy záznamů
+- by_company    normalizovaná firma  → indexy záznamů
+- by_deal_name  normalizovaný název  → indexy záznamů
+
+Výsledek se uloží do `<export>.index.pickle` vedle exportu a je platný, dokud
+se nezmění SHA-1 exportu. Další skripty ho pak dostanou v řádu milisekund.
+
+Použití:
+  python3 pipedrive_index.py            # postaví/ověří index a vypíše statistiky
+  python3 pipedrive_index.py --force    # přestaví index
+
+Ve skriptech:
+  from pipedrive_index import load_pipedrive
+  pd = load_pipedrive()
+  for rec in pd.find_by_email("jan.novak@firma.cz"): ...
+  for rec in pd.find_by_company("Škoda Auto a.s."): ...
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import pickle
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Dict, List
+
+from company_key import normalize_company
+from csv_cache import file_sha1, read_dicts
+from phones import normalize_phones
+
+
+BASE_DIR = Path(__file__).parent
+PIPEDRIVE = BASE_DIR / "deals-16044442-64.csv"
+
+INDEX_VERSION = "3"
+
+EMAIL_COLUMNS = ["Osoba - E-mail - Práce", "Osoba - E-mail - Domov", "Osoba - E-mail - Ostatní"]
+PHONE_COLUMNS = ["Osoba - Telefon - Práce", "Osoba - Telefon - Mobil", "Osoba - Telefon - Domov", "Osoba - Telefon - Ostatní"]
+FREEMAIL_MARKERS = ["gmail", "seznam", "email.cz", "centrum.cz"]
+
+
+def normalize(s):
+    return (s or "").strip().lower()
+
+
+def get_best_email(emails: List[str]) -> str:
+    """Preferuje pracovní email před freemailem."""
+    for e in emails:
+        if not any(x in e.lower() for x in FREEMAIL_MARKERS):
+            return e
+    return emails[0] if emails else ""
+
+
+def get_best_phone(phones: List[str]) -> str:
+    """První platné číslo v E.164 (phones.py)."""
+    for p in phones:
+        e164 = normalize_phones(p)
+        if e164:
+            return e164[0]
+    return ""
+
+
+def build_record(row: dict) -> dict:
+    emails = [(row.get(c) or "").strip() for c in EMAIL_COLUMNS]
+    emails = [e for e in emails if "@" in e]
+    phones = [(row.get(c) or "").strip() for c in PHONE_COLUMNS]
+    phones = [p for p in phones if p]
+    return {
+        "deal_name": (row.get("Deal - Název") or "").strip(),
+        "firma": (row.get("Deal - Organizace") or "").strip(),
+        "kontakt": (row.get("Deal - Kontaktní osoba") or "").strip(),
+        "hodnota": (row.get("Deal - Hodnota") or "").strip(),
+        "termin": (row.get("Deal - Předpokládaný termín uzavření") or "").strip(),
+        "vlastnik": (row.get("Deal - Vlastník") or "").strip(),
+        "emails": emails,
+        # první email v pořadí Práce/Domov/Ostatní vs. nejlepší (firemní před freemailem)
+        "email_prvni": emails[0] if emails else "",
+        "email": get_best_email(emails),
+        "phones": phones,
+        "telefon": get_best_phone(phones),
+    }
+
+
+@dataclass
+class PipedriveIndex:
+    sha1: str
+    records: List[dict] = field(default_factory=list)
+    by_email: Dict[str, List[int]] = field(default_factory=dict)
+    by_company: Dict[str, List[int]] = field(default_factory=dict)
+    by_deal_name: Dict[str, List[int]] = field(default_factory=dict)
+
+    def _lookup(self, index: Dict[str, List[int]], key: str) -> List[dict]:
+        return [self.records[i] for i in index.get(key, [])]
+
+    def find_by_email(self, email: str) -> List[dict]:
+        return self._lookup(self.by_email, normalize(email))
+
+    def find_by_company(self, company: str) -> List[dict]:
+        return self._lookup(self.by_company, normalize_company(company))
+
+    def find_by_deal_name(self, deal_name: str) -> List[dict]:
+        return self._lookup(self.by_deal_name, normalize(deal_name))
+
+
+def build_index(path: Path, sha1: str) -> PipedriveIndex:
+    idx = PipedriveIndex(sha1=sha1)
+    for row in read_dicts(path):
+        rec = build_record(row)
+        i = len(idx.records)
+        idx.records.append(rec)
+        for email in dict.fromkeys(normalize(e) for e in rec["emails"]):
+            idx.by_email.setdefault(email, []).append(i)
+        if rec["firma"]:
+            idx.by_company.setdefault(normalize_company(rec["firma"]), []).append(i)
+        if rec["deal_name"]:
+            idx.by_deal_name.setdefault(normalize(rec["deal_name"]), []).append(i)
+    return idx
+
+
+def index_path(path: Path) -> Path:
+    return path.with_name(path.name + ".index.pickle")
+
+
+def load_pipedrive(path: Path = PIPEDRIVE, force: bool = False) -> PipedriveIndex:
+    """Vrátí index Pipedrive exportu; přestaví ho jen když se změnil obsah exportu."""
+    path = Path(path)
+    target = index_path(path)
+    st = path.stat()
+    stamp = [st.st_mtime_ns, st.st_size]
+
+    cached = None
+    if target.exists() and not force:
+        try:
+            with open(target, "rb") as f:
+                cached = pickle.load(f)
+        except Exception:
+            cached = None
+        if cached and cached.get("version") == INDEX_VERSION:
+            if cached.get("stamp") == stamp:
+                return PipedriveIndex(**cached["index"])
+            if cached["index"]["sha1"] == file_sha1(path):
+                cached["stamp"] = stamp
+                _save(target, cached)
+                return PipedriveIndex(**cached["index"])
+
+    idx = build_index(path, file_sha1(path))
+    # ukládáme čisté dicty (ne instanci třídy), aby šel index načíst z libovolného skriptu
+    _save(target, {"version": INDEX_VERSION, "stamp": stamp, "index": asdict(idx)})
+    return idx
+
+
+def _save(target: Path, payload: dict) -> None:
+    tmp = target.with_name(target.name + ".tmp")
+    with open(tmp, "wb") as f:
+        pickle.dump(payload, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp, target)
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Postaví perzistentní index Pipedrive exportu.")
+    ap.add_argument("--csv", dest="csv_path", default=str(PIPEDRIVE))
+    ap.add_argument("--force", action="store_true")
+    args = ap.parse_args()
+
+    idx = load_pipedrive(Path(args.csv_path), force=args.force)
+    print(f"📇 Pipedrive index ({idx.sha1[:12]}): {len(idx.records)} dealů")
+    print(f"   emailů: {len(idx.by_email)}, firem: {len(idx.by_company)}, názvů dealů: {len(idx.by_deal_name)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,397 @@
+#!/usr/bin/env python3
+"""
+Celé obnovení kontaktů (WORKFLOW_KONTAKTY.md) jedním příkazem – kroky jako DAG.
+
+  merge ──▶ upsert ──▶ klienti ──▶ link ──▶ link-hr ──┐
+                 │                                   ├──▶ audit
+                 └──────────────▶ osloveni ──────────┘
+
+Každý krok deklaruje vstupy (soubory, tabulky Airtable) a výstupy. Před
+spuštěním se spočítá klíč z kódu skriptu, argumentů, otisků vstupních souborů
+(csv_cache.file_sha1) a otisků předchozích kroků; když se shoduje s posledním
+úspěšným během (.pipeline/state.json), krok se přeskočí. Změna zdrojového CSV
+tak přepočítá jen merge a to, co na něm závisí. Kroky, jejichž výstupem jsou
+tabulky Airtable (`result`), se po doběhnutí otisknou obsahem těch tabulek –
+link-hr tak běží znovu, kdykoli link propojí jiné kontakty.
+
+Nezávislé kroky běží souběžně (--jobs, každý ve vlastním procesu přes
+kontakty.py, výstup s prefixem kroku + .pipeline/logs/<krok>.log). Kroky
+označené `snapshot` nečtou tabulky z API každý zvlášť: pipeline je stáhne
+jednou do .pipeline/snapshot/ a airtable_api je jim obslouží odtud
+(AIRTABLE_SNAPSHOT_DIR). Tabulka se stahuje znovu jen tehdy, když ji mezitím
+změnil jiný krok.
+
+Airtable má limit 5 req/s na base, ne na proces: při --jobs N dostane každý
+krok (i stahování snapshotu) 1/N stropu přes KONTAKTY_LIMITS.
+
+Airtable se mezi běhy může změnit i ručně – pak --force (vše) nebo --force link,
+případně --from klienti (tento krok a vše za ním).
+
+Použití:
+  python3 pipeline.py                       # spustí, co je potřeba
+  python3 pipeline.py --plan                # jen ukáže, co by se spustilo
+  python3 pipeline.py --jobs 2 --force link-hr
+  python3 pipeline.py --from upsert
+  python3 pipeline.py --only merge,upsert
+  python3 kontakty.py pipeline --plan
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import os
+import shlex
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from pathlib import Path
+from typing import Dict, List, Optional, Set
+
+from csv_cache import file_sha1
+
+
+BASE_DIR = Path(__file__).parent
+STATE_DIR = BASE_DIR / ".pipeline"
+STATE_PATH = STATE_DIR / "state.json"
+KONTAKTY = BASE_DIR / "kontakty.py"
+
+BASE_ID = "appEXpqOEIElHzScl"
+DEFAULT_JOBS = 3
+
+
+def merge_inputs() -> List[str]:
+    """Zdrojová CSV merge_contacts + zdroje suppression indexu."""
+    from merge_contacts import CONFIGS
+    from suppression import SOURCES
+
+    return sorted(set(CONFIGS) | set(SOURCES))
+
+
+# name: příkaz kontakty.py, after: předchozí kroky, inputs: soubory (nebo funkce, která je vrátí),
+# outputs: soubory, reads/writes: tabulky Airtable, snapshot: číst tabulky ze sdíleného snapshotu,
+# result: tabulky, jejichž obsah po kroku je jeho výstupem pro další kroky
+STAGES = [
+    {"name": "merge", "command": "merge", "after": [], "inputs": merge_inputs,
+     "outputs": ["kontakty_unified.csv"]},
+    {"name": "upsert", "command": "upsert", "after": ["merge"], "inputs": ["kontakty_unified.csv"],
+     "writes": ["Kontakty"]},
+    {"name": "klienti", "command": "klienti", "after": ["upsert"],
+     "reads": ["Kontakty", "Klienti"], "writes": ["Klienti", "Kontakty"], "result": ["Kontakty", "Klienti"]},
+    {"name": "link", "command": "link", "after": ["klienti"], "snapshot": True,
+     "reads": ["Kontakty", "Klienti"], "writes": ["Kontakty", "Klienti"], "result": ["Kontakty", "Klienti"]},
+    {"name": "link-hr", "command": "link-hr", "after": ["link"], "snapshot": True,
+     "reads": ["Kontakty", "Klienti"], "writes": ["Klienti", "Kontakty"]},
+    {"name": "osloveni", "command": "osloveni", "after": ["upsert"], "snapshot": True,
+     "reads": ["Kontakty"], "writes": ["Kontakty"]},
+    {"name": "audit", "command": "audit", "after": ["link", "link-hr", "osloveni"],
+     "reads": ["Kontakty", "Klienti", "Deals"]},
+]
+
+
+def stage_map() -> Dict[str, dict]:
+    return {s["name"]: s for s in STAGES}
+
+
+def descendants(names: Set[str]) -> Set[str]:
+    out = set(names)
+    changed = True
+    while changed:
+        changed = False
+        for s in STAGES:
+            if s["name"] not in out and out.intersection(s["after"]):
+                out.add(s["name"])
+                changed = True
+    return out
+
+
+def stage_inputs(stage: dict) -> List[str]:
+    inputs = stage.get("inputs") or []
+    return list(inputs()) if callable(inputs) else list(inputs)
+
+
+def stage_key(stage: dict, upstream_keys: Dict[str, str], args: List[str],
+              results: Optional[Dict[str, str]] = None) -> str:
+    """
+    Otisk kroku: kód skriptu + argumenty + vstupní soubory + předchozí kroky.
+    Předchozí krok s výstupními soubory se započítá otiskem těch souborů (merge,
+    který vyrobí stejné CSV, nic dalšího nespustí), krok s `result` otiskem
+    svých tabulek po doběhnutí, ostatní svým klíčem.
+    """
+    from kontakty import COMMANDS
+
+    stages = stage_map()
+    h = hashlib.sha1()
+    module = COMMANDS[stage["command"]][0]
+    h.update(f"{stage['name']}\0{stage['command']}\0{json.dumps(args)}\0".encode("utf-8"))
+    h.update(file_sha1(BASE_DIR / f"{module}.py").encode("ascii"))
+    for name in stage_inputs(stage):
+        path = BASE_DIR / name
+        h.update(f"\0{name}\0{file_sha1(path) if path.exists() else 'missing'}".encode("utf-8"))
+    for dep in stage["after"]:
+        outputs = stages[dep].get("outputs")
+        if outputs:
+            fp = ",".join(file_sha1(BASE_DIR / o) if (BASE_DIR / o).exists() else "missing" for o in outputs)
+        else:
+            fp = (results or {}).get(dep) or upstream_keys.get(dep, "")
+        h.update(f"\0{dep}:{fp}".encode("utf-8"))
+    return h.hexdigest()
+
+
+def load_state() -> dict:
+    if STATE_PATH.exists():
+        with open(STATE_PATH, "r", encoding="utf-8") as f:
+            return json.load(f)
+    return {"stages": {}}
+
+
+def save_state(state: dict) -> None:
+    STATE_DIR.mkdir(exist_ok=True)
+    tmp = STATE_PATH.with_name(STATE_PATH.name + ".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(state, f, ensure_ascii=False, indent=2)
+    os.replace(tmp, STATE_PATH)
+
+
+class Snapshot:
+    """Sdílené stažení tabulek pro kroky se `snapshot: True` (.pipeline/snapshot/<Tabulka>.json)."""
+
+    def __init__(self, root: Path = STATE_DIR / "snapshot"):
+        self.root = root
+        self.fresh: Set[str] = set()     # tabulky stažené od posledního zápisu mimo snapshot
+        self.lock = threading.Lock()
+
+    def invalidate(self, tables: List[str]) -> None:
+        with self.lock:
+            self.fresh.difference_update(tables)
+
+    def ensure(self, tables: List[str]) -> None:
+        from urllib.parse import quote
+
+        from airtable_api import API_BASE, get_token, request_with_backoff
+
+        self.root.mkdir(parents=True, exist_ok=True)
+        with self.lock:
+            hdrs = {"Authorization": f"Bearer {get_token()}", "Content-Type": "application/json"}
+            for table in tables:
+                if table in self.fresh:
+                    continue
+                start = time.perf_counter()
+                url = f"{API_BASE}/{BASE_ID}/{quote(table, safe='')}"
+                records, offset = [], None
+                while True:
+                    params = {"pageSize": 100}
+                    if offset:
+                        params["offset"] = offset
+                    data = request_with_backoff("GET", url, headers=hdrs, params=params)
+                    records.extend(data.get("records", []))
+                    offset = data.get("offset")
+                    if not offset:
+                        break
+                target = self.root / f"{table}.json"
+                tmp = target.with_name(target.name + ".tmp")
+                with open(tmp, "w", encoding="utf-8") as f:
+                    json.dump({"records": records}, f, ensure_ascii=False)
+                os.replace(tmp, target)
+                self.fresh.add(table)
+                print(f"📸 Snapshot {table}: {len(records)} záznamů ({time.perf_counter() - start:.1f} s)", flush=True)
+
+    def fingerprint(self, tables: List[str]) -> str:
+        """Otisk obsahu tabulek (stáhne je, pokud snapshot není aktuální)."""
+        self.ensure(tables)
+        return ",".join(f"{t}:{file_sha1(self.root / f'{t}.json')}" for t in tables)
+
+
+def run_stage(stage: dict, args: List[str], env: dict, log_dir: Path, width: int) -> int:
+    """Spustí krok jako `kontakty.py <příkaz>` a průběžně vypisuje jeho výstup s prefixem."""
+    log_dir.mkdir(parents=True, exist_ok=True)
+    prefix = f"[{stage['name']}]".ljust(width + 2)
+    cmd = [sys.executable, "-u", str(KONTAKTY), stage["command"], *args]
+    with open(log_dir / f"{stage['name']}.log", "w", encoding="utf-8") as log:
+        proc = subprocess.Popen(cmd, cwd=BASE_DIR, env=env, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                                text=True, encoding="utf-8", errors="replace")
+        for line in proc.stdout:
+            log.write(line)
+            print(f"{prefix} {line}", end="", flush=True)
+        return proc.wait()
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="DAG pipeline obnovy kontaktů (merge → Airtable → audit).")
+    ap.add_argument("--plan", action="store_true", help="Jen vypsat, které kroky by se spustily")
+    ap.add_argument("--jobs", type=int, default=DEFAULT_JOBS, help="Max. souběžných kroků")
+    ap.add_argument("--force", nargs="*", default=None, metavar="KROK",
+                    help="Spustit i nezměněné kroky (bez jmen = všechny)")
+    ap.add_argument("--from", dest="from_stage", default="", help="Vynutit tento krok a vše za ním")
+    ap.add_argument("--only", default="", help="Spustit jen vybrané kroky (čárkou)")
+    ap.add_argument("--no-snapshot", action="store_true", help="Každý krok čte tabulky z API sám")
+    ap.add_argument("--keep-going", action="store_true", help="Po chybě pokračovat v nezávislých krocích")
+    ap.add_argument("--args", action="append", default=[], metavar="KROK=ARGUMENTY",
+                    help='Argumenty pro krok, např. --args "upsert=--dry-run --limit 50"')
+    args = ap.parse_args()
+
+    stages = stage_map()
+    for name in [args.from_stage] + (args.force or []) + [n for n in args.only.split(",") if n]:
+        if name and name not in stages:
+            raise SystemExit(f"Neznámý krok: {name} (kroky: {', '.join(stages)})")
+
+    forced: Set[str] = set()
+    if args.force is not None:
+        forced = set(args.force) if args.force else set(stages)
+    if args.from_stage:
+        forced |= descendants({args.from_stage})
+    selected = set(n.strip() for n in args.only.split(",") if n.strip()) or set(stages)
+
+    stage_args: Dict[str, List[str]] = {}
+    for spec in args.args:
+        name, _, rest = spec.partition("=")
+        if name not in stages:
+            raise SystemExit(f"Neznámý krok v --args: {name}")
+        stage_args[name] = shlex.split(rest)
+
+    state = load_state()
+    prev = state.setdefault("stages", {})
+    keys: Dict[str, str] = {}
+    results: Dict[str, str] = {name: st["result"] for name, st in prev.items() if st.get("result")}
+
+    if args.plan:
+        # klíče po sobě; u kroků za těmi, které poběží, nejde výsledek předem znát
+        will_run: Set[str] = set()
+        print("📋 Plán:")
+        for s in STAGES:
+            name = s["name"]
+            keys[name] = stage_key(s, keys, stage_args.get(name, []), results)
+            if name not in selected:
+                print(f"   ·  {name:<10} (vynecháno)")
+                continue
+            reason = ("vynuceno" if name in forced else
+                      "závisí na měnícím se kroku" if will_run.intersection(s["after"]) else
+                      "nový" if name not in prev else
+                      "vstupy se změnily" if prev[name].get("key") != keys[name] else "")
+            if reason:
+                will_run.add(name)
+                print(f"   ▶️  {name:<10} {reason}")
+            else:
+                print(f"   ✓  {name:<10} beze změny (naposledy {prev[name].get('finished', '?')})")
+        return
+
+    env = dict(os.environ)
+    env.setdefault("AIRTABLE_BASE_ID", BASE_ID)
+    env.setdefault("AIRTABLE_TABLE", "Kontakty")
+    if "AIRTABLE_TOKEN" not in env:
+        try:
+            from airtable_api import get_token
+
+            env["AIRTABLE_TOKEN"] = get_token()
+        except OSError:
+            pass
+    if args.jobs > 1:
+        # strop Airtable platí na base – souběžné kroky si ho dělí
+        from rate_control import share_spec
+
+        limits = ",".join(v for v in (env.get("KONTAKTY_LIMITS", ""), share_spec("airtable", args.jobs)) if v)
+        env["KONTAKTY_LIMITS"] = os.environ["KONTAKTY_LIMITS"] = limits
+
+    snapshot = Snapshot()
+    log_dir = STATE_DIR / "logs"
+    width = max(len(n) for n in stages)
+    done: Dict[str, str] = {}        # name → "ok" | "skipped" | "failed" | "cancelled"
+    running = {}
+    started = time.perf_counter()
+    timings: Dict[str, float] = {}
+
+    def ready(s: dict) -> bool:
+        return s["name"] not in done and s["name"] not in running.values() and all(d in done for d in s["after"])
+
+    def launch(s: dict, pool: ThreadPoolExecutor):
+        name = s["name"]
+        st_env = dict(env)
+        if s.get("snapshot") and not args.no_snapshot and s.get("reads"):
+            snapshot.ensure(s["reads"])
+            st_env["AIRTABLE_SNAPSHOT_DIR"] = str(snapshot.root)
+            st_env["AIRTABLE_SNAPSHOT_TABLES"] = ",".join(s["reads"])
+        print(f"▶️  {name} – {' '.join(['kontakty', s['command'], *stage_args.get(name, [])])}", flush=True)
+        timings[name] = time.perf_counter()
+        return pool.submit(run_stage, s, stage_args.get(name, []), st_env, log_dir, width)
+
+    with ThreadPoolExecutor(max_workers=max(1, args.jobs)) as pool:
+        while len(done) < len(STAGES):
+            for s in STAGES:
+                name = s["name"]
+                if not ready(s) or len(running) >= max(1, args.jobs):
+                    continue
+                bad = [d for d in s["after"] if done[d] in ("failed", "cancelled")]
+                if bad:
+                    done[name] = "cancelled"
+                    print(f"⏭️  {name}: zrušeno (selhal {', '.join(bad)})")
+                    continue
+                keys[name] = stage_key(s, keys, stage_args.get(name, []), results)
+                unchanged = prev.get(name, {}).get("key") == keys[name] and prev[name].get("status") == "ok"
+                if name not in selected or (unchanged and name not in forced):
+                    done[name] = "skipped"
+                    why = "vynecháno" if name not in selected else "beze změny"
+                    print(f"✓  {name}: {why}")
+                    continue
+                try:
+                    running[launch(s, pool)] = name
+                except Exception as e:
+                    done[name] = "failed"
+                    print(f"❌ {name}: {e}")
+            if not running:
+                if len(done) < len(STAGES):
+                    continue
+                break
+            finished, _ = wait(list(running), return_when=FIRST_COMPLETED)
+            for fut in finished:
+                name = running.pop(fut)
+                s = stages[name]
+                try:
+                    code = fut.result()
+                except Exception as e:
+                    print(f"❌ {name}: {e}")
+                    code = 1
+                seconds = time.perf_counter() - timings[name]
+                timings[name] = seconds
+                if code == 0:
+                    done[name] = "ok"
+                    prev[name] = {"key": keys[name], "status": "ok", "seconds": round(seconds, 2),
+                                  "finished": time.strftime("%Y-%m-%d %H:%M:%S")}
+                    if s.get("writes"):
+                        snapshot.invalidate(s["writes"])
+                    if s.get("result"):
+                        try:
+                            results[name] = snapshot.fingerprint(s["result"])
+                        except Exception as e:
+                            # bez otisku se další kroky spustí vždy
+                            results[name] = f"neznámý {time.time()}"
+                            print(f"⚠️  {name}: otisk tabulek se nepodařil ({e})")
+                        prev[name]["result"] = results[name]
+                    save_state(state)
+                    print(f"✅ {name}: hotovo za {seconds:.1f} s")
+                else:
+                    done[name] = "failed"
+                    prev.pop(name, None)
+                    save_state(state)
+                    print(f"❌ {name}: skončil s kódem {code} (log: {log_dir / (name + '.log')})")
+                    if not args.keep_going:
+                        for other in STAGES:
+                            if other["name"] not in done and other["name"] not in running.values():
+                                done[other["name"]] = "cancelled"
+
+    total = time.perf_counter() - started
+    print(f"\n📊 Pipeline za {total:.1f} s:")
+    for s in STAGES:
+        name = s["name"]
+        status = done.get(name, "cancelled")
+        icon = {"ok": "✅", "skipped": "✓ ", "failed": "❌", "cancelled": "⏭️"}[status]
+        extra = f" {timings[name]:.1f} s" if status in ("ok", "failed") else ""
+        print(f"   {icon} {name:<10} {status}{extra}")
+    if any(v == "failed" for v in done.values()):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
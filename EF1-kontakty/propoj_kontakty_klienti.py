@@ -3,23 +3,14 @@
 Propojí kontakty s klienty podle názvu firmy.
 """
 
-import json
-import time
-import re
-from pathlib import Path
-from typing import Dict, List
+from typing import Dict
 from urllib.parse import quote
 
-import requests
-
-API_BASE = "https://api.airtable.com/v0"
-BASE_ID = "appEXpqOEIElHzScl"
-BATCH_SIZE = 10
 
+from company_key import normalize_company
+from airtable_api import API_BASE, get_token, request_with_backoff as airtable_request, write_records
 
-def get_token() -> str:
-    with open(Path.home() / ".cursor" / "mcp.json") as f:
-        return json.load(f)["mcpServers"]["airtable"]["env"]["AIRTABLE_API_KEY"]
+BASE_ID = "appEXpqOEIElHzScl"
 
 
 def headers(token: str) -> Dict[str, str]:
@@ -27,34 +18,7 @@ def headers(token: str) -> Dict[str, str]:
 
 
 def request_with_backoff(method: str, url: str, *, hdrs: dict, json_data=None, params=None) -> dict:
-    delay = 1.0
-    for attempt in range(1, 8):
-        resp = requests.request(method, url, headers=hdrs, json=json_data, params=params, timeout=60)
-        if resp.status_code in (429, 500, 502, 503, 504):
-            time.sleep(delay)
-            delay = min(delay * 2, 20)
-            continue
-        if not resp.ok:
-            raise RuntimeError(f"Airtable API error {resp.status_code}: {resp.text[:500]}")
-        return resp.json()
-    raise RuntimeError("Airtable API still failing after retries")
-
-
-def chunked(items: List, size: int) -> List[List]:
-    return [items[i:i + size] for i in range(0, len(items), size)]
-
-
-def normalize_company(s):
-    """Normalizuje název firmy pro porovnání."""
-    s = (s or "").strip().lower()
-    for suffix in [' s.r.o.', ' a.s.', ' s.r.o', ' a.s', ' spol.', ' k.s.', 
-                   ' gmbh', ' ltd', ' ltd.', ' inc', ' n.v.', ' ag', ' se',
-                   ' czech republic', ' česká republika', ' cz', ' sk',
-                   ' czech', ' slovakia', ' group', ' holding']:
-        s = s.replace(suffix, '')
-    s = re.sub(r'[,\.\-\(\)]', ' ', s)
-    s = re.sub(r'\s+', ' ', s)
-    return s.strip()
+    return airtable_request(method, url, headers=hdrs, json=json_data, params=params)
 
 
 def main():
@@ -144,12 +108,7 @@ def main():
     # 3. Aktualizuj
     print(f"\n⬆️ Propojuji...")
     
-    updated = 0
-    for batch in chunked(to_update, BATCH_SIZE):
-        request_with_backoff("PATCH", kontakty_url, hdrs=hdrs, 
-                            json_data={"records": batch, "typecast": True})
-        updated += len(batch)
-        time.sleep(0.2)
+    updated = len(write_records("PATCH", BASE_ID, "Kontakty", to_update, queue="link"))
     
     print(f"\n✅ Propojeno {updated} kontaktů s Klienty!")
 
@@ -0,0 +1,229 @@
+#!/usr/bin/env python3
+"""
+Adaptivní řízení souběžnosti volání externích API (AIMD) – zvlášť pro každého poskytovatele.
+
+Každý poskytovatel (airtable, apify, google_cse, google, duckduckgo, bing…) má
+limit souběžných požadavků, který se řídí odpověďmi:
+- zdravá odpověď → limit roste o 1/limit (≈ +1 za každé „kolo“ požadavků),
+- 429 / 503 → limit se vynásobí DECREASE (nejvýš jednou za kolo – odpovědi
+  na požadavky odeslané před posledním snížením se ignorují) a poskytovatel
+  se pozastaví na Retry-After (bez hlavičky na výchozí pauzu poskytovatele),
+- ostatní chyby limit nemění.
+
+Poskytovatelé s dokumentovaným limitem rychlosti (Airtable 5 req/s na base)
+mají navíc strop požadavků za sekundu – souběžnost pod ním hledá AIMD, takže
+skripty nepotřebují ruční time.sleep().
+
+Řízení používá http_metrics.request() i timed() (SDK volání Apify), takže
+platí pro všechna měřená volání. Aktuální limity vrací limits(), zapisují
+se do souhrnu metrik (metrics/<skript>_*.json, Prometheus gauge
+kontakty_concurrency_limit) a vypíše je `python3 rate_control.py`.
+
+Proměnná prostředí KONTAKTY_LIMITS přepíše meze, např.
+  KONTAKTY_LIMITS="airtable=1:4:5,apify=2:20"   # poskytovatel=min:max[:req/s]
+
+Použití:
+  from rate_control import limiter
+  with limiter("apify").slot() as slot:
+      resp = …
+      slot.observe(resp.status_code, resp.headers.get("Retry-After"))
+
+  python3 rate_control.py                  # výchozí meze poskytovatelů
+"""
+
+from __future__ import annotations
+
+import email.utils
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, NamedTuple, Optional
+
+INCREASE = 1.0      # přírůstek limitu za jedno „kolo“ zdravých odpovědí
+DECREASE = 0.5      # násobek limitu při přetížení
+THROTTLE_STATUSES = (429, 503)
+
+
+class Bounds(NamedTuple):
+    initial: float
+    min: float
+    max: float
+    rate: float = 0.0           # strop požadavků za sekundu (0 = bez stropu)
+    pause: float = 5.0          # pauza po 429 bez Retry-After (s)
+
+
+PROVIDERS: Dict[str, Bounds] = {
+    # Airtable: 5 req/s na base, po překročení 30 s penalizace
+    "airtable": Bounds(initial=2, min=1, max=8, rate=5.0, pause=30.0),
+    # Apify: běhy actorů – limit dává paměť účtu
+    "apify": Bounds(initial=2, min=1, max=10, pause=60.0),
+    "google_cse": Bounds(initial=2, min=1, max=8, rate=10.0, pause=30.0),
+    # HTML vyhledávání bez API – opatrně, captcha je horší než 429
+    "google": Bounds(initial=1, min=1, max=2, pause=60.0),
+    "duckduckgo": Bounds(initial=1, min=1, max=3, pause=30.0),
+    "bing": Bounds(initial=1, min=1, max=3, pause=30.0),
+}
+DEFAULT_BOUNDS = Bounds(initial=4, min=1, max=16)
+
+
+def _env_overrides() -> Dict[str, Bounds]:
+    out = {}
+    for spec in os.getenv("KONTAKTY_LIMITS", "").split(","):
+        name, _, values = spec.strip().partition("=")
+        if not name or not values:
+            continue
+        base = PROVIDERS.get(name, DEFAULT_BOUNDS)
+        parts = [float(v) for v in values.split(":") if v]
+        lo = parts[0] if parts else base.min
+        hi = parts[1] if len(parts) > 1 else max(lo, base.max)
+        rate = parts[2] if len(parts) > 2 else base.rate
+        out[name] = base._replace(min=lo, max=hi, initial=min(max(base.initial, lo), hi), rate=rate)
+    return out
+
+
+def retry_after(value, default: float) -> float:
+    """Retry-After v sekundách (číslo nebo HTTP datum); jinak default."""
+    if value is None or value == "":
+        return default
+    try:
+        return max(0.0, float(value))
+    except (TypeError, ValueError):
+        pass
+    try:
+        when = email.utils.parsedate_to_datetime(str(value))
+        return max(0.0, when.timestamp() - time.time())
+    except (TypeError, ValueError):
+        return default
+
+
+class Slot:
+    """Jeden povolený požadavek; observe() řekne limiteru, jak dopadl."""
+
+    __slots__ = ("limiter", "started", "outcome")
+
+    def __init__(self, limiter: "AimdLimiter", started: float):
+        self.limiter = limiter
+        self.started = started
+        self.outcome: Optional[tuple] = None
+
+    def observe(self, status, retry_after_value=None) -> None:
+        self.outcome = (status, retry_after_value)
+
+
+class AimdLimiter:
+    """Limit souběžnosti jednoho poskytovatele (additive increase / multiplicative decrease)."""
+
+    def __init__(self, name: str, bounds: Bounds):
+        self.name = name
+        self.bounds = bounds
+        self.limit = float(bounds.initial)
+        self.in_flight = 0
+        self.paused_until = 0.0
+        self.next_start = 0.0
+        self.last_decrease = 0.0
+        self.throttled = 0
+        self.peak = self.limit
+        self.cond = threading.Condition()
+
+    def acquire(self) -> float:
+        """Počká na volné místo (limit, pauza, strop rychlosti); vrací čas startu."""
+        with self.cond:
+            while True:
+                now = time.monotonic()
+                wait = max(self.paused_until, self.next_start) - now
+                if self.in_flight < max(1, int(self.limit)) and wait <= 0:
+                    self.in_flight += 1
+                    if self.bounds.rate:
+                        self.next_start = max(now, self.next_start) + 1.0 / self.bounds.rate
+                    return now
+                self.cond.wait(timeout=wait if wait > 0 else None)
+
+    def release(self, started: float, status=None, retry_after_value=None) -> float:
+        """Uvolní místo a upraví limit podle stavu odpovědi; vrací pauzu (s), pokud přišlo 429/503."""
+        pause = 0.0
+        with self.cond:
+            self.in_flight -= 1
+            if status in THROTTLE_STATUSES:
+                self.throttled += 1
+                pause = retry_after(retry_after_value, self.bounds.pause)
+                self.paused_until = max(self.paused_until, time.monotonic() + pause)
+                if started >= self.last_decrease:
+                    self.limit = max(self.bounds.min, self.limit * DECREASE)
+                    self.last_decrease = time.monotonic()
+            elif status is not None and (status == "ok" or (isinstance(status, int) and status < 500)):
+                self.limit = min(self.bounds.max, self.limit + INCREASE / max(self.limit, 1.0))
+                self.peak = max(self.peak, self.limit)
+            self.cond.notify_all()
+        return pause
+
+    @contextmanager
+    def slot(self) -> Iterator[Slot]:
+        s = Slot(self, self.acquire())
+        try:
+            yield s
+        finally:
+            status, value = s.outcome or (None, None)
+            self.release(s.started, status, value)
+
+    def state(self) -> dict:
+        with self.cond:
+            return {"limit": round(self.limit, 2), "in_flight": self.in_flight, "peak": round(self.peak, 2),
+                    "min": self.bounds.min, "max": self.bounds.max, "rate": self.bounds.rate,
+                    "throttled": self.throttled,
+                    "paused_for": round(max(0.0, self.paused_until - time.monotonic()), 1)}
+
+
+_limiters: Dict[str, AimdLimiter] = {}
+_limiters_lock = threading.Lock()
+_overrides: Optional[Dict[str, Bounds]] = None
+
+
+def bounds_for(provider: str) -> Bounds:
+    global _overrides
+    if _overrides is None:
+        _overrides = _env_overrides()
+    return _overrides.get(provider) or PROVIDERS.get(provider, DEFAULT_BOUNDS)
+
+
+def share_spec(provider: str, parts: int) -> str:
+    """
+    Položka KONTAKTY_LIMITS pro jeden z `parts` souběžných procesů: strop req/s
+    a max. souběžnost poskytovatele rozdělené mezi ně (limit platí na base, ne na proces).
+    """
+    b = _env_overrides().get(provider) or PROVIDERS.get(provider, DEFAULT_BOUNDS)
+    parts = max(1, parts)
+    hi = max(b.min, b.max / parts)
+    return f"{provider}={b.min:g}:{hi:g}:{b.rate / parts:g}"
+
+
+def limiter(provider: str) -> AimdLimiter:
+    """Sdílený limiter poskytovatele (jeden na proces)."""
+    lim = _limiters.get(provider)
+    if lim is None:
+        with _limiters_lock:
+            lim = _limiters.get(provider)
+            if lim is None:
+                lim = _limiters[provider] = AimdLimiter(provider, bounds_for(provider))
+    return lim
+
+
+def limits() -> Dict[str, dict]:
+    """Aktuální stav všech použitých limiterů: limit, běžící, maximum, počet 429…"""
+    with _limiters_lock:
+        items = list(_limiters.items())
+    return {name: lim.state() for name, lim in sorted(items)}
+
+
+def main() -> None:
+    print(f"{'poskytovatel':<14} {'start':>6} {'min':>5} {'max':>5} {'req/s':>6} {'pauza 429':>10}")
+    for name in sorted(set(PROVIDERS) | set(_env_overrides())):
+        b = bounds_for(name)
+        rate = f"{b.rate:g}" if b.rate else "–"
+        print(f"{name:<14} {b.initial:>6g} {b.min:>5g} {b.max:>5g} {rate:>6} {b.pause:>9g}s")
+    b = DEFAULT_BOUNDS
+    print(f"{'(ostatní)':<14} {b.initial:>6g} {b.min:>5g} {b.max:>5g} {'–':>6} {b.pause:>9g}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,361 @@
+#!/usr/bin/env python3
+"""
+Fulltextové hledání přes kontakty, dealy a klienty – bez ohledu na diakritiku.
+
+Index (invertovaný) pokrývá:
+- kontakty_unified.csv a deals_complete.csv (id = pořadí řádku jako v csv_editoru),
+- zrcadlo Airtable tabulek v airtable_mirror/<Tabulka>.json (id = record id),
+  které se stáhne přes --mirror.
+
+"Všechovský", "vsechovsky" i "VSECHOV" najdou totéž: text se složí na malá
+písmena bez diakritiky, slova se hledají podle prefixu (seřazený slovník +
+bisect) a od 3 znaků i jako podřetězec (trigramy). Více slov = AND.
+
+Index leží v search_index.pickle a při změně zdroje se přeindexuje jen ten
+zdroj (mtime/velikost → SHA-1), ostatní zůstanou beze změny.
+
+Použití:
+  python3 search_index.py vsechovsky              # hledání (výsledky + čas)
+  python3 search_index.py "skoda auto" --limit 50
+  python3 search_index.py --source deals_complete.csv workshop
+  python3 search_index.py --mirror                # stáhne Kontakty/Klienti/Deals z Airtable
+  python3 search_index.py --rebuild               # postaví index znovu
+
+Ve skriptech (a v csv_editor_server.py → GET /search?q=):
+  from search_index import load_search_index
+  idx = load_search_index()
+  for hit in idx.search("novak skoda"): ...
+"""
+
+from __future__ import annotations
+
+import argparse
+import bisect
+import csv
+import json
+import os
+import pickle
+import re
+import time
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+from urllib.parse import quote
+
+from company_key import fold
+from csv_cache import file_sha1
+from airtable_api import API_BASE, get_token, request_with_backoff
+
+
+BASE_DIR = Path(__file__).parent
+INDEX_PATH = BASE_DIR / "search_index.pickle"
+MIRROR_DIR = BASE_DIR / "airtable_mirror"
+
+INDEX_VERSION = "2"
+DEFAULT_LIMIT = 20
+
+BASE_ID = "appEXpqOEIElHzScl"
+
+# zdroj → pole, ze kterých se skládá titulek výsledku
+CSV_SOURCES = {
+    "kontakty_unified.csv": ["Jméno", "Příjmení", "Email", "Společnost / Firma"],
+    "deals_complete.csv": ["Název", "Firma", "Kontakt"],
+}
+MIRROR_TABLES = {
+    "Kontakty": ["Jméno", "Příjmení", "E-mail", "Společnost / Firma"],
+    "Klienti": ["Firma"],
+    "Deals": ["Název dealu", "Firma"],
+}
+
+_WORD_RE = re.compile(r"[a-z0-9]+")
+_RECORD_ID_RE = re.compile(r"^rec[A-Za-z0-9]{14}$")
+
+
+def tokenize(text: str) -> List[str]:
+    """Slova bez diakritiky; email "jan.novak@firma.cz" → jan, novak, firma, cz."""
+    return _WORD_RE.findall(fold(text or ""))
+
+
+def trigrams(token: str) -> Set[str]:
+    return {token[i:i + 3] for i in range(len(token) - 2)}
+
+
+def _text(value) -> str:
+    if isinstance(value, list):
+        return " ".join(_text(v) for v in value)
+    if isinstance(value, dict):
+        return str(value.get("name") or value.get("email") or "")
+    return "" if value is None else str(value)
+
+
+def iter_csv_docs(path: Path) -> Iterator[Tuple[str, dict]]:
+    """Stejná pravidla jako csv_editor_server (prázdné řádky se přeskočí) → stejná id řádků."""
+    with open(path, "r", encoding="utf-8-sig", newline="") as f:
+        rows = (r for r in csv.reader(f) if any(r))
+        header = next(rows, [])
+        for i, row in enumerate(rows):
+            yield str(i), {h: v for h, v in zip(header, row) if v}
+
+
+def _is_links(value) -> bool:
+    """Hodnota vazebního pole – neprázdný seznam id záznamů."""
+    return (isinstance(value, list) and bool(value)
+            and all(isinstance(v, str) and _RECORD_ID_RE.match(v) for v in value))
+
+
+def iter_mirror_docs(path: Path) -> Iterator[Tuple[str, dict]]:
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    records = data.get("records", []) if isinstance(data, dict) else data
+    for rec in records:
+        # propojené záznamy (seznam recXXX) do textu nepatří
+        fields = {k: _text(v) for k, v in (rec.get("fields") or {}).items() if not _is_links(v)}
+        fields = {k: v for k, v in fields.items() if v}
+        if rec.get("id"):
+            yield rec["id"], fields
+
+
+def all_sources(base_dir: Path = BASE_DIR) -> Dict[str, Tuple[Path, List[str]]]:
+    sources = {name: (base_dir / name, title) for name, title in CSV_SOURCES.items()}
+    for table, title in MIRROR_TABLES.items():
+        sources[f"airtable:{table}"] = (base_dir / MIRROR_DIR.name / f"{table}.json", title)
+    return sources
+
+
+class SearchIndex:
+    def __init__(self):
+        self.sources: Dict[str, dict] = {}              # zdroj → {stamp, sha1, docs: [doc id]}
+        self.docs: Dict[int, dict] = {}                 # doc id → {source, key, title, fields}
+        self.postings: Dict[str, Set[int]] = {}         # slovo → doc id
+        self.trigram_words: Dict[str, Set[str]] = {}    # trigram → slova
+        self.next_id = 0
+        self._vocab: Optional[List[str]] = None         # seřazený slovník (pro prefixy), staví se líně
+        self.dirty = False
+
+    # --- indexace ---
+
+    def _add_doc(self, source: str, key: str, fields: dict, title_fields: List[str]) -> int:
+        doc_id = self.next_id
+        self.next_id += 1
+        parts = dict.fromkeys(fields[f] for f in title_fields if fields.get(f))
+        title = " ".join(parts) or next(iter(fields.values()), key)
+        self.docs[doc_id] = {"source": source, "key": key, "title": title, "fields": fields}
+        for token in set(tokenize(" ".join(fields.values()))):
+            posting = self.postings.get(token)
+            if posting is None:
+                posting = self.postings[token] = set()
+                for tri in trigrams(token):
+                    self.trigram_words.setdefault(tri, set()).add(token)
+                self._vocab = None
+            posting.add(doc_id)
+        return doc_id
+
+    def _remove_doc(self, doc_id: int) -> None:
+        doc = self.docs.pop(doc_id)
+        for token in set(tokenize(" ".join(doc["fields"].values()))):
+            posting = self.postings.get(token)
+            if posting is None:
+                continue
+            posting.discard(doc_id)
+            if not posting:
+                del self.postings[token]
+                for tri in trigrams(token):
+                    words = self.trigram_words.get(tri)
+                    if words is not None:
+                        words.discard(token)
+                        if not words:
+                            del self.trigram_words[tri]
+                self._vocab = None
+
+    def refresh(self, base_dir: Path = BASE_DIR, force: bool = False) -> Dict[str, int]:
+        """Přeindexuje jen zdroje, které se změnily. Vrací {zdroj: počet dokumentů}."""
+        changed: Dict[str, int] = {}
+        sources = all_sources(base_dir)
+        for name in [n for n in self.sources if n not in sources or not sources[n][0].exists()]:
+            for doc_id in self.sources.pop(name)["docs"]:
+                self._remove_doc(doc_id)
+            changed[name] = 0
+            self.dirty = True
+
+        for name, (path, title_fields) in sources.items():
+            if not path.exists():
+                continue
+            st = path.stat()
+            stamp = [st.st_mtime_ns, st.st_size]
+            prev = self.sources.get(name)
+            if prev and prev["stamp"] == stamp and not force:
+                continue
+            sha1 = file_sha1(path)
+            self.dirty = True
+            if prev and prev["sha1"] == sha1 and not force:
+                prev["stamp"] = stamp
+                continue
+
+            for doc_id in (prev or {}).get("docs", []):
+                self._remove_doc(doc_id)
+            docs_iter = iter_csv_docs(path) if path.suffix == ".csv" else iter_mirror_docs(path)
+            doc_ids = [self._add_doc(name, key, fields, title_fields) for key, fields in docs_iter if fields]
+            self.sources[name] = {"stamp": stamp, "sha1": sha1, "docs": doc_ids}
+            changed[name] = len(doc_ids)
+        return changed
+
+    # --- hledání ---
+
+    def _vocabulary(self) -> List[str]:
+        if self._vocab is None:
+            self._vocab = sorted(self.postings)
+        return self._vocab
+
+    def _matching_words(self, term: str) -> Set[str]:
+        vocab = self._vocabulary()
+        i = bisect.bisect_left(vocab, term)
+        words = set()
+        while i < len(vocab) and vocab[i].startswith(term):
+            words.add(vocab[i])
+            i += 1
+        if len(term) >= 3:
+            candidates: Optional[Set[str]] = None
+            for tri in trigrams(term):
+                found = self.trigram_words.get(tri, set())
+                candidates = set(found) if candidates is None else candidates & found
+                if not candidates:
+                    break
+            words |= {w for w in candidates or () if term in w}
+        return words
+
+    def search(self, query: str, limit: int = DEFAULT_LIMIT, source: str = "") -> List[dict]:
+        terms = tokenize(query)
+        if not terms:
+            return []
+        scores: Optional[Dict[int, int]] = None
+        for term in terms:
+            term_scores: Dict[int, int] = {}
+            for word in self._matching_words(term):
+                # přesná shoda > prefix > podřetězec
+                weight = 3 if word == term else (2 if word.startswith(term) else 1)
+                for doc_id in self.postings[word]:
+                    if term_scores.get(doc_id, 0) < weight:
+                        term_scores[doc_id] = weight
+            if scores is None:
+                scores = term_scores
+            else:
+                scores = {d: s + term_scores[d] for d, s in scores.items() if d in term_scores}
+            if not scores:
+                return []
+
+        hits = []
+        for doc_id, score in sorted(scores.items(), key=lambda x: (-x[1], x[0])):
+            doc = self.docs[doc_id]
+            if source and doc["source"] != source:
+                continue
+            hits.append({"source": doc["source"], "key": doc["key"], "title": doc["title"],
+                         "score": score, "fields": doc["fields"]})
+            if len(hits) >= limit:
+                break
+        return hits
+
+    def __len__(self) -> int:
+        return len(self.docs)
+
+    # --- perzistence ---
+
+    def to_dict(self) -> dict:
+        return {"sources": self.sources, "docs": self.docs, "postings": self.postings,
+                "trigram_words": self.trigram_words, "next_id": self.next_id}
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "SearchIndex":
+        idx = cls()
+        for key, value in data.items():
+            setattr(idx, key, value)
+        return idx
+
+    def save(self, path: Path = INDEX_PATH) -> None:
+        tmp = path.with_name(path.name + ".tmp")
+        with open(tmp, "wb") as f:
+            pickle.dump({"version": INDEX_VERSION, "index": self.to_dict()}, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, path)
+        self.dirty = False
+
+
+def load_search_index(path: Path = INDEX_PATH, refresh: bool = True, force: bool = False) -> SearchIndex:
+    """Načte index z disku; při `refresh` doindexuje změněné zdroje a uloží ho."""
+    idx = None
+    if path.exists() and not force:
+        try:
+            with open(path, "rb") as f:
+                cached = pickle.load(f)
+            if cached.get("version") == INDEX_VERSION:
+                idx = SearchIndex.from_dict(cached["index"])
+        except Exception:
+            idx = None
+    if idx is None:
+        idx = SearchIndex()
+        idx.dirty = True
+    if refresh:
+        idx.refresh(path.parent)
+    if idx.dirty:
+        idx.save(path)
+    return idx
+
+
+# --- Zrcadlo Airtable ---
+
+def mirror_airtable(tables: List[str], base_dir: Path = BASE_DIR) -> Dict[str, int]:
+    """Stáhne tabulky do airtable_mirror/<Tabulka>.json (formát jako Airtable list: {"records": [...]})."""
+
+    token = get_token()
+    hdrs = {"Authorization": f"Bearer {token}"}
+    out_dir = base_dir / MIRROR_DIR.name
+    out_dir.mkdir(exist_ok=True)
+    counts = {}
+    for table in tables:
+        url = f"{API_BASE}/{BASE_ID}/{quote(table, safe='')}"
+        records, offset = [], None
+        while True:
+            params = {"pageSize": 100}
+            if offset:
+                params["offset"] = offset
+            data = request_with_backoff("GET", url, headers=hdrs, params=params)
+            records.extend(data.get("records", []))
+            offset = data.get("offset")
+            if not offset:
+                break
+        target = out_dir / f"{table}.json"
+        tmp = target.with_name(target.name + ".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"records": records}, f, ensure_ascii=False)
+        os.replace(tmp, target)
+        counts[table] = len(records)
+    return counts
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Fulltextové hledání (bez diakritiky) přes kontakty, dealy a klienty.")
+    ap.add_argument("query", nargs="*", help="Hledaný text")
+    ap.add_argument("--limit", type=int, default=DEFAULT_LIMIT)
+    ap.add_argument("--source", default="", help="Jen jeden zdroj (např. deals_complete.csv, airtable:Klienti)")
+    ap.add_argument("--mirror", action="store_true", help="Stáhnout zrcadlo Airtable tabulek")
+    ap.add_argument("--rebuild", action="store_true", help="Postavit index znovu")
+    args = ap.parse_args()
+
+    if args.mirror:
+        for table, count in mirror_airtable(list(MIRROR_TABLES)).items():
+            print(f"   ⬇️  {table}: {count} záznamů → {MIRROR_DIR.name}/{table}.json")
+
+    t0 = time.perf_counter()
+    idx = load_search_index(force=args.rebuild)
+    t_load = (time.perf_counter() - t0) * 1000
+    print(f"🔎 Index: {len(idx)} dokumentů, {len(idx.postings)} slov ({t_load:.0f} ms)")
+
+    if args.query:
+        query = " ".join(args.query)
+        t0 = time.perf_counter()
+        hits = idx.search(query, limit=args.limit, source=args.source)
+        elapsed = (time.perf_counter() - t0) * 1000
+        print(f"   \"{query}\": {len(hits)} výsledků ({elapsed:.1f} ms)")
+        for hit in hits:
+            print(f"   • [{hit['source']} #{hit['key']}] {hit['title']}")
+
+
+if __name__ == "__main__":
+    main()
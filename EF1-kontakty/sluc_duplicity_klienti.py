@@ -3,61 +3,30 @@
 Sloučí duplicitní klienty - převede linky a smaže duplicity.
 """
 
-import json
-import time
-import re
-from pathlib import Path
 from typing import Dict, List
 from urllib.parse import quote
 from collections import defaultdict
 
-import requests
 
-API_BASE = "https://api.airtable.com/v0"
+from company_key import normalize_company
+from airtable_api import API_BASE, get_token, request_with_backoff as airtable_request
+
 BASE_ID = "appEXpqOEIElHzScl"
 BATCH_SIZE = 10
 
 
-def get_token() -> str:
-    with open(Path.home() / ".cursor" / "mcp.json") as f:
-        return json.load(f)["mcpServers"]["airtable"]["env"]["AIRTABLE_API_KEY"]
-
-
 def headers(token: str) -> Dict[str, str]:
     return {"Authorization": f"Bearer {token}", "Content-Type": "application/json"}
 
 
 def request_with_backoff(method: str, url: str, *, hdrs: dict, json_data=None, params=None) -> dict:
-    delay = 1.0
-    for attempt in range(1, 8):
-        resp = requests.request(method, url, headers=hdrs, json=json_data, params=params, timeout=60)
-        if resp.status_code in (429, 500, 502, 503, 504):
-            time.sleep(delay)
-            delay = min(delay * 2, 20)
-            continue
-        if not resp.ok:
-            raise RuntimeError(f"Airtable API error {resp.status_code}: {resp.text[:500]}")
-        return resp.json()
-    raise RuntimeError("Airtable API still failing after retries")
+    return airtable_request(method, url, headers=hdrs, json=json_data, params=params)
 
 
 def chunked(items: List, size: int) -> List[List]:
     return [items[i:i + size] for i in range(0, len(items), size)]
 
 
-def normalize_company(s):
-    """Normalizuje název firmy pro porovnání."""
-    s = (s or "").strip().lower()
-    for suffix in [' s.r.o.', ' a.s.', ' s.r.o', ' a.s', ' spol.', ' k.s.', 
-                   ' gmbh', ' ltd', ' ltd.', ' inc', ' n.v.', ' ag', ' se',
-                   ' czech republic', ' česká republika', ' cz', ' sk',
-                   ' czech', ' slovakia', ' group', ' holding']:
-        s = s.replace(suffix, '')
-    s = re.sub(r'[,\.\-\(\)]', ' ', s)
-    s = re.sub(r'\s+', ' ', s)
-    return s.strip()
-
-
 def main():
     token = get_token()
     hdrs = headers(token)
@@ -154,7 +123,6 @@ def main():
                 request_with_backoff("PATCH", klienti_url, hdrs=hdrs, 
                                     json_data={"records": clean_batch})
             updated += len(batch)
-            time.sleep(0.2)
         print(f"   Aktualizováno {updated} záznamů")
     
     # 5. Smaž duplicity
@@ -167,7 +135,6 @@ def main():
         request_with_backoff("DELETE", delete_url, hdrs=hdrs)
         deleted += len(batch)
         print(f"   Smazáno: {deleted}/{len(to_delete)}", end="\r")
-        time.sleep(0.2)
     
     print(f"\n\n✅ Sloučeno! Smazáno {deleted} duplicitních klientů.")
 
@@ -0,0 +1,306 @@
+#!/usr/bin/env python3
+"""
+Snapshoty CSV po řádcích (content-addressed) místo ručních kopií typu
+kontakty_unified.before_jobtitle_cleanup.csv.
+
+Každý řádek se uloží jednou podle hashe svého obsahu; snapshot je jen
+manifest = hlavička + seznam (klíč, hash řádku) v původním pořadí. Nezměněné
+řádky se mezi verzemi sdílejí, takže nový snapshot zapíše jen změněné řádky.
+
+Řádek se ukládá i se svým původním textem (uvozovky, konce řádků), takže
+obnova zapíše soubor bajtově shodný s originálem (ověřuje se SHA-1 z
+manifestu).
+
+Úložiště (.snapshots/ vedle skriptu):
+- objects.pack          řádky (JSON {"cells", "raw"}, jeden na řádek souboru), jen append
+- objects.idx.pickle    hash → (offset, délka) v objects.pack
+- manifests/<soubor>/<id>.json.gz
+
+Použití:
+  python3 snapshots.py take kontakty_unified.csv --label jobtitle_cleanup
+  python3 snapshots.py list [kontakty_unified.csv]
+  python3 snapshots.py restore kontakty_unified.csv 20260201-101500-jobtitle_cleanup            # → nový soubor
+  python3 snapshots.py restore kontakty_unified.csv 20260201-101500-jobtitle_cleanup --in-place
+  python3 snapshots.py import kontakty_unified.before_master_xlsx.csv --as kontakty_unified.csv --label before_master_xlsx
+
+Ve skriptech (před riskantním krokem):
+  from snapshots import take_snapshot
+  take_snapshot(Path("kontakty_unified.csv"), label="pred_doplnenim_pozic")
+"""
+
+from __future__ import annotations
+
+import argparse
+import csv
+import gzip
+import hashlib
+import json
+import os
+import pickle
+import time
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from csv_cache import file_sha1
+
+
+BASE_DIR = Path(__file__).parent
+STORE_DIR = BASE_DIR / ".snapshots"
+
+DEFAULT_KEY = "Email"
+HASH_BYTES = 16
+
+
+def raw_hash(raw: str) -> str:
+    """Hash původního textu řádku (dva různě ouvozovkované zápisy jsou dva objekty)."""
+    return hashlib.blake2b(raw.encode("utf-8"), digest_size=HASH_BYTES).hexdigest()
+
+
+def iter_records(f) -> Iterator[Tuple[List[str], str]]:
+    """(buňky, původní text) záznamů CSV; záznam s víceřádkovou buňkou = více fyzických řádků."""
+    consumed: List[str] = []
+
+    def lines():
+        for line in f:
+            consumed.append(line)
+            yield line
+
+    for cells in csv.reader(lines()):
+        raw = "".join(consumed)
+        consumed.clear()
+        yield cells, raw
+
+
+class ObjectStore:
+    """Append-only úložiště řádků adresovaných hashem."""
+
+    def __init__(self, root: Path = STORE_DIR):
+        self.root = Path(root)
+        self.pack_path = self.root / "objects.pack"
+        self.idx_path = self.root / "objects.idx.pickle"
+        self._index: Optional[Dict[str, Tuple[int, int]]] = None
+        self._pending: Dict[str, bytes] = {}
+
+    @property
+    def index(self) -> Dict[str, Tuple[int, int]]:
+        if self._index is None:
+            self._index = {}
+            if self.idx_path.exists():
+                with open(self.idx_path, "rb") as f:
+                    self._index = pickle.load(f)
+        return self._index
+
+    def __contains__(self, digest: str) -> bool:
+        return digest in self.index
+
+    def put(self, digest: str, cells: List[str], raw: str) -> bool:
+        """Přidá řádek (buňky + původní text), pokud ještě není uložený. True = nový objekt."""
+        if digest in self.index or digest in self._pending:
+            return False
+        obj = {"cells": cells, "raw": raw}
+        self._pending[digest] = json.dumps(obj, ensure_ascii=False).encode("utf-8") + b"\n"
+        return True
+
+    def flush(self) -> None:
+        if not self._pending:
+            return
+        self.root.mkdir(parents=True, exist_ok=True)
+        index = self.index
+        with open(self.pack_path, "ab") as f:
+            offset = f.tell()
+            for digest, data in self._pending.items():
+                f.write(data)
+                index[digest] = (offset, len(data))
+                offset += len(data)
+            f.flush()
+            os.fsync(f.fileno())
+        # index až po zapsání dat – při pádu zůstanou v packu jen nepoužité bajty
+        tmp = self.idx_path.with_name(self.idx_path.name + ".tmp")
+        with open(tmp, "wb") as f:
+            pickle.dump(index, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, self.idx_path)
+        self._pending = {}
+
+    def get_many(self, digests: List[str]) -> Dict[str, dict]:
+        """Načte objekty řádků (čtení seřazené podle offsetu = sekvenční průchod packem)."""
+        index = self.index
+        wanted = sorted(set(digests), key=lambda d: index[d][0])
+        out: Dict[str, dict] = {}
+        with open(self.pack_path, "rb") as f:
+            for digest in wanted:
+                offset, length = index[digest]
+                f.seek(offset)
+                out[digest] = json.loads(f.read(length))
+        return out
+
+
+def manifest_dir(filename: str, root: Path = STORE_DIR) -> Path:
+    return Path(root) / "manifests" / Path(filename).name
+
+
+def list_snapshots(filename: str = "", root: Path = STORE_DIR) -> List[dict]:
+    """Metadata snapshotů (bez seznamu řádků), od nejstaršího."""
+    base = Path(root) / "manifests"
+    dirs = [manifest_dir(filename, root)] if filename else sorted(p for p in base.glob("*") if p.is_dir())
+    out = []
+    for d in dirs:
+        for path in sorted(d.glob("*.json.gz")):
+            m = load_manifest(d.name, path.name[: -len(".json.gz")], root)
+            m.pop("rows", None)
+            out.append(m)
+    return out
+
+
+def load_manifest(filename: str, snap_id: str, root: Path = STORE_DIR) -> dict:
+    path = manifest_dir(filename, root) / f"{snap_id}.json.gz"
+    if not path.exists():
+        raise SystemExit(f"Snapshot nenalezen: {Path(filename).name} / {snap_id}")
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _latest_manifest(filename: str, root: Path) -> Optional[dict]:
+    paths = sorted(manifest_dir(filename, root).glob("*.json.gz"))
+    if not paths:
+        return None
+    return load_manifest(filename, paths[-1].name[: -len(".json.gz")], root)
+
+
+def take_snapshot(path: Path, label: str = "", key: str = DEFAULT_KEY, as_name: str = "",
+                  root: Path = STORE_DIR) -> dict:
+    """Uloží snapshot CSV. Zapisují se jen řádky, které v úložišti ještě nejsou."""
+    path = Path(path)
+    filename = as_name or path.name
+    sha1 = file_sha1(path)
+
+    latest = _latest_manifest(filename, root)
+    if latest and latest["sha1"] == sha1 and latest["label"] == label:
+        latest["reused"] = True
+        return latest
+
+    store = ObjectStore(root)
+    with open(path, "r", encoding="utf-8", newline="") as f:
+        records = iter_records(f)
+        header, header_raw = next(records, ([], ""))
+        key_col = header.index(key) if key in header else 0
+        rows = []
+        new_rows = 0
+        for cells, raw in records:
+            digest = raw_hash(raw)
+            if store.put(digest, cells, raw):
+                new_rows += 1
+            rows.append([cells[key_col].strip().lower() if key_col < len(cells) else "", digest])
+    store.flush()
+
+    created = time.strftime("%Y-%m-%dT%H:%M:%S")
+    snap_id = time.strftime("%Y%m%d-%H%M%S") + (f"-{label}" if label else "")
+    manifest = {
+        "id": snap_id,
+        "file": filename,
+        "label": label,
+        "created": created,
+        "sha1": sha1,
+        "header": header,
+        "header_raw": header_raw,
+        "key": header[key_col] if header else "",
+        "row_count": len(rows),
+        "new_rows": new_rows,
+        "rows": rows,
+    }
+    target_dir = manifest_dir(filename, root)
+    target_dir.mkdir(parents=True, exist_ok=True)
+    n = 1
+    while (target_dir / f"{snap_id}.json.gz").exists():
+        n += 1
+        snap_id = f"{snap_id.rsplit('~', 1)[0]}~{n}"
+    manifest["id"] = snap_id
+    target = target_dir / f"{snap_id}.json.gz"
+    tmp = target.with_name(target.name + ".tmp")
+    with gzip.open(tmp, "wt", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False)
+    os.replace(tmp, target)
+    return manifest
+
+
+def iter_snapshot_rows(filename: str, snap_id: str, root: Path = STORE_DIR) -> Iterator[Tuple[str, List[str]]]:
+    """(klíč, buňky) řádků snapshotu v původním pořadí."""
+    manifest = load_manifest(filename, snap_id, root)
+    objects = ObjectStore(root).get_many([h for _, h in manifest["rows"]])
+    for key, digest in manifest["rows"]:
+        yield key, objects[digest]["cells"]
+
+
+def restore_snapshot(filename: str, snap_id: str, out: Path, root: Path = STORE_DIR) -> int:
+    """Zapíše snapshot do `out` (atomicky, bajtově shodně s originálem). Vrací počet řádků."""
+    manifest = load_manifest(filename, snap_id, root)
+    objects = ObjectStore(root).get_many([h for _, h in manifest["rows"]])
+    out = Path(out)
+    tmp = out.with_name(out.name + ".tmp")
+    with open(tmp, "w", encoding="utf-8", newline="") as f:
+        f.write(manifest["header_raw"])
+        for _, digest in manifest["rows"]:
+            f.write(objects[digest]["raw"])
+    if file_sha1(tmp) != manifest["sha1"]:
+        tmp.unlink()
+        raise SystemExit(f"❌ Obnova {filename} / {snap_id} nesouhlasí s SHA-1 originálu – úložiště je poškozené.")
+    os.replace(tmp, out)
+    return len(manifest["rows"])
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Řádkové snapshoty CSV (deduplikované podle obsahu).")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+
+    p = sub.add_parser("take", help="Uloží snapshot souboru")
+    p.add_argument("file")
+    p.add_argument("--label", default="")
+    p.add_argument("--key", default=DEFAULT_KEY, help="Klíčový sloupec (default: Email)")
+
+    p = sub.add_parser("import", help="Uloží existující zálohu jako snapshot jiného souboru")
+    p.add_argument("file")
+    p.add_argument("--as", dest="as_name", required=True, help="Soubor, ke kterému záloha patří")
+    p.add_argument("--label", default="")
+    p.add_argument("--key", default=DEFAULT_KEY)
+
+    p = sub.add_parser("list", help="Vypíše snapshoty")
+    p.add_argument("file", nargs="?", default="")
+
+    p = sub.add_parser("restore", help="Obnoví snapshot")
+    p.add_argument("file")
+    p.add_argument("snapshot")
+    p.add_argument("--out", default="", help="Cílový soubor (default: <soubor>.<snapshot>.csv)")
+    p.add_argument("--in-place", action="store_true", help="Přepsat původní soubor (předtím se uloží jeho snapshot)")
+
+    args = ap.parse_args()
+
+    if args.cmd in ("take", "import"):
+        path = Path(args.file)
+        if not path.exists():
+            raise SystemExit(f"Soubor nenalezen: {path}")
+        m = take_snapshot(path, label=args.label, key=args.key, as_name=getattr(args, "as_name", "") or "")
+        if m.get("reused"):
+            print(f"♻️  Beze změny od snapshotu {m['id']}")
+        else:
+            print(f"📸 {m['file']} → {m['id']}: {m['row_count']} řádků, nově uložených {m['new_rows']}")
+        return
+
+    if args.cmd == "list":
+        for m in list_snapshots(args.file):
+            print(f"   {m['file']:32} {m['id']:40} {m['row_count']:>7} řádků  (+{m['new_rows']} nových)")
+        return
+
+    if args.cmd == "restore":
+        filename = Path(args.file).name
+        if args.in_place:
+            target = Path(args.file)
+            if target.exists():
+                backup = take_snapshot(target, label="pred_obnovou")
+                print(f"📸 Aktuální stav uložen jako {backup['id']}")
+        else:
+            target = Path(args.out) if args.out else Path(args.file).with_name(f"{Path(filename).stem}.{args.snapshot}.csv")
+        count = restore_snapshot(filename, args.snapshot, target)
+        print(f"✅ Obnoveno {count} řádků → {target} (bajtově shodné s originálem)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,309 @@
+#!/usr/bin/env python3
+"""
+Sdílený suppression index – nedoručitelné (bounced) emaily ze všech zdrojů na jednom místě.
+
+Zdroje (SOURCES) se ingestují inkrementálně: znovu se načte jen soubor, kterému
+se změnil obsah (mtime/velikost → SHA-1). Výsledek leží na disku:
+- suppression_index.json   manifest (zdroje, razítka, počty)
+- suppression_index.tsv    email <TAB> důvod <TAB> zdroj (jeden řádek na dvojici email+zdroj)
+- suppression_index.bloom  volitelný Bloom filtr (pro velké seznamy)
+
+Dotaz `email in index` je O(1). S Bloom filtrem se přesná množina z .tsv
+načte až při prvním pozitivním zásahu filtru – negativní dotazy (drtivá
+většina) se vyřídí bez načítání seznamu.
+
+Použití:
+  python3 suppression.py                       # ingestuje změněné zdroje, vypíše statistiky
+  python3 suppression.py --check jan@firma.cz  # je email potlačený?
+  python3 suppression.py --add jan@firma.cz --reason "vrátil se ručně"
+  python3 suppression.py --bloom               # (pře)postaví i Bloom filtr
+
+Ve skriptech:
+  from suppression import load_suppression
+  bounced = load_suppression()
+  stav = "Neaktivní" if email in bounced else "Aktivní"
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import math
+import os
+import re
+from pathlib import Path
+from typing import Dict, Iterable, Optional
+
+from csv_cache import file_sha1, read_rows
+
+
+BASE_DIR = Path(__file__).parent
+INDEX_JSON = BASE_DIR / "suppression_index.json"
+INDEX_TSV = BASE_DIR / "suppression_index.tsv"
+INDEX_BLOOM = BASE_DIR / "suppression_index.bloom"
+
+# Od této velikosti se Bloom filtr staví automaticky
+BLOOM_THRESHOLD = 100_000
+BLOOM_FP_RATE = 0.001
+
+MANUAL_SOURCE = "manual"
+
+# soubor → kde je email a status; řádek se bere, když status == match (bez ohledu na velikost písmen)
+SOURCES = {
+    "Final mejling 2025 (AIP a AImpact) - List 1.csv": {
+        "header": True, "email": 0, "status": 3, "match": "EMAIL_BOUNCED", "reason": 5,
+    },
+    "merged_emails_old_dlm_2024 vcetne bounced.csv": {
+        "header": True, "email": 0, "status": 1, "match": "bounced", "reason": None,
+    },
+}
+
+
+def norm_email(s: str) -> str:
+    """Malá písmena, bez mezer; z více adres v jedné buňce vezme první."""
+    s = (s or "").strip().lower()
+    for part in re.split(r"[\s,;]+", s):
+        if "@" in part:
+            return part
+    return s
+
+
+class BloomFilter:
+    """Jednoduchý Bloom filtr (double hashing nad blake2b)."""
+
+    def __init__(self, size_bits: int, hashes: int, bits: Optional[bytearray] = None):
+        self.size_bits = max(8, size_bits)
+        self.hashes = max(1, hashes)
+        self.bits = bits if bits is not None else bytearray((self.size_bits + 7) // 8)
+
+    @classmethod
+    def for_capacity(cls, n: int, fp_rate: float = BLOOM_FP_RATE) -> "BloomFilter":
+        n = max(1, n)
+        m = int(-n * math.log(fp_rate) / (math.log(2) ** 2))
+        k = int(round(m / n * math.log(2)))
+        return cls(m, k)
+
+    def _positions(self, item: str):
+        digest = hashlib.blake2b(item.encode("utf-8"), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        for i in range(self.hashes):
+            yield (h1 + i * h2) % self.size_bits
+
+    def add(self, item: str) -> None:
+        for pos in self._positions(item):
+            self.bits[pos >> 3] |= 1 << (pos & 7)
+
+    def __contains__(self, item: str) -> bool:
+        return all(self.bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(item))
+
+    def save(self, path: Path) -> None:
+        tmp = path.with_name(path.name + ".tmp")
+        with open(tmp, "wb") as f:
+            f.write(self.size_bits.to_bytes(8, "little"))
+            f.write(self.hashes.to_bytes(4, "little"))
+            f.write(self.bits)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: Path) -> "BloomFilter":
+        with open(path, "rb") as f:
+            size_bits = int.from_bytes(f.read(8), "little")
+            hashes = int.from_bytes(f.read(4), "little")
+            bits = bytearray(f.read())
+        return cls(size_bits, hashes, bits)
+
+
+class SuppressionIndex:
+    def __init__(self, base_dir: Path = BASE_DIR):
+        self.base_dir = Path(base_dir)
+        self.json_path = self.base_dir / INDEX_JSON.name
+        self.tsv_path = self.base_dir / INDEX_TSV.name
+        self.bloom_path = self.base_dir / INDEX_BLOOM.name
+        self.manifest: dict = {"sources": {}, "count": 0, "bloom": False}
+        if self.json_path.exists():
+            with open(self.json_path, "r", encoding="utf-8") as f:
+                self.manifest = json.load(f)
+        self._entries: Optional[Dict[str, Dict[str, str]]] = None  # email -> {zdroj: důvod}
+        self.dirty = not self.json_path.exists()
+        self._bloom: Optional[BloomFilter] = None
+        if self.manifest.get("bloom") and self.bloom_path.exists():
+            self._bloom = BloomFilter.load(self.bloom_path)
+
+    # --- čtení ---
+
+    def _load_entries(self) -> Dict[str, Dict[str, str]]:
+        if self._entries is None:
+            self._entries = {}
+            if self.tsv_path.exists():
+                with open(self.tsv_path, "r", encoding="utf-8") as f:
+                    for line in f:
+                        email, reason, source = (line.rstrip("\n").split("\t") + ["", ""])[:3]
+                        if email:
+                            self._entries.setdefault(email, {})[source] = reason
+        return self._entries
+
+    def __contains__(self, email: str) -> bool:
+        key = norm_email(email)
+        if not key:
+            return False
+        if self._bloom is not None and key not in self._bloom:
+            return False
+        return key in self._load_entries()
+
+    is_suppressed = __contains__
+
+    def reason(self, email: str) -> str:
+        entry = self._load_entries().get(norm_email(email))
+        return next(iter(entry.values()), "") if entry else ""
+
+    def __len__(self) -> int:
+        if self._entries is None:
+            return int(self.manifest.get("count", 0))
+        return len(self._entries)
+
+    def __iter__(self):
+        return iter(self._load_entries())
+
+    # --- zápis ---
+
+    def _replace_source(self, source: str, emails: Dict[str, str]) -> None:
+        entries = self._load_entries()
+        for email in list(entries):
+            by_source = entries[email]
+            if by_source.pop(source, None) is not None and not by_source:
+                del entries[email]
+        for email, reason in emails.items():
+            entries.setdefault(email, {})[source] = reason
+
+    def add(self, email: str, reason: str = "", source: str = MANUAL_SOURCE) -> bool:
+        key = norm_email(email)
+        if not key or "@" not in key:
+            return False
+        entries = self._load_entries()
+        if key in entries:
+            return False
+        entries[key] = {source: reason or source}
+        self.dirty = True
+        if self._bloom is not None:
+            self._bloom.add(key)
+        return True
+
+    def refresh(self, sources: Optional[Dict[str, dict]] = None) -> Dict[str, int]:
+        """Znovu ingestuje jen zdroje, které se změnily. Vrací {zdroj: počet emailů}."""
+        sources = SOURCES if sources is None else sources
+        changed: Dict[str, int] = {}
+        known = self.manifest.setdefault("sources", {})
+
+        for name, cfg in sources.items():
+            path = self.base_dir / name
+            if not path.exists():
+                continue
+            st = path.stat()
+            stamp = [st.st_mtime_ns, st.st_size]
+            prev = known.get(name) or {}
+            if prev.get("stamp") == stamp:
+                continue
+            sha1 = file_sha1(path)
+            self.dirty = True
+            if prev.get("sha1") == sha1:
+                prev["stamp"] = stamp
+                continue
+
+            emails: Dict[str, str] = {}
+            for row in read_rows(path, has_header=cfg.get("header", False)):
+                status = row[cfg["status"]].strip() if len(row) > cfg["status"] else ""
+                if status.lower() != cfg["match"].lower():
+                    continue
+                email = norm_email(row[cfg["email"]] if len(row) > cfg["email"] else "")
+                if not email or "@" not in email:
+                    continue
+                reason_col = cfg.get("reason")
+                reason = row[reason_col].strip() if reason_col is not None and len(row) > reason_col else ""
+                emails[email] = reason or "bounced"
+
+            self._replace_source(name, emails)
+            known[name] = {"stamp": stamp, "sha1": sha1, "count": len(emails)}
+            changed[name] = len(emails)
+
+        return changed
+
+    def save(self, bloom: Optional[bool] = None) -> None:
+        entries = self._load_entries()
+        if bloom is None:
+            bloom = bool(self.manifest.get("bloom")) or len(entries) >= BLOOM_THRESHOLD
+
+        tmp = self.tsv_path.with_name(self.tsv_path.name + ".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            for email in sorted(entries):
+                for source, reason in entries[email].items():
+                    f.write(f"{email}\t{_tsv(reason)}\t{_tsv(source)}\n")
+        os.replace(tmp, self.tsv_path)
+
+        if bloom:
+            self._bloom = BloomFilter.for_capacity(len(entries))
+            for email in entries:
+                self._bloom.add(email)
+            self._bloom.save(self.bloom_path)
+
+        self.manifest["count"] = len(entries)
+        self.manifest["bloom"] = bool(bloom)
+        tmp = self.json_path.with_name(self.json_path.name + ".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.manifest, f, ensure_ascii=False, indent=2)
+        os.replace(tmp, self.json_path)
+        self.dirty = False
+
+
+def _tsv(value: str) -> str:
+    return (value or "").replace("\t", " ").replace("\n", " ")
+
+
+def load_suppression(refresh: bool = True, base_dir: Path = BASE_DIR) -> SuppressionIndex:
+    """Načte index; při `refresh` nejdřív doingestuje změněné zdroje (a uloží je)."""
+    idx = SuppressionIndex(base_dir)
+    if refresh:
+        idx.refresh()
+    if idx.dirty:
+        idx.save()
+    return idx
+
+
+def add_many(emails: Iterable[str], reason: str = "", base_dir: Path = BASE_DIR) -> int:
+    idx = load_suppression(refresh=False, base_dir=base_dir)
+    added = sum(1 for e in emails if idx.add(e, reason))
+    if idx.dirty:
+        idx.save()
+    return added
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Suppression index nedoručitelných emailů.")
+    ap.add_argument("--check", nargs="*", default=[], help="Ověří, zda jsou emaily potlačené")
+    ap.add_argument("--add", nargs="*", default=[], help="Ručně přidá emaily")
+    ap.add_argument("--reason", default="", help="Důvod pro --add")
+    ap.add_argument("--bloom", action="store_true", help="Postavit Bloom filtr i pro malý seznam")
+    args = ap.parse_args()
+
+    idx = SuppressionIndex()
+    changed = idx.refresh()
+    added = sum(1 for e in args.add if idx.add(e, args.reason))
+    if idx.dirty or args.bloom:
+        idx.save(bloom=True if args.bloom else None)
+
+    for name, count in changed.items():
+        print(f"   ♻️  {name}: {count} bounced")
+    if added:
+        print(f"   ➕ Ručně přidáno: {added}")
+    print(f"🚫 Potlačených emailů: {len(idx)} (Bloom filtr: {'ano' if idx.manifest.get('bloom') else 'ne'})")
+
+    for email in args.check:
+        if email in idx:
+            print(f"   ❌ {email}: {idx.reason(email)}")
+        else:
+            print(f"   ✅ {email}: není v seznamu")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,364 @@
+#!/usr/bin/env python3
+"""
+Proudové kopírování tabulky do tabulky v Airtable – mapování polí, přemapování vazeb, mapa id.
+
+TableCopy čte zdrojovou tabulku po stránkách a každou stránku hned posílá jako
+dávky vytvoření (POST po 10) do cílové tabulky – souběžně, s limitem Airtable
+z rate_control. Kopie je deklarativní:
+
+- fields  – zdrojové pole → cílové pole (ostatní pole se nekopírují; pole, která
+            cílová tabulka podle schématu nemá, se vynechají s upozorněním),
+- links   – vazební pole → jak přemapovat id: None = ponechat (stejná base),
+            "<jméno kopie>" = přes mapu id jiné kopie (např. zkopírovaní Klienti),
+            SELF = vazby uvnitř kopírované tabulky (doplní se druhým průchodem,
+            až existují všechny nové záznamy; opakovaný běh je doplní i u
+            záznamů z mapy id, kdyby předchozí běh skončil před nimi),
+- key     – volitelný klíč záznamu; zdroj, jehož klíč už v cíli je, se přeskočí.
+
+Mapa id zdroj → cíl se průběžně připisuje do .copies/<kopie>.idmap.tsv. Opakovaná
+kopie tak zkopíruje jen nové záznamy a navazující kopie (vazby) ji použijí.
+
+Ve skriptech:
+  from table_copy import SELF, TableCopy
+  copy = TableCopy("deals_doplnek", BASE_ID, "Deals", "Deals - doplněk",
+                   fields={"Firma": "Firma", "Email": "Email"}, links={"Klienti": None})
+  stats = copy.run()
+  copy.id_map["rec…"]          # → id kopie
+
+Použití:
+  python3 kopiruj_deals.py
+  python3 table_copy.py                    # uložené mapy id
+  python3 table_copy.py reset deals_doplnek   # zapomene mapu id (kopie začne znovu)
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Optional, Set
+from urllib.parse import quote
+
+from rate_control import bounds_for
+
+BASE_DIR = Path(__file__).parent
+COPY_DIR = Path(os.getenv("KONTAKTY_COPY_DIR") or BASE_DIR / ".copies")
+
+SELF = "@self"
+BATCH_SIZE = 10
+PAGE_SIZE = 100
+PROGRESS_EVERY = 500
+
+
+def _headers() -> Dict[str, str]:
+    from airtable_api import get_token
+
+    return {"Authorization": f"Bearer {get_token()}", "Content-Type": "application/json"}
+
+
+def _url(base_id: str, table: str) -> str:
+    from airtable_api import API_BASE
+
+    return f"{API_BASE}/{base_id}/{quote(table, safe='')}"
+
+
+def iter_pages(base_id: str, table: str, fields: Optional[List[str]] = None) -> Iterator[List[dict]]:
+    """Stránky záznamů tabulky (po 100)."""
+    from airtable_api import request_with_backoff
+
+    url, hdrs, offset = _url(base_id, table), _headers(), None
+    while True:
+        params = {"pageSize": PAGE_SIZE}
+        if fields:
+            params["fields[]"] = fields
+        if offset:
+            params["offset"] = offset
+        data = request_with_backoff("GET", url, headers=hdrs, params=params)
+        yield data.get("records", [])
+        offset = data.get("offset")
+        if not offset:
+            break
+
+
+class IdMap:
+    """Mapa id zdroj → cíl jedné kopie, připisovaná do .copies/<kopie>.idmap.tsv."""
+
+    def __init__(self, name: str):
+        self.path = COPY_DIR / f"{name}.idmap.tsv"
+        self.map: Dict[str, str] = {}
+        self.lock = threading.Lock()
+        if self.path.exists():
+            with open(self.path, "r", encoding="utf-8") as f:
+                for line in f:
+                    src, _, dst = line.rstrip("\n").partition("\t")
+                    if dst:
+                        self.map[src] = dst
+
+    def __contains__(self, src: str) -> bool:
+        return src in self.map
+
+    def __getitem__(self, src: str) -> str:
+        return self.map[src]
+
+    def get(self, src: str) -> Optional[str]:
+        return self.map.get(src)
+
+    def __len__(self) -> int:
+        return len(self.map)
+
+    def add(self, pairs: List[tuple]) -> None:
+        with self.lock:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write("".join(f"{src}\t{dst}\n" for src, dst in pairs))
+                f.flush()
+                os.fsync(f.fileno())
+            self.map.update(pairs)
+
+    def reset(self) -> None:
+        with self.lock:
+            self.map.clear()
+            if self.path.exists():
+                self.path.unlink()
+
+
+class TableCopy:
+    """Deklarace a běh kopie jedné tabulky."""
+
+    def __init__(self, name: str, base_id: str, source: str, target: str, *,
+                 fields: Dict[str, str], links: Optional[Dict[str, Optional[str]]] = None,
+                 key: Optional[Callable[[dict], object]] = None, skip_empty: bool = True,
+                 typecast: bool = True, refresh_schema: bool = False):
+        self.name = name
+        self.base_id = base_id
+        self.source = source
+        self.target = target
+        self.fields = dict(fields)
+        self.links = dict(links or {})
+        self.key = key
+        self.skip_empty = skip_empty
+        self.typecast = typecast
+        self.refresh_schema = refresh_schema
+        self.id_map = IdMap(name)
+        self._maps: Dict[str, IdMap] = {}
+        self._lock = threading.Lock()
+        self._deferred: Dict[str, Dict[str, List[str]]] = {}   # zdrojové id → {cílové pole: zdrojové vazby}
+        self.copied: List[dict] = []    # pole záznamů vytvořených tímto během
+        self.stats = {"read": 0, "created": 0, "skipped": 0, "existing": 0, "links_dropped": 0, "links_deferred": 0}
+
+    # --- mapování ---
+
+    def _target_name(self, src_field: str) -> str:
+        return self.fields.get(src_field) or src_field
+
+    def _usable_fields(self) -> None:
+        """Vynechá pole, která cílová tabulka nemá (schéma z cache; chybí-li v něm, stáhne se znovu)."""
+        from airtable_schema import schema_for
+
+        wanted = [self._target_name(src) for src in list(self.fields) + list(self.links)]
+        existing = schema_for(self.base_id, self.target, wanted, refresh=self.refresh_schema).field_names(self.target)
+        if not existing:
+            return
+        for src in list(self.fields) + list(self.links):
+            if self._target_name(src) not in existing:
+                print(f"   ⚠️  Pole '{self._target_name(src)}' v {self.target} není – nekopíruje se")
+                self.fields.pop(src, None)
+                self.links.pop(src, None)
+
+    def _link_map(self, spec: str) -> IdMap:
+        if spec in (SELF, self.name):
+            return self.id_map
+        if spec not in self._maps:
+            self._maps[spec] = IdMap(spec)
+        return self._maps[spec]
+
+    def map_record(self, rec: dict) -> Optional[dict]:
+        """Pole nového záznamu v cíli (None = nekopírovat)."""
+        src = rec.get("fields", {})
+        out = {}
+        for s, t in self.fields.items():
+            if s in self.links:
+                continue
+            value = src.get(s)
+            if self.skip_empty and (value is None or value == "" or value == []):
+                continue
+            out[t] = value
+        for s, spec in self.links.items():
+            ids = src.get(s) or []
+            if not ids:
+                continue
+            t = self._target_name(s)
+            if spec is None:
+                out[t] = list(ids)
+                continue
+            if spec in (SELF, self.name):
+                # nové záznamy ještě nemusí existovat – vazby se doplní po vytvoření všech
+                continue
+            mapping = self._link_map(spec)
+            mapped = [mapping.get(i) for i in ids]
+            self.stats["links_dropped"] += sum(1 for m in mapped if m is None)
+            mapped = [m for m in mapped if m]
+            if mapped:
+                out[t] = mapped
+        self._defer_self_links(rec)
+        return out or None
+
+    def _defer_self_links(self, rec: dict) -> None:
+        """Zapamatuje vazby uvnitř tabulky (SELF) – doplní je _patch_deferred."""
+        src = rec.get("fields", {})
+        for s, spec in self.links.items():
+            ids = src.get(s) or []
+            if ids and spec in (SELF, self.name):
+                self._deferred.setdefault(rec["id"], {})[self._target_name(s)] = list(ids)
+                self.stats["links_deferred"] += len(ids)
+
+    # --- běh ---
+
+    def _existing_keys(self) -> Set[object]:
+        target_fields = [self._target_name(s) for s in self.fields]
+        keys = set()
+        for page in iter_pages(self.base_id, self.target, target_fields):
+            for rec in page:
+                tf = rec.get("fields", {})
+                # klíč se počítá nad zdrojovými názvy polí
+                keys.add(self.key({s: tf.get(self._target_name(s)) for s in self.fields}))
+        return keys
+
+    def _create(self, batch: List[tuple]) -> None:
+        from airtable_api import request_with_backoff
+
+        body = {"records": [{"fields": f} for _, f in batch]}
+        if self.typecast:
+            body["typecast"] = True
+        data = request_with_backoff("POST", _url(self.base_id, self.target), headers=_headers(), json=body)
+        created = data.get("records", [])
+        self.id_map.add([(src_id, r["id"]) for (src_id, _), r in zip(batch, created)])
+        with self._lock:
+            self.stats["created"] += len(created)
+            self.copied.extend(f for _, f in batch)
+
+    def _patch_deferred(self, pool: ThreadPoolExecutor) -> None:
+        from airtable_api import request_with_backoff
+
+        updates = []
+        for src_id, links in self._deferred.items():
+            dst = self.id_map.get(src_id)
+            if not dst:
+                continue
+            fields = {}
+            for t, ids in links.items():
+                mapped = [self.id_map.get(i) for i in ids]
+                self.stats["links_dropped"] += sum(1 for m in mapped if m is None)
+                fields[t] = [m for m in mapped if m]
+            updates.append({"id": dst, "fields": fields})
+        if not updates:
+            return
+        print(f"   🔗 Doplňuji vazby uvnitř tabulky: {len(updates)} záznamů")
+        url, hdrs = _url(self.base_id, self.target), _headers()
+        futures = [pool.submit(request_with_backoff, "PATCH", url, headers=hdrs,
+                               json={"records": updates[i:i + BATCH_SIZE]})
+                   for i in range(0, len(updates), BATCH_SIZE)]
+        for f in futures:
+            f.result()
+
+    def run(self, records: Optional[Iterator[List[dict]]] = None) -> dict:
+        """Zkopíruje (zbylé) záznamy; `records` = vlastní zdroj stránek místo celé tabulky."""
+        start = time.perf_counter()
+        self._usable_fields()
+        existing = self._existing_keys() if self.key else set()
+        if existing:
+            print(f"   {len(existing)} záznamů v {self.target} podle klíče")
+        source_fields = list(dict.fromkeys(list(self.fields) + list(self.links)))
+        pages = records if records is not None else iter_pages(self.base_id, self.source, source_fields)
+
+        workers = max(1, int(bounds_for("airtable").max))
+        in_flight: Set[Future] = set()
+        batch: List[tuple] = []
+        last_report = 0
+
+        def submit(pool: ThreadPoolExecutor, b: List[tuple]) -> None:
+            nonlocal in_flight
+            if len(in_flight) >= workers * 2:
+                done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                for f in done:
+                    f.result()
+            in_flight.add(pool.submit(self._create, b))
+
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            for page in pages:
+                for rec in page:
+                    self.stats["read"] += 1
+                    if rec["id"] in self.id_map:
+                        # přerušený běh mohl skončit před doplněním vazeb – doplní se znovu
+                        self.stats["existing"] += 1
+                        self._defer_self_links(rec)
+                        continue
+                    fields = self.map_record(rec)
+                    k = self.key({s: rec.get("fields", {}).get(s) for s in self.fields}) if self.key else None
+                    if fields is None or (self.key and k in existing):
+                        self.stats["skipped"] += 1
+                        continue
+                    if self.key:
+                        existing.add(k)
+                    batch.append((rec["id"], fields))
+                    if len(batch) == BATCH_SIZE:
+                        submit(pool, batch)
+                        batch = []
+                if self.stats["created"] - last_report >= PROGRESS_EVERY:
+                    last_report = self.stats["created"]
+                    print(f"   ... {self.stats['created']} zkopírováno", flush=True)
+            if batch:
+                submit(pool, batch)
+            for f in in_flight:
+                f.result()
+            self._patch_deferred(pool)
+
+        s = self.stats
+        print(f"   ✅ {self.source} → {self.target}: přečteno {s['read']}, vytvořeno {s['created']}, "
+              f"už zkopírováno {s['existing']}, přeskočeno {s['skipped']} ({time.perf_counter() - start:.1f} s)")
+        if s["links_dropped"]:
+            print(f"   ⚠️  {s['links_dropped']} vazeb bez protějšku v mapě id – vynechány")
+        return s
+
+    def clear_target(self) -> int:
+        """Smaže všechny záznamy cílové tabulky (souběžně po 10) a zapomene mapu id."""
+        from airtable_api import request_with_backoff
+
+        ids = [rec["id"] for page in iter_pages(self.base_id, self.target) for rec in page]
+        url, hdrs = _url(self.base_id, self.target), _headers()
+        workers = max(1, int(bounds_for("airtable").max))
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(request_with_backoff, "DELETE", url, headers=hdrs,
+                                   params={"records[]": ids[i:i + BATCH_SIZE]})
+                       for i in range(0, len(ids), BATCH_SIZE)]
+            for f in futures:
+                f.result()
+        self.id_map.reset()
+        return len(ids)
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Mapy id kopií tabulek (.copies/)")
+    ap.add_argument("action", nargs="?", default="list", choices=["list", "reset"])
+    ap.add_argument("name", nargs="?")
+    args = ap.parse_args()
+
+    if args.action == "reset":
+        if not args.name:
+            raise SystemExit("❌ Zadej jméno kopie: python3 table_copy.py reset <kopie>")
+        IdMap(args.name).reset()
+        print(f"🗑️  Mapa id {args.name} zapomenuta.")
+        return
+    paths = sorted(COPY_DIR.glob("*.idmap.tsv"))
+    if not paths:
+        print("✅ Žádná uložená kopie.")
+    for path in paths:
+        name = path.name[:-len(".idmap.tsv")]
+        print(f"   {name:<28} {len(IdMap(name)):>7} záznamů")
+
+
+if __name__ == "__main__":
+    main()
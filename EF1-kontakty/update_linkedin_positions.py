@@ -13,25 +13,22 @@ Updates:
 import csv
 import os
 import sys
-import time
+from functools import lru_cache
 from pathlib import Path
 from apify_client import ApifyClient
 
+from company_key import normalize_company
+from snapshots import take_snapshot
+from http_metrics import timed
+from job_queue import open_queue
+
 # Configuration
 CSV_FILE = Path(__file__).parent / "kontakty_unified.csv"
 # HarvestAPI LinkedIn Profile Scraper (No Cookies) - použijte ID pokud name nefunguje
 APIFY_ACTOR = "LpVuK3Zozwuipa5bp"  # harvestapi/linkedin-profile-scraper
-
-def normalize_firma(name: str) -> str:
-    """Pro porovnání: malá písmena, bez s.r.o. / a.s., zkrácené mezery."""
-    if not name:
-        return ""
-    s = (name or "").lower().strip()
-    for suffix in (" s.r.o.", " a.s.", " s.r.o", " a.s", ", s.r.o.", ", a.s.", " spol. s r.o."):
-        s = s.replace(suffix, "")
-    s = " ".join(s.split())
-    return s
-
+# Fronta úloh (job_queue.py): souběžnost Apify běhů řídí rate_control, stažený profil platí 30 dní
+JOB_QUEUE = "linkedin_profile"
+PROFILE_FRESH_FOR = 30 * 86400
 
 def company_matches(csv_firma: str, linkedin_company: str) -> bool:
     """True, pokud se firma v CSV shoduje s firmou z LinkedIn (nebo CSV nemá firmu)."""
@@ -39,8 +36,8 @@ def company_matches(csv_firma: str, linkedin_company: str) -> bool:
         return True
     if not (linkedin_company or "").strip():
         return False
-    a = normalize_firma(csv_firma)
-    b = normalize_firma(linkedin_company)
+    a = normalize_company(csv_firma)
+    b = normalize_company(linkedin_company)
     if not a:
         return True
     # Shoda: celý název nebo alespoň významná slova
@@ -141,61 +138,66 @@ def get_linkedin_username(url: str) -> str:
 def scrape_linkedin_profile(client: ApifyClient, linkedin_url: str) -> dict:
     """
     Scrape LinkedIn profile using Apify
-    Returns: dict with 'headline', 'currentPosition', 'company', etc.
+    Returns: dict with 'headline', 'currentPosition', 'company', etc. ({} = profil bez dat)
+    Chyby Apify propadnou ven – fronta úlohu zopakuje s backoffem.
     """
     username = get_linkedin_username(linkedin_url)
     if not username:
         return {}
     
-    print(f"  Scraping: {username}...", end=" ", flush=True)
-    
-    try:
-        run_input = {"urls": [linkedin_url]}
+    run_input = {"urls": [linkedin_url]}
+    with timed("apify", f"actor/{APIFY_ACTOR}"):
         run_result = client.actor(APIFY_ACTOR).call(run_input=run_input)
-        default_dataset_id = run_result.get("defaultDatasetId")
-        if not default_dataset_id:
-            print("✗ (no dataset)")
-            return {}
+    default_dataset_id = (run_result or {}).get("defaultDatasetId")
+    if not default_dataset_id:
+        raise RuntimeError(f"{username}: Apify run bez datasetu")
+    with timed("apify", "dataset/items"):
         dataset = client.dataset(default_dataset_id)
         items = list(dataset.iterate_items())
-        
-        if items and len(items) > 0:
-            profile = items[0]
-            # HarvestAPI: headline, currentPosition = list of {companyName, title?}; bereme JEN job title, ne headline
-            headline = profile.get("headline", "") or ""
-            curr = profile.get("currentPosition")
-            if isinstance(curr, list) and curr:
-                first = curr[0]
-                company = (first.get("companyName") or first.get("company") or "") if isinstance(first, dict) else ""
-                # Pouze title/position z aktuální pozice – nikdy headline (citáty, "Pamela, je tu" atd.)
-                position = (first.get("title") or first.get("position") or "") if isinstance(first, dict) else ""
-            else:
-                company = profile.get("company", "") or profile.get("currentCompany", "")
-                position = profile.get("title", "") or ""
-            # Fallback: pokud API neposkytne title, zkusíme vytáhnout jen job title z headline
-            if not position:
-                position = extract_job_title_from_headline(headline)
-
-            # finální kontrola: do CSV nechceme citáty / osobní texty
-            if position and _looks_like_headline_not_title(position):
-                position = ""
-            result = {
-                "headline": headline,
-                "currentPosition": position,
-                "company": company,
-                "location": profile.get("location", ""),
-                "email": profile.get("email", ""),
-                "emails": profile.get("emails", []),
-            }
-            print("✓")
-            return result
-        else:
-            print("✗ (no data)")
-            return {}
-            
-    except Exception as e:
-        print(f"✗ Error: {str(e)[:80]}")
+    
+    if not items:
+        print(f"  Scraping: {username} ✗ (no data)", flush=True)
         return {}
+    
+    profile = items[0]
+    # HarvestAPI: headline, currentPosition = list of {companyName, title?}; bereme JEN job title, ne headline
+    headline = profile.get("headline", "") or ""
+    curr = profile.get("currentPosition")
+    if isinstance(curr, list) and curr:
+        first = curr[0]
+        company = (first.get("companyName") or first.get("company") or "") if isinstance(first, dict) else ""
+        # Pouze title/position z aktuální pozice – nikdy headline (citáty, "Pamela, je tu" atd.)
+        position = (first.get("title") or first.get("position") or "") if isinstance(first, dict) else ""
+    else:
+        company = profile.get("company", "") or profile.get("currentCompany", "")
+        position = profile.get("title", "") or ""
+    # Fallback: pokud API neposkytne title, zkusíme vytáhnout jen job title z headline
+    if not position:
+        position = extract_job_title_from_headline(headline)
+
+    # finální kontrola: do CSV nechceme citáty / osobní texty
+    if position and _looks_like_headline_not_title(position):
+        position = ""
+    print(f"  Scraping: {username} ✓", flush=True)
+    return {
+        "headline": headline,
+        "currentPosition": position,
+        "company": company,
+        "location": profile.get("location", ""),
+        "email": profile.get("email", ""),
+        "emails": profile.get("emails", []),
+    }
+
+
+@lru_cache(maxsize=None)
+def get_apify_client() -> ApifyClient:
+    return ApifyClient(os.environ["APIFY_API_TOKEN"])
+
+
+def profile_job(payload: dict) -> dict:
+    """Handler fronty (job_queue): stáhne jeden profil."""
+    return scrape_linkedin_profile(get_apify_client(), payload["url"])
+
 
 def main():
     # Get API token
@@ -209,8 +211,6 @@ def main():
         print("4. Or pass as argument: python update_linkedin_positions.py YOUR_TOKEN")
         sys.exit(1)
     
-    client = ApifyClient(api_token)
-    
     # Read CSV
     print(f"📖 Reading {CSV_FILE}...")
     rows = []
@@ -219,13 +219,14 @@ def main():
         headers = reader.fieldnames
         for row in reader:
             rows.append(row)
+    take_snapshot(CSV_FILE, label="pred_linkedin_pozicemi")
     
     # Kontakty s LinkedIn, kde chybí pozice (doplníme jen při shodě firmy)
     to_update = []
     for i, row in enumerate(rows):
         linkedin = row.get('LinkedIn profil', '').strip()
         pozice = row.get('Pracovní pozice', '').strip()
-        if linkedin and not pozice:
+        if linkedin and not pozice and get_linkedin_username(linkedin):
             to_update.append((i, linkedin))
     
     print(f"\n📊 Kontakty s LinkedIn a bez pozice: {len(to_update)}")
@@ -255,6 +256,19 @@ def main():
     else:
         print(f"\n🚀 Spouštím aktualizaci ({len(to_update)} kontaktů)...")
     
+    # Profily stahuje fronta (souběžně, s opakováním); přerušený běh stačí spustit znovu
+    queue = open_queue()
+    job_keys = {row_idx: f"linkedin_profile:{get_linkedin_username(url).lower()}" for row_idx, url in to_update}
+    new_jobs = queue.enqueue_many(
+        JOB_QUEUE, "apify", "update_linkedin_positions:profile_job",
+        [(job_keys[row_idx], {"url": url}) for row_idx, url in to_update],
+        fresh_for=PROFILE_FRESH_FOR,
+    )
+    if new_jobs < len(to_update):
+        print(f"   ♻️  {len(to_update) - new_jobs} profilů už je ve frontě (staženo nebo rozpracováno)")
+    queue.run_workers(JOB_QUEUE)
+    profiles = queue.results(job_keys.values())
+    
     updated_positions = 0
     skipped_no_match = 0
     for idx, (row_idx, linkedin_url) in enumerate(to_update, 1):
@@ -262,9 +276,10 @@ def main():
         jmeno = f"{rows[row_idx].get('Jméno','')} {rows[row_idx].get('Příjmení','')}".strip()
         print(f"\n[{idx}/{len(to_update)}] {jmeno or '?'}…")
         
-        profile_data = scrape_linkedin_profile(client, linkedin_url)
+        profile_data = profiles.get(job_keys[row_idx])
         
         if not profile_data:
+            print("  → Profil se nepodařilo stáhnout" if job_keys[row_idx] not in profiles else "  → LinkedIn bez dat")
             continue
         
         # Pouze skutečný job title – headline nepoužíváme
@@ -293,16 +308,6 @@ def main():
         if not csv_firma and new_company:
             rows[row_idx]['Společnost / Firma'] = new_company
             print(f"  → Firma doplněna: {new_company[:50]}")
-        
-        if idx % 10 == 0 and updated_positions > 0:
-            with open(CSV_FILE, 'w', encoding='utf-8', newline='') as f:
-                writer = csv.DictWriter(f, fieldnames=headers)
-                writer.writeheader()
-                writer.writerows(rows)
-            print(f"  💾 Průběžně uloženo ({updated_positions} pozic)")
-        
-        if idx < len(to_update):
-            time.sleep(2)
     
     if updated_positions > 0:
         with open(CSV_FILE, 'w', encoding='utf-8', newline='') as f:
@@ -1,19 +1,12 @@
 #!/usr/bin/env python3
 """Zjistí unikátní hodnoty v poli Reakce/výsledek."""
 
-import json
-import time
-from pathlib import Path
 from collections import Counter
 from urllib.parse import quote
-import requests
 
-API_BASE = "https://api.airtable.com/v0"
-BASE_ID = "appEXpqOEIElHzScl"
+from airtable_api import API_BASE, get_token, request_with_backoff
 
-def get_token():
-    with open(Path.home() / ".cursor" / "mcp.json") as f:
-        return json.load(f)["mcpServers"]["airtable"]["env"]["AIRTABLE_API_KEY"]
+BASE_ID = "appEXpqOEIElHzScl"
 
 def main():
     hdrs = {"Authorization": f"Bearer {get_token()}", "Content-Type": "application/json"}
@@ -26,8 +19,7 @@ def main():
         params = {"pageSize": 100}
         if offset:
             params["offset"] = offset
-        resp = requests.get(url, headers=hdrs, params=params, timeout=60)
-        data = resp.json()
+        data = request_with_backoff("GET", url, headers=hdrs, params=params)
         
         for rec in data.get("records", []):
             v = rec.get("fields", {}).get("Reakce/výsledek", "")